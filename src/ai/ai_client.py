@@ -3,14 +3,38 @@ AI 客户端封装
 将 AI 模型相关的函数抽象出来，支持多种 AI 提供商
 """
 
-from typing import Optional
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional
 from loguru import logger
 
 
+# 可重试的 HTTP 状态码：限流和服务端错误
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+# 可重试的异常类型名（超时、连接错误），兼容 openai / anthropic SDK
+RETRYABLE_ERROR_NAMES = {'APITimeoutError', 'APIConnectionError', 'TimeoutException', 'ConnectError'}
+
+# 各提供商的默认 API 地址，用于从共享连接池中取对应主机的客户端
+DEFAULT_BASE_URLS = {
+    'openai': "https://api.openai.com",
+    'deepseek': "https://api.deepseek.com",
+    'anthropic': "https://api.anthropic.com",
+}
+
+
 class AIClient:
     """AI 客户端封装类"""
     
-    def __init__(self, provider: str, api_key: str, model: str, base_url: Optional[str] = None):
+    def __init__(self, provider: str, api_key: str, model: str, base_url: Optional[str] = None,
+                 timeout: Optional[float] = None, max_retries: int = 0,
+                 backoff_base: float = 1.0, backoff_max: float = 30.0,
+                 hedge_enabled: bool = False, hedge_after: Optional[float] = None,
+                 hedge_percentile: float = 0.95, hedge_min_samples: int = 20,
+                 fallbacks: Optional[List['AIClient']] = None, http_pool=None):
         """初始化 AI 客户端
         
         Args:
@@ -18,15 +42,81 @@ class AIClient:
             api_key: API 密钥
             model: 模型名称
             base_url: API 基础 URL (可选)
+            timeout: 单次调用超时时间（秒），None 使用 SDK 默认值
+            max_retries: 遇到 429/5xx/超时时的最大重试次数
+            backoff_base: 指数退避的基础等待时间（秒）
+            backoff_max: 单次退避的最大等待时间（秒）
+            hedge_enabled: 是否启用对冲请求
+            hedge_after: 发起对冲请求的固定延迟（秒），None 时使用历史延迟的百分位
+            hedge_percentile: 自动对冲阈值使用的延迟百分位
+            hedge_min_samples: 计算自动对冲阈值所需的最少样本数
+            fallbacks: 失败时依次切换的备用客户端
+            http_pool: 共享的 HTTPPool，通过 SDK 的 http_client 参数注入
         """
         self.provider = provider
         self.api_key = api_key
         self.model = model
         self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.fallbacks = fallbacks or []
+        self.http_pool = http_pool
         self.client = None
         
+        self._latencies = deque(maxlen=200)
+        self._latency_lock = threading.Lock()
+        # 分块摘要等多个线程共用同一客户端，对冲线程池在锁内创建，只创建一次
+        self._hedge_lock = threading.Lock()
+        self._hedge_executor = None
+        # 每个线程最近一次调用实际返回结果的客户端（主客户端或备用客户端）
+        self._answered = threading.local()
+        
         self._init_client()
     
+    @classmethod
+    def from_config(cls, config, http_pool=None) -> 'AIClient':
+        """根据配置创建 AI 客户端（包含失败切换链）
+        
+        ai.failover 为有序列表，每项包含 provider/api_key/model/base_url，
+        未配置的调用策略（超时、重试、对冲）继承自主配置。
+        """
+        options = {
+            'timeout': config.get("ai.timeout", 60),
+            'max_retries': config.get("ai.max_retries", 2),
+            'backoff_base': config.get("ai.backoff_base", 1.0),
+            'backoff_max': config.get("ai.backoff_max", 30.0),
+            'hedge_enabled': config.get("ai.hedge.enabled", False),
+            'hedge_after': config.get("ai.hedge.after_seconds"),
+            'hedge_percentile': config.get("ai.hedge.percentile", 0.95),
+            'hedge_min_samples': config.get("ai.hedge.min_samples", 20),
+            'http_pool': http_pool,
+        }
+        
+        fallbacks = []
+        for entry in config.get("ai.failover", []) or []:
+            fallbacks.append(cls(
+                entry.get("provider"),
+                entry.get("api_key"),
+                entry.get("model"),
+                entry.get("base_url"),
+                **{**options, **{k: v for k, v in entry.items() if k in options}}
+            ))
+        
+        return cls(
+            config.get("ai.provider", "openai"),
+            config.get("ai.api_key"),
+            config.get("ai.model", "gpt-4-turbo-preview"),
+            config.get("ai.base_url"),
+            fallbacks=fallbacks,
+            **options
+        )
+    
     def _init_client(self):
         """初始化具体的 AI 客户端"""
         if not self.api_key or self.api_key == "your_ai_api_key_here":
@@ -46,7 +136,7 @@ class AIClient:
         """初始化 OpenAI 客户端"""
         try:
             from openai import OpenAI
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = OpenAI(api_key=self.api_key, **self._sdk_options())
             logger.info("OpenAI 客户端初始化成功")
         except Exception as e:
             logger.error(f"OpenAI 客户端初始化失败: {e}")
@@ -56,7 +146,7 @@ class AIClient:
         """初始化 Anthropic 客户端"""
         try:
             from anthropic import Anthropic
-            self.client = Anthropic(api_key=self.api_key)
+            self.client = Anthropic(api_key=self.api_key, **self._sdk_options())
             logger.info("Anthropic 客户端初始化成功")
         except Exception as e:
             logger.error(f"Anthropic 客户端初始化失败: {e}")
@@ -68,16 +158,30 @@ class AIClient:
             from openai import OpenAI
             self.client = OpenAI(
                 api_key=self.api_key,
-                base_url=self.base_url or "https://api.deepseek.com"
+                base_url=self.base_url or "https://api.deepseek.com",
+                **self._sdk_options()
             )
             logger.info("DeepSeek 客户端初始化成功")
         except Exception as e:
             logger.error(f"DeepSeek 客户端初始化失败: {e}")
             self.client = None
     
+    def _sdk_options(self) -> dict:
+        """SDK 客户端参数：由本类统一负责重试，关闭 SDK 内置重试；
+        配置了共享连接池时注入对应主机的 http_client"""
+        options = {'max_retries': 0}
+        if self.timeout:
+            options['timeout'] = self.timeout
+        if self.http_pool is not None:
+            base_url = self.base_url or DEFAULT_BASE_URLS.get(self.provider)
+            http_client = self.http_pool.httpx_client_for(base_url) if base_url else None
+            if http_client is not None:
+                options['http_client'] = http_client
+        return options
+    
     def is_available(self) -> bool:
-        """检查 AI 客户端是否可用"""
-        return self.client is not None
+        """检查 AI 客户端是否可用（主客户端或任一备用客户端）"""
+        return self.client is not None or any(fb.is_available() for fb in self.fallbacks)
     
     def generate_completion(self, 
                           system_prompt: str, 
@@ -94,22 +198,138 @@ class AIClient:
         
         Returns:
             生成的文本内容，失败返回 None
+        
+        主客户端重试耗尽后，按顺序切换到备用客户端。
         """
+        self._answered.client = None
         if not self.is_available():
             logger.warning("AI 客户端不可用")
             return None
         
+        for candidate in [self] + self.fallbacks:
+            if candidate.client is None:
+                continue
+            result = candidate._complete_with_retries(system_prompt, user_prompt, max_tokens, temperature)
+            if result is not None:
+                self._answered.client = candidate
+                return result
+            logger.warning(f"AI 提供商 {candidate.provider} 调用失败，尝试切换到下一个提供商")
+        
+        logger.error("所有 AI 提供商均调用失败")
+        return None
+    
+    def answered_by(self) -> 'AIClient':
+        """当前线程最近一次成功调用实际使用的客户端（切换到备用提供商时为备用客户端），尚无成功调用时为自身"""
+        return getattr(self._answered, 'client', None) or self
+    
+    def _complete_with_retries(self, system_prompt: str, user_prompt: str,
+                               max_tokens: int, temperature: float) -> Optional[str]:
+        """带指数退避重试的单提供商调用"""
+        for attempt in range(1, self.max_retries + 2):
+            try:
+                return self._complete_hedged(system_prompt, user_prompt, max_tokens, temperature, attempt)
+            except Exception as e:
+                if not self._is_retryable(e) or attempt > self.max_retries:
+                    logger.error(f"AI 生成失败 [{self.provider}/{self.model}]: {e}")
+                    return None
+                
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"AI 调用可重试错误 [{self.provider}/{self.model}]: {e}，{delay:.1f}s 后重试")
+                time.sleep(delay)
+        return None
+    
+    def _complete_hedged(self, system_prompt: str, user_prompt: str,
+                         max_tokens: int, temperature: float, attempt: int) -> str:
+        """单次尝试；超过对冲阈值仍未返回时再发起一个相同请求，取先成功者"""
+        threshold = self._hedge_threshold()
+        if threshold is None:
+            return self._timed_completion(system_prompt, user_prompt, max_tokens, temperature, f"#{attempt}")
+        
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ai-hedge")
+        
+        primary = self._hedge_executor.submit(
+            self._timed_completion, system_prompt, user_prompt, max_tokens, temperature, f"#{attempt}"
+        )
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+        
+        logger.info(f"AI 调用超过对冲阈值 {threshold:.2f}s，发起对冲请求 [{self.provider}/{self.model}]")
+        hedge = self._hedge_executor.submit(
+            self._timed_completion, system_prompt, user_prompt, max_tokens, temperature, f"#{attempt}-hedge"
+        )
+        
+        pending = {primary, hedge}
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                last_error = future.exception()
+        raise last_error
+    
+    def _timed_completion(self, system_prompt: str, user_prompt: str,
+                          max_tokens: int, temperature: float, tag: str) -> str:
+        """执行一次调用并记录延迟"""
+        started = time.monotonic()
         try:
             if self.provider in ["openai", "deepseek"]:
-                return self._openai_completion(system_prompt, user_prompt, max_tokens, temperature)
+                result = self._openai_completion(system_prompt, user_prompt, max_tokens, temperature)
             elif self.provider == "anthropic":
-                return self._anthropic_completion(user_prompt, max_tokens, temperature)
+                result = self._anthropic_completion(user_prompt, max_tokens, temperature)
             else:
-                logger.error(f"不支持的 AI 提供商: {self.provider}")
-                return None
-        except Exception as e:
-            logger.error(f"AI 生成失败: {e}")
+                raise ValueError(f"不支持的 AI 提供商: {self.provider}")
+        except Exception:
+            elapsed = time.monotonic() - started
+            logger.info(f"AI 调用 [{self.provider}/{self.model}] 尝试 {tag} 失败，耗时 {elapsed:.2f}s")
+            raise
+        
+        elapsed = time.monotonic() - started
+        with self._latency_lock:
+            self._latencies.append(elapsed)
+        logger.info(f"AI 调用 [{self.provider}/{self.model}] 尝试 {tag} 成功，耗时 {elapsed:.2f}s")
+        return result
+    
+    def _hedge_threshold(self) -> Optional[float]:
+        """计算对冲阈值：固定值优先，否则使用历史延迟百分位"""
+        if not self.hedge_enabled:
+            return None
+        if self.hedge_after:
+            return self.hedge_after
+        
+        with self._latency_lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.hedge_min_samples:
             return None
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile))
+        return samples[index]
+    
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """判断错误是否可重试（429、5xx、超时、连接错误）"""
+        status_code = getattr(error, 'status_code', None)
+        if status_code is not None:
+            return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+        if isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        return type(error).__name__ in RETRYABLE_ERROR_NAMES
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """计算重试等待时间：优先使用 Retry-After，否则使用带抖动的指数退避"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = headers.get('retry-after') if hasattr(headers, 'get') else None
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
     
     def _openai_completion(self, system_prompt: str, user_prompt: str, 
                           max_tokens: int, temperature: float) -> str:
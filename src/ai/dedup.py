@@ -0,0 +1,134 @@
+"""
+相似条目聚类
+在生成提示词之前，按规范化标题的词组（shingle）计算 MinHash 签名，经 LSH 分桶找出候选，
+再用 Jaccard 相似度确认，把近似重复的 Issues/PRs（如同类崩溃报告、依赖升级 PR）合并为一条代表条目
+"""
+
+import hashlib
+import re
+from typing import Dict, List, Set
+
+import numpy as np
+
+
+# 大于 2^32 的素数，用于 MinHash 的通用哈希
+_PRIME = 4294967311
+
+_TOKEN_PATTERN = re.compile(r'[a-z_]+|<[a-z]>|[\u4e00-\u9fff]')
+_HEX_PATTERN = re.compile(r'\b[0-9a-f]{7,40}\b')
+_NUMBER_PATTERN = re.compile(r'v?\d+(?:[.\-_]\d+)*')
+
+
+def normalize_title(title: str) -> List[str]:
+    """规范化标题并切分为词：小写，版本号、编号替换为 <n>，提交哈希替换为 <h>，中文按字切分"""
+    text = (title or '').lower()
+    text = _HEX_PATTERN.sub(' <h> ', text)
+    text = _NUMBER_PATTERN.sub(' <n> ', text)
+    return _TOKEN_PATTERN.findall(text)
+
+
+def title_shingles(title: str, size: int = 2) -> Set[str]:
+    """标题的连续词组集合，词数不足时使用整个标题"""
+    tokens = normalize_title(title)
+    if len(tokens) <= size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _hash_shingles(shingles: Set[str]) -> np.ndarray:
+    """词组哈希为 32 位整数"""
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') for s in shingles],
+        dtype=np.uint64
+    )
+
+
+class MinHasher:
+    """MinHash 签名与 LSH 分桶
+
+    签名长度为 num_perm，分为 bands 段，每段完全相同的两个条目成为候选。
+    排列参数由固定种子生成，同样的输入总得到同样的签名。
+    """
+
+    def __init__(self, num_perm: int = 96, bands: int = 32, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须是 bands 的整数倍")
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._a = rng.integers(1, 2 ** 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 32, num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: Set[str]) -> np.ndarray:
+        """计算 MinHash 签名（空集合返回全为最大值的签名）"""
+        if not shingles:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        hashes = _hash_shingles(shingles)
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % np.uint64(_PRIME)).min(axis=1)
+
+    def candidate_pairs(self, signatures: List[np.ndarray]) -> Set[tuple]:
+        """按段分桶，返回至少有一段相同的条目对"""
+        pairs = set()
+        for band in range(self.bands):
+            buckets: Dict[bytes, List[int]] = {}
+            start = band * self.rows
+            for index, signature in enumerate(signatures):
+                buckets.setdefault(signature[start:start + self.rows].tobytes(), []).append(index)
+            for members in buckets.values():
+                for i in range(len(members)):
+                    for j in range(i + 1, len(members)):
+                        pairs.add((members[i], members[j]))
+        return pairs
+
+
+def cluster_items(items: List[Dict], threshold: float = 0.5, hasher: MinHasher = None) -> List[List[Dict]]:
+    """把标题近似重复的条目聚为一组
+
+    Args:
+        items: Issues 或 PRs 列表（需包含 number、title）
+        threshold: 标题词组 Jaccard 相似度阈值
+        hasher: MinHash 计算器，默认 96 个排列、32 段（相似度 0.5 的条目对约 99% 成为候选）
+
+    Returns:
+        分组列表，每组按编号排序；保持各组首个条目在输入中的顺序
+    """
+    hasher = hasher or MinHasher()
+    shingles = [title_shingles(item.get('title', '')) for item in items]
+    signatures = [hasher.signature(s) for s in shingles]
+
+    parent = list(range(len(items)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in hasher.candidate_pairs(signatures):
+        if not shingles[i] or not shingles[j]:
+            continue
+        # LSH 只用于筛选候选，是否合并以精确的 Jaccard 相似度为准
+        similarity = len(shingles[i] & shingles[j]) / len(shingles[i] | shingles[j])
+        if similarity >= threshold:
+            parent[find(i)] = find(j)
+
+    groups: Dict[int, List[Dict]] = {}
+    for index, item in enumerate(items):
+        groups.setdefault(find(index), []).append(item)
+    return [sorted(group, key=lambda item: item['number']) for group in groups.values()]
+
+
+def collapse_duplicates(items: List[Dict], threshold: float = 0.5, hasher: MinHasher = None) -> List[Dict]:
+    """合并近似重复的条目
+
+    每组保留编号最小的条目作为代表，其余条目的编号记录在代表条目的 duplicates 字段中。
+    不修改传入的条目。
+    """
+    collapsed = []
+    for group in cluster_items(items, threshold, hasher):
+        representative = group[0]
+        if len(group) > 1:
+            representative = dict(representative, duplicates=[item['number'] for item in group[1:]])
+        collapsed.append(representative)
+    return collapsed
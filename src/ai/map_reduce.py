@@ -0,0 +1,153 @@
+"""
+分层（Map-Reduce）摘要工具
+将大时间窗口内的活动切分为若干块，分块摘要后再合并为最终报告
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+
+# 支持的分块策略
+CHUNK_STRATEGIES = ('day', 'label', 'area')
+
+# 识别"领域"标签的前缀，如 area/editor、area-terminal、area:api
+AREA_LABEL_PREFIXES = ('area/', 'area-', 'area:')
+
+
+def _chunk_key(item: Dict, strategy: str) -> str:
+    """计算单个条目所属的分块键"""
+    if strategy == 'day':
+        timestamp = item.get('updated_at') or item.get('created_at') or ''
+        return timestamp[:10] or 'unknown'
+
+    labels = sorted(item.get('labels') or [])
+    if strategy == 'area':
+        for label in labels:
+            if label.lower().startswith(AREA_LABEL_PREFIXES):
+                return label[5:]
+        return 'other'
+
+    # label 策略：取排序后的第一个标签，避免同一条目出现在多个分块中
+    return labels[0] if labels else 'unlabeled'
+
+
+def chunk_activity(issues: List[Dict], pull_requests: List[Dict],
+                   strategy: str = 'day', max_chunk_items: int = 40) -> "OrderedDict[str, Dict]":
+    """按指定策略切分活动数据
+
+    Args:
+        issues: Issues 列表
+        pull_requests: Pull Requests 列表
+        strategy: 分块策略 (day, label, area)
+        max_chunk_items: 单个分块的最大条目数，超出时继续拆分
+
+    Returns:
+        按键排序的有序字典 {chunk_key: {'issues': [...], 'pull_requests': [...]}}
+    """
+    if strategy not in CHUNK_STRATEGIES:
+        logger.warning(f"未知的分块策略: {strategy}，使用 day")
+        strategy = 'day'
+
+    groups: Dict[str, Dict[str, List[Dict]]] = {}
+    for kind, items in (('issues', issues or []), ('pull_requests', pull_requests or [])):
+        for item in items:
+            key = _chunk_key(item, strategy)
+            groups.setdefault(key, {'issues': [], 'pull_requests': []})[kind].append(item)
+
+    chunks: "OrderedDict[str, Dict]" = OrderedDict()
+    for key in sorted(groups):
+        group = groups[key]
+        # 固定顺序，保证同样的数据得到同样的分块（缓存才能命中）
+        entries = [('issues', i) for i in sorted(group['issues'], key=lambda x: x['number'])]
+        entries += [('pull_requests', p) for p in sorted(group['pull_requests'], key=lambda x: x['number'])]
+
+        size = max_chunk_items if max_chunk_items and max_chunk_items > 0 else len(entries)
+        for part, offset in enumerate(range(0, len(entries), size), 1):
+            part_key = key if part == 1 else f"{key}#{part}"
+            chunk = {'issues': [], 'pull_requests': []}
+            for kind, item in entries[offset:offset + size]:
+                chunk[kind].append(item)
+            chunks[part_key] = chunk
+
+    return chunks
+
+
+def chunk_fingerprint(repo_name: str, chunk_key: str, chunk: Dict, extra: str = '') -> str:
+    """计算分块内容指纹，作为摘要缓存的键
+
+    只要分块内条目的编号、状态、更新时间和合并的相似条目不变，指纹就不变
+    """
+    signature = {
+        'repo': repo_name,
+        'chunk': chunk_key,
+        'extra': extra,
+        'items': [
+            [kind, item.get('number'), item.get('state'), item.get('updated_at'), item.get('merged')]
+            + ([item['duplicates']] if item.get('duplicates') else [])
+            for kind in ('issues', 'pull_requests')
+            for item in chunk.get(kind, [])
+        ]
+    }
+    payload = json.dumps(signature, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ChunkSummaryCache:
+    """分块摘要缓存（JSON 文件）"""
+
+    def __init__(self, cache_path: str = "data/cache/chunk_summaries.json", max_entries: int = 5000):
+        self.cache_path = Path(cache_path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict:
+        """从文件加载缓存"""
+        if not self.cache_path.exists():
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"加载分块摘要缓存失败: {e}，使用空缓存")
+            return {}
+
+    def get(self, fingerprint: str) -> Optional[str]:
+        """获取缓存的摘要"""
+        with self._lock:
+            entry = self.entries.get(fingerprint)
+            return entry['summary'] if entry else None
+
+    def put(self, fingerprint: str, summary: str, repo_name: str = '', chunk_key: str = ''):
+        """写入摘要（调用 save 后持久化）"""
+        with self._lock:
+            self.entries[fingerprint] = {
+                'repo': repo_name,
+                'chunk': chunk_key,
+                'summary': summary,
+                'created_at': datetime.now().isoformat()
+            }
+            self._dirty = True
+
+    def save(self):
+        """保存缓存到文件，超出上限时淘汰最旧的条目"""
+        with self._lock:
+            if not self._dirty:
+                return
+            if len(self.entries) > self.max_entries:
+                ordered = sorted(self.entries.items(), key=lambda kv: kv[1].get('created_at', ''))
+                self.entries = dict(ordered[-self.max_entries:])
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.cache_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f, ensure_ascii=False, indent=2)
+                self._dirty = False
+            except Exception as e:
+                logger.error(f"保存分块摘要缓存失败: {e}")
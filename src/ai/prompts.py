@@ -61,6 +61,49 @@ class PromptTemplates:
 {progress_content}
 
 请基于以上信息，生成一份简短汇总的项目每日报告。报告要求根据功能合并同类项，至少包含：1）新增功能；2）主要改进；3）修复问题；
+"""
+    
+    # 合并相似条目后的活动列表（替代进展文件中的逐条明细）
+    SELECTED_ACTIVITY_TEMPLATE = """## 📋 活动明细
+
+共 {items_count} 个 Issues/PRs，{selection_note}：
+
+{items_content}
+"""
+    
+    # 活动明细的说明：相似条目合并 / 按重要性截取
+    CLUSTERED_NOTE = "标题近似的条目已合并为 {clusters_count} 条，代表条目后注明了相似条目的数量和编号"
+    TOP_K_NOTE = "以下按重要性列出其中 {listed_count} 条，其余 {omitted_count} 条重要性较低，已省略"
+    
+    # 较长的 Release 更新日志的摘要提示模板（摘要按 tag 缓存，在各报告间复用）
+    RELEASE_SUMMARY_TEMPLATE = """
+以下是 {repo_name} 项目 {tag}（{name}）版本的更新日志：
+
+{body}
+
+请将更新日志提炼为不超过 8 条的要点，优先保留新增功能、不兼容变更和重要修复，保留关键的 Issue/PR 编号。
+只输出要点列表，不要添加额外说明。
+"""
+    
+    # 分层摘要：单个分块的摘要提示模板（Map 阶段）
+    CHUNK_SUMMARY_TEMPLATE = """
+以下是 {repo_name} 项目在分块「{chunk_key}」中的活动记录（共 {items_count} 条）：
+
+{items_content}
+
+请将以上活动按功能合并同类项，提炼为简洁的要点摘要，分为：1）新增功能；2）主要改进；3）修复问题。
+只输出要点列表，保留关键的 Issue/PR 编号，不要添加额外说明。
+"""
+    
+    # 分层摘要：合并分块摘要的提示模板（Reduce 阶段）
+    REDUCE_REPORT_TEMPLATE = """
+你是一位专业的技术项目分析师，负责为 GitHub 项目生成正式的项目报告。
+
+{repo_name} 项目在本期内的活动较多，已按「{chunk_by}」拆分为 {chunks_count} 个分块并分别摘要如下：
+
+{chunk_summaries}
+
+请基于以上分块摘要，生成一份简短汇总的项目报告。报告要求跨分块根据功能合并同类项，至少包含：1）新增功能；2）主要改进；3）修复问题；
 """
     
     @staticmethod
@@ -109,6 +152,45 @@ class PromptTemplates:
         
         return '\n'.join(lines)
     
+    @staticmethod
+    def format_activity_items(issues: List[Dict], pull_requests: List[Dict],
+                              body_chars: int = 200) -> str:
+        """格式化 Issues 和 PRs（用于分层摘要和合并相似条目后的提示词）
+        
+        已合并相似条目的代表条目（带 duplicates 字段）会注明相似条目的数量和编号。
+        """
+        lines = []
+        for issue in issues:
+            labels = f" [{', '.join(issue['labels'])}]" if issue.get('labels') else ""
+            lines.append(f"- Issue #{issue['number']}: {issue['title']}{labels} ({issue['state']}) by {issue['author']}"
+                         f"{PromptTemplates._duplicates_note(issue)}")
+            body = (issue.get('body') or '').strip().replace('\n', ' ')
+            if body and body_chars:
+                lines.append(f"  {body[:body_chars]}")
+        
+        for pr in pull_requests:
+            status = "✅ 已合并" if pr.get('merged') else f"📌 {pr['state']}"
+            lines.append(
+                f"- PR #{pr['number']}: {pr['title']} ({status}, +{pr.get('additions', 0)}/-{pr.get('deletions', 0)}) by {pr['author']}"
+                f"{PromptTemplates._duplicates_note(pr)}"
+            )
+            body = (pr.get('body') or '').strip().replace('\n', ' ')
+            if body and body_chars:
+                lines.append(f"  {body[:body_chars]}")
+        
+        return '\n'.join(lines) if lines else "无活动"
+    
+    @staticmethod
+    def _duplicates_note(item: Dict, max_numbers: int = 10) -> str:
+        """相似条目说明，如（另有 3 个相似条目: #12, #15, #18）"""
+        duplicates = item.get('duplicates')
+        if not duplicates:
+            return ""
+        numbers = ', '.join(f"#{n}" for n in duplicates[:max_numbers])
+        if len(duplicates) > max_numbers:
+            numbers += ", …"
+        return f"（另有 {len(duplicates)} 个相似条目: {numbers}）"
+    
     @staticmethod
     def format_releases(releases: List[Dict]) -> str:
         """格式化 Release 信息"""
@@ -118,5 +200,10 @@ class PromptTemplates:
         lines = []
         for release in releases:
             lines.append(f"- {release['tag']}: {release['name']} by {release['author']}")
+            # 有摘要时附上摘要，否则附上说明的第一行
+            if release.get('summary'):
+                lines.extend(f"  {line}" for line in release['summary'].strip().splitlines() if line.strip())
+            elif (release.get('body') or '').strip():
+                lines.append(f"  {release['body'].strip().splitlines()[0][:200]}")
         
         return '\n'.join(lines)
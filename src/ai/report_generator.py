@@ -2,35 +2,58 @@
 AI 驱动的报告生成器
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 from loguru import logger
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 from src.ai.ai_client import AIClient
+from src.ai.dedup import collapse_duplicates
+from src.ai.map_reduce import ChunkSummaryCache, chunk_activity, chunk_fingerprint
 from src.ai.prompts import PromptTemplates
+from src.storage.release_cache import release_digest
+from src.core.scoring import ImportanceScorer, release_references
+from src.notifier.html_renderer import get_renderer
 
 
 class ReportGenerator:
     """AI 报告生成器"""
     
-    def __init__(self, config):
+    def __init__(self, config, http_pool=None, search_index=None, release_cache=None):
         self.config = config
+        # 全文搜索索引（可选），生成的报告写入后加入索引
+        self.search_index = search_index
+        # Release 缓存（可选），较长的更新日志摘要一次后保存，在各报告间复用
+        self.release_cache = release_cache
+        self.release_summary_min_length = config.get("releases.summary_min_length", 1500)
         self.language = config.get("ai.language", "zh-CN")
         
-        # 初始化 AI 客户端
-        provider = config.get("ai.provider", "openai")
-        api_key = config.get("ai.api_key")
-        model = config.get("ai.model", "gpt-4-turbo-preview")
-        base_url = config.get("ai.base_url")
-        
-        self.ai_client = AIClient(provider, api_key, model, base_url)
+        # 初始化 AI 客户端（包含超时、重试、对冲和失败切换策略）
+        self.ai_client = AIClient.from_config(config, http_pool=http_pool)
         
         if self.ai_client.is_available():
-            logger.info(f"{provider} AI 客户端初始化成功")
+            logger.info(f"{self.ai_client.provider} AI 客户端初始化成功")
         else:
             logger.warning("AI 客户端不可用，将使用基础报告模板")
+        
+        # 分层（Map-Reduce）摘要配置
+        self.map_reduce_enabled = config.get("report.map_reduce.enabled", False)
+        self.map_reduce_threshold = config.get("report.map_reduce.threshold", 80)
+        self.chunk_by = config.get("report.map_reduce.chunk_by", "day")
+        self.max_chunk_items = config.get("report.map_reduce.max_chunk_items", 40)
+        self.map_workers = config.get("report.map_reduce.max_workers", 4)
+        self.chunk_cache = ChunkSummaryCache(
+            config.get("report.map_reduce.cache_path", "data/cache/chunk_summaries.json")
+        )
+        
+        # 相似条目聚类配置
+        self.dedup_enabled = config.get("report.dedup.enabled", True)
+        self.dedup_threshold = config.get("report.dedup.threshold", 0.5)
+        
+        # 重要性评分：提示词中的条目按重要性排序，并按订阅规则截取前 top_k 条
+        self.scorer = ImportanceScorer.from_config(config)
     
     def generate_report(self, repo_name: str, updates: Dict) -> str:
         """生成报告
@@ -74,7 +97,17 @@ class ReportGenerator:
             return self._generate_basic_report(repo_name, updates)
     
     def _build_update_report_prompt(self, repo_name: str, updates: Dict) -> str:
-        """构建更新报告的 AI 提示词"""
+        """构建更新报告的 AI 提示词
+        
+        提示词只列出前若干个 PRs/Issues，启用评分时先按重要性排序（数量统计不变）。
+        """
+        pull_requests = updates.get('pull_requests', [])
+        issues = updates.get('issues', [])
+        releases = self._summarize_releases(repo_name, updates.get('releases', []))
+        if self.scorer is not None:
+            referenced = release_references(releases)
+            pull_requests = self.scorer.rank(repo_name, pull_requests, referenced)
+            issues = self.scorer.rank(repo_name, issues, referenced)
         return PromptTemplates.UPDATE_REPORT_TEMPLATE.format(
             repo_name=repo_name,
             repo_description=updates.get('repo_description', 'N/A'),
@@ -84,13 +117,49 @@ class ReportGenerator:
             commits_count=len(updates.get('commits', [])),
             commits_content=PromptTemplates.format_commits(updates.get('commits', [])),
             prs_count=len(updates.get('pull_requests', [])),
-            prs_content=PromptTemplates.format_prs(updates.get('pull_requests', [])),
+            prs_content=PromptTemplates.format_prs(pull_requests),
             issues_count=len(updates.get('issues', [])),
-            issues_content=PromptTemplates.format_issues(updates.get('issues', [])),
+            issues_content=PromptTemplates.format_issues(issues),
             releases_count=len(updates.get('releases', [])),
-            releases_content=PromptTemplates.format_releases(updates.get('releases', []))
+            releases_content=PromptTemplates.format_releases(releases)
         )
     
+    def _summarize_releases(self, repo_name: str, releases: List[Dict]) -> List[Dict]:
+        """为说明较长的 Releases 附上摘要
+        
+        摘要按 tag 和说明内容保存在 Release 缓存中，同一版本只摘要一次；
+        Release 被编辑后内容摘要变化，重新生成。未启用缓存时不生成摘要。
+        """
+        if self.release_cache is None:
+            return releases
+        summarized = []
+        for release in releases:
+            body = release.get('body') or ''
+            if release.get('summary') or len(body) < self.release_summary_min_length:
+                summarized.append(release)
+                continue
+            digest = release_digest(release)
+            summary = self.release_cache.summary(repo_name, release['tag'], digest)
+            if summary is None:
+                try:
+                    summary = self.ai_client.generate_completion(
+                        system_prompt=PromptTemplates.SYSTEM_REPORT_WRITER.format(language=self.language),
+                        user_prompt=PromptTemplates.RELEASE_SUMMARY_TEMPLATE.format(
+                            repo_name=repo_name, tag=release['tag'], name=release.get('name') or release['tag'],
+                            body=body
+                        ),
+                        max_tokens=500,
+                        temperature=0.3
+                    )
+                except Exception as e:
+                    logger.warning(f"摘要 {repo_name} {release['tag']} 的更新日志失败: {e}")
+                    summary = None
+                if summary:
+                    self.release_cache.store_summary(repo_name, release['tag'], digest, summary)
+                    logger.info(f"已摘要 {repo_name} {release['tag']} 的更新日志（{len(body)} 字符）")
+            summarized.append(dict(release, summary=summary) if summary else release)
+        return summarized
+    
     def _generate_basic_report(self, repo_name: str, updates: Dict) -> str:
         """生成基础报告（不使用 AI）"""
         report_lines = [
@@ -164,7 +233,12 @@ class ReportGenerator:
                 report_lines.append(
                     f"- **{release['tag']}**: {release['name']}{prerelease_tag} - *{release['author']}*"
                 )
-                if release.get('body'):
+                if release.get('summary'):
+                    # 已缓存的更新日志摘要
+                    for line in release['summary'].strip().splitlines():
+                        if line.strip():
+                            report_lines.append(f"  {line.strip()}")
+                elif release.get('body'):
                     # 只取前两行描述
                     body_lines = release['body'].split('\n')[:2]
                     for line in body_lines:
@@ -190,15 +264,25 @@ class ReportGenerator:
     
     def generate_daily_report(self, repo_name: str, progress_file: str, 
                              output_dir: str = "data/reports", 
-                             start_date: datetime = None, end_date: datetime = None) -> str:
+                             start_date: datetime = None, end_date: datetime = None,
+                             issues: List[Dict] = None,
+                             pull_requests: List[Dict] = None) -> str:
         """读取每日进展文件，生成正式的项目每日报告
         
+        当启用分层摘要且活动条目数超过阈值时，会基于 issues/pull_requests
+        分块摘要后再合并，而不是把整个进展文件放进一个提示词。
+        提供 issues/pull_requests 时，标题近似的条目先在本地合并为一条代表条目，
+        再按订阅的 top_k 规则只保留最重要的条目，提示词中只列出这些条目
+        （进展文件本身保持完整）。
+        
         Args:
             repo_name: 仓库名称
             progress_file: 每日进展的 markdown 文件路径
             output_dir: 报告输出目录
             start_date: 开始日期
             end_date: 结束日期
+            issues: 原始 Issues 列表（可选，用于分层摘要）
+            pull_requests: 原始 Pull Requests 列表（可选，用于分层摘要）
         
         Returns:
             生成的报告文件路径
@@ -214,7 +298,18 @@ class ReportGenerator:
         
         # 使用 AI 生成报告
         if self.ai_client.is_available():
-            report_content = self._generate_ai_daily_report(repo_name, progress_content)
+            prompt_content = progress_content
+            if issues is not None and pull_requests is not None:
+                issues, pull_requests, prompt_content = self._select_activity(
+                    repo_name, issues, pull_requests, progress_content
+                )
+            
+            if self._should_map_reduce(issues, pull_requests):
+                report_content = self._generate_map_reduce_report(
+                    repo_name, issues, pull_requests, progress_content
+                )
+            else:
+                report_content = self._generate_ai_daily_report(repo_name, progress_content, prompt_content)
         else:
             logger.warning("未配置 AI，将使用原始进展文件作为报告")
             report_content = progress_content
@@ -243,15 +338,79 @@ class ReportGenerator:
         with open(report_filepath, 'w', encoding='utf-8') as f:
             f.write(report_content)
         
+        # 归档 HTML 版本（与邮件共用渲染缓存）
+        if self.config.get("report.export_html", False):
+            html_filepath = os.path.splitext(report_filepath)[0] + '.html'
+            with open(html_filepath, 'w', encoding='utf-8') as f:
+                f.write(get_renderer().render(report_content, title=f"{repo_name} 报告"))
+            logger.info(f"HTML 报告已归档: {html_filepath}")
+        
+        if self.search_index is not None:
+            try:
+                self.search_index.index_report(repo_name, report_filepath, report_content,
+                                               date=start_date.strftime('%Y-%m-%d') if start_date else None)
+            except Exception as e:
+                logger.warning(f"索引报告 {report_filepath} 失败: {e}")
+        
         logger.info(f"每日报告已生成: {report_filepath}")
         return report_filepath
     
-    def _generate_ai_daily_report(self, repo_name: str, progress_content: str) -> str:
+    def _select_activity(self, repo_name: str, issues: List[Dict], pull_requests: List[Dict],
+                         progress_content: str):
+        """合并标题近似的 Issues/PRs，并按重要性截取每类前 top_k 条
+        
+        Returns:
+            (选出的 Issues, 选出的 PRs, 提示词使用的进展内容)。没有合并或省略任何条目时原样返回；
+            否则进展内容中的逐条明细替换为选出的活动列表
+        """
+        selected_issues, selected_prs = issues, pull_requests
+        if self.dedup_enabled:
+            selected_issues = collapse_duplicates(issues, self.dedup_threshold)
+            selected_prs = collapse_duplicates(pull_requests, self.dedup_threshold)
+        total = len(issues) + len(pull_requests)
+        clusters = len(selected_issues) + len(selected_prs)
+        
+        top_k = self.scorer.top_k(repo_name) if self.scorer is not None else 0
+        if top_k:
+            selected_issues = self._top_items(repo_name, selected_issues, top_k)
+            selected_prs = self._top_items(repo_name, selected_prs, top_k)
+        listed = len(selected_issues) + len(selected_prs)
+        if listed == total:
+            return issues, pull_requests, progress_content
+        
+        notes = []
+        if clusters < total:
+            logger.info(f"{repo_name} 合并相似条目: {total} 条 -> {clusters} 条")
+            notes.append(PromptTemplates.CLUSTERED_NOTE.format(clusters_count=clusters))
+        if listed < clusters:
+            logger.info(f"{repo_name} 按重要性保留 {listed} 条，省略 {clusters - listed} 条")
+            notes.append(PromptTemplates.TOP_K_NOTE.format(listed_count=listed, omitted_count=clusters - listed))
+        
+        # 保留进展文件中明细之前的部分（概览、趋势指标）
+        header, found, _ = progress_content.partition("## 🐛 Issues")
+        if not found:
+            return selected_issues, selected_prs, progress_content
+        prompt_content = header + PromptTemplates.SELECTED_ACTIVITY_TEMPLATE.format(
+            items_count=total,
+            selection_note='；'.join(notes),
+            items_content=PromptTemplates.format_activity_items(selected_issues, selected_prs)
+        )
+        return selected_issues, selected_prs, prompt_content
+    
+    def _top_items(self, repo_name: str, items: List[Dict], top_k: int) -> List[Dict]:
+        """按重要性取前 top_k 条，条目没有分数时先评分"""
+        if not all('score' in item for item in items):
+            items = self.scorer.rank(repo_name, items)
+        return sorted(items, key=lambda item: item['score'], reverse=True)[:top_k]
+    
+    def _generate_ai_daily_report(self, repo_name: str, progress_content: str,
+                                  prompt_content: str = None) -> str:
         """使用 AI 生成正式的每日报告
         
         Args:
             repo_name: 仓库名称
-            progress_content: 每日进展的原始内容
+            progress_content: 每日进展的原始内容（AI 失败时作为报告）
+            prompt_content: 提示词使用的进展内容（合并相似条目后），默认与 progress_content 相同
         
         Returns:
             生成的正式报告内容
@@ -261,7 +420,7 @@ class ReportGenerator:
             system_prompt = PromptTemplates.SYSTEM_ANALYST.format(language=self.language)
             user_prompt = PromptTemplates.DAILY_REPORT_TEMPLATE.format(
                 repo_name=repo_name,
-                progress_content=progress_content
+                progress_content=prompt_content or progress_content
             )
             
             # 调用 AI 生成
@@ -276,25 +435,122 @@ class ReportGenerator:
                 logger.warning("AI 生成失败，使用原始进展文件")
                 return progress_content
             
-            # 添加报告元信息
-            metadata = f"""---
+            logger.info(f"AI 每日报告生成成功: {repo_name}")
+            return self._wrap_ai_report(repo_name, report)
+            
+        except Exception as e:
+            logger.error(f"AI 每日报告生成失败: {e}，使用原始进展文件")
+            return progress_content
+    
+    def _wrap_ai_report(self, repo_name: str, report: str, mode: str = "AI 分析") -> str:
+        """为 AI 报告添加元信息头和页脚（提供商和模型取实际返回结果的客户端）"""
+        answered = self.ai_client.answered_by()
+        metadata = f"""---
 **项目**: {repo_name}  
 **报告日期**: {datetime.now().strftime('%Y-%m-%d')}  
 **生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  
-**生成方式**: AI 分析（{self.ai_client.provider} - {self.ai_client.model}）
+**生成方式**: {mode}（{answered.provider} - {answered.model}）
 
 ---
 
 """
-            
-            full_report = metadata + report + "\n\n---\n\n*本报告由 GitHub Sentinel 基于 AI 技术自动生成*\n"
-            
-            logger.info(f"AI 每日报告生成成功: {repo_name}")
-            return full_report
-            
+        
+        return metadata + report + "\n\n---\n\n*本报告由 GitHub Sentinel 基于 AI 技术自动生成*\n"
+    
+    def _should_map_reduce(self, issues: Optional[List[Dict]], 
+                           pull_requests: Optional[List[Dict]]) -> bool:
+        """判断是否需要使用分层摘要"""
+        if not self.map_reduce_enabled or issues is None or pull_requests is None:
+            return False
+        return len(issues) + len(pull_requests) > self.map_reduce_threshold
+    
+    def _generate_map_reduce_report(self, repo_name: str, issues: List[Dict],
+                                    pull_requests: List[Dict], progress_content: str) -> str:
+        """分层摘要：分块并行摘要（Map），再合并为最终报告（Reduce）
+        
+        分块摘要按内容指纹缓存，扩大日期范围时只需摘要新增的分块。
+        """
+        chunks = chunk_activity(issues, pull_requests, self.chunk_by, self.max_chunk_items)
+        cache_extra = f"{self.language}|{self.ai_client.provider}|{self.ai_client.model}|{self.chunk_by}"
+        
+        summaries: Dict[str, str] = {}
+        pending = {}
+        for key, chunk in chunks.items():
+            fingerprint = chunk_fingerprint(repo_name, key, chunk, cache_extra)
+            cached = self.chunk_cache.get(fingerprint)
+            if cached:
+                summaries[key] = cached
+            else:
+                pending[key] = (fingerprint, chunk)
+        
+        logger.info(f"{repo_name} 分层摘要: 共 {len(chunks)} 个分块，缓存命中 {len(summaries)} 个")
+        
+        if pending:
+            with ThreadPoolExecutor(max_workers=max(1, self.map_workers)) as executor:
+                futures = {
+                    executor.submit(self._summarize_chunk, repo_name, key, chunk): (key, fingerprint)
+                    for key, (fingerprint, chunk) in pending.items()
+                }
+                for future in as_completed(futures):
+                    key, fingerprint = futures[future]
+                    try:
+                        summary = future.result()
+                    except Exception as e:
+                        logger.error(f"分块 {key} 摘要失败: {e}")
+                        summary = None
+                    
+                    if summary:
+                        summaries[key] = summary
+                        self.chunk_cache.put(fingerprint, summary, repo_name, key)
+                    else:
+                        # 摘要失败时退化为条目列表，且不写入缓存
+                        chunk = pending[key][1]
+                        summaries[key] = PromptTemplates.format_activity_items(
+                            chunk['issues'], chunk['pull_requests'], body_chars=0
+                        )
+            self.chunk_cache.save()
+        
+        chunk_summaries = '\n\n'.join(
+            f"### {key}\n\n{summaries[key]}" for key in chunks if key in summaries
+        )
+        
+        try:
+            report = self.ai_client.generate_completion(
+                system_prompt=PromptTemplates.SYSTEM_ANALYST.format(language=self.language),
+                user_prompt=PromptTemplates.REDUCE_REPORT_TEMPLATE.format(
+                    repo_name=repo_name,
+                    chunk_by=self.chunk_by,
+                    chunks_count=len(chunks),
+                    chunk_summaries=chunk_summaries
+                ),
+                max_tokens=self.config.get("ai.max_tokens", 3000),
+                temperature=0.5
+            )
         except Exception as e:
-            logger.error(f"AI 每日报告生成失败: {e}，使用原始进展文件")
+            logger.error(f"分层摘要合并失败: {e}")
+            report = None
+        
+        if not report:
+            logger.warning("分层摘要合并失败，使用原始进展文件")
             return progress_content
+        
+        logger.info(f"AI 分层摘要报告生成成功: {repo_name}")
+        return self._wrap_ai_report(repo_name, report, mode=f"AI 分层摘要，{len(chunks)} 个分块")
+    
+    def _summarize_chunk(self, repo_name: str, chunk_key: str, chunk: Dict) -> Optional[str]:
+        """摘要单个分块（Map 阶段）"""
+        items_count = len(chunk['issues']) + len(chunk['pull_requests'])
+        return self.ai_client.generate_completion(
+            system_prompt=PromptTemplates.SYSTEM_ANALYST.format(language=self.language),
+            user_prompt=PromptTemplates.CHUNK_SUMMARY_TEMPLATE.format(
+                repo_name=repo_name,
+                chunk_key=chunk_key,
+                items_count=items_count,
+                items_content=PromptTemplates.format_activity_items(chunk['issues'], chunk['pull_requests'])
+            ),
+            max_tokens=self.config.get("report.map_reduce.chunk_max_tokens", 800),
+            temperature=0.3
+        )
     
     def batch_generate_reports(self, repo_names: List[str], date: datetime = None,
                                progress_dir: str = "data/daily_progress",
@@ -2,11 +2,20 @@
 订阅管理命令模块
 """
 
+import os
+import sys
+
 import click
 from rich.console import Console
 from rich.table import Table
 from loguru import logger
 
+from src.core.subscription_manager import format_schedule
+from src.core.watch import parse_watch_query
+from src.core.subscription_io import (
+    FILE_FORMATS, read_subscriptions, dump_subscriptions, write_subscriptions
+)
+
 console = Console()
 
 
@@ -21,15 +30,24 @@ class SubscriptionCommands:
         """
         self.sentinel = sentinel
     
-    def add_subscription(self, repo_name: str, tags: list = None):
+    def add_subscription(self, repo_name: str, tags: list = None,
+                         frequency: str = None, time: str = None):
         """添加仓库订阅
         
         Args:
             repo_name: 仓库名称 (owner/repo)
             tags: 标签列表
+            frequency: 更新频率 (daily, weekly)
+            time: 更新时间 (HH:MM)
         """
         try:
-            self.sentinel.subscription_manager.add_subscription(repo_name, tags or [])
+            if parse_watch_query(repo_name):
+                # org:名称 / topic:名称 按 watch.interval_hours 定期展开，不使用单独的调度设置
+                repo_name = self.sentinel.subscription_manager.add_watch(repo_name, tags or [])
+            else:
+                self.sentinel.subscription_manager.add_subscription(
+                    repo_name, tags or [], frequency=frequency, time=time
+                )
             console.print(f"[green]✓[/green] 已添加订阅: {repo_name}")
             logger.info(f"添加订阅成功: {repo_name}")
             return True
@@ -38,6 +56,103 @@ class SubscriptionCommands:
             logger.error(f"添加订阅失败: {repo_name} - {e}")
             return False
     
+    def set_schedule(self, repo_name: str, frequency: str = None, time: str = None):
+        """设置订阅的更新频率和时间（都不指定时恢复使用全局调度配置）
+        
+        Args:
+            repo_name: 仓库名称
+            frequency: 更新频率 (daily, weekly)
+            time: 更新时间 (HH:MM)
+        """
+        try:
+            if self.sentinel.subscription_manager.set_schedule(repo_name, frequency, time):
+                console.print(f"[green]✓[/green] 已更新调度设置: {repo_name}")
+                return True
+            console.print(f"[yellow]⚠[/yellow] 未找到订阅: {repo_name}")
+            return False
+        except Exception as e:
+            console.print(f"[red]✗[/red] 更新调度设置失败: {e}")
+            logger.error(f"更新调度设置失败: {repo_name} - {e}")
+            return False
+    
+    def import_subscriptions(self, source: str, tags: list = None, frequency: str = None,
+                             time: str = None, fmt: str = None, limit: int = 0):
+        """批量导入订阅
+        
+        Args:
+            source: 文件路径（YAML/CSV/txt），或 GitHub 查询 "org:名称" / "topic:名称"
+            tags: 追加到每个仓库的标签
+            frequency: 文件中未指定时使用的更新频率
+            time: 文件中未指定时使用的更新时间
+            fmt: 文件格式，默认按扩展名识别
+            limit: 按查询导入时的最大仓库数，0 表示不限制
+        """
+        manager = self.sentinel.subscription_manager
+        try:
+            if not os.path.exists(source) and source.split(':', 1)[0].lower() in ('org', 'topic'):
+                names = self.sentinel.github_client.list_repositories(source, limit=limit)
+                entries = [{'repo_name': name, 'tags': [], 'frequency': None, 'time': None} for name in names]
+                # 查询结果来自 GitHub，无需再次验证
+                validate = False
+            else:
+                entries = read_subscriptions(source, fmt)
+                validate = True
+        except Exception as e:
+            console.print(f"[red]✗[/red] 读取订阅列表失败: {e}")
+            logger.error(f"读取订阅列表失败: {source} - {e}")
+            return None
+        
+        for entry in entries:
+            entry['tags'] = list(dict.fromkeys((entry.get('tags') or []) + (tags or [])))
+            if not entry.get('frequency') and not entry.get('time'):
+                entry['frequency'], entry['time'] = frequency, time
+        
+        console.print(f"正在导入 {len(entries)} 个仓库...")
+        try:
+            result = manager.import_subscriptions(entries, validate=validate)
+        except Exception as e:
+            console.print(f"[red]✗[/red] 导入订阅失败: {e}")
+            logger.error(f"导入订阅失败: {source} - {e}")
+            return None
+        
+        table = Table(title="导入结果")
+        table.add_column("仓库", style="magenta")
+        table.add_column("结果")
+        table.add_column("说明", style="white")
+        for repo_name in result['added']:
+            table.add_row(repo_name, "[green]新增[/green]", "")
+        for repo_name, reason in result['skipped']:
+            table.add_row(repo_name, "[yellow]跳过[/yellow]", reason)
+        for repo_name, reason in result['invalid']:
+            table.add_row(repo_name, "[red]无效[/red]", reason)
+        if entries:
+            console.print(table)
+        console.print(
+            f"[green]✓[/green] 新增 {len(result['added'])} 个，"
+            f"跳过 {len(result['skipped'])} 个，无效 {len(result['invalid'])} 个"
+        )
+        return result
+    
+    def export_subscriptions(self, path: str = None, fmt: str = None):
+        """导出订阅列表
+        
+        Args:
+            path: 输出文件路径，不指定时输出到标准输出
+            fmt: 文件格式，默认按扩展名识别（无法识别或输出到标准输出时为 YAML）
+        """
+        try:
+            entries = self.sentinel.subscription_manager.export_subscriptions()
+            if path:
+                write_subscriptions(entries, path, fmt)
+                console.print(f"[green]✓[/green] 已导出 {len(entries)} 个订阅: {path}")
+            else:
+                sys.stdout.write(dump_subscriptions(entries, fmt or 'yaml'))
+            return entries
+        except Exception as e:
+            console.print(f"[red]✗[/red] 导出订阅失败: {e}")
+            logger.error(f"导出订阅失败: {e}")
+            return None
+    
     def remove_subscription(self, repo_name: str):
         """移除仓库订阅
         
@@ -45,7 +160,11 @@ class SubscriptionCommands:
             repo_name: 仓库名称
         """
         try:
-            self.sentinel.subscription_manager.remove_subscription(repo_name)
+            manager = self.sentinel.subscription_manager
+            if parse_watch_query(repo_name):
+                manager.remove_watch(repo_name)
+            else:
+                manager.remove_subscription(repo_name)
             console.print(f"[green]✓[/green] 已移除订阅: {repo_name}")
             logger.info(f"移除订阅成功: {repo_name}")
             return True
@@ -58,15 +177,35 @@ class SubscriptionCommands:
         """列出所有订阅"""
         try:
             subscriptions = self.sentinel.subscription_manager.list_subscriptions()
+            watches = self.sentinel.subscription_manager.list_watches()
+            
+            if watches:
+                watch_table = Table(title="组织 / 主题订阅")
+                watch_table.add_column("订阅", style="magenta")
+                watch_table.add_column("标签", style="green")
+                watch_table.add_column("仓库数", style="cyan")
+                watch_table.add_column("订阅时间", style="yellow")
+                watch_table.add_column("最后展开", style="blue")
+                for watch in watches:
+                    watch_table.add_row(
+                        watch['query'],
+                        watch['tags'],
+                        str(watch['repo_count']),
+                        watch['created_at'],
+                        watch['last_expanded']
+                    )
+                console.print(watch_table)
             
             if not subscriptions:
-                console.print("[yellow]没有订阅的仓库[/yellow]")
+                if not watches:
+                    console.print("[yellow]没有订阅的仓库[/yellow]")
                 return []
             
             table = Table(title="订阅列表")
             table.add_column("ID", style="cyan")
             table.add_column("仓库", style="magenta")
             table.add_column("标签", style="green")
+            table.add_column("调度", style="white")
             table.add_column("订阅时间", style="yellow")
             table.add_column("最后更新", style="blue")
             
@@ -75,6 +214,7 @@ class SubscriptionCommands:
                     str(sub['id']),
                     sub['repo_name'],
                     sub.get('tags', ''),
+                    format_schedule(sub.get('schedule')),
                     sub['created_at'],
                     sub.get('last_updated', 'Never')
                 )
@@ -130,10 +270,39 @@ def create_subscription_cli_commands(sentinel):
     @subscribe.command("add")
     @click.argument("repo_name")
     @click.option("--tags", "-t", help="标签（逗号分隔）", default="")
-    def add(repo_name: str, tags: str):
-        """添加仓库订阅"""
+    @click.option("--frequency", "-f", type=click.Choice(["daily", "weekly"]), help="更新频率")
+    @click.option("--time", "time_", help="更新时间 (HH:MM)")
+    def add(repo_name: str, tags: str, frequency: str, time_: str):
+        """添加仓库订阅（也可以是 org:名称 或 topic:名称）"""
         tag_list = [t.strip() for t in tags.split(",") if t.strip()]
-        commands.add_subscription(repo_name, tag_list)
+        commands.add_subscription(repo_name, tag_list, frequency=frequency, time=time_)
+    
+    @subscribe.command("schedule")
+    @click.argument("repo_name")
+    @click.option("--frequency", "-f", type=click.Choice(["daily", "weekly"]), help="更新频率")
+    @click.option("--time", "time_", help="更新时间 (HH:MM)")
+    def schedule(repo_name: str, frequency: str, time_: str):
+        """设置订阅的更新频率和时间"""
+        commands.set_schedule(repo_name, frequency, time_)
+    
+    @subscribe.command("import")
+    @click.argument("source")
+    @click.option("--tags", "-t", help="追加到每个仓库的标签（逗号分隔）", default="")
+    @click.option("--frequency", "-f", type=click.Choice(["daily", "weekly"]), help="默认更新频率")
+    @click.option("--time", "time_", help="默认更新时间 (HH:MM)")
+    @click.option("--format", "fmt", type=click.Choice(sorted(set(FILE_FORMATS.values()))), help="文件格式")
+    @click.option("--limit", type=int, default=0, help="按 org:/topic: 查询导入时的最大仓库数")
+    def import_cmd(source: str, tags: str, frequency: str, time_: str, fmt: str, limit: int):
+        """从文件（YAML/CSV/txt）或 org:名称 / topic:名称 批量导入订阅"""
+        tag_list = [t.strip() for t in tags.split(",") if t.strip()]
+        commands.import_subscriptions(source, tag_list, frequency, time_, fmt, limit)
+    
+    @subscribe.command("export")
+    @click.argument("path", required=False)
+    @click.option("--format", "fmt", type=click.Choice(sorted(set(FILE_FORMATS.values()))), help="文件格式")
+    def export_cmd(path: str, fmt: str):
+        """导出订阅列表（不指定路径时输出到标准输出）"""
+        commands.export_subscriptions(path, fmt)
     
     @subscribe.command("remove")
     @click.argument("repo_name")
@@ -0,0 +1,113 @@
+"""
+自适应轮询
+根据仓库过去的更新记录估算活跃度，活跃仓库更频繁地检查，冷门仓库降低频率
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+
+def _parse_time(value: str) -> Optional[datetime]:
+    """解析 ISO 时间字符串，缺少时区时按本地时间处理（数据库中的时间为本地时间）"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.astimezone()
+    return parsed
+
+
+def record_events(update_data: Dict) -> Dict[tuple, Optional[datetime]]:
+    """提取一条更新记录中的活动事件，键为 (类型, 标识)，值为事件时间"""
+    events = {}
+    for commit in update_data.get('commits', []):
+        events[('commit', commit.get('sha'))] = _parse_time(commit.get('date'))
+    for pr in update_data.get('pull_requests', []):
+        events[('pr', pr.get('number'), pr.get('updated_at'))] = _parse_time(pr.get('updated_at'))
+    for issue in update_data.get('issues', []):
+        events[('issue', issue.get('number'), issue.get('updated_at'))] = _parse_time(issue.get('updated_at'))
+    for release in update_data.get('releases', []):
+        events[('release', release.get('tag'))] = _parse_time(release.get('created_at'))
+    return events
+
+
+class AdaptivePolicy:
+    """按活跃度计算轮询间隔"""
+
+    def __init__(self, min_hours: float = 1, max_hours: float = 168, target_events: int = 20,
+                 default_hours: float = 24, history: int = 10):
+        """初始化策略
+
+        Args:
+            min_hours: 最短轮询间隔（小时）
+            max_hours: 最长轮询间隔（小时），探测无变化时也至少按此间隔完整更新一次
+            target_events: 期望每次轮询获取到的活动数量
+            default_hours: 没有历史记录时的轮询间隔（小时）
+            history: 估算活跃度时使用的最近更新记录数
+        """
+        self.min_hours = min_hours
+        self.max_hours = max_hours
+        self.target_events = target_events
+        self.default_hours = default_hours
+        self.history = history
+
+    @classmethod
+    def from_config(cls, config) -> Optional['AdaptivePolicy']:
+        """根据配置创建策略，未启用时返回 None"""
+        if not config.get("schedule.adaptive.enabled", False):
+            return None
+        return cls(
+            min_hours=config.get("schedule.adaptive.min_hours", 1),
+            max_hours=config.get("schedule.adaptive.max_hours", 168),
+            target_events=config.get("schedule.adaptive.target_events", 20),
+            default_hours=config.get("schedule.adaptive.default_hours", 24),
+            history=config.get("schedule.adaptive.history", 10),
+        )
+
+    def change_rate(self, records: List[Dict], now: datetime = None) -> Optional[float]:
+        """估算每天的活动数量
+
+        各记录的拉取窗口相互重叠，因此先按事件去重，再统计最早一条记录之后
+        （至少 1 天）发生的事件。没有历史记录时返回 None。
+        """
+        if not records:
+            return None
+        now = now or datetime.now(timezone.utc)
+
+        events = {}
+        oldest = now
+        for record in records[:self.history]:
+            events.update(record_events(record.get('update_data') or {}))
+            created_at = _parse_time(record.get('created_at'))
+            if created_at and created_at < oldest:
+                oldest = created_at
+
+        window = max(now - oldest, timedelta(days=1))
+        since = now - window
+        count = sum(1 for when in events.values() if when and when >= since)
+        return count / (window.total_seconds() / 86400)
+
+    def interval_hours(self, rate: Optional[float]) -> float:
+        """根据活跃度计算轮询间隔（小时，按 15 分钟取整以避免频繁重新调度）"""
+        if rate is None:
+            hours = self.default_hours
+        elif rate <= 0:
+            hours = self.max_hours
+        else:
+            hours = self.target_events / rate * 24
+        hours = min(self.max_hours, max(self.min_hours, hours))
+        return max(0.25, round(hours * 4) / 4)
+
+    def should_skip(self, probe: Dict, last_probe: Optional[Dict], last_updated: Optional[str],
+                    now: datetime = None) -> bool:
+        """探测结果与上次完全相同，且距上次完整更新未超过最长间隔时跳过本次轮询"""
+        if not last_probe or probe != last_probe:
+            return False
+        last = _parse_time(last_updated) if last_updated and last_updated != 'Never' else None
+        if last is None:
+            return False
+        now = now or datetime.now(timezone.utc)
+        return now - last < timedelta(hours=self.max_hours)
@@ -0,0 +1,440 @@
+"""
+多进程 / 多节点分片
+订阅按仓库名一致性哈希分配到存活的工作进程，任务与租约保存在共享的 SQLite 文件中，
+工作进程失联后其任务自动转移到其他进程
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from loguru import logger
+
+
+# 工作进程各自使用一份的本地 JSON 文件：这些文件按内存中的副本整体重写，
+# 多个进程共用同一文件会互相覆盖（发件箱为 SQLite，由各进程共用）
+WORKER_LOCAL_PATHS = {
+    "github.snapshot.path": "data/cache/activity_snapshots.json",
+    "report.map_reduce.cache_path": "data/cache/chunk_summaries.json",
+}
+
+
+def default_worker_id() -> str:
+    """由主机名和随机后缀生成工作进程 ID"""
+    return f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+
+
+def scope_worker_paths(config, worker_id: str) -> Dict[str, str]:
+    """为工作进程本地的 JSON 文件路径加上工作进程 ID（如 data/cache/activity_snapshots.w1.json），写回配置
+
+    Returns:
+        配置键 -> 新路径
+    """
+    suffix = re.sub(r'[^\w.-]', '_', worker_id)
+    scoped = {}
+    for key, default in WORKER_LOCAL_PATHS.items():
+        path = Path(config.get(key, default))
+        scoped[key] = str(path.with_name(f"{path.stem}.{suffix}{path.suffix}"))
+        config.set(key, scoped[key])
+    return scoped
+
+
+class HashRing:
+    """一致性哈希环（带虚拟节点）"""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 64):
+        """初始化哈希环
+
+        Args:
+            nodes: 节点列表
+            replicas: 每个节点的虚拟节点数，越大分布越均匀
+        """
+        self.replicas = replicas
+        self._keys: List[int] = []
+        self._nodes: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int(hashlib.md5(value.encode('utf-8')).hexdigest()[:16], 16)
+
+    def add(self, node: str):
+        """添加节点"""
+        for i in range(self.replicas):
+            key = self._hash(f"{node}#{i}")
+            if key not in self._nodes:
+                bisect.insort(self._keys, key)
+            self._nodes[key] = node
+
+    def remove(self, node: str):
+        """移除节点"""
+        for i in range(self.replicas):
+            key = self._hash(f"{node}#{i}")
+            if self._nodes.get(key) == node:
+                del self._nodes[key]
+                self._keys.remove(key)
+
+    def node_for(self, key: str) -> Optional[str]:
+        """获取键所属的节点，环为空时返回 None"""
+        if not self._keys:
+            return None
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._nodes[self._keys[index]]
+
+
+class ClusterStore:
+    """共享 SQLite 存储：工作进程心跳与任务租约"""
+
+    STATUS_PENDING = 'pending'
+    STATUS_LEASED = 'leased'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    def __init__(self, path: str = "data/cluster.sqlite", heartbeat_ttl: float = 30,
+                 lease_ttl: float = 900, max_attempts: int = 3, replicas: int = 64):
+        """初始化存储
+
+        Args:
+            path: SQLite 文件路径（多个节点共享时放在共享存储上）
+            heartbeat_ttl: 超过该时间（秒）没有心跳的工作进程视为失联
+            lease_ttl: 任务租约时长（秒），执行期间由心跳续期
+            max_attempts: 任务最大尝试次数
+            replicas: 哈希环虚拟节点数
+        """
+        self.path = Path(path)
+        self.heartbeat_ttl = heartbeat_ttl
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.replicas = replicas
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    @classmethod
+    def from_config(cls, config) -> 'ClusterStore':
+        """根据配置创建存储"""
+        return cls(
+            path=config.get("cluster.path", "data/cluster.sqlite"),
+            heartbeat_ttl=config.get("cluster.heartbeat_ttl", 30),
+            lease_ttl=config.get("cluster.lease_ttl", 900),
+            max_attempts=config.get("cluster.max_attempts", 3),
+            replicas=config.get("cluster.replicas", 64),
+        )
+
+    @contextmanager
+    def _connect(self):
+        """打开连接并在一个事务内执行（写操作立即获取写锁）"""
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建表结构"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    worker_id TEXT PRIMARY KEY,
+                    host TEXT,
+                    pid INTEGER,
+                    started_at REAL,
+                    heartbeat_at REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    repo_name TEXT NOT NULL,
+                    payload TEXT,
+                    status TEXT NOT NULL,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER DEFAULT 0,
+                    created_at REAL,
+                    updated_at REAL,
+                    error TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, id)")
+
+    # ---- 工作进程 ----
+
+    def heartbeat(self, worker_id: str):
+        """登记或刷新工作进程心跳，并续期其持有的租约"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO workers (worker_id, host, pid, started_at, heartbeat_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at
+            """, (worker_id, socket.gethostname(), os.getpid(), now, now))
+            conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE worker_id = ? AND status = ?",
+                (now + self.lease_ttl, worker_id, self.STATUS_LEASED)
+            )
+
+    def deregister(self, worker_id: str):
+        """注销工作进程，释放其未完成的任务"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker_id = NULL WHERE worker_id = ? AND status = ?",
+                (self.STATUS_PENDING, worker_id, self.STATUS_LEASED)
+            )
+
+    def reap_dead_workers(self) -> List[str]:
+        """移除失联的工作进程，并把它们持有的任务放回队列"""
+        cutoff = time.time() - self.heartbeat_ttl
+        with self._connect() as conn:
+            dead = [row['worker_id'] for row in conn.execute(
+                "SELECT worker_id FROM workers WHERE heartbeat_at < ?", (cutoff,)
+            )]
+            if dead:
+                conn.executemany("DELETE FROM workers WHERE worker_id = ?", [(w,) for w in dead])
+                conn.execute(f"""
+                    UPDATE tasks SET status = ?, worker_id = NULL
+                    WHERE status = ? AND worker_id IN ({','.join('?' * len(dead))})
+                """, (self.STATUS_PENDING, self.STATUS_LEASED, *dead))
+        for worker_id in dead:
+            logger.warning(f"工作进程失联，任务已重新分配: {worker_id}")
+        return dead
+
+    def live_workers(self) -> List[Dict]:
+        """存活的工作进程"""
+        cutoff = time.time() - self.heartbeat_ttl
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM workers WHERE heartbeat_at >= ? ORDER BY worker_id", (cutoff,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def ring(self) -> HashRing:
+        """由存活的工作进程构成的哈希环"""
+        return HashRing([w['worker_id'] for w in self.live_workers()], replicas=self.replicas)
+
+    # ---- 任务 ----
+
+    def enqueue(self, kind: str, repo_name: str, payload: Dict = None) -> Optional[int]:
+        """添加任务；同一仓库同类任务尚未完成时不重复添加
+
+        Returns:
+            任务 ID，重复时返回 None
+        """
+        now = time.time()
+        with self._connect() as conn:
+            existing = conn.execute(
+                "SELECT id FROM tasks WHERE kind = ? AND repo_name = ? AND status IN (?, ?)",
+                (kind, repo_name, self.STATUS_PENDING, self.STATUS_LEASED)
+            ).fetchone()
+            if existing:
+                return None
+            cursor = conn.execute("""
+                INSERT INTO tasks (kind, repo_name, payload, status, attempts, created_at, updated_at)
+                VALUES (?, ?, ?, ?, 0, ?, ?)
+            """, (kind, repo_name, json.dumps(payload or {}, ensure_ascii=False), self.STATUS_PENDING, now, now))
+            return cursor.lastrowid
+
+    def claim(self, worker_id: str, ring: HashRing = None, batch: int = 200) -> Optional[Dict]:
+        """领取一个分配给该工作进程的任务（待执行或租约已过期）
+
+        按 ID 分批扫描队列，直到找到分配给该工作进程的任务或扫描完整个队列，
+        队列前部积压的其他进程的任务不会挡住后面的任务。
+
+        Args:
+            batch: 每批扫描的任务数
+        """
+        ring = ring or self.ring()
+        now = time.time()
+        last_id = 0
+        with self._connect() as conn:
+            while True:
+                rows = conn.execute("""
+                    SELECT id, repo_name FROM tasks
+                    WHERE (status = ? OR (status = ? AND lease_expires < ?)) AND id > ?
+                    ORDER BY id LIMIT ?
+                """, (self.STATUS_PENDING, self.STATUS_LEASED, now, last_id, batch)).fetchall()
+                if not rows:
+                    return None
+                last_id = rows[-1]['id']
+                for row in rows:
+                    if ring.node_for(row['repo_name']) != worker_id:
+                        continue
+                    cursor = conn.execute("""
+                        UPDATE tasks SET status = ?, worker_id = ?, lease_expires = ?,
+                                         attempts = attempts + 1, updated_at = ?
+                        WHERE id = ? AND (status = ? OR (status = ? AND lease_expires < ?))
+                    """, (self.STATUS_LEASED, worker_id, now + self.lease_ttl, now,
+                          row['id'], self.STATUS_PENDING, self.STATUS_LEASED, now))
+                    if cursor.rowcount == 1:
+                        task = dict(conn.execute("SELECT * FROM tasks WHERE id = ?", (row['id'],)).fetchone())
+                        task['payload'] = json.loads(task['payload'] or '{}')
+                        return task
+
+    def complete(self, task_id: int):
+        """标记任务完成"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker_id = NULL, updated_at = ?, error = NULL WHERE id = ?",
+                (self.STATUS_DONE, time.time(), task_id)
+            )
+
+    def fail(self, task_id: int, error: str):
+        """记录任务失败：未达上限时放回队列，否则标记为失败"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT attempts FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            status = self.STATUS_FAILED if row and row['attempts'] >= self.max_attempts else self.STATUS_PENDING
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker_id = NULL, updated_at = ?, error = ? WHERE id = ?",
+                (status, time.time(), error, task_id)
+            )
+
+    def purge(self, older_than_hours: float = 24) -> int:
+        """清理已结束的旧任务"""
+        cutoff = time.time() - older_than_hours * 3600
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM tasks WHERE status IN (?, ?) AND updated_at < ?",
+                (self.STATUS_DONE, self.STATUS_FAILED, cutoff)
+            )
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """各状态的任务数量"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+        result = {self.STATUS_PENDING: 0, self.STATUS_LEASED: 0, self.STATUS_DONE: 0, self.STATUS_FAILED: 0}
+        result.update({row['status']: row['n'] for row in rows})
+        return result
+
+
+class ClusterWorker:
+    """工作进程：心跳、领取分配给自己的任务并执行"""
+
+    def __init__(self, sentinel, store: ClusterStore, worker_id: str = None,
+                 heartbeat_interval: float = 10, poll_interval: float = 5):
+        """初始化工作进程
+
+        Args:
+            sentinel: GitHubSentinel 实例，执行具体任务
+            store: 共享存储
+            worker_id: 工作进程 ID，默认由主机名和随机后缀生成
+            heartbeat_interval: 心跳间隔（秒），应明显小于 heartbeat_ttl
+            poll_interval: 没有任务时的轮询间隔（秒）
+        """
+        self.sentinel = sentinel
+        self.store = store
+        self.worker_id = worker_id or default_worker_id()
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config, sentinel, worker_id: str = None) -> 'ClusterWorker':
+        """根据配置创建工作进程"""
+        return cls(
+            sentinel,
+            ClusterStore.from_config(config),
+            worker_id=worker_id,
+            heartbeat_interval=config.get("cluster.heartbeat_interval", 10),
+            poll_interval=config.get("cluster.poll_interval", 5),
+        )
+
+    def _heartbeat_loop(self):
+        """后台心跳：刷新自身心跳、续期租约并回收失联进程的任务"""
+        while not self._stop.wait(self.heartbeat_interval):
+            try:
+                self.store.heartbeat(self.worker_id)
+                self.store.reap_dead_workers()
+            except Exception as e:
+                logger.warning(f"集群心跳失败: {e}")
+
+    def execute(self, task: Dict):
+        """执行任务：update -> update_single_repository（自适应轮询时先探测），
+        report -> generate_custom_range_report"""
+        repo_name = task['repo_name']
+        payload = task['payload']
+
+        if task['kind'] == 'update':
+            if payload.get('adaptive') and self.sentinel.scheduler.adaptive:
+                # 自适应轮询：由工作进程探测，无变化时跳过
+                self.sentinel.poll_repository(repo_name)
+            elif not self.sentinel.update_single_repository(repo_name):
+                raise RuntimeError(f"更新仓库失败: {repo_name}")
+            # 更新完成后立即生成报告（同一仓库的报告任务哈希到同一个工作进程）
+            if payload.get('report'):
+                self.store.enqueue('report', repo_name, payload['report'])
+        elif task['kind'] == 'report':
+            start_date = datetime.fromisoformat(payload['start_date'])
+            end_date = datetime.fromisoformat(payload['end_date']) if payload.get('end_date') else None
+            self.sentinel.generate_custom_range_report(repo_name, start_date, end_date)
+        else:
+            raise ValueError(f"未知的任务类型: {task['kind']}")
+
+    def run_once(self) -> bool:
+        """领取并执行一个任务
+
+        Returns:
+            是否执行了任务
+        """
+        task = self.store.claim(self.worker_id)
+        if task is None:
+            return False
+
+        logger.info(f"[{self.worker_id}] 执行任务 #{task['id']}: {task['kind']} {task['repo_name']}")
+        try:
+            self.execute(task)
+        except Exception as e:
+            logger.error(f"[{self.worker_id}] 任务 #{task['id']} 失败: {e}")
+            self.store.fail(task['id'], str(e))
+        else:
+            self.store.complete(task['id'])
+        return True
+
+    def run(self):
+        """运行工作进程直到 stop() 或 Ctrl+C"""
+        self.store.heartbeat(self.worker_id)
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="cluster-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+        logger.info(f"集群工作进程已启动: {self.worker_id}")
+
+        try:
+            while not self._stop.is_set():
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            logger.info("收到中断信号，正在停止工作进程...")
+        finally:
+            self._stop.set()
+            self.store.deregister(self.worker_id)
+            logger.info(f"集群工作进程已停止: {self.worker_id}")
+
+    def stop(self):
+        """请求停止"""
+        self._stop.set()
+
+
+def daily_report_payload(now: datetime = None) -> Dict:
+    """当天每日报告任务的日期范围（与 get_daily_issues 的默认范围一致）"""
+    now = now or datetime.now(timezone.utc)
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {'start_date': start.isoformat(), 'end_date': (start + timedelta(days=1)).isoformat()}
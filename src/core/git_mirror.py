@@ -0,0 +1,182 @@
+"""
+本地 Git 镜像
+为订阅的仓库维护裸的部分克隆（--filter=blob:none，只下载提交和目录树），
+增量 git fetch 后在本地读取任意时间范围的提交记录，不消耗 API 配额
+"""
+
+import base64
+import os
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+
+# git log 输出的字段分隔符和记录分隔符
+_FIELD = '\x1f'
+_RECORD = '\x1e'
+_LOG_FORMAT = _FIELD.join(['%H', '%an', '%aI', '%s'])
+
+
+class GitMirror:
+    """按仓库维护的本地裸镜像
+
+    镜像只跟踪远程的分支（refs/heads/*），提交记录读取默认分支（HEAD）。
+    两次 fetch 的间隔不小于 fetch_interval，同一仓库的 clone / fetch 串行执行。
+    部分克隆不含文件内容：变更文件数只需目录树，可直接在本地计算；
+    增删行数需要文件内容，启用 diffstat 时由 git 按需下载。
+    """
+
+    def __init__(self, root: str = "data/mirrors", remote_url: str = "https://github.com/{repo}.git",
+                 token: str = None, fetch_interval: float = 300, timeout: float = 600,
+                 max_commits: int = 500, diffstat: bool = False):
+        """初始化镜像管理器
+
+        Args:
+            root: 镜像存放目录
+            remote_url: 远程地址模板，{repo} 替换为 owner/repo
+            token: GitHub Token（可选），用于访问私有仓库，只通过环境变量传给 git
+            fetch_interval: 两次 fetch 的最短间隔（秒）
+            timeout: 单个 git 命令的超时时间（秒）
+            max_commits: 每次读取的最大提交数，0 表示不限制
+            diffstat: 是否统计增删行数（需要按需下载文件内容）
+        """
+        self.root = Path(root)
+        self.remote_url = remote_url
+        self.token = token if token and token != "your_github_token_here" else None
+        self.fetch_interval = fetch_interval
+        self.timeout = timeout
+        self.max_commits = max_commits
+        self.diffstat = diffstat
+        # 仓库名（小写） -> 上次 fetch 的时间戳
+        self._fetched_at: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> Optional['GitMirror']:
+        """根据配置创建镜像管理器，提交来源不是 git 时返回 None"""
+        if config.get("github.commit_source", "api") != "git":
+            return None
+        return cls(
+            root=config.get("github.git_mirror.path", "data/mirrors"),
+            remote_url=config.get("github.git_mirror.remote_url", "https://github.com/{repo}.git"),
+            token=config.get("github.token"),
+            fetch_interval=config.get("github.git_mirror.fetch_interval", 300),
+            timeout=config.get("github.git_mirror.timeout", 600),
+            max_commits=config.get("github.git_mirror.max_commits", 500),
+            diffstat=config.get("github.git_mirror.diffstat", False),
+        )
+
+    def mirror_path(self, repo_name: str) -> Path:
+        """仓库镜像的路径"""
+        return self.root / (repo_name.lower().replace('/', '__') + '.git')
+
+    def _lock(self, repo_name: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(repo_name.lower(), threading.Lock())
+
+    def _env(self) -> Dict[str, str]:
+        """git 命令的环境变量：禁止交互式询问凭据，有 token 时通过配置环境变量附加认证头"""
+        env = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+        if self.token:
+            credentials = base64.b64encode(f"x-access-token:{self.token}".encode()).decode()
+            env.update({
+                'GIT_CONFIG_COUNT': '1',
+                'GIT_CONFIG_KEY_0': 'http.https://github.com/.extraheader',
+                'GIT_CONFIG_VALUE_0': f"Authorization: Basic {credentials}",
+            })
+        return env
+
+    def _git(self, *args: str, cwd: Path = None) -> str:
+        """执行 git 命令并返回标准输出
+
+        Raises:
+            RuntimeError: 命令失败或超时
+        """
+        try:
+            result = subprocess.run(
+                ['git', *args], cwd=str(cwd) if cwd else None, env=self._env(),
+                capture_output=True, text=True, encoding='utf-8', errors='replace', timeout=self.timeout
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            raise RuntimeError(f"git {args[0]} 执行失败: {e}") from e
+        if result.returncode != 0:
+            raise RuntimeError(f"git {args[0]} 失败: {result.stderr.strip()}")
+        return result.stdout
+
+    def sync(self, repo_name: str, force: bool = False) -> Path:
+        """创建或增量更新仓库镜像
+
+        Args:
+            repo_name: 仓库名称，格式为 owner/repo
+            force: 忽略 fetch_interval 立即 fetch
+
+        Returns:
+            镜像路径
+        """
+        path = self.mirror_path(repo_name)
+        key = repo_name.lower()
+        with self._lock(repo_name):
+            if not (path / 'HEAD').exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                url = self.remote_url.format(repo=repo_name)
+                logger.info(f"创建 {repo_name} 的本地镜像（部分克隆）: {path}")
+                self._git('clone', '--bare', '--filter=blob:none', '--quiet', url, str(path))
+                # 裸克隆默认不跟踪远程分支，设置后 fetch 才会更新本地分支
+                self._git('config', 'remote.origin.fetch', '+refs/heads/*:refs/heads/*', cwd=path)
+                self._fetched_at[key] = time.time()
+            elif force or time.time() - self._fetched_at.get(key, 0) >= self.fetch_interval:
+                started = time.monotonic()
+                self._git('fetch', '--prune', '--quiet', 'origin', cwd=path)
+                self._fetched_at[key] = time.time()
+                logger.debug(f"{repo_name} 镜像 fetch 完成，耗时 {time.monotonic() - started:.1f}s")
+        return path
+
+    def commits(self, repo_name: str, since: datetime, until: datetime = None,
+                max_count: int = None) -> List[Dict]:
+        """读取时间范围内默认分支的提交（按提交时间过滤，与 REST API 的 since 一致）
+
+        Args:
+            repo_name: 仓库名称
+            since: 开始时间
+            until: 结束时间（可选）
+            max_count: 最大提交数，默认使用 max_commits，0 表示不限制
+
+        Returns:
+            按时间倒序的提交列表，字段与 REST API 路径一致（sha、message、author、date、url），
+            另含 changed_files，启用 diffstat 时含 additions、deletions
+        """
+        path = self.sync(repo_name)
+        max_count = self.max_commits if max_count is None else max_count
+        args = ['log', 'HEAD', '--no-renames', f'--format={_RECORD}{_LOG_FORMAT}',
+                '--numstat' if self.diffstat else '--name-only', f'--since={since.isoformat()}']
+        if until is not None:
+            args.append(f'--until={until.isoformat()}')
+        if max_count:
+            args.append(f'--max-count={max_count}')
+        output = self._git(*args, cwd=path)
+
+        commits = []
+        for record in output.split(_RECORD)[1:]:
+            header, _, files = record.partition('\n')
+            sha, author, date, message = header.split(_FIELD, 3)
+            changed = [line for line in files.splitlines() if line.strip()]
+            commit = {
+                'sha': sha[:7],
+                'message': message,
+                'author': author,
+                'date': datetime.fromisoformat(date).astimezone(timezone.utc).isoformat(),
+                'url': f"https://github.com/{repo_name}/commit/{sha}",
+                'changed_files': len(changed),
+            }
+            if self.diffstat:
+                # 二进制文件的增删行数为 "-"
+                stats = [line.split('\t', 2) for line in changed]
+                commit['additions'] = sum(int(s[0]) for s in stats if s[0].isdigit())
+                commit['deletions'] = sum(int(s[1]) for s in stats if len(s) > 1 and s[1].isdigit())
+            commits.append(commit)
+        return commits
@@ -2,22 +2,125 @@
 GitHub API 客户端
 """
 
-from github import Github, GithubException
+from github import Github, GithubException, UnknownObjectException
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 from loguru import logger
+import json
+import math
 import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import requests
+
+from src.core.git_mirror import GitMirror
+from src.core.rate_pacer import SearchRateLimiter
+from src.core.scoring import ImportanceScorer, release_references
+from src.storage.activity_warehouse import ActivityWarehouse
+from src.storage.release_cache import ReleaseCache
+from src.storage.search_index import SearchIndex
+from src.storage.snapshot_store import ActivitySnapshotStore, select_window_items
+
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+RELEASES_URL = "https://api.github.com/repos/{repo}/releases"
+REPO_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+/[A-Za-z0-9_.-]+$')
+
+# Search API 每个查询最多返回的结果数
+SEARCH_RESULT_CAP = 1000
+
+# 展开组织 / 主题时每个仓库获取的字段
+_REPO_SNAPSHOT_FIELDS = """
+    nameWithOwner pushedAt updatedAt isArchived
+    issues(states: OPEN) { totalCount }
+    pullRequests(states: OPEN) { totalCount }
+"""
+
+EXPAND_ORG_QUERY = """
+query($login: String!, $first: Int!, $cursor: String) {
+  repositoryOwner(login: $login) {
+    repositories(first: $first, after: $cursor, orderBy: {field: PUSHED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { %s }
+    }
+  }
+}
+""" % _REPO_SNAPSHOT_FIELDS
+
+EXPAND_TOPIC_QUERY = """
+query($q: String!, $first: Int!, $cursor: String) {
+  search(query: $q, type: REPOSITORY, first: $first, after: $cursor) {
+    pageInfo { hasNextPage endCursor }
+    nodes { ... on Repository { %s } }
+  }
+}
+""" % _REPO_SNAPSHOT_FIELDS
+
+
+def _normalize_time(value: Optional[str]) -> Optional[str]:
+    """把 GraphQL 返回的时间（...Z）转换为与 PyGithub isoformat() 一致的格式"""
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).isoformat()
 
 
 class GitHubClient:
     """GitHub API 客户端封装"""
     
-    def __init__(self, token: str):
+    def __init__(self, token: str, max_items: int = 100,
+                 snapshot_store: Optional[ActivitySnapshotStore] = None,
+                 repo_cache_ttl: float = 600, repo_negative_ttl: float = 300,
+                 http_pool=None, graphql_batch_size: int = 50, graphql_workers: int = 4,
+                 warehouse: Optional[ActivityWarehouse] = None,
+                 search_index: Optional[SearchIndex] = None,
+                 scorer: Optional[ImportanceScorer] = None,
+                 search_workers: int = 4, search_per_minute: int = 30,
+                 git_mirror: Optional[GitMirror] = None,
+                 release_cache: Optional[ReleaseCache] = None, release_pages: int = 3):
         """初始化 GitHub 客户端
         
         Args:
             token: GitHub Personal Access Token
+            max_items: 每日 Issues/PRs 每种类型的最大获取数量，0 表示不限制
+            snapshot_store: 活动快照存储（可选），用于在更新任务和报告任务间共享数据
+            repo_cache_ttl: 仓库信息缓存时间（秒），0 表示不缓存
+            repo_negative_ttl: 仓库不存在（404）结果的缓存时间（秒），0 表示不缓存
+            http_pool: 共享 HTTP 连接池（可选），用于 GraphQL 请求
+            graphql_batch_size: 批量验证时每个 GraphQL 请求包含的仓库数
+            graphql_workers: 批量验证时并发的 GraphQL 请求数
+            warehouse: 本地活动仓库（可选），保存拉取到的活动，历史日期范围直接读取本地数据
+            search_index: 全文搜索索引（可选），导出进展时索引 Issues 和 PRs
+            scorer: 重要性评分器（可选），在数量上限截断前按重要性过滤和排序
+            search_workers: 完整获取大范围搜索结果时并发的请求数
+            search_per_minute: Search API 每分钟最多请求数（0 表示不限速）
+            git_mirror: 本地 Git 镜像（可选），设置后提交记录从本地镜像读取，失败时改用 REST API
+            release_cache: Release 缓存（可选），按 ETag 条件请求，只拉取比游标更新的 Releases
+            release_pages: 同步 Releases 时最多请求的列表页数（每页 30 个）
         """
+        self.max_items = max_items
+        self.snapshot_store = snapshot_store
+        self.warehouse = warehouse
+        self.search_index = search_index
+        self.scorer = scorer
+        self.search_workers = max(1, search_workers)
+        self.search_limiter = SearchRateLimiter(search_per_minute)
+        self.git_mirror = git_mirror
+        self.release_cache = release_cache
+        self.release_pages = max(1, release_pages)
+        self.repo_cache_ttl = repo_cache_ttl
+        self.repo_negative_ttl = repo_negative_ttl
+        # 仓库名（小写） -> (过期时间戳, Repository 对象, 规范名称)，仓库不存在时后两项为 None
+        self._repo_cache: Dict[str, tuple] = {}
+        self._repo_cache_lock = threading.Lock()
+        self.http_pool = http_pool
+        self.graphql_batch_size = max(1, graphql_batch_size)
+        self.graphql_workers = max(1, graphql_workers)
+        # GraphQL API 不支持匿名访问，token 无效时为 None
+        self.token = None
         if not token or token == "your_github_token_here":
             logger.warning("未设置有效的 GitHub Token，将使用匿名访问（受限于更严格的 Rate Limit）")
             self.github = Github()
@@ -26,12 +129,81 @@ class GitHubClient:
             self.github = Github(token)
             try:
                 self.user = self.github.get_user()
+                self.token = token
                 logger.info(f"GitHub 客户端初始化成功，当前用户: {self.user.login}")
             except Exception as e:
                 logger.warning(f"GitHub Token 无效或无法获取用户信息: {e}，将尝试匿名访问")
                 self.github = Github()
                 self.user = None
     
+    @classmethod
+    def from_config(cls, config, http_pool=None) -> 'GitHubClient':
+        """根据配置创建客户端"""
+        return cls(
+            config.get("github.token"),
+            max_items=config.get("github.max_items_per_type", 100),
+            snapshot_store=ActivitySnapshotStore.from_config(config),
+            repo_cache_ttl=config.get("github.repo_cache.ttl", 600),
+            repo_negative_ttl=config.get("github.repo_cache.negative_ttl", 300),
+            http_pool=http_pool,
+            graphql_batch_size=config.get("github.graphql.batch_size", 50),
+            graphql_workers=config.get("github.graphql.workers", 4),
+            warehouse=ActivityWarehouse.from_config(config),
+            search_index=SearchIndex.from_config(config),
+            scorer=ImportanceScorer.from_config(config),
+            search_workers=config.get("github.search.workers", 4),
+            search_per_minute=config.get("github.search.requests_per_minute", 30),
+            git_mirror=GitMirror.from_config(config),
+            release_cache=ReleaseCache.from_config(config),
+            release_pages=config.get("releases.max_pages", 3),
+        )
+    
+    def get_repository(self, repo_name: str, refresh: bool = False):
+        """获取仓库对象（带缓存）
+        
+        验证、探测和拉取更新共用同一份缓存，订阅时验证过的仓库在随后拉取更新时
+        不再重复请求。仓库不存在时同样缓存一段时间，避免反复请求无效的仓库名。
+        
+        Args:
+            repo_name: 仓库名称，格式为 owner/repo
+            refresh: 忽略缓存重新请求（结果仍会写入缓存）
+        
+        Returns:
+            Repository 对象
+        
+        Raises:
+            UnknownObjectException: 仓库不存在
+            GithubException: 其他 API 错误（不缓存）
+        """
+        key = repo_name.lower()
+        if not refresh:
+            with self._repo_cache_lock:
+                cached = self._repo_cache.get(key)
+            if cached and cached[0] > time.time():
+                if cached[1] is None:
+                    raise UnknownObjectException(404, {'message': 'Not Found (cached)'}, None)
+                return cached[1]
+        
+        try:
+            repo = self.github.get_repo(repo_name)
+        except UnknownObjectException:
+            self._cache_repository(key, None, self.repo_negative_ttl)
+            raise
+        self._cache_repository(key, repo, self.repo_cache_ttl)
+        return repo
+    
+    def _cache_repository(self, key: str, repo, ttl: float, full_name: str = None):
+        """写入仓库缓存，ttl 不大于 0 时不缓存
+        
+        延迟加载的仓库对象读取 full_name 会触发请求，此时需要显式传入规范名称。
+        """
+        if ttl <= 0:
+            return
+        if repo is not None and full_name is None:
+            full_name = repo.full_name
+        with self._repo_cache_lock:
+            self._repo_cache[key] = (time.time() + ttl, repo, full_name)
+    
     def validate_repository(self, repo_name: str) -> bool:
         """验证仓库是否存在
         
@@ -42,12 +214,233 @@ class GitHubClient:
             是否存在
         """
         try:
-            self.github.get_repo(repo_name)
+            self.get_repository(repo_name)
             return True
         except GithubException:
             return False
     
-    def fetch_repository_updates(self, repo_name: str, days: int = 7) -> Dict:
+    def validate_repositories(self, repo_names: List[str]) -> Dict[str, Optional[str]]:
+        """批量验证仓库是否存在
+        
+        缓存中已有结果的仓库不再请求；其余仓库按 graphql_batch_size 分批，每批用一个
+        带别名的 GraphQL 查询验证，多个批次并发执行。没有有效 token（GraphQL 不支持匿名
+        访问）或某一批请求失败时，该批改为逐个调用 REST API 验证。
+        
+        Args:
+            repo_names: 仓库名称列表，格式为 owner/repo
+        
+        Returns:
+            仓库名称 -> GitHub 上的规范名称（大小写可能不同），不存在或无法访问时为 None
+        """
+        results: Dict[str, Optional[str]] = {}
+        pending = []
+        for name in dict.fromkeys(repo_names):
+            if not REPO_NAME_PATTERN.match(name):
+                results[name] = None
+                continue
+            with self._repo_cache_lock:
+                cached = self._repo_cache.get(name.lower())
+            if cached and cached[0] > time.time():
+                results[name] = cached[2]
+            else:
+                pending.append(name)
+        
+        batches = [pending[i:i + self.graphql_batch_size]
+                   for i in range(0, len(pending), self.graphql_batch_size)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.graphql_workers, len(batches))) as executor:
+                for batch_result in executor.map(self._validate_batch, batches):
+                    results.update(batch_result)
+        return results
+    
+    def _validate_batch(self, repo_names: List[str]) -> Dict[str, Optional[str]]:
+        """验证一批仓库，GraphQL 不可用时逐个调用 REST API"""
+        if self.token:
+            try:
+                return self._graphql_validate(repo_names)
+            except Exception as e:
+                logger.warning(f"GraphQL 批量验证失败: {e}，改为逐个验证 {len(repo_names)} 个仓库")
+        return self._validate_batch_rest(repo_names)
+    
+    def _validate_batch_rest(self, repo_names: List[str]) -> Dict[str, Optional[str]]:
+        """逐个调用 REST API 验证仓库"""
+        results = {}
+        for name in repo_names:
+            try:
+                results[name] = self.get_repository(name).full_name
+            except GithubException:
+                results[name] = None
+        return results
+    
+    def _graphql_validate(self, repo_names: List[str]) -> Dict[str, Optional[str]]:
+        """用一个带别名的 GraphQL 查询验证一批仓库"""
+        fields = []
+        for i, name in enumerate(repo_names):
+            owner, repo = name.split('/', 1)
+            fields.append(f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) {{ nameWithOwner }}")
+        data, errors = self.graphql("query { " + " ".join(fields) + " }")
+        
+        # 仓库不存在时对应别名为 null，并带有 NOT_FOUND 错误
+        not_found = {err['path'][0] for err in errors
+                     if err.get('type') == 'NOT_FOUND' and err.get('path')}
+        results = {}
+        for i, name in enumerate(repo_names):
+            node = data.get(f"r{i}")
+            if node:
+                results[name] = node['nameWithOwner']
+                # 缓存延迟加载的仓库对象，随后拉取更新时才真正请求
+                self._cache_repository(name.lower(), self.github.get_repo(node['nameWithOwner'], lazy=True),
+                                       self.repo_cache_ttl, full_name=node['nameWithOwner'])
+            elif f"r{i}" in not_found:
+                results[name] = None
+                self._cache_repository(name.lower(), None, self.repo_negative_ttl)
+            else:
+                # 其他错误（如无权限）不缓存，按单个仓库重新验证
+                results.update(self._validate_batch_rest([name]))
+        return results
+    
+    def graphql(self, query: str, variables: Dict = None):
+        """执行 GraphQL 查询
+        
+        Returns:
+            (data, errors)，部分字段出错时 data 中对应字段为 null
+        
+        Raises:
+            RuntimeError: 请求失败或整个查询出错
+        """
+        if not self.token:
+            raise RuntimeError("GraphQL API 需要有效的 GitHub Token")
+        payload = {'query': query, 'variables': variables or {}}
+        headers = {'Authorization': f'bearer {self.token}'}
+        if self.http_pool is not None:
+            response = self.http_pool.post(GRAPHQL_URL, json=payload, headers=headers)
+        else:
+            response = requests.post(GRAPHQL_URL, json=payload, headers=headers, timeout=30)
+        if response.status_code != 200:
+            raise RuntimeError(f"GraphQL 请求失败: HTTP {response.status_code}")
+        body = response.json()
+        errors = body.get('errors') or []
+        if body.get('data') is None:
+            raise RuntimeError(f"GraphQL 查询失败: {errors}")
+        return body['data'], errors
+    
+    def list_repositories(self, query: str, limit: int = 0) -> List[str]:
+        """列出组织 / 用户或主题下未归档的仓库
+        
+        有有效 token 时通过 expand_query 分页查询 GraphQL，否则使用 REST API。
+        
+        Args:
+            query: "org:名称"（组织或用户的全部仓库）或 "topic:名称"（带该主题的仓库）
+            limit: 最大数量，0 表示不限制
+        
+        Returns:
+            仓库全名列表
+        """
+        kind, value = self._split_query(query)
+        if self.token:
+            names = [name for name, probe in self.expand_query(query).items() if not probe['archived']]
+            names = names[:limit] if limit else names
+        else:
+            if kind == 'org':
+                try:
+                    repos = self.github.get_organization(value).get_repos()
+                except UnknownObjectException:
+                    repos = self.github.get_user(value).get_repos()
+            else:
+                repos = self.github.search_repositories(f"topic:{value}", sort='stars', order='desc')
+            
+            names = []
+            for repo in repos:
+                if repo.archived:
+                    continue
+                names.append(repo.full_name)
+                self._cache_repository(repo.full_name.lower(), repo, self.repo_cache_ttl)
+                if limit and len(names) >= limit:
+                    break
+        logger.info(f"{query} 共找到 {len(names)} 个仓库")
+        return names
+    
+    @staticmethod
+    def _split_query(query: str):
+        """拆分 org:名称 / topic:名称 查询"""
+        kind, _, value = query.partition(':')
+        kind, value = kind.strip().lower(), value.strip()
+        if not value or kind not in ('org', 'topic'):
+            raise ValueError(f"不支持的查询: {query}，正确格式: org:名称 或 topic:名称")
+        return kind, value
+    
+    def expand_query(self, query: str, limit: int = 0) -> Dict[str, Dict]:
+        """通过分页 GraphQL 查询展开组织 / 主题下的仓库及其活动快照
+        
+        每页 100 个仓库，一次请求同时得到各仓库的推送时间、更新时间和打开的 Issues/PRs 数，
+        无需逐个仓库请求即可判断哪些仓库有变化。组织按推送时间倒序返回；
+        主题搜索最多返回 1000 个仓库。
+        
+        Args:
+            query: "org:名称" 或 "topic:名称"
+            limit: 最大数量，0 表示不限制
+        
+        Returns:
+            仓库全名 -> {'pushed_at', 'updated_at', 'open_issues', 'archived'}，
+            前三项与 probe_repository 的结果一致
+        
+        Raises:
+            ValueError: 组织 / 用户不存在
+            RuntimeError: GraphQL 请求失败
+        """
+        kind, value = self._split_query(query)
+        if kind == 'org':
+            graphql_query = EXPAND_ORG_QUERY
+            variables = {'login': value}
+        else:
+            graphql_query = EXPAND_TOPIC_QUERY
+            variables = {'q': f"topic:{value} sort:updated-desc"}
+        
+        repos: Dict[str, Dict] = {}
+        cursor = None
+        while True:
+            page_size = min(100, limit - len(repos)) if limit else 100
+            data, _ = self.graphql(graphql_query, dict(variables, cursor=cursor, first=page_size))
+            if kind == 'org':
+                if data.get('repositoryOwner') is None:
+                    raise ValueError(f"组织或用户不存在: {value}")
+                connection = data['repositoryOwner']['repositories']
+            else:
+                connection = data['search']
+            
+            for node in connection['nodes']:
+                if not node:
+                    continue
+                repos[node['nameWithOwner']] = {
+                    'pushed_at': _normalize_time(node.get('pushedAt')),
+                    'updated_at': _normalize_time(node.get('updatedAt')),
+                    'open_issues': node['issues']['totalCount'] + node['pullRequests']['totalCount'],
+                    'archived': node['isArchived'],
+                }
+            
+            page_info = connection['pageInfo']
+            if not page_info['hasNextPage'] or (limit and len(repos) >= limit):
+                break
+            cursor = page_info['endCursor']
+        
+        logger.info(f"{query} 展开得到 {len(repos)} 个仓库")
+        return repos
+    
+    def probe_repository(self, repo_name: str) -> Dict:
+        """轻量探测仓库是否有变化（一次 API 请求）
+        
+        pushed_at 反映代码推送，updated_at 反映仓库元数据变化，
+        open_issues_count 在 Issues/PRs 打开或关闭时变化。
+        探测总是重新请求，并刷新仓库缓存。
+        """
+        repo = self.get_repository(repo_name, refresh=True)
+        return {
+            'pushed_at': repo.pushed_at.isoformat() if repo.pushed_at else None,
+            'updated_at': repo.updated_at.isoformat() if repo.updated_at else None,
+            'open_issues': repo.open_issues_count
+        }
+    
+    def fetch_repository_updates(self, repo_name: str, days: float = 7) -> Dict:
         """获取仓库更新信息（遗留方法，用于 CLI）
         
         注意: 对于 AI 报告生成，推荐直接使用 get_daily_issues() 和 
@@ -56,16 +449,20 @@ class GitHubClient:
         
         Args:
             repo_name: 仓库名称
-            days: 获取最近多少天的更新
+            days: 获取最近多少天的更新（可为小数）
         
         Returns:
             包含各类更新的字典
         """
-        logger.info(f"正在获取仓库 {repo_name} 最近 {days} 天的更新...")
+        logger.info(f"正在获取仓库 {repo_name} 最近 {days:g} 天的更新...")
         
         try:
-            repo = self.github.get_repo(repo_name)
-            since_date = datetime.now() - timedelta(days=days)
+            repo = self.get_repository(repo_name)
+            fetched_at = datetime.now(timezone.utc)
+            since_date = fetched_at - timedelta(days=days)
+            
+            issues, issues_complete = self._fetch_issues(repo, since_date)
+            pull_requests, prs_complete = self._fetch_pull_requests(repo, since_date)
             
             updates = {
                 'repo_name': repo_name,
@@ -75,12 +472,22 @@ class GitHubClient:
                 'open_issues': repo.open_issues_count,
                 'language': repo.language,
                 'updated_at': repo.updated_at.isoformat() if repo.updated_at else None,
-                'commits': self._fetch_commits(repo, since_date),
-                'pull_requests': self._fetch_pull_requests(repo, since_date),
-                'issues': self._fetch_issues(repo, since_date),
-                'releases': self._fetch_releases(repo, since_date),
+                'commits': self._fetch_commits(repo, since_date, repo_name),
+                'pull_requests': pull_requests,
+                'issues': issues,
+                'releases': self._fetch_releases(repo, since_date, repo_name),
             }
             
+            # 提交和 Releases 追加到本地活动仓库，供趋势分析使用
+            if self.warehouse is not None:
+                self.warehouse.record_events(repo_name, 'commits', updates['commits'], 'sha', 'date')
+                self.warehouse.record_events(repo_name, 'releases', updates['releases'], 'tag', 'created_at')
+            
+            # 记录快照，供随后的报告任务复用
+            if self.snapshot_store is not None:
+                self._record_snapshot(repo_name, 'issues', issues, issues_complete, since_date, fetched_at)
+                self._record_snapshot(repo_name, 'pull_requests', pull_requests, prs_complete, since_date, fetched_at)
+            
             logger.info(f"仓库 {repo_name} 更新获取成功")
             return updates
             
@@ -88,8 +495,32 @@ class GitHubClient:
             logger.error(f"获取仓库 {repo_name} 更新失败: {e}")
             raise
     
-    def _fetch_commits(self, repo, since_date: datetime) -> List[Dict]:
-        """获取提交记录"""
+    def _record_snapshot(self, repo_name: str, kind: str, items: List[Dict], complete: Optional[bool],
+                         since_date: datetime, fetched_at: datetime):
+        """记录 REST 列表快照
+        
+        列表按更新时间倒序拉取：未被截断时完整覆盖 since_date 之后的所有条目，
+        被截断时只覆盖到最后一个条目的更新时间。拉取出错时不记录。
+        """
+        if complete is None:
+            return
+        if complete or not items:
+            covered_from = since_date
+        else:
+            covered_from = min(datetime.fromisoformat(item['updated_at']) for item in items)
+        self.snapshot_store.record(repo_name, kind, items, covered_from, fetched_at)
+    
+    def _fetch_commits(self, repo, since_date: datetime, repo_name: str = None) -> List[Dict]:
+        """获取提交记录
+        
+        配置了本地 Git 镜像时从镜像读取（不消耗 API 配额），镜像不可用时改用 REST API（最多 50 个）。
+        """
+        if self.git_mirror is not None and repo_name:
+            try:
+                return self.git_mirror.commits(repo_name, since_date)
+            except Exception as e:
+                logger.warning(f"从本地镜像读取 {repo_name} 的提交失败: {e}，改用 REST API")
+        
         commits = []
         try:
             for commit in repo.get_commits(since=since_date):
@@ -107,14 +538,19 @@ class GitHubClient:
         
         return commits
     
-    def _fetch_pull_requests(self, repo, since_date: datetime) -> List[Dict]:
-        """获取 Pull Requests"""
+    def _fetch_pull_requests(self, repo, since_date: datetime, max_count: int = 30):
+        """获取 Pull Requests
+        
+        Returns:
+            (PR 列表, 是否完整)：列表未被数量上限截断时为 True，被截断为 False，出错为 None
+        """
         prs = []
         try:
             for pr in repo.get_pulls(state='all', sort='updated', direction='desc'):
                 if pr.updated_at < since_date:
-                    break
+                    return prs, True
                 
+                # 访问 merged 时会加载完整的 PR 对象，代码变更统计无需额外请求
                 prs.append({
                     'number': pr.number,
                     'title': pr.title,
@@ -123,23 +559,34 @@ class GitHubClient:
                     'created_at': pr.created_at.isoformat(),
                     'updated_at': pr.updated_at.isoformat(),
                     'merged': pr.merged,
+                    'merged_at': pr.merged_at.isoformat() if pr.merged_at else None,
+                    'body': pr.body or '',
+                    'additions': pr.additions,
+                    'deletions': pr.deletions,
+                    'changed_files': pr.changed_files,
+                    'labels': [label.name for label in pr.labels],
                     'url': pr.html_url
                 })
                 
-                if len(prs) >= 30:
-                    break
+                if len(prs) >= max_count:
+                    return prs, False
         except Exception as e:
             logger.warning(f"获取 Pull Requests 失败: {e}")
+            return prs, None
         
-        return prs
+        return prs, True
     
-    def _fetch_issues(self, repo, since_date: datetime) -> List[Dict]:
-        """获取 Issues"""
+    def _fetch_issues(self, repo, since_date: datetime, max_count: int = 30):
+        """获取 Issues
+        
+        Returns:
+            (Issue 列表, 是否完整)：列表未被数量上限截断时为 True，被截断为 False，出错为 None
+        """
         issues = []
         try:
-            for issue in repo.get_issues(state='all', sort='updated', direction='desc'):
+            for issue in repo.get_issues(state='all', sort='updated', direction='desc', since=since_date):
                 if issue.updated_at < since_date:
-                    break
+                    return issues, True
                 
                 # 跳过 Pull Requests（GitHub API 中 PR 也算 Issue）
                 if issue.pull_request:
@@ -154,18 +601,30 @@ class GitHubClient:
                     'updated_at': issue.updated_at.isoformat(),
                     'comments': issue.comments,
                     'labels': [label.name for label in issue.labels],
+                    'body': issue.body or '',
                     'url': issue.html_url
                 })
                 
-                if len(issues) >= 30:
-                    break
+                if len(issues) >= max_count:
+                    return issues, False
         except Exception as e:
             logger.warning(f"获取 Issues 失败: {e}")
+            return issues, None
         
-        return issues
+        return issues, True
     
-    def _fetch_releases(self, repo, since_date: datetime) -> List[Dict]:
-        """获取发布版本"""
+    def _fetch_releases(self, repo, since_date: datetime, repo_name: str = None) -> List[Dict]:
+        """获取发布版本
+        
+        启用 Release 缓存时先增量同步，再从缓存读取（包含已有的说明摘要）；同步失败时改为直接获取。
+        """
+        if self.release_cache is not None and repo_name:
+            try:
+                self.sync_releases(repo_name)
+                return self.release_cache.releases(repo_name, since_date, limit=10)
+            except Exception as e:
+                logger.warning(f"同步 {repo_name} 的 Releases 失败: {e}，改为直接获取")
+        
         releases = []
         try:
             for release in repo.get_releases():
@@ -189,6 +648,72 @@ class GitHubClient:
         
         return releases
     
+    def _rest_get(self, url: str, params: Dict = None, headers: Dict = None) -> requests.Response:
+        """发送 REST GET 请求（用于 PyGithub 不支持的条件请求），有有效 token 时附带认证头"""
+        headers = dict(headers or {}, Accept='application/vnd.github+json')
+        if self.token:
+            headers['Authorization'] = f'bearer {self.token}'
+        if self.http_pool is not None:
+            return self.http_pool.get(url, params=params, headers=headers)
+        return requests.get(url, params=params, headers=headers, timeout=30)
+    
+    def sync_releases(self, repo_name: str) -> int:
+        """增量同步 Releases 到缓存
+        
+        第一页带上次的 ETag 发送条件请求，未变化时 GitHub 返回 304（不计入配额），无需任何处理；
+        有变化时逐页读取，遇到不晚于游标的 Release 后停止翻页。第一页中已缓存的 tag
+        内容变化（被编辑）时更新缓存。
+        
+        Returns:
+            新增或被编辑的 Release 数
+        
+        Raises:
+            RuntimeError: 请求失败
+        """
+        cursor = self.release_cache.cursor(repo_name)
+        latest = cursor['latest_created_at']
+        url = RELEASES_URL.format(repo=repo_name)
+        headers = {'If-None-Match': cursor['etag']} if cursor['etag'] else {}
+        
+        etag = None
+        written = 0
+        for page in range(1, self.release_pages + 1):
+            response = self._rest_get(url, params={'per_page': 30, 'page': page}, headers=headers)
+            if response.status_code == 304:
+                logger.debug(f"{repo_name} 的 Releases 未变化（304）")
+                return 0
+            if response.status_code != 200:
+                raise RuntimeError(f"获取 Releases 失败: HTTP {response.status_code}")
+            if page == 1:
+                etag = response.headers.get('ETag')
+                headers = {}
+            
+            data = response.json()
+            releases = [self._release_from_json(item) for item in data if not item.get('draft')]
+            written += self.release_cache.store(repo_name, releases)
+            reached_cursor = latest is not None and any(r['created_at'] <= latest for r in releases)
+            if reached_cursor or len(data) < 30:
+                break
+        
+        newest = max([r['created_at'] for r in self.release_cache.releases(repo_name, limit=1)] + [latest or ''])
+        self.release_cache.set_cursor(repo_name, newest or None, etag)
+        if written:
+            logger.info(f"{repo_name} 同步 Releases: {written} 个新增或更新")
+        return written
+    
+    @staticmethod
+    def _release_from_json(item: Dict) -> Dict:
+        """将 REST API 返回的 Release 转换为字典（字段与 _fetch_releases 一致）"""
+        return {
+            'tag': item['tag_name'],
+            'name': item.get('name') or item['tag_name'],
+            'body': item.get('body') or '',
+            'author': (item.get('author') or {}).get('login', 'Unknown'),
+            'created_at': _normalize_time(item['created_at']),
+            'prerelease': bool(item.get('prerelease')),
+            'url': item.get('html_url'),
+        }
+    
     def get_rate_limit(self) -> Dict:
         """获取 API 调用限制信息"""
         rate_limit = self.github.get_rate_limit()
@@ -200,22 +725,10 @@ class GitHubClient:
             }
         }
     
-    def get_daily_issues(self, repo_name: str, date: datetime = None, 
-                        start_date: datetime = None, end_date: datetime = None) -> List[Dict]:
-        """获取指定日期或日期范围的已关闭 Issues 列表
-        
-        注意：只返回已关闭（closed）状态的 Issues
-        
-        Args:
-            repo_name: 仓库名称，格式为 owner/repo
-            date: 目标日期（向后兼容），默认为当天
-            start_date: 开始日期（优先级高于 date）
-            end_date: 结束日期（优先级高于 date）
-        
-        Returns:
-            已关闭的 Issues 列表
-        """
-        # 处理日期参数
+    @staticmethod
+    def _resolve_date_range(date: datetime = None, start_date: datetime = None,
+                            end_date: datetime = None):
+        """统一处理日期参数，返回带 UTC 时区的 (start_date, end_date)"""
         if start_date and end_date:
             # 使用日期范围
             if start_date.tzinfo is None:
@@ -233,77 +746,44 @@ class GitHubClient:
             now = datetime.now(timezone.utc)
             start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
             end_date = start_date + timedelta(days=1)
+        return start_date, end_date
+    
+    def get_daily_issues(self, repo_name: str, date: datetime = None, 
+                        start_date: datetime = None, end_date: datetime = None,
+                        max_items: int = None) -> List[Dict]:
+        """获取指定日期或日期范围的已关闭 Issues 列表
+        
+        注意：只返回已关闭（closed）状态的 Issues
+        
+        Args:
+            repo_name: 仓库名称，格式为 owner/repo
+            date: 目标日期（向后兼容），默认为当天
+            start_date: 开始日期（优先级高于 date）
+            end_date: 结束日期（优先级高于 date）
+            max_items: 最大获取数量（默认使用客户端配置，0 表示不限制）
+        
+        Returns:
+            已关闭的 Issues 列表
+        """
+        start_date, end_date = self._resolve_date_range(date, start_date, end_date)
         
         date_range_str = f"{start_date.strftime('%Y-%m-%d')} 到 {end_date.strftime('%Y-%m-%d')}"
         logger.info(f"正在获取仓库 {repo_name} 在 {date_range_str} 的 Issues...")
         
+        limit = self.max_items if max_items is None else max_items
+        
         try:
-            issues = []
-            
-            # 使用 GitHub Search API 进行日期范围查询
-            # 搜索在指定日期范围内创建或更新的 Issues
-            start_date_str = start_date.strftime('%Y-%m-%d')
-            end_date_str = end_date.strftime('%Y-%m-%d')
-            
-            # 查询新关闭的 Issues（只获取 closed 状态）
-            created_query = f"repo:{repo_name} is:issue is:closed created:{start_date_str}..{end_date_str}"
-            created_issues = self.github.search_issues(created_query, sort='created', order='desc')
-            
-            # 查询更新并关闭的 Issues（排除已包含的新创建的）
-            updated_query = f"repo:{repo_name} is:issue is:closed updated:{start_date_str}..{end_date_str} -created:{start_date_str}..{end_date_str}"
-            updated_issues = self.github.search_issues(updated_query, sort='updated', order='desc')
-            
-            # 处理新创建的 Issues
-            for issue in created_issues:
-                if len(issues) >= 100:  # 限制总数
-                    break
-                issues.append({
-                    'number': issue.number,
-                    'title': issue.title,
-                    'state': issue.state,
-                    'author': issue.user.login if issue.user else 'Unknown',
-                    'created_at': issue.created_at.isoformat(),
-                    'updated_at': issue.updated_at.isoformat(),
-                    'comments': issue.comments,
-                    'labels': [label.name for label in issue.labels],
-                    'body': issue.body or '',
-                    'url': issue.html_url,
-                    'is_new': True,  # 新创建
-                    'is_updated': False
-                })
-            
-            # 处理更新的 Issues
-            for issue in updated_issues:
-                if len(issues) >= 100:  # 限制总数
-                    break
-                issues.append({
-                    'number': issue.number,
-                    'title': issue.title,
-                    'state': issue.state,
-                    'author': issue.user.login if issue.user else 'Unknown',
-                    'created_at': issue.created_at.isoformat(),
-                    'updated_at': issue.updated_at.isoformat(),
-                    'comments': issue.comments,
-                    'labels': [label.name for label in issue.labels],
-                    'body': issue.body or '',
-                    'url': issue.html_url,
-                    'is_new': False,
-                    'is_updated': True  # 更新
-                })
-            
+            issues = self._get_closed_activity(repo_name, 'issues', start_date, end_date, limit)
             logger.info(f"获取到 {len(issues)} 个 Issues")
             return issues
             
         except Exception as e:
             logger.error(f"获取 Issues 失败: {e}")
             return []
-            
-        except GithubException as e:
-            logger.error(f"获取仓库 {repo_name} 的 Issues 失败: {e}")
-            raise
     
     def get_daily_pull_requests(self, repo_name: str, date: datetime = None,
-                               start_date: datetime = None, end_date: datetime = None) -> List[Dict]:
+                               start_date: datetime = None, end_date: datetime = None,
+                               max_items: int = None) -> List[Dict]:
         """获取指定日期或日期范围的已关闭 Pull Requests 列表
         
         注意：只返回已关闭（closed/merged）状态的 PRs
@@ -313,111 +793,370 @@ class GitHubClient:
             date: 目标日期（向后兼容），默认为当天
             start_date: 开始日期（优先级高于 date）
             end_date: 结束日期（优先级高于 date）
+            max_items: 最大获取数量（默认使用客户端配置，0 表示不限制）
         
         Returns:
             已关闭的 Pull Requests 列表
         """
-        # 处理日期参数
-        if start_date and end_date:
-            # 使用日期范围
-            if start_date.tzinfo is None:
-                start_date = start_date.replace(tzinfo=timezone.utc)
-            if end_date.tzinfo is None:
-                end_date = end_date.replace(tzinfo=timezone.utc)
-        elif date:
-            # 向后兼容：使用单个日期
-            if date.tzinfo is None:
-                date = date.replace(tzinfo=timezone.utc)
-            start_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = start_date + timedelta(days=1)
-        else:
-            # 默认当天
-            now = datetime.now(timezone.utc)
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = start_date + timedelta(days=1)
+        start_date, end_date = self._resolve_date_range(date, start_date, end_date)
         
         date_range_str = f"{start_date.strftime('%Y-%m-%d')} 到 {end_date.strftime('%Y-%m-%d')}"
         logger.info(f"正在获取仓库 {repo_name} 在 {date_range_str} 的 Pull Requests...")
         
+        limit = self.max_items if max_items is None else max_items
+        
         try:
-            prs = []
-            
-            # 使用 GitHub Search API 进行日期范围查询
-            # 搜索在指定日期范围内创建或更新的 PRs
-            start_date_str = start_date.strftime('%Y-%m-%d')
-            end_date_str = end_date.strftime('%Y-%m-%d')
-            
-            # 查询新关闭的 PRs（只获取 closed/merged 状态）
-            created_query = f"repo:{repo_name} is:pr is:closed created:{start_date_str}..{end_date_str}"
-            created_prs = self.github.search_issues(created_query, sort='created', order='desc')
-            
-            # 查询更新并关闭的 PRs（排除已包含的新创建的）
-            updated_query = f"repo:{repo_name} is:pr is:closed updated:{start_date_str}..{end_date_str} -created:{start_date_str}..{end_date_str}"
-            updated_prs = self.github.search_issues(updated_query, sort='updated', order='desc')
-            
-            # 处理新创建的 PRs
-            for pr in created_prs:
-                if len(prs) >= 100:  # 限制总数
-                    break
-                # 获取完整的 PR 对象以获取更多信息
-                full_pr = pr.as_pull_request()
-                prs.append({
-                    'number': pr.number,
-                    'title': pr.title,
-                    'state': pr.state,
-                    'author': pr.user.login if pr.user else 'Unknown',
-                    'created_at': pr.created_at.isoformat(),
-                    'updated_at': pr.updated_at.isoformat(),
-                    'merged': full_pr.merged if full_pr else False,
-                    'merged_at': full_pr.merged_at.isoformat() if full_pr and full_pr.merged_at else None,
-                    'body': pr.body or '',
-                    'additions': full_pr.additions if full_pr else 0,
-                    'deletions': full_pr.deletions if full_pr else 0,
-                    'changed_files': full_pr.changed_files if full_pr else 0,
-                    'url': pr.html_url,
-                    'is_new': True,  # 新创建
-                    'is_updated': False
-                })
-            
-            # 处理更新的 PRs
-            for pr in updated_prs:
-                if len(prs) >= 100:  # 限制总数
-                    break
-                # 获取完整的 PR 对象以获取更多信息
-                full_pr = pr.as_pull_request()
-                prs.append({
-                    'number': pr.number,
-                    'title': pr.title,
-                    'state': pr.state,
-                    'author': pr.user.login if pr.user else 'Unknown',
-                    'created_at': pr.created_at.isoformat(),
-                    'updated_at': pr.updated_at.isoformat(),
-                    'merged': full_pr.merged if full_pr else False,
-                    'merged_at': full_pr.merged_at.isoformat() if full_pr and full_pr.merged_at else None,
-                    'body': pr.body or '',
-                    'additions': full_pr.additions if full_pr else 0,
-                    'deletions': full_pr.deletions if full_pr else 0,
-                    'changed_files': full_pr.changed_files if full_pr else 0,
-                    'url': pr.html_url,
-                    'is_new': False,
-                    'is_updated': True  # 更新
-                })
-            
+            prs = self._get_closed_activity(repo_name, 'pull_requests', start_date, end_date, limit)
             logger.info(f"获取到 {len(prs)} 个 Pull Requests")
             return prs
             
         except Exception as e:
             logger.error(f"获取 Pull Requests 失败: {e}")
             return []
+    
+    def _get_closed_activity(self, repo_name: str, kind: str, start_date: datetime,
+                             end_date: datetime, limit: int) -> List[Dict]:
+        """获取日期范围内已关闭的 Issues/PRs
+        
+        启用本地活动仓库时从本地读取，只完整拉取本地缺失的日期（及当天）。
+        补齐时只保存搜索结果自带的字段，读取后再像 _search_important 一样
+        只为入选的 PR 请求完整信息。
+        """
+        if self.warehouse is not None:
+            items = self.warehouse.closed_activity(
+                repo_name, kind, start_date, end_date,
+                lambda start, end: self._fetch_closed_activity(repo_name, kind, start, end, 0, details=False)
+            )
+            items = select_window_items(items, start_date, end_date)
+            return self._select_stored(repo_name, kind, items, limit)
+        
+        items, _ = self._fetch_closed_activity(repo_name, kind, start_date, end_date, limit)
+        return items
+    
+    def _fetch_closed_activity(self, repo_name: str, kind: str, start_date: datetime,
+                               end_date: datetime, limit: int, details: bool = True):
+        """从 GitHub 获取日期范围内已关闭的 Issues/PRs
+        
+        优先复用快照（如更新任务刚刚拉取的 REST 列表），只为快照未覆盖的
+        时间段调用 Search API；没有可用快照时完整搜索。
+        
+        Args:
+            details: 是否为 PR 请求完整信息（代码变更统计）
+        
+        Returns:
+            (条目列表, 数据的拉取时间)：复用快照时为快照的拉取时间
+        """
+        fetched_at = datetime.now(timezone.utc)
+        if self.snapshot_store is not None:
+            cached = self.snapshot_store.lookup(repo_name, kind, start_date, end_date)
+            if cached is not None:
+                items, missing, fetched_at = cached
+                if missing:
+                    logger.info(f"{repo_name} {kind} 快照部分覆盖，补充获取 {missing[0].strftime('%Y-%m-%d')} 到 {missing[1].strftime('%Y-%m-%d')}")
+                    # 补充部分同样受数量上限约束（启用评分时从候选池中选取），不完整拉取
+                    items = items + self._search_closed(repo_name, kind, missing[0], missing[1], limit, details)
+                else:
+                    logger.info(f"{repo_name} {kind} 使用快照数据，跳过 Search API")
+                items = select_window_items(items, start_date, end_date)
+                return self._select_important(repo_name, items, limit), fetched_at
+        
+        return self._search_closed(repo_name, kind, start_date, end_date, limit, details), fetched_at
+    
+    def _search_closed(self, repo_name: str, kind: str, start_date: datetime,
+                       end_date: datetime, limit: int, details: bool = True) -> List[Dict]:
+        """使用 GitHub Search API 获取日期范围内已关闭的 Issues/PRs
+        
+        启用重要性评分且有数量上限时，先取最多 candidate_pool 个搜索结果，用结果自带的
+        字段（标签、反应、评论、作者身份）预评分，只为入选的 PR 请求完整信息。
+        需要的结果数超过 Search API 单个查询的上限（1000）或不限数量时，
+        按时间窗口拆分查询并完整获取（见 _search_windows）。
+        details 为 False 时 PR 只使用搜索结果自带的字段。
+        """
+        qualifier = 'issue' if kind == 'issues' else 'pr'
+        if kind == 'issues':
+            to_dict = self._issue_to_dict
+        else:
+            to_dict = lambda item, is_new: self._pull_request_to_dict(item, is_new, details=details)
+        
+        results = []
+        
+        # 使用 GitHub Search API 进行日期范围查询
+        # 搜索在指定日期范围内创建或更新的条目
+        start_date_str = start_date.strftime('%Y-%m-%d')
+        end_date_str = end_date.strftime('%Y-%m-%d')
+        created_range = f"{start_date_str}..{end_date_str}"
+        
+        # 查询新关闭的条目（只获取 closed 状态）
+        created_query = f"repo:{repo_name} is:{qualifier} is:closed created:{{}}"
+        # 查询更新并关闭的条目（排除已包含的新创建的）
+        updated_query = f"repo:{repo_name} is:{qualifier} is:closed updated:{{}} -created:{created_range}"
+        
+        wanted = max(limit, self.scorer.candidate_pool) if self.scorer is not None and limit else limit
+        if wanted and wanted <= SEARCH_RESULT_CAP:
+            created_items = self.github.search_issues(created_query.format(created_range), sort='created', order='desc')
+            updated_items = self.github.search_issues(updated_query.format(created_range), sort='updated', order='desc')
+        else:
+            # 日期范围按天包含首尾两天
+            first = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+            last = end_date.replace(hour=23, minute=59, second=59, microsecond=0)
+            created_items = self._search_windows(created_query, 'created', first, last)
+            created_numbers = {item.number for item in created_items}
+            updated_items = [item for item in self._search_windows(updated_query, 'updated', first, last)
+                             if item.number not in created_numbers]
+        
+        if self.scorer is not None and limit:
+            return self._search_important(repo_name, kind, created_items, updated_items, limit)
+        
+        # 处理新创建的条目
+        for item in created_items:
+            if limit and len(results) >= limit:  # 限制总数
+                break
+            results.append(to_dict(item, is_new=True))
+        
+        # 处理更新的条目
+        for item in updated_items:
+            if limit and len(results) >= limit:  # 限制总数
+                break
+            results.append(to_dict(item, is_new=False))
+        
+        return results
+    
+    @staticmethod
+    def _window_range(start: datetime, end: datetime) -> str:
+        """搜索限定词的时间范围：整天窗口使用日期，其余使用精确到秒的 UTC 时间"""
+        if start.time() == datetime.min.time() and end.strftime('%H:%M:%S') == '23:59:59':
+            return f"{start.strftime('%Y-%m-%d')}..{end.strftime('%Y-%m-%d')}"
+        fmt = '%Y-%m-%dT%H:%M:%SZ'
+        return f"{start.astimezone(timezone.utc).strftime(fmt)}..{end.astimezone(timezone.utc).strftime(fmt)}"
+    
+    def _search_page(self, results, page: int) -> list:
+        """限速后获取搜索结果的一页"""
+        self.search_limiter.acquire()
+        return results.get_page(page)
+    
+    def _search_windows(self, query: str, field: str, start: datetime, end: datetime) -> List:
+        """完整获取时间范围内的搜索结果，不受单个查询 1000 条的限制
+        
+        先请求各窗口的第一页得到结果总数，超过上限的窗口二分为两个子窗口再次探测，
+        直到每个窗口都不超过上限（窗口缩小到 1 秒仍超过上限时只能获取前 1000 条）。
+        探测和剩余页面的请求在 search_workers 个线程中并发执行，并由限速器控制在
+        Search API 的每分钟限额内。窗口边界上的条目可能在两个窗口中各出现一次，按编号去重。
+        
+        Args:
+            query: 带一个 {} 占位符的查询，占位符替换为时间范围
+            field: 时间范围对应的字段（created 或 updated），结果按该字段倒序返回
+            start: 开始时间（含）
+            end: 结束时间（含）
+        
+        Returns:
+            搜索结果对象列表
+        """
+        pages = []
+        leaves = []
+        pending = [(start, end)]
+        probes = 0
+        with ThreadPoolExecutor(max_workers=self.search_workers) as executor:
+            while pending:
+                searches = [self.github.search_issues(query.format(self._window_range(*window)),
+                                                      sort=field, order='desc') for window in pending]
+                first_pages = list(executor.map(lambda results: self._search_page(results, 0), searches))
+                probes += len(pending)
+                split = []
+                for window, results, page in zip(pending, searches, first_pages):
+                    total = results.totalCount
+                    if total > SEARCH_RESULT_CAP and window[1] - window[0] >= timedelta(seconds=1):
+                        middle = window[0] + (window[1] - window[0]) / 2
+                        middle = middle.replace(microsecond=0)
+                        split.extend([(window[0], middle), (middle + timedelta(seconds=1), window[1])])
+                        continue
+                    if total > SEARCH_RESULT_CAP:
+                        logger.warning(f"搜索窗口 {self._window_range(*window)} 有 {total} 个结果，只能获取前 {SEARCH_RESULT_CAP} 个")
+                    pages.append(page)
+                    if page and total > len(page):
+                        leaves.append((results, math.ceil(min(total, SEARCH_RESULT_CAP) / len(page))))
+                pending = split
             
-        except GithubException as e:
-            logger.error(f"获取仓库 {repo_name} 的 Pull Requests 失败: {e}")
-            raise
+            later_pages = [(results, n) for results, count in leaves for n in range(1, count)]
+            pages.extend(executor.map(lambda args: self._search_page(*args), later_pages))
+        
+        items: Dict[int, object] = {}
+        for page in pages:
+            for item in page:
+                items.setdefault(item.number, item)
+        if probes > 1:
+            logger.info(f"搜索结果超过 {SEARCH_RESULT_CAP} 条，拆分为 {len(pages) - len(later_pages)} 个时间窗口，"
+                        f"共获取 {len(items)} 个条目")
+        return sorted(items.values(), key=lambda item: getattr(item, f"{field}_at"), reverse=True)
+    
+    def _search_important(self, repo_name: str, kind: str, created_items, updated_items,
+                          limit: int) -> List[Dict]:
+        """从搜索结果的候选池中选出最重要的 limit 个条目"""
+        pool = max(limit, self.scorer.candidate_pool)
+        candidates = [(item, True) for item in islice(created_items, pool)]
+        candidates += [(item, False) for item in islice(updated_items, pool - len(candidates))]
+        referenced = self._release_references(repo_name)
+        
+        if kind == 'issues':
+            items = [self._issue_to_dict(item, is_new) for item, is_new in candidates]
+            return self._select_important(repo_name, items, limit, referenced)
+        
+        light = [self._pull_request_to_dict(item, is_new, details=False) for item, is_new in candidates]
+        selected = self._select_important(repo_name, light, limit, referenced)
+        if len(candidates) > len(selected):
+            logger.info(f"{repo_name} 从 {len(candidates)} 个 PR 候选中按重要性选出 {len(selected)} 个")
+        # 只为入选的 PR 请求完整信息，补充代码变更规模后重新排序
+        objects = {item.number: item for item, _ in candidates}
+        prs = [self._pull_request_to_dict(objects[item['number']], item['is_new']) for item in selected]
+        return self._select_important(repo_name, prs, limit, referenced)
+    
+    def _select_stored(self, repo_name: str, kind: str, items: List[Dict], limit: int) -> List[Dict]:
+        """从本地活动仓库读取的条目中选出前 limit 个
+        
+        本地只保存搜索结果自带的字段（PR 的代码变更统计为 0）：先按这些字段选出条目，
+        只为入选且缺少统计的 PR 请求完整信息，写回本地后重新排序。
+        """
+        referenced = self._release_references(repo_name)
+        selected = self._select_important(repo_name, items, limit, referenced)
+        if kind == 'issues':
+            return selected
+        
+        light = [item for item in selected if not item.get('changed_files')]
+        if not light:
+            return selected
+        if len(items) > len(selected):
+            logger.info(f"{repo_name} 从 {len(items)} 个本地 PR 中按重要性选出 {len(selected)} 个")
+        try:
+            repo = self.get_repository(repo_name)
+            for item in light:
+                full_pr = repo.get_pull(item['number'])
+                item.update({
+                    'merged': full_pr.merged,
+                    'merged_at': full_pr.merged_at.isoformat() if full_pr.merged_at else None,
+                    'additions': full_pr.additions,
+                    'deletions': full_pr.deletions,
+                    'changed_files': full_pr.changed_files,
+                })
+        except Exception as e:
+            logger.warning(f"获取 {repo_name} 的 PR 详情失败: {e}，使用搜索结果中的字段")
+            return selected
+        self.warehouse.update_items(repo_name, kind, light)
+        return self._select_important(repo_name, selected, limit, referenced)
+    
+    def _select_important(self, repo_name: str, items: List[Dict], limit: int,
+                          referenced=None) -> List[Dict]:
+        """按重要性过滤排序后截取前 limit 个，未启用评分时按原顺序截取"""
+        if self.scorer is None:
+            return items[:limit] if limit else items
+        if referenced is None:
+            referenced = self._release_references(repo_name)
+        return self.scorer.rank(repo_name, items, referenced, limit)
+    
+    def _release_references(self, repo_name: str, days: int = 90) -> set:
+        """本地活动仓库中最近 Releases 说明引用的 Issue/PR 编号"""
+        if self.warehouse is None:
+            return set()
+        now = datetime.now(timezone.utc)
+        try:
+            return release_references(self.warehouse.events(repo_name, 'releases', now - timedelta(days=days), now))
+        except Exception as e:
+            logger.warning(f"读取 {repo_name} 的 Releases 失败: {e}")
+            return set()
+    
+    @staticmethod
+    def _raw_data(item) -> Dict:
+        """搜索结果的原始 JSON
+        
+        PyGithub 2.1.1 的 Issue 没有 reactions、author_association 属性，IssuePullRequest 也没有 merged_at，
+        这些字段只能从原始数据读取；2.1.1 的 raw_data 属性会为每个条目再请求一次完整对象，
+        因此优先使用搜索已返回的数据。
+        """
+        raw = getattr(item, '_rawData', None)
+        if not isinstance(raw, dict):
+            raw = item.raw_data
+        return raw if isinstance(raw, dict) else {}
+    
+    @staticmethod
+    def _reactions(item) -> int:
+        """搜索结果自带的反应总数"""
+        reactions = GitHubClient._raw_data(item).get('reactions')
+        return reactions.get('total_count', 0) if isinstance(reactions, dict) else 0
+    
+    @staticmethod
+    def _author_association(item) -> str:
+        """作者与仓库的关系（OWNER、MEMBER、CONTRIBUTOR 等）"""
+        association = GitHubClient._raw_data(item).get('author_association')
+        return association if isinstance(association, str) else 'NONE'
+    
+    @staticmethod
+    def _search_merged_at(item) -> Optional[str]:
+        """搜索结果中 PR 的合并时间（isoformat），未合并时为 None"""
+        pull_request = GitHubClient._raw_data(item).get('pull_request')
+        if not isinstance(pull_request, dict):
+            return None
+        return _normalize_time(pull_request.get('merged_at'))
+    
+    @staticmethod
+    def _issue_to_dict(issue, is_new: bool) -> Dict:
+        """将 Search API 返回的 Issue 转换为字典"""
+        return {
+            'number': issue.number,
+            'title': issue.title,
+            'state': issue.state,
+            'author': issue.user.login if issue.user else 'Unknown',
+            'author_association': GitHubClient._author_association(issue),
+            'created_at': issue.created_at.isoformat(),
+            'updated_at': issue.updated_at.isoformat(),
+            'closed_at': issue.closed_at.isoformat() if issue.closed_at else None,
+            'comments': issue.comments,
+            'reactions': GitHubClient._reactions(issue),
+            'labels': [label.name for label in issue.labels],
+            'body': issue.body or '',
+            'url': issue.html_url,
+            'is_new': is_new,  # 新创建
+            'is_updated': not is_new  # 更新
+        }
+    
+    @staticmethod
+    def _pull_request_to_dict(pr, is_new: bool, details: bool = True) -> Dict:
+        """将 Search API 返回的 PR 转换为字典
+        
+        details 为 False 时不请求完整的 PR 对象，合并时间取自搜索结果，代码变更统计为 0。
+        """
+        if details:
+            # 获取完整的 PR 对象以获取更多信息
+            full_pr = pr.as_pull_request()
+            merged_at = full_pr.merged_at.isoformat() if full_pr and full_pr.merged_at else None
+        else:
+            full_pr = None
+            merged_at = GitHubClient._search_merged_at(pr)
+        return {
+            'number': pr.number,
+            'title': pr.title,
+            'state': pr.state,
+            'author': pr.user.login if pr.user else 'Unknown',
+            'author_association': GitHubClient._author_association(pr),
+            'created_at': pr.created_at.isoformat(),
+            'updated_at': pr.updated_at.isoformat(),
+            'closed_at': pr.closed_at.isoformat() if pr.closed_at else None,
+            'merged': full_pr.merged if full_pr else merged_at is not None,
+            'merged_at': merged_at,
+            'body': pr.body or '',
+            'comments': pr.comments,
+            'reactions': GitHubClient._reactions(pr),
+            'additions': full_pr.additions if full_pr else 0,
+            'deletions': full_pr.deletions if full_pr else 0,
+            'changed_files': full_pr.changed_files if full_pr else 0,
+            'labels': [label.name for label in pr.labels],
+            'url': pr.html_url,
+            'is_new': is_new,  # 新创建
+            'is_updated': not is_new  # 更新
+        }
     
     def export_daily_progress(self, repo_name: str, issues: List[Dict], 
                              pull_requests: List[Dict], date: datetime = None,
                              start_date: datetime = None, end_date: datetime = None,
-                             output_dir: str = "data/daily_progress") -> str:
+                             output_dir: str = "data/daily_progress",
+                             metrics_section: str = None) -> str:
         """将每日进展导出为 Markdown 文件
         
         Args:
@@ -428,28 +1167,13 @@ class GitHubClient:
             start_date: 开始日期
             end_date: 结束日期
             output_dir: 输出目录
+            metrics_section: 趋势指标（Markdown，可选），写在概览之后供 AI 报告参考
         
         Returns:
             导出的文件路径
         """
         # 处理日期参数
-        if start_date and end_date:
-            # 使用日期范围
-            if start_date.tzinfo is None:
-                start_date = start_date.replace(tzinfo=timezone.utc)
-            if end_date.tzinfo is None:
-                end_date = end_date.replace(tzinfo=timezone.utc)
-        elif date:
-            # 向后兼容：使用单个日期
-            if date.tzinfo is None:
-                date = date.replace(tzinfo=timezone.utc)
-            start_date = date.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = start_date + timedelta(days=1)
-        else:
-            # 默认当天
-            now = datetime.now(timezone.utc)
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_date = start_date + timedelta(days=1)
+        start_date, end_date = self._resolve_date_range(date, start_date, end_date)
         
         # 创建项目特定的输出目录
         repo_safe_name = repo_name.replace('/', '_')
@@ -470,18 +1194,27 @@ class GitHubClient:
         filepath = os.path.join(project_dir, filename)
         
         # 生成 Markdown 内容
-        content = self._generate_progress_markdown(repo_name, issues, pull_requests, start_date, end_date)
+        content = self._generate_progress_markdown(repo_name, issues, pull_requests, start_date, end_date,
+                                                   metrics_section)
         
         # 写入文件
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(content)
         
+        # 索引导出的条目（索引失败不影响导出）
+        if self.search_index is not None:
+            try:
+                self.search_index.index_items(repo_name, 'issue', issues)
+                self.search_index.index_items(repo_name, 'pull_request', pull_requests)
+            except Exception as e:
+                logger.warning(f"索引 {repo_name} 的 Issues/PRs 失败: {e}")
+        
         logger.info(f"每日进展已导出到: {filepath}")
         return filepath
     
     def _generate_progress_markdown(self, repo_name: str, issues: List[Dict], 
                                     pull_requests: List[Dict], start_date: datetime, 
-                                    end_date: datetime = None) -> str:
+                                    end_date: datetime = None, metrics_section: str = None) -> str:
         """生成每日进展的 Markdown 内容"""
         if end_date is None:
             end_date = start_date + timedelta(days=1)
@@ -520,10 +1253,13 @@ class GitHubClient:
 
 ---
 
-## 🐛 Issues
-
 """
         
+        if metrics_section:
+            content += f"## 📈 趋势指标\n\n{metrics_section}\n\n---\n\n"
+        
+        content += "## 🐛 Issues\n\n"
+        
         if not issues:
             content += "*今日无 Issues 更新*\n\n"
         else:
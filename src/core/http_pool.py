@@ -0,0 +1,117 @@
+"""
+HTTP 连接池
+按目标主机复用 keep-alive 连接，供 Webhook 通知和 AI 提供商 SDK 共享
+"""
+
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+
+class HTTPPool:
+    """按目标主机共享的 HTTP 连接池"""
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 20,
+                 timeout: float = 30, connect_timeout: float = 10):
+        """初始化连接池
+
+        Args:
+            pool_connections: 每个主机保持的 keep-alive 连接数
+            pool_maxsize: 每个主机的最大并发连接数
+            timeout: 默认读取超时时间（秒）
+            connect_timeout: 默认连接超时时间（秒）
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._httpx_clients: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config) -> 'HTTPPool':
+        """根据配置创建连接池"""
+        return cls(
+            pool_connections=config.get("http.pool_connections", 10),
+            pool_maxsize=config.get("http.pool_maxsize", 20),
+            timeout=config.get("http.timeout", 30),
+            connect_timeout=config.get("http.connect_timeout", 10),
+        )
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        """提取 scheme://host[:port] 作为连接池键"""
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def session_for(self, url: str) -> requests.Session:
+        """获取目标主机对应的 requests 会话（首次访问时创建）"""
+        key = self._host_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize
+                )
+                session.mount(key, adapter)
+                self._sessions[key] = session
+                logger.debug(f"创建 HTTP 连接池: {key}")
+            return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """通过共享会话发送请求，未指定时使用默认超时"""
+        kwargs.setdefault('timeout', (self.connect_timeout, self.timeout))
+        return self.session_for(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """发送 GET 请求"""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """发送 POST 请求"""
+        return self.request('POST', url, **kwargs)
+
+    def httpx_client_for(self, base_url: str) -> Optional[object]:
+        """获取目标主机对应的 httpx 客户端，用于注入 openai / anthropic SDK
+
+        未安装 httpx 时返回 None，SDK 将使用自己的默认客户端。
+        """
+        try:
+            import httpx
+        except ImportError:
+            logger.warning("未安装 httpx，AI 客户端将不使用共享连接池")
+            return None
+
+        key = self._host_key(base_url)
+        with self._lock:
+            client = self._httpx_clients.get(key)
+            if client is None:
+                client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.pool_maxsize,
+                        max_keepalive_connections=self.pool_connections
+                    ),
+                    timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)
+                )
+                self._httpx_clients[key] = client
+                logger.debug(f"创建 httpx 连接池: {key}")
+            return client
+
+    def close(self):
+        """关闭所有连接"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            for client in self._httpx_clients.values():
+                client.close()
+            self._sessions.clear()
+            self._httpx_clients.clear()
+        logger.info("HTTP 连接池已关闭")
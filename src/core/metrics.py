@@ -0,0 +1,463 @@
+"""
+活动指标计算
+基于本地活动仓库的数据，用 NumPy 一次性为所有仓库计算按日的时间序列：
+PR 合并数与合并耗时、Issue 关闭数与关闭耗时、提交数、代码变更量和贡献者数
+
+每日的部分聚合（可累加的计数器和当天的作者）按 (仓库, 日期) 缓存在活动仓库中，
+任意日期范围的统计由缓存的每日结果经前缀和合并得到，只有当天的数据每次重新统计。
+"""
+
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.storage.activity_warehouse import ActivityWarehouse
+
+
+# 指标名 -> 显示名称
+METRIC_LABELS = {
+    'prs_merged': 'PR 合并数',
+    'merge_hours': 'PR 合并耗时中位数（小时）',
+    'churn': '代码变更行数（+/-）',
+    'issues_closed': 'Issue 关闭数',
+    'close_hours': 'Issue 关闭耗时中位数（小时）',
+    'commits': '提交数',
+    'contributors': '贡献者数',
+}
+
+# 由每日缓存合并得到的指标（中位数无法合并，耗时类改为平均值）
+WINDOW_LABELS = {
+    'prs_merged': 'PR 合并数',
+    'merge_hours': 'PR 平均合并耗时（小时）',
+    'churn': '代码变更行数（+/-）',
+    'issues_closed': 'Issue 关闭数',
+    'close_hours': 'Issue 平均关闭耗时（小时）',
+    'commits': '提交数',
+    'contributors': '贡献者数',
+}
+
+# 每日缓存的可累加计数器
+COUNTERS = ActivityWarehouse.COUNTER_COLUMNS
+
+
+def _timestamps(values: list) -> np.ndarray:
+    """ISO 时间字符串（已截取到秒，None 表示缺失）转换为 datetime64"""
+    return np.array(values, dtype='datetime64[s]')
+
+
+def _numbers(values: list) -> np.ndarray:
+    """数值列转换为 float 数组，缺失值为 0"""
+    return np.array([0 if v is None else v for v in values], dtype=float) if values else np.zeros(0)
+
+
+def grouped_median(groups: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """按组计算中位数，没有数据的组为 NaN
+
+    先按 (组, 值) 排序，再根据每组的起止位置直接取中间元素，不逐组循环。
+    """
+    result = np.full(n_groups, np.nan)
+    if len(groups) == 0:
+        return result
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    counts = np.diff(np.r_[starts, len(groups)])
+    lower = starts + (counts - 1) // 2
+    upper = starts + counts // 2
+    result[groups[starts]] = (values[lower] + values[upper]) / 2
+    return result
+
+
+def grouped_distinct(groups: np.ndarray, labels: np.ndarray, n_groups: int) -> np.ndarray:
+    """按组统计不同标签（如作者）的数量"""
+    if len(groups) == 0:
+        return np.zeros(n_groups, dtype=int)
+    _, codes = np.unique(labels, return_inverse=True)
+    n_labels = int(codes.max()) + 1
+    pairs = np.unique(groups.astype(np.int64) * n_labels + codes)
+    return np.bincount(pairs // n_labels, minlength=n_groups)
+
+
+def grouped_labels(groups: np.ndarray, labels: np.ndarray) -> Dict[int, List[str]]:
+    """按组收集不同的标签（如每个单元格的作者列表）"""
+    if len(groups) == 0:
+        return {}
+    names, codes = np.unique(labels, return_inverse=True)
+    n_labels = len(names)
+    pairs = np.unique(groups.astype(np.int64) * n_labels + codes)
+    result = {}
+    for group, code in zip((pairs // n_labels).tolist(), (pairs % n_labels).tolist()):
+        result.setdefault(group, []).append(str(names[code]))
+    return result
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """逐元素相除，分母为 0 时为 NaN"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+
+class ActivityMetrics:
+    """一组仓库在一段日期内的指标
+
+    series 中每个指标为 (仓库数, 天数) 的矩阵；summary 中每个指标为按仓库汇总整个时间段的数组
+    （数量类指标为总和，耗时类指标为所有条目的中位数，贡献者为去重后的人数）。
+    """
+
+    def __init__(self, repos: List[str], days: np.ndarray, series: Dict[str, np.ndarray],
+                 summary: Dict[str, np.ndarray]):
+        self.repos = repos
+        self.days = days
+        self.series = series
+        self.summary = summary
+        self._index = {repo.lower(): i for i, repo in enumerate(repos)}
+
+    def repo_series(self, repo_name: str) -> Dict[str, np.ndarray]:
+        """单个仓库的按日时间序列"""
+        i = self._index[repo_name.lower()]
+        return {name: matrix[i] for name, matrix in self.series.items()}
+
+    def repo_summary(self, repo_name: str) -> Dict[str, Optional[float]]:
+        """单个仓库整个时间段的汇总值（没有数据的中位数为 None）"""
+        i = self._index[repo_name.lower()]
+        result = {}
+        for name, values in self.summary.items():
+            value = float(values[i])
+            result[name] = None if np.isnan(value) else value
+        return result
+
+    def chart_rows(self, repo_name: str, metrics: List[str] = None) -> List[Dict]:
+        """图表数据：每行为 {'date', 'metric', 'value'}（长表格式）"""
+        series = self.repo_series(repo_name)
+        rows = []
+        for name in metrics or list(series):
+            for day, value in zip(self.days, series[name]):
+                if not np.isnan(value):
+                    rows.append({'date': str(day), 'metric': METRIC_LABELS[name], 'value': float(value)})
+        return rows
+
+
+class DailyAggregates:
+    """按日的部分聚合及其前缀和索引
+
+    counters 中每个计数器为 (仓库数, 天数) 的矩阵，prefix 为沿日期方向的前缀和（首列为 0），
+    任意日期范围的合计为 prefix[:, e] - prefix[:, s]，与范围长度无关。
+    贡献者无法累加，按天保存作者列表，查询时合并。
+    """
+
+    def __init__(self, repos: List[str], days: np.ndarray, counters: Dict[str, np.ndarray],
+                 authors: List[List[List[str]]]):
+        self.repos = repos
+        self.days = days
+        self.counters = counters
+        self.authors = authors
+        self.prefix = {
+            name: np.concatenate([np.zeros((len(repos), 1)), np.cumsum(matrix, axis=1)], axis=1)
+            for name, matrix in counters.items()
+        }
+        self._index = {repo.lower(): i for i, repo in enumerate(repos)}
+
+    def _span(self, start: date = None, end: date = None) -> Tuple[int, int]:
+        """日期范围对应的列区间 [s, e)，超出已加载范围的部分截断"""
+        s = 0 if start is None else int((np.datetime64(start, 'D') - self.days[0]).astype(int))
+        e = len(self.days) if end is None else int((np.datetime64(end, 'D') - self.days[0]).astype(int)) + 1
+        return max(s, 0), min(max(e, 0), len(self.days))
+
+    @staticmethod
+    def _derive(totals: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """由计数器合计得到各项指标"""
+        return {
+            'prs_merged': totals['prs_merged'],
+            'merge_hours': _ratio(totals['merge_hours_sum'], totals['prs_merged']),
+            'churn': totals['churn'],
+            'issues_closed': totals['issues_closed'],
+            'close_hours': _ratio(totals['close_hours_sum'], totals['issues_closed']),
+            'commits': totals['commits'],
+        }
+
+    def totals(self, start: date = None, end: date = None) -> Dict[str, np.ndarray]:
+        """所有仓库在日期范围内的指标（贡献者除外），每项为按仓库的数组"""
+        s, e = self._span(start, end)
+        return self._derive({name: prefix[:, e] - prefix[:, s] for name, prefix in self.prefix.items()})
+
+    def summary(self, repo_name: str, start: date = None, end: date = None) -> Dict[str, Optional[float]]:
+        """单个仓库在日期范围内的指标（没有数据的平均值为 None）"""
+        i = self._index[repo_name.lower()]
+        s, e = self._span(start, end)
+        result = {}
+        for name, values in self.totals(start, end).items():
+            value = float(values[i])
+            result[name] = None if np.isnan(value) else value
+        result['contributors'] = float(len(set().union(*self.authors[i][s:e])))
+        return result
+
+    def rolling(self, metric: str, window: int = 1) -> np.ndarray:
+        """每天以该日结尾、长度为 window 天的滑动窗口指标，(仓库数, 天数) 的矩阵
+
+        窗口起点早于已加载范围时按已加载的部分计算。
+        """
+        n_days = len(self.days)
+        ends = np.arange(1, n_days + 1)
+        starts = np.maximum(ends - window, 0)
+
+        if metric == 'contributors':
+            result = np.zeros((len(self.repos), n_days))
+            for i, days in enumerate(self.authors):
+                counts = Counter()
+                for j, names in enumerate(days):
+                    counts.update(names)
+                    if j >= window:
+                        counts.subtract(days[j - window])
+                        counts += Counter()
+                    result[i, j] = len(counts)
+            return result
+
+        totals = {name: prefix[:, ends] - prefix[:, starts] for name, prefix in self.prefix.items()}
+        return self._derive(totals)[metric]
+
+    def chart_rows(self, metric: str, window: int = 1) -> List[Dict]:
+        """图表数据：每行为 {'date', 'repo', 'value'}（长表格式），没有数据的平均值不输出"""
+        matrix = self.rolling(metric, window)
+        dates = [str(day) for day in self.days]
+        rows = []
+        for repo_name, values in zip(self.repos, matrix):
+            rows.extend({'date': day, 'repo': repo_name, 'value': float(value)}
+                        for day, value in zip(dates, values) if not np.isnan(value))
+        return rows
+
+
+class MetricsEngine:
+    """基于本地活动仓库的指标计算"""
+
+    def __init__(self, warehouse: ActivityWarehouse):
+        self.warehouse = warehouse
+
+    def _collect(self, repos: List[str], start: date, end: date) -> Tuple[np.ndarray, Dict[str, Dict]]:
+        """读取 [start, end]（含）内的条目并定位到 (仓库, 日期) 单元格
+
+        每类数据只查询一次并以列的形式读取。
+
+        Returns:
+            (日期数组, 类型 -> {'cells', 'rows', 'authors', 以及 'hours' / 'churn'})，
+            单元格索引为 仓库索引 × 天数 + 日期索引
+        """
+        days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+        n_days = len(days)
+        repo_index = {repo.lower(): i for i, repo in enumerate(repos)}
+        start_dt = datetime.combine(start, datetime.min.time())
+        end_dt = datetime.combine(end, datetime.min.time())
+
+        def locate(repo_column: list, times: np.ndarray):
+            """返回 (有效掩码, 单元格索引, 仓库索引)"""
+            if not repo_column:
+                empty = np.zeros(0, dtype=np.int64)
+                return np.zeros(0, dtype=bool), empty, empty
+            names, inverse = np.unique(np.array(repo_column), return_inverse=True)
+            lookup = np.array([repo_index.get(name, -1) for name in names])
+            rows = lookup[inverse]
+            day = (times.astype('datetime64[D]') - days[0]).astype(np.int64)
+            valid = (rows >= 0) & ~np.isnat(times) & (day >= 0) & (day < n_days)
+            return valid, rows * n_days + day, rows
+
+        parts = {}
+
+        # Pull Requests：按合并日期统计。条目按创建 / 更新日分区，合并发生在范围内的条目
+        # 更新日不早于 start，但可能晚于 end，因此只限定起始日期
+        prs = self.warehouse.scan('pull_requests', {
+            'merged_at': '$.merged_at', 'additions': '$.additions',
+            'deletions': '$.deletions', 'author': '$.author'
+        }, start_dt, None, repos)
+        merged_at = _timestamps(prs['merged_at'])
+        valid, cells, rows = locate(prs['repo'], merged_at)
+        hours = (merged_at - _timestamps(prs['created_at'])).astype('timedelta64[s]').astype(float) / 3600
+        churn = _numbers(prs['additions']) + _numbers(prs['deletions'])
+        parts['pull_requests'] = {
+            'cells': cells[valid], 'rows': rows[valid], 'hours': hours[valid], 'churn': churn[valid],
+            'authors': np.array(prs['author'], dtype=object)[valid]
+        }
+
+        # Issues：按关闭日期统计（旧数据没有 closed_at 时使用更新时间近似）
+        issues = self.warehouse.scan('issues', {
+            'closed_at': '$.closed_at', 'updated_at': '$.updated_at', 'author': '$.author'
+        }, start_dt, None, repos)
+        closed_at = _timestamps(issues['closed_at'])
+        missing = np.isnat(closed_at)
+        if missing.any():
+            closed_at[missing] = _timestamps([issues['updated_at'][i] for i in np.flatnonzero(missing)])
+        valid, cells, rows = locate(issues['repo'], closed_at)
+        hours = (closed_at - _timestamps(issues['created_at'])).astype('timedelta64[s]').astype(float) / 3600
+        parts['issues'] = {
+            'cells': cells[valid], 'rows': rows[valid], 'hours': hours[valid],
+            'authors': np.array(issues['author'], dtype=object)[valid]
+        }
+
+        # 提交：按提交日期统计
+        commits = self.warehouse.scan('commits', {'author': '$.author'}, start_dt, end_dt, repos)
+        valid, cells, rows = locate(commits['repo'], _timestamps(commits['created_at']))
+        parts['commits'] = {
+            'cells': cells[valid], 'rows': rows[valid],
+            'authors': np.array(commits['author'], dtype=object)[valid]
+        }
+        return days, parts
+
+    def compute(self, repos: List[str], start: date, end: date) -> ActivityMetrics:
+        """为多个仓库计算 [start, end]（含）内的按日指标
+
+        所有仓库的分组统计在同一次向量化运算中完成。
+        """
+        days, parts = self._collect(repos, start, end)
+        n_repos, n_days = len(repos), len(days)
+        n_cells = n_repos * n_days
+        prs, issues, commits = parts['pull_requests'], parts['issues'], parts['commits']
+
+        series = {}
+        summary = {}
+        series['prs_merged'] = np.bincount(prs['cells'], minlength=n_cells).astype(float)
+        series['merge_hours'] = grouped_median(prs['cells'], prs['hours'], n_cells)
+        series['churn'] = np.bincount(prs['cells'], weights=prs['churn'], minlength=n_cells)
+        summary['prs_merged'] = np.bincount(prs['rows'], minlength=n_repos).astype(float)
+        summary['merge_hours'] = grouped_median(prs['rows'], prs['hours'], n_repos)
+        summary['churn'] = np.bincount(prs['rows'], weights=prs['churn'], minlength=n_repos)
+
+        series['issues_closed'] = np.bincount(issues['cells'], minlength=n_cells).astype(float)
+        series['close_hours'] = grouped_median(issues['cells'], issues['hours'], n_cells)
+        summary['issues_closed'] = np.bincount(issues['rows'], minlength=n_repos).astype(float)
+        summary['close_hours'] = grouped_median(issues['rows'], issues['hours'], n_repos)
+
+        series['commits'] = np.bincount(commits['cells'], minlength=n_cells).astype(float)
+        summary['commits'] = np.bincount(commits['rows'], minlength=n_repos).astype(float)
+
+        # 贡献者：PR 作者、Issue 作者和提交作者去重
+        all_authors = np.concatenate([part['authors'] for part in parts.values()]).astype(str)
+        series['contributors'] = grouped_distinct(
+            np.concatenate([part['cells'] for part in parts.values()]), all_authors, n_cells).astype(float)
+        summary['contributors'] = grouped_distinct(
+            np.concatenate([part['rows'] for part in parts.values()]), all_authors, n_repos).astype(float)
+
+        series = {name: matrix.reshape(n_repos, n_days) for name, matrix in series.items()}
+        return ActivityMetrics(list(repos), days, series, summary)
+
+    def _daily_partials(self, repos: List[str], start: date, end: date) -> Tuple[Dict[str, np.ndarray], Dict[int, List[str]]]:
+        """计算 [start, end]（含）内每个 (仓库, 日期) 单元格的计数器和作者列表
+
+        Returns:
+            (计数器 -> (仓库数, 天数) 矩阵, 单元格索引 -> 作者列表)
+        """
+        days, parts = self._collect(repos, start, end)
+        n_repos, n_days = len(repos), len(days)
+        n_cells = n_repos * n_days
+        prs, issues, commits = parts['pull_requests'], parts['issues'], parts['commits']
+
+        counters = {
+            'prs_merged': np.bincount(prs['cells'], minlength=n_cells).astype(float),
+            'merge_hours_sum': np.bincount(prs['cells'], weights=prs['hours'], minlength=n_cells),
+            'churn': np.bincount(prs['cells'], weights=prs['churn'], minlength=n_cells),
+            'issues_closed': np.bincount(issues['cells'], minlength=n_cells).astype(float),
+            'close_hours_sum': np.bincount(issues['cells'], weights=issues['hours'], minlength=n_cells),
+            'commits': np.bincount(commits['cells'], minlength=n_cells).astype(float),
+        }
+        authors = grouped_labels(
+            np.concatenate([part['cells'] for part in parts.values()]),
+            np.concatenate([part['authors'] for part in parts.values()]).astype(str)
+        )
+        return {name: matrix.reshape(n_repos, n_days) for name, matrix in counters.items()}, authors
+
+    def aggregates(self, repos: List[str], start: date, end: date, today: date = None) -> DailyAggregates:
+        """读取 [start, end]（含）内的每日部分聚合并建立前缀和索引
+
+        已缓存的日期直接读取；缺失的日期与当天一起在一次向量化计算中补齐，
+        已结束的日期写回缓存。
+        """
+        today = today or datetime.now(timezone.utc).date()
+        days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+        day_strs = [str(day) for day in days]
+        n_repos, n_days = len(repos), len(days)
+
+        counters = {name: np.zeros((n_repos, n_days)) for name in COUNTERS}
+        authors = [[[] for _ in range(n_days)] for _ in range(n_repos)]
+        missing = np.ones((n_repos, n_days), dtype=bool)
+
+        cached = self.warehouse.cached_counters(repos, start, end)
+        if cached['repo']:
+            repo_index = {repo.lower(): i for i, repo in enumerate(repos)}
+            rows = np.array([repo_index[repo] for repo in cached['repo']])
+            cols = (np.array(cached['day'], dtype='datetime64[D]') - days[0]).astype(np.int64)
+            for name in COUNTERS:
+                counters[name][rows, cols] = cached[name]
+            missing[rows, cols] = False
+            for i, j, names in zip(rows.tolist(), cols.tolist(), cached['authors']):
+                authors[i][j] = names
+        # 当天的数据仍在变化，每次重新统计
+        missing[:, days >= np.datetime64(today, 'D')] = True
+
+        if missing.any():
+            rows = np.flatnonzero(missing.any(axis=1))
+            cols = np.flatnonzero(missing.any(axis=0))
+            first, last = int(cols[0]), int(cols[-1])
+            span = last - first + 1
+            partial, partial_authors = self._daily_partials(
+                [repos[i] for i in rows], days[first].astype(date), days[last].astype(date))
+
+            new_rows = []
+            for k, i in enumerate(rows.tolist()):
+                for j in np.flatnonzero(missing[i]).tolist():
+                    values = {name: float(partial[name][k, j - first]) for name in COUNTERS}
+                    names = partial_authors.get(k * span + j - first, [])
+                    for name, value in values.items():
+                        counters[name][i, j] = value
+                    authors[i][j] = names
+                    if days[j] < np.datetime64(today, 'D'):
+                        new_rows.append((repos[i], day_strs[j], values, names))
+            self.warehouse.store_counters(new_rows)
+
+        return DailyAggregates(list(repos), days, counters, authors)
+
+    def _covered(self, repo_name: str, start: date, end: date) -> bool:
+        """本地活动仓库是否完整拉取了该时间段的 Issues 和 PRs"""
+        return all(self.warehouse.covers(repo_name, kind, start, end) for kind in ActivityWarehouse.CLOSED_KINDS)
+
+    def report_sections(self, repos: List[str], start: date, end: date, min_days: int = 7) -> Dict[str, str]:
+        """为多个仓库生成报告中的趋势指标章节：本期与上一个等长时间段对比
+
+        报告范围短于 min_days 天时，按截止到 end 的 min_days 天统计。
+        两个时间段由同一份每日缓存经前缀和合并得到；本地活动仓库未完整拉取的时间段
+        显示为 "-"，避免把缺失的数据当作 0 交给模型。
+
+        Returns:
+            仓库名称 -> Markdown 章节
+        """
+        length = max((end - start).days + 1, min_days)
+        start = end - timedelta(days=length - 1)
+        previous_end = start - timedelta(days=1)
+        previous_start = previous_end - timedelta(days=length - 1)
+
+        aggregates = self.aggregates(repos, previous_start, end)
+
+        def fmt(value):
+            return "-" if value is None else f"{value:g}" if value == int(value) else f"{value:.1f}"
+
+        unknown = dict.fromkeys(WINDOW_LABELS)
+        sections = {}
+        for repo_name in repos:
+            now_covered = self._covered(repo_name, start, end)
+            before_covered = self._covered(repo_name, previous_start, previous_end)
+            now = aggregates.summary(repo_name, start, end) if now_covered else unknown
+            before = aggregates.summary(repo_name, previous_start, previous_end) if before_covered else unknown
+            lines = [
+                f"统计区间: {start} 到 {end}（上期: {previous_start} 到 {previous_end}，基于本地活动仓库）",
+                "",
+                "| 指标 | 本期 | 上期 |",
+                "| --- | --- | --- |",
+            ]
+            for name, label in WINDOW_LABELS.items():
+                lines.append(f"| {label} | {fmt(now[name])} | {fmt(before[name])} |")
+            if not (now_covered and before_covered):
+                lines += ["", "注: 本地活动仓库未完整拉取的时间段显示为 -（数据缺失，不代表没有活动）"]
+            sections[repo_name] = '\n'.join(lines)
+        return sections
+
+    def report_section(self, repo_name: str, start: date, end: date, min_days: int = 7) -> str:
+        """生成单个仓库的趋势指标章节"""
+        return self.report_sections([repo_name], start, end, min_days)[repo_name]
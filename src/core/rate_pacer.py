@@ -0,0 +1,142 @@
+"""
+API 配额节流
+按剩余的 GitHub API 配额控制定时任务的派发节奏，避免集中执行时触发限流
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+from loguru import logger
+
+
+class RateLimitPacer:
+    """按剩余配额匀速派发仓库任务"""
+
+    def __init__(self, github_client, cost_per_repo: int = 60, reserve: int = 200,
+                 max_wait: float = 900, refresh_interval: float = 60):
+        """初始化节流器
+
+        Args:
+            github_client: GitHubClient 实例，用于查询剩余配额
+            cost_per_repo: 处理一个仓库预计消耗的 API 请求数
+            reserve: 为交互操作（Web 界面、命令行）保留的请求数
+            max_wait: 单次派发的最长等待时间（秒）
+            refresh_interval: 重新查询配额的间隔（秒），期间按预计消耗扣减
+        """
+        self.github_client = github_client
+        self.cost_per_repo = cost_per_repo
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._remaining: Optional[int] = None
+        self._reset_at = 0.0
+        self._checked_at = 0.0
+        self._last_dispatch = 0.0
+
+    @classmethod
+    def from_config(cls, config, github_client) -> Optional['RateLimitPacer']:
+        """根据配置创建节流器，未启用时返回 None"""
+        if not config.get("schedule.pacing.enabled", True):
+            return None
+        return cls(
+            github_client,
+            cost_per_repo=config.get("schedule.pacing.cost_per_repo", 60),
+            reserve=config.get("schedule.pacing.reserve", 200),
+            max_wait=config.get("schedule.pacing.max_wait", 900),
+        )
+
+    def _budget(self) -> Optional[Tuple[int, float]]:
+        """获取 (剩余请求数, 配额重置时间戳)，查询失败时返回 None（调用方需持有锁）"""
+        now = time.time()
+        if self._remaining is None or now - self._checked_at >= self.refresh_interval or now >= self._reset_at:
+            try:
+                core = self.github_client.get_rate_limit()['core']
+            except Exception as e:
+                logger.warning(f"查询 API 配额失败: {e}，本次不做节流")
+                return None
+            self._remaining = core['remaining']
+            self._reset_at = datetime.fromisoformat(core['reset']).timestamp()
+            self._checked_at = now
+        return self._remaining, self._reset_at
+
+    def wait_time(self) -> float:
+        """计算下一次派发前需要等待的时间（秒，调用方需持有锁）
+
+        剩余配额不足一个仓库时等待配额重置；否则把剩余配额平均分配到重置前的时间里，
+        在上一次预约的派发时间之后再间隔 (距重置时间 × 单仓库消耗 / 可用配额)。
+        结果不受 max_wait 限制，由 acquire 决定是否放行。
+        """
+        budget = self._budget()
+        if budget is None:
+            return 0.0
+        remaining, reset_at = budget
+
+        now = time.time()
+        until_reset = max(0.0, reset_at - now)
+        usable = remaining - self.reserve
+        if usable < self.cost_per_repo:
+            slot = max(reset_at + 1, self._last_dispatch)
+        else:
+            slot = self._last_dispatch + until_reset * self.cost_per_repo / usable
+        return max(0.0, slot - now)
+
+    def acquire(self, repo_name: str = None) -> float:
+        """派发前调用：按剩余配额等待，并预扣本次任务的预计消耗
+
+        持有锁时只预约派发时间并预扣配额，释放锁后再等待；
+        多个同时到期的任务按预约的时间依次放行，预约时间逐个后移。
+        需要等待的时间超过 max_wait 时不预约、不等待，由调用方推迟或跳过任务。
+
+        Returns:
+            0 表示已放行；否则为需要等待的秒数（未放行）
+        """
+        with self._lock:
+            wait = self.wait_time()
+            if wait > self.max_wait:
+                logger.warning(f"API 配额节流: {repo_name or '任务'} 需等待 {wait:.0f}s，超过 {self.max_wait:.0f}s，本次不执行")
+                return wait
+            self._last_dispatch = time.time() + wait
+            if self._remaining is not None:
+                self._remaining -= self.cost_per_repo
+            remaining = self._remaining
+        if wait > 0:
+            logger.info(f"API 配额节流: {repo_name or '任务'} 等待 {wait:.0f}s 后执行（剩余 {remaining}）")
+            time.sleep(wait)
+        return 0.0
+
+
+class SearchRateLimiter:
+    """Search API 请求限速（令牌桶）
+
+    Search API 有独立于核心配额的每分钟限额（认证用户 30 次，匿名 10 次）。
+    桶容量等于每分钟限额，允许短时突发，之后按固定速率补充；多个线程共用同一个限速器。
+    """
+
+    def __init__(self, per_minute: int = 30):
+        """初始化限速器
+
+        Args:
+            per_minute: 每分钟最多请求数，0 表示不限速
+        """
+        self.per_minute = per_minute
+        self._lock = threading.Lock()
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+
+    def acquire(self):
+        """取得一次请求的许可，令牌不足时等待"""
+        if self.per_minute <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            rate = self.per_minute / 60.0
+            self._tokens = min(self.per_minute, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            # 预扣令牌，令牌为负时等待补足后再请求，后续线程依次排队
+            self._tokens -= 1
+            wait = -self._tokens / rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
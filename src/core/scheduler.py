@@ -2,101 +2,463 @@
 任务调度器
 """
 
-from apscheduler.schedulers.blocking import BlockingScheduler
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from apscheduler.events import (
+    EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+)
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from loguru import logger
-from typing import TYPE_CHECKING
+
+from src.core.adaptive_polling import AdaptivePolicy
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 if TYPE_CHECKING:
     from src.main import GitHubSentinel
 
 
+# 持久化任务存储只能保存模块级函数的引用，运行时通过该变量找到当前的 GitHubSentinel 实例
+_active_sentinel: Optional['GitHubSentinel'] = None
+
+PIPELINE_JOB_ID = 'update_pipeline'
+SYNC_JOB_ID = 'sync_subscriptions'
+SUBSCRIPTION_JOB_PREFIX = 'subscription:'
+POLL_JOB_PREFIX = 'poll:'
+WATCH_JOB_PREFIX = 'watch:'
+DEFERRED_JOB_PREFIX = 'deferred:'
+
+# 轮询任务的相位基准，各仓库在此基础上按哈希偏移，重启后保持不变
+POLL_ANCHOR = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def run_update_pipeline():
+    """定时任务入口：依次更新仓库，每个仓库更新完成后立即生成其报告"""
+    if _active_sentinel is None:
+        logger.error("调度器未绑定 GitHubSentinel 实例，跳过本次任务")
+        return
+    _active_sentinel.run_update_pipeline()
+
+
+def run_subscription_job(repo_name: str):
+    """定时任务入口：更新单个订阅仓库并生成其报告"""
+    if _active_sentinel is None:
+        logger.error("调度器未绑定 GitHubSentinel 实例，跳过本次任务")
+        return
+    _active_sentinel.run_repository_pipeline(repo_name)
+
+
+def run_poll_job(repo_name: str):
+    """定时任务入口：自适应轮询单个订阅仓库"""
+    if _active_sentinel is None:
+        logger.error("调度器未绑定 GitHubSentinel 实例，跳过本次任务")
+        return
+    _active_sentinel.poll_repository(repo_name)
+
+
+def run_watch_job(query: str):
+    """定时任务入口：展开组织 / 主题订阅并处理有变化的仓库"""
+    if _active_sentinel is None:
+        logger.error("调度器未绑定 GitHubSentinel 实例，跳过本次任务")
+        return
+    _active_sentinel.run_watch(query)
+
+
+def sync_subscription_jobs():
+    """定时任务入口：同步订阅列表与调度任务"""
+    if _active_sentinel is None:
+        return
+    _active_sentinel.scheduler.sync_subscription_jobs()
+
+
+def jitter_seconds(key: str, window_seconds: int) -> int:
+    """根据键计算确定性的抖动偏移（同一仓库每次得到相同的结果）"""
+    if window_seconds <= 0:
+        return 0
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return int(digest, 16) % window_seconds
+
+
+def subscription_trigger(repo_name: str, schedule: Optional[Dict], config) -> Tuple[CronTrigger, str]:
+    """计算订阅的触发器
+
+    未指定时间的订阅分散到全局调度时间之后的 `schedule.spread_minutes` 窗口内；
+    指定了时间的订阅只在 `schedule.jitter_minutes` 内做小幅抖动。
+    偏移由仓库名哈希得到，重启后保持不变。
+    """
+    schedule = schedule or {}
+    frequency = schedule.get('frequency') or config.get("schedule.interval", "daily")
+    if frequency == 'weekly':
+        base_time = schedule.get('time') or config.get("schedule.weekly_time", "09:00")
+    else:
+        base_time = schedule.get('time') or config.get("schedule.daily_time", "09:00")
+
+    if schedule.get('time'):
+        window_minutes = config.get("schedule.jitter_minutes", 5)
+    else:
+        window_minutes = config.get("schedule.spread_minutes", 60)
+
+    hour, minute = map(int, base_time.split(':'))
+    total = hour * 3600 + minute * 60 + jitter_seconds(repo_name, int(window_minutes * 60))
+    day_offset, total = divmod(total, 24 * 3600)
+    hour, rest = divmod(total, 3600)
+    minute, second = divmod(rest, 60)
+    time_str = f"{hour:02d}:{minute:02d}:{second:02d}"
+
+    if frequency == 'weekly':
+        weekday = (config.get("schedule.weekly_day", 0) + day_offset) % 7
+        return CronTrigger(day_of_week=weekday, hour=hour, minute=minute, second=second), f"每周 星期{weekday} {time_str}"
+    return CronTrigger(hour=hour, minute=minute, second=second), f"每日 {time_str}"
+
+
 class Scheduler:
     """任务调度器"""
-    
-    def __init__(self, config, sentinel: 'GitHubSentinel'):
+
+    def __init__(self, config, sentinel: 'GitHubSentinel', background: bool = False):
+        """初始化调度器
+
+        Args:
+            config: 配置
+            sentinel: GitHubSentinel 实例
+            background: 使用后台调度器（start 立即返回），用于与 Web 界面运行在同一进程
+        """
         self.config = config
         self.sentinel = sentinel
-        self.scheduler = BlockingScheduler()
-        self._setup_jobs()
-    
-    def _setup_jobs(self):
-        """设置定时任务"""
+        self.background = background
+        # 前台模式同样使用后台调度器：先暂停启动以读取任务存储中保存的任务并同步，再恢复运行；
+        # 任务存储在启动时才创建，只执行命令行命令时不会创建 SQLite 文件
+        self.scheduler = BackgroundScheduler(
+            job_defaults={
+                # 上一次运行未结束时不再启动新的实例；错过的多次运行合并为一次
+                'max_instances': 1,
+                'coalesce': True,
+                'misfire_grace_time': self.config.get("schedule.misfire_grace_time", 3600)
+            }
+        )
+        self.mode = self._resolve_mode()
+        # 自适应轮询只在 spread 模式下生效
+        self.adaptive = AdaptivePolicy.from_config(config) if self.mode != "batch" else None
+        self._jobs_ready = False
+        self._jobstore_ready = False
+        self._stopped = threading.Event()
+
+        # 最近的任务运行记录，供 Web 界面查看
+        self._runs = deque(maxlen=self.config.get("schedule.history_size", 50))
+        self._running: Dict[str, datetime] = {}
+        self._runs_lock = threading.Lock()
+        self.scheduler.add_listener(
+            self._on_job_event,
+            EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+        )
+
+    def _resolve_mode(self) -> str:
+        """实际使用的调度模式：邮件摘要模式只在批量更新中合并报告，因此需要 batch 模式"""
+        mode = self.config.get("schedule.mode", "spread")
+        if mode == "batch":
+            return mode
+        if mode != "spread":
+            logger.warning(f"未知的调度模式: {mode}，使用 spread 模式")
+            mode = "spread"
+        if (self.config.get("notification.email.enabled")
+                and self.config.get("notification.email.mode", "per_repo") == "digest"):
+            logger.warning("邮件通知为 digest 模式，需要批量更新才能合并报告，调度模式改用 batch")
+            return "batch"
+        return mode
+
+    def _create_jobstore(self):
+        """创建任务存储：默认使用 SQLite 持久化，重启后可补跑错过的任务"""
+        if self.config.get("schedule.jobstore", "sqlite") != "sqlite":
+            return MemoryJobStore()
+        try:
+            from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+        except ImportError:
+            logger.warning("未安装 SQLAlchemy，任务存储使用内存模式，重启后不会补跑错过的任务")
+            return MemoryJobStore()
+
+        path = Path(self.config.get("schedule.jobstore_path", "data/scheduler.sqlite"))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return SQLAlchemyJobStore(url=f"sqlite:///{path}")
+
+    def _build_trigger(self):
+        """根据配置构建更新流水线的触发器"""
         interval = self.config.get("schedule.interval", "daily")
-        
-        if interval == "daily":
-            # 每日任务
-            daily_time = self.config.get("schedule.daily_time", "09:00")
-            hour, minute = map(int, daily_time.split(':'))
-            
-            # 添加更新仓库任务
-            self.scheduler.add_job(
-                self.sentinel.update_repositories,
-                CronTrigger(hour=hour, minute=minute),
-                id='daily_update',
-                name='每日更新任务',
-                replace_existing=True
-            )
-            logger.info(f"已设置每日更新任务: {daily_time}")
-            
-            # 添加生成每日报告任务（在更新后30分钟执行）
-            report_hour = hour if minute < 30 else (hour + 1) % 24
-            report_minute = (minute + 30) % 60
-            
-            self.scheduler.add_job(
-                self.sentinel.generate_daily_reports,
-                CronTrigger(hour=report_hour, minute=report_minute),
-                id='daily_report',
-                name='每日报告生成任务',
-                replace_existing=True
-            )
-            logger.info(f"已设置每日报告生成任务: {report_hour:02d}:{report_minute:02d}")
-            
-        elif interval == "weekly":
+
+        if interval == "weekly":
             # 每周任务
             weekly_day = self.config.get("schedule.weekly_day", 0)  # 0 = Monday
             weekly_time = self.config.get("schedule.weekly_time", "09:00")
             hour, minute = map(int, weekly_time.split(':'))
-            
-            # 添加更新仓库任务
-            self.scheduler.add_job(
-                self.sentinel.update_repositories,
-                CronTrigger(day_of_week=weekly_day, hour=hour, minute=minute),
-                id='weekly_update',
-                name='每周更新任务',
-                replace_existing=True
+            return CronTrigger(day_of_week=weekly_day, hour=hour, minute=minute), f"每周更新与报告任务: 星期{weekly_day} {weekly_time}"
+
+        if interval != "daily":
+            logger.warning(f"未知的调度间隔: {interval}，使用默认每日任务")
+
+        # 每日任务
+        daily_time = self.config.get("schedule.daily_time", "09:00")
+        hour, minute = map(int, daily_time.split(':'))
+        return CronTrigger(hour=hour, minute=minute), f"每日更新与报告任务: {daily_time}"
+
+    def _stored_jobs(self) -> Dict:
+        """获取调度任务（调度器以暂停状态启动后包含任务存储中上次保存的任务）"""
+        return {job.id: job for job in self.scheduler.get_jobs()}
+
+    def _remove_job(self, job_id: str):
+        """移除调度任务"""
+        self.scheduler.remove_job(job_id)
+
+    def _add_job(self, func, trigger, job_id: str, name: str, existing: Dict, args: list = None) -> bool:
+        """添加或更新调度任务
+
+        触发器未变化时保持不动：已保存的任务沿用其下次运行时间，
+        停机期间错过的运行在调度器恢复后补跑。
+
+        Returns:
+            是否添加或更新了任务
+        """
+        current = existing.get(job_id)
+        if current is not None and str(current.trigger) == str(trigger):
+            return False
+
+        self.scheduler.add_job(
+            func,
+            trigger,
+            args=args,
+            id=job_id,
+            name=name,
+            replace_existing=True
+        )
+        return True
+
+    def sync_subscription_jobs(self):
+        """按订阅列表同步每个仓库的调度任务：新增、修改触发时间、删除已取消的订阅"""
+        existing = self._stored_jobs()
+        desired = {}
+        for sub in self.sentinel.subscription_manager.list_subscriptions():
+            desired[SUBSCRIPTION_JOB_PREFIX + sub['repo_name']] = sub
+
+        if self.adaptive:
+            for sub in list(desired.values()):
+                desired[POLL_JOB_PREFIX + sub['repo_name']] = sub
+
+        for job_id in existing:
+            if job_id.startswith((SUBSCRIPTION_JOB_PREFIX, POLL_JOB_PREFIX)) and job_id not in desired:
+                self._remove_job(job_id)
+                logger.info(f"已移除调度任务: {job_id}")
+
+        for job_id, sub in desired.items():
+            repo_name = sub['repo_name']
+            if job_id.startswith(POLL_JOB_PREFIX):
+                trigger, description = self._poll_trigger(repo_name)
+                if self._add_job(run_poll_job, trigger, job_id, f"{repo_name} 自适应轮询",
+                                 existing, args=[repo_name]):
+                    logger.info(f"已设置轮询任务: {repo_name} - {description}")
+                continue
+
+            trigger, description = subscription_trigger(repo_name, sub.get('schedule'), self.config)
+            if self._add_job(run_subscription_job, trigger, job_id, f"{repo_name} 更新与报告任务",
+                             existing, args=[repo_name]):
+                logger.info(f"已设置调度任务: {repo_name} - {description}")
+
+        self.sync_watch_jobs(existing)
+
+    def sync_watch_jobs(self, existing: Dict = None):
+        """为每个组织 / 主题订阅设置按固定间隔展开的任务"""
+        existing = self._stored_jobs() if existing is None else existing
+        desired = {WATCH_JOB_PREFIX + w['query']: w['query']
+                   for w in self.sentinel.subscription_manager.list_watches()}
+
+        for job_id in existing:
+            if job_id.startswith(WATCH_JOB_PREFIX) and job_id not in desired:
+                self._remove_job(job_id)
+                logger.info(f"已移除调度任务: {job_id}")
+
+        hours = self.config.get("watch.interval_hours", 6)
+        interval_seconds = int(hours * 3600)
+        for job_id, query in desired.items():
+            start_date = POLL_ANCHOR.timestamp() + jitter_seconds(query, interval_seconds)
+            trigger = IntervalTrigger(
+                seconds=interval_seconds,
+                start_date=datetime.fromtimestamp(start_date, tz=timezone.utc)
             )
-            logger.info(f"已设置每周更新任务: 星期{weekly_day} {weekly_time}")
-            
-            # 添加生成每周报告任务（在更新后30分钟执行）
-            report_hour = hour if minute < 30 else (hour + 1) % 24
-            report_minute = (minute + 30) % 60
-            
+            if self._add_job(run_watch_job, trigger, job_id, f"{query} 展开任务", existing, args=[query]):
+                logger.info(f"已设置展开任务: {query} - 每 {hours:g} 小时")
+
+    def _poll_trigger(self, repo_name: str):
+        """根据仓库历史更新记录的活跃度计算轮询触发器"""
+        history = self.sentinel.subscription_manager.get_update_history(repo_name, limit=self.adaptive.history)
+        rate = self.adaptive.change_rate(history)
+        hours = self.adaptive.interval_hours(rate)
+        interval_seconds = int(hours * 3600)
+        start_date = POLL_ANCHOR.timestamp() + jitter_seconds(repo_name, interval_seconds)
+        trigger = IntervalTrigger(
+            seconds=interval_seconds,
+            start_date=datetime.fromtimestamp(start_date, tz=timezone.utc)
+        )
+        rate_desc = "无历史记录" if rate is None else f"{rate:.1f} 个活动/天"
+        return trigger, f"每 {hours:g} 小时（{rate_desc}）"
+
+    def _setup_jobs(self):
+        """设置定时任务
+
+        spread 模式（默认）为每个订阅单独调度，按订阅的频率和时间执行并分散负载；
+        batch 模式按全局时间依次更新所有仓库（邮件摘要模式下自动使用 batch 模式）。
+        spread 模式下启用自适应轮询时，另为每个订阅添加按活跃度调整间隔的轮询任务负责更新，
+        按订阅时间执行的任务只生成报告。组织 / 主题订阅在两种模式下都按固定间隔展开。
+        """
+        if self._jobs_ready:
+            return
+
+        existing = self._stored_jobs()
+
+        if self.mode == "batch":
+            for job_id in existing:
+                if job_id.startswith((SUBSCRIPTION_JOB_PREFIX, POLL_JOB_PREFIX)) or job_id == SYNC_JOB_ID:
+                    self._remove_job(job_id)
+
+            trigger, description = self._build_trigger()
+            # 更新与报告作为一条流水线：仓库更新完成后立即生成该仓库的报告，
+            # 不再依赖固定的时间间隔
+            self._add_job(run_update_pipeline, trigger, PIPELINE_JOB_ID, '更新与报告任务', existing)
+            logger.info(f"已设置{description}")
+            self.sync_watch_jobs(existing)
+        else:
+            if PIPELINE_JOB_ID in existing:
+                self._remove_job(PIPELINE_JOB_ID)
+
+            self.sync_subscription_jobs()
+            # 定期同步，使运行期间新增或修改的订阅生效
             self.scheduler.add_job(
-                self.sentinel.generate_daily_reports,
-                CronTrigger(day_of_week=weekly_day, hour=report_hour, minute=report_minute),
-                id='weekly_report',
-                name='每周报告生成任务',
+                sync_subscription_jobs,
+                'interval',
+                minutes=self.config.get("schedule.sync_minutes", 5),
+                id=SYNC_JOB_ID,
+                name='同步订阅调度任务',
                 replace_existing=True
             )
-            logger.info(f"已设置每周报告生成任务: 星期{weekly_day} {report_hour:02d}:{report_minute:02d}")
-        
-        else:
-            logger.warning(f"未知的调度间隔: {interval}，使用默认每日任务")
-    
+
+        self._jobs_ready = True
+
+    def _on_job_event(self, event):
+        """记录任务的开始、完成、失败和错过"""
+        now = datetime.now(timezone.utc)
+        with self._runs_lock:
+            if event.code == EVENT_JOB_SUBMITTED:
+                self._running[event.job_id] = now
+                return
+
+            started = self._running.pop(event.job_id, None)
+            if event.code == EVENT_JOB_EXECUTED:
+                status = 'success'
+            elif event.code == EVENT_JOB_ERROR:
+                status = 'error'
+            elif event.code == EVENT_JOB_MAX_INSTANCES:
+                status = 'skipped'
+            else:
+                status = 'missed'
+            self._runs.appendleft({
+                'job_id': event.job_id,
+                'status': status,
+                'scheduled_at': getattr(event, 'scheduled_run_time', None),
+                'started_at': started,
+                'finished_at': now,
+                'error': str(event.exception) if getattr(event, 'exception', None) else None
+            })
+
+    def recent_runs(self, limit: int = 20) -> List[Dict]:
+        """最近的任务运行记录（最新的在前）"""
+        with self._runs_lock:
+            return list(self._runs)[:limit]
+
+    def job_overview(self) -> List[Dict]:
+        """当前的调度任务及其状态"""
+        with self._runs_lock:
+            running = dict(self._running)
+        jobs = []
+        for job in self.scheduler.get_jobs():
+            jobs.append({
+                'id': job.id,
+                'name': job.name,
+                'next_run_time': job.next_run_time,
+                'running_since': running.get(job.id)
+            })
+        jobs.sort(key=lambda j: (j['next_run_time'] is None, j['next_run_time'] or datetime.max.replace(tzinfo=timezone.utc)))
+        return jobs
+
+    def defer_subscription_job(self, repo_name: str, delay: float):
+        """API 配额不足时把订阅任务推迟到 delay 秒后单独执行一次"""
+        run_date = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        self.scheduler.add_job(
+            run_subscription_job,
+            DateTrigger(run_date=run_date),
+            args=[repo_name],
+            id=DEFERRED_JOB_PREFIX + repo_name,
+            name=f"{repo_name} 更新与报告任务（推迟）",
+            replace_existing=True
+        )
+        logger.info(f"{repo_name} 的调度任务推迟到 {run_date.astimezone():%Y-%m-%d %H:%M:%S} 执行")
+
+    def trigger_job(self, job_id: str) -> bool:
+        """立即运行已有的调度任务
+
+        通过调整下次运行时间交给调度器执行，仍受 max_instances 限制，
+        任务正在运行时不会重复启动。
+        """
+        job = self.scheduler.get_job(job_id)
+        if job is None:
+            return False
+        job.modify(next_run_time=datetime.now(timezone.utc))
+        logger.info(f"已手动触发任务: {job.name}")
+        return True
+
     def start(self):
-        """启动调度器"""
+        """启动调度器（后台模式下立即返回，否则阻塞到停止）"""
+        global _active_sentinel
+        _active_sentinel = self.sentinel
+
         logger.info("任务调度器启动中...")
+        self._stopped.clear()
+        if not self._jobstore_ready:
+            self.scheduler.add_jobstore(self._create_jobstore(), 'default')
+            self._jobstore_ready = True
+        # 暂停状态下启动以加载已保存的任务，同步完成后再开始执行
+        self.scheduler.start(paused=True)
+        try:
+            self._setup_jobs()
+        except Exception:
+            self.scheduler.shutdown(wait=False)
+            raise
+        self.scheduler.resume()
+        if self.background:
+            return
+
         try:
-            self.scheduler.start()
+            while not self._stopped.wait(1):
+                pass
         except (KeyboardInterrupt, SystemExit):
-            logger.info("任务调度器已停止")
-    
-    def stop(self):
-        """停止调度器"""
-        self.scheduler.shutdown()
+            self.stop()
+
+    @property
+    def running(self) -> bool:
+        """调度器是否正在运行"""
+        return self.scheduler.running
+
+    def stop(self, wait: bool = True):
+        """停止调度器
+
+        Args:
+            wait: 是否等待正在运行的任务结束
+        """
+        self._stopped.set()
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=wait)
         logger.info("任务调度器已停止")
-    
+
     def list_jobs(self):
         """列出所有任务"""
         jobs = self.scheduler.get_jobs()
@@ -0,0 +1,209 @@
+"""
+Issues/PRs 重要性评分
+在每日条目数上限截断和生成提示词之前，按标签、反应数、评论数、代码变更规模、
+作者身份以及是否被 Release 引用为条目打分，并按订阅（仓库）配置的规则过滤，
+使 API 详情请求和 AI 提示词优先用于重要条目
+"""
+
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+
+# 标签关键字 -> 权重（标签名包含关键字即命中，多个关键字命中时取最大值）
+DEFAULT_LABEL_WEIGHTS = {
+    'security': 3.0,
+    'breaking': 2.5,
+    'regression': 2.5,
+    'critical': 2.5,
+    'p0': 2.5,
+    'bug': 1.5,
+    'p1': 1.5,
+    'feature': 1.0,
+    'enhancement': 0.8,
+    'performance': 1.0,
+    'documentation': -0.5,
+    'docs': -0.5,
+    'dependencies': -1.0,
+    'chore': -1.0,
+    'duplicate': -2.0,
+    'invalid': -2.0,
+    'wontfix': -2.0,
+    'stale': -1.5,
+}
+
+# 作者与仓库的关系（GitHub author_association）-> 特征值
+ASSOCIATION_WEIGHTS = {
+    'OWNER': 1.0,
+    'MEMBER': 1.0,
+    'COLLABORATOR': 0.8,
+    'CONTRIBUTOR': 0.5,
+    'FIRST_TIME_CONTRIBUTOR': 0.3,
+    'FIRST_TIMER': 0.3,
+    'MANNEQUIN': 0.0,
+    'NONE': 0.0,
+}
+
+# 线性模型的特征权重，分数 = 100 × sigmoid(bias + Σ 权重 × 特征)
+DEFAULT_MODEL_WEIGHTS = {
+    'bias': -2.0,
+    'labels': 0.8,
+    'reactions': 0.7,
+    'comments': 0.5,
+    'diff_size': 0.3,
+    'association': 0.8,
+    'release': 1.5,
+    'merged': 0.5,
+}
+
+# 过滤规则的默认值
+DEFAULT_RULES = {
+    'include_labels': [],
+    'exclude_labels': [],
+    'exclude_authors': [],
+    'boost_labels': {},
+    'min_score': 0,
+    'top_k': 50,
+}
+
+_REFERENCE_PATTERN = re.compile(r'(?:#|/(?:pull|issues)/)(\d+)\b')
+
+
+def release_references(releases: Iterable[Dict]) -> Set[int]:
+    """从 Release 说明中提取引用的 Issue/PR 编号（#123 或 .../pull/123 形式）"""
+    numbers = set()
+    for release in releases:
+        numbers.update(int(n) for n in _REFERENCE_PATTERN.findall(release.get('body') or ''))
+    return numbers
+
+
+def _labels(item: Dict) -> List[str]:
+    """小写的标签列表"""
+    return [label.lower() for label in item.get('labels') or []]
+
+
+def _matches(labels: List[str], keywords: Iterable[str]) -> bool:
+    """是否有标签包含任一关键字"""
+    return any(keyword.lower() in label for keyword in keywords for label in labels)
+
+
+def extract_features(item: Dict, label_weights: Dict[str, float] = None,
+                     referenced: Set[int] = frozenset()) -> Dict[str, float]:
+    """提取条目的评分特征
+
+    计数类特征取 log1p，避免个别热门条目的数值压倒其他特征；
+    没有详情的条目（如尚未请求完整 PR）代码变更规模按 0 计算。
+    """
+    label_weights = DEFAULT_LABEL_WEIGHTS if label_weights is None else label_weights
+    labels = _labels(item)
+    label_score = 0.0
+    for label in labels:
+        hits = [weight for keyword, weight in label_weights.items() if keyword in label]
+        if hits:
+            label_score += max(hits, key=abs)
+    churn = (item.get('additions') or 0) + (item.get('deletions') or 0)
+    return {
+        'labels': label_score,
+        'reactions': math.log1p(item.get('reactions') or 0),
+        'comments': math.log1p(item.get('comments') or 0),
+        'diff_size': math.log10(1 + churn),
+        'association': ASSOCIATION_WEIGHTS.get((item.get('author_association') or 'NONE').upper(), 0.0),
+        'release': 1.0 if item.get('number') in referenced else 0.0,
+        'merged': 1.0 if item.get('merged') else 0.0,
+    }
+
+
+class ImportanceScorer:
+    """规则 + 线性模型的重要性评分器
+
+    模型给出 0-100 的基础分，boost_labels 在此基础上加分；
+    规则按仓库合并全局配置（scoring.rules）与订阅配置（scoring.repos.<仓库名>）：
+    include_labels 非空时只保留命中的条目，exclude_labels / exclude_authors 排除条目，
+    min_score 过滤低分条目，top_k 限制进入 AI 提示词的条目数（0 表示不限制）。
+    """
+
+    def __init__(self, model_weights: Dict[str, float] = None, label_weights: Dict[str, float] = None,
+                 rules: Dict = None, repo_rules: Dict[str, Dict] = None, candidate_pool: int = 300):
+        """初始化评分器
+
+        Args:
+            model_weights: 特征权重，未指定的特征使用默认值
+            label_weights: 标签关键字权重，未指定时使用默认值
+            rules: 全局过滤规则
+            repo_rules: 仓库名 -> 该仓库的过滤规则（覆盖全局规则）
+            candidate_pool: Search API 路径下参与预评分的候选条目数上限
+        """
+        self.model_weights = dict(DEFAULT_MODEL_WEIGHTS, **(model_weights or {}))
+        self.label_weights = {k.lower(): v for k, v in (label_weights or DEFAULT_LABEL_WEIGHTS).items()}
+        self.rules = dict(DEFAULT_RULES, **(rules or {}))
+        self.repo_rules = {name.lower(): value or {} for name, value in (repo_rules or {}).items()}
+        self.candidate_pool = candidate_pool
+
+    @classmethod
+    def from_config(cls, config) -> Optional['ImportanceScorer']:
+        """根据配置创建评分器，未启用时返回 None"""
+        if not config.get("scoring.enabled", True):
+            return None
+        return cls(
+            model_weights=config.get("scoring.model_weights", None),
+            label_weights=config.get("scoring.label_weights", None),
+            rules=config.get("scoring.rules", None),
+            repo_rules=config.get("scoring.repos", None),
+            candidate_pool=config.get("scoring.candidate_pool", 300),
+        )
+
+    def rules_for(self, repo_name: str) -> Dict:
+        """仓库生效的过滤规则"""
+        return dict(self.rules, **self.repo_rules.get(repo_name.lower(), {}))
+
+    def top_k(self, repo_name: str) -> int:
+        """进入 AI 提示词的每类条目数上限，0 表示不限制"""
+        return self.rules_for(repo_name).get('top_k') or 0
+
+    def score(self, item: Dict, rules: Dict = None, referenced: Set[int] = frozenset()) -> float:
+        """计算条目的重要性分数"""
+        features = extract_features(item, self.label_weights, referenced)
+        logit = self.model_weights['bias'] + sum(
+            self.model_weights.get(name, 0.0) * value for name, value in features.items()
+        )
+        score = 100.0 / (1.0 + math.exp(-logit))
+        labels = _labels(item)
+        for keyword, boost in ((rules or {}).get('boost_labels') or {}).items():
+            if _matches(labels, [keyword]):
+                score += boost
+        return round(score, 1)
+
+    @staticmethod
+    def _allowed(item: Dict, rules: Dict) -> bool:
+        """按标签和作者规则判断是否保留条目"""
+        labels = _labels(item)
+        if rules['include_labels'] and not _matches(labels, rules['include_labels']):
+            return False
+        if rules['exclude_labels'] and _matches(labels, rules['exclude_labels']):
+            return False
+        excluded = {author.lower() for author in rules['exclude_authors']}
+        return (item.get('author') or '').lower() not in excluded
+
+    def rank(self, repo_name: str, items: List[Dict], referenced: Set[int] = frozenset(),
+             limit: int = 0) -> List[Dict]:
+        """过滤并按分数从高到低排序（同分保持原顺序）
+
+        Args:
+            repo_name: 仓库名称
+            items: Issues 或 PRs 列表
+            referenced: 被 Release 引用的编号
+            limit: 返回数量上限，0 表示不限制
+
+        Returns:
+            带 score 字段的条目副本（不修改传入的条目）
+        """
+        rules = self.rules_for(repo_name)
+        ranked = [
+            dict(item, score=self.score(item, rules, referenced))
+            for item in items if self._allowed(item, rules)
+        ]
+        min_score = rules.get('min_score') or 0
+        if min_score:
+            ranked = [item for item in ranked if item['score'] >= min_score]
+        ranked.sort(key=lambda item: item['score'], reverse=True)
+        return ranked[:limit] if limit else ranked
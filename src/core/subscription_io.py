@@ -0,0 +1,130 @@
+"""
+订阅批量导入 / 导出
+支持 YAML、CSV 和纯文本（每行一个仓库）三种文件格式
+"""
+
+import csv
+import io
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+
+# 文件扩展名 -> 格式
+FILE_FORMATS = {
+    '.yaml': 'yaml',
+    '.yml': 'yaml',
+    '.csv': 'csv',
+    '.txt': 'txt',
+}
+
+CSV_FIELDS = ['repo_name', 'tags', 'frequency', 'time']
+
+
+def detect_format(path: str, default: str = 'txt') -> str:
+    """按扩展名识别文件格式"""
+    return FILE_FORMATS.get(Path(path).suffix.lower(), default)
+
+
+def _split_tags(tags) -> List[str]:
+    """标签可以是列表或逗号分隔的字符串"""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    return [str(t).strip() for t in tags if str(t).strip()]
+
+
+def _entry(repo_name: str, tags=None, frequency: str = None, time: str = None) -> Dict:
+    """构建一条导入记录"""
+    return {
+        'repo_name': str(repo_name).strip(),
+        'tags': _split_tags(tags),
+        'frequency': frequency or None,
+        'time': str(time).strip() if time else None,
+    }
+
+
+def parse_subscriptions(text: str, fmt: str) -> List[Dict]:
+    """解析订阅列表
+
+    - yaml: 仓库名列表，或带 repo_name / repo、tags、frequency、time 字段的映射列表，
+      列表也可以放在顶层的 subscriptions 键下（与 export 输出一致）
+    - csv: 带表头时按列名读取，否则第一列为仓库名、第二列为标签
+    - txt: 每行一个仓库，# 开头的行为注释
+
+    Returns:
+        导入记录列表，每条包含 repo_name、tags、frequency、time
+    """
+    entries = []
+    if fmt == 'yaml':
+        data = yaml.safe_load(text) or []
+        if isinstance(data, dict):
+            data = data.get('subscriptions') or []
+        for item in data:
+            if isinstance(item, str):
+                entries.append(_entry(item))
+            elif isinstance(item, dict):
+                repo_name = item.get('repo_name') or item.get('repo')
+                if repo_name:
+                    entries.append(_entry(repo_name, item.get('tags'), item.get('frequency'), item.get('time')))
+    elif fmt == 'csv':
+        rows = [row for row in csv.reader(io.StringIO(text)) if row and row[0].strip()]
+        if rows and rows[0][0].strip().lower() in ('repo_name', 'repo'):
+            header = [h.strip().lower() for h in rows[0]]
+            header[0] = 'repo_name'
+            for row in rows[1:]:
+                item = dict(zip(header, row))
+                entries.append(_entry(item['repo_name'], item.get('tags'), item.get('frequency'), item.get('time')))
+        else:
+            for row in rows:
+                entries.append(_entry(row[0], row[1] if len(row) > 1 else None))
+    elif fmt == 'txt':
+        for line in text.splitlines():
+            line = line.split('#', 1)[0].strip()
+            if line:
+                entries.append(_entry(line))
+    else:
+        raise ValueError(f"不支持的文件格式: {fmt}")
+    return entries
+
+
+def read_subscriptions(path: str, fmt: Optional[str] = None) -> List[Dict]:
+    """读取订阅文件，未指定格式时按扩展名识别"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_subscriptions(f.read(), fmt or detect_format(path))
+
+
+def dump_subscriptions(subscriptions: List[Dict], fmt: str) -> str:
+    """把订阅列表序列化为导入时可读取的格式"""
+    if fmt == 'yaml':
+        items = []
+        for sub in subscriptions:
+            item = {'repo_name': sub['repo_name']}
+            if sub.get('tags'):
+                item['tags'] = sub['tags']
+            if sub.get('frequency'):
+                item['frequency'] = sub['frequency']
+            if sub.get('time'):
+                item['time'] = sub['time']
+            items.append(item)
+        return yaml.safe_dump({'subscriptions': items}, allow_unicode=True, sort_keys=False)
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(CSV_FIELDS)
+        for sub in subscriptions:
+            writer.writerow([sub['repo_name'], ','.join(sub.get('tags') or []),
+                             sub.get('frequency') or '', sub.get('time') or ''])
+        return buffer.getvalue()
+    if fmt == 'txt':
+        return ''.join(f"{sub['repo_name']}\n" for sub in subscriptions)
+    raise ValueError(f"不支持的文件格式: {fmt}")
+
+
+def write_subscriptions(subscriptions: List[Dict], path: str, fmt: Optional[str] = None):
+    """写入订阅文件，未指定格式时按扩展名识别（无法识别时使用 YAML）"""
+    content = dump_subscriptions(subscriptions, fmt or detect_format(path, default='yaml'))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
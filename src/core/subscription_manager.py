@@ -8,6 +8,18 @@ from loguru import logger
 
 from src.storage.database import Database
 from src.core.github_client import GitHubClient
+from src.core.watch import parse_watch_query
+
+
+# 订阅支持的更新频率
+SCHEDULE_FREQUENCIES = ('daily', 'weekly')
+
+
+def format_schedule(schedule: Optional[Dict] = None) -> str:
+    """格式化订阅的调度设置"""
+    if not schedule:
+        return "全局配置"
+    return f"{schedule.get('frequency', 'daily')} {schedule.get('time') or '自动分散'}"
 
 
 class SubscriptionManager:
@@ -17,27 +29,141 @@ class SubscriptionManager:
         self.db = db
         self.github_client = github_client
     
-    def add_subscription(self, repo_name: str, tags: List[str] = None) -> int:
+    def add_subscription(self, repo_name: str, tags: List[str] = None,
+                         frequency: str = None, time: str = None) -> int:
         """添加仓库订阅
         
         Args:
             repo_name: 仓库名称，格式为 owner/repo
             tags: 标签列表
+            frequency: 更新频率 (daily, weekly)，默认使用全局调度配置
+            time: 更新时间 (HH:MM)，默认在全局调度时间之后的时间窗口内分散执行
         
         Returns:
             订阅 ID
         """
+        schedule = self.build_schedule(frequency, time)
+        
         # 验证仓库是否存在
         if not self.github_client.validate_repository(repo_name):
             raise ValueError(f"仓库不存在或无法访问: {repo_name}")
         
         # 添加订阅
         tags_str = ','.join(tags) if tags else ''
-        subscription_id = self.db.add_subscription(repo_name, tags_str)
+        subscription_id = self.db.add_subscription(repo_name, tags_str, schedule)
         
         logger.info(f"添加订阅成功: {repo_name} (ID: {subscription_id})")
         return subscription_id
     
+    def import_subscriptions(self, entries: List[Dict], validate: bool = True) -> Dict[str, List]:
+        """批量导入订阅
+        
+        先在本地过滤格式错误、重复和已订阅的仓库，再批量并发验证其余仓库，
+        最后一次性写入数据库。
+        
+        Args:
+            entries: 导入记录列表，每条包含 repo_name、tags、frequency、time
+            validate: 是否验证仓库存在（仓库来自 GitHub 查询结果时可跳过）
+        
+        Returns:
+            {'added': [仓库名], 'skipped': [(仓库名, 原因)], 'invalid': [(仓库名, 原因)]}
+        """
+        result = {'added': [], 'skipped': [], 'invalid': []}
+        existing = {sub['repo_name'].lower() for sub in self.db.get_subscriptions()}
+        
+        candidates = {}
+        for entry in entries:
+            repo_name = entry['repo_name']
+            key = repo_name.lower()
+            if key in existing:
+                result['skipped'].append((repo_name, "已订阅"))
+                continue
+            if key in candidates:
+                result['skipped'].append((repo_name, "重复"))
+                continue
+            try:
+                schedule = self.build_schedule(entry.get('frequency'), entry.get('time'))
+            except ValueError as e:
+                result['invalid'].append((repo_name, str(e)))
+                continue
+            candidates[key] = {
+                'repo_name': repo_name,
+                'tags': ','.join(entry.get('tags') or []),
+                'schedule': schedule
+            }
+        
+        if validate and candidates:
+            names = [c['repo_name'] for c in candidates.values()]
+            canonical = self.github_client.validate_repositories(names)
+            for key, candidate in list(candidates.items()):
+                full_name = canonical.get(candidate['repo_name'])
+                if full_name is None:
+                    result['invalid'].append((candidate['repo_name'], "仓库不存在或无法访问"))
+                    del candidates[key]
+                else:
+                    # 使用 GitHub 上的规范名称，避免大小写不同的重复订阅
+                    candidate['repo_name'] = full_name
+        
+        added = self.db.add_subscriptions(list(candidates.values()))
+        for candidate in candidates.values():
+            if candidate['repo_name'] in added:
+                result['added'].append(candidate['repo_name'])
+            else:
+                result['skipped'].append((candidate['repo_name'], "已订阅"))
+        
+        logger.info(f"批量导入订阅: 新增 {len(result['added'])}，跳过 {len(result['skipped'])}，"
+                    f"无效 {len(result['invalid'])}")
+        return result
+    
+    def export_subscriptions(self) -> List[Dict]:
+        """导出订阅列表（格式与导入记录一致），按订阅 ID 排序"""
+        entries = []
+        for sub in sorted(self.db.get_subscriptions(), key=lambda s: s['id']):
+            schedule = self._schedule_of(sub) or {}
+            tags = [t.strip() for t in (sub.get('tags') or '').split(',')
+                    if t.strip() and t.strip() not in SCHEDULE_FREQUENCIES]
+            entries.append({
+                'repo_name': sub['repo_name'],
+                'tags': tags,
+                'frequency': schedule.get('frequency'),
+                'time': schedule.get('time')
+            })
+        return entries
+    
+    @staticmethod
+    def build_schedule(frequency: str = None, time: str = None) -> Optional[Dict]:
+        """校验并构建订阅的调度设置，未指定任何项时返回 None（使用全局配置）"""
+        if not frequency and not time:
+            return None
+        
+        if frequency and frequency not in SCHEDULE_FREQUENCIES:
+            raise ValueError(f"不支持的更新频率: {frequency}，可选: {', '.join(SCHEDULE_FREQUENCIES)}")
+        
+        if time:
+            try:
+                hour, minute = map(int, time.split(':'))
+                if not (0 <= hour < 24 and 0 <= minute < 60):
+                    raise ValueError
+            except ValueError:
+                raise ValueError(f"更新时间格式错误: {time}，正确格式: HH:MM")
+            time = f"{hour:02d}:{minute:02d}"
+        
+        return {'frequency': frequency or 'daily', 'time': time}
+    
+    def set_schedule(self, repo_name: str, frequency: str = None, time: str = None) -> bool:
+        """设置订阅的更新频率和时间
+        
+        Returns:
+            True if successful, False if subscription doesn't exist
+        """
+        schedule = self.build_schedule(frequency, time)
+        if not self.db.update_subscription_schedule(repo_name, schedule):
+            logger.warning(f"订阅不存在: {repo_name}")
+            return False
+        
+        logger.info(f"更新订阅调度成功: {repo_name} -> {schedule or '全局配置'}")
+        return True
+    
     def remove_subscription(self, repo_name: str) -> bool:
         """移除仓库订阅
         
@@ -64,6 +190,7 @@ class SubscriptionManager:
                 'id': sub['id'],
                 'repo_name': sub['repo_name'],
                 'tags': sub.get('tags', ''),
+                'schedule': self._schedule_of(sub),
                 'created_at': sub['created_at'],
                 'last_updated': sub.get('last_updated') or 'Never'
             })
@@ -84,10 +211,70 @@ class SubscriptionManager:
             'id': sub['id'],
             'repo_name': sub['repo_name'],
             'tags': sub.get('tags', ''),
+            'schedule': self._schedule_of(sub),
+            'probe': sub.get('probe'),
             'created_at': sub['created_at'],
             'last_updated': sub.get('last_updated') or 'Never'
         }
     
+    @staticmethod
+    def _schedule_of(sub: Dict) -> Optional[Dict]:
+        """读取订阅的调度设置；兼容旧版本 Web 界面以标签记录的 daily / weekly"""
+        if sub.get('schedule'):
+            return sub['schedule']
+        tags = [t.strip() for t in (sub.get('tags') or '').split(',')]
+        for frequency in SCHEDULE_FREQUENCIES:
+            if frequency in tags:
+                return {'frequency': frequency, 'time': None}
+        return None
+    
+    def add_watch(self, query: str, tags: List[str] = None) -> str:
+        """添加组织 / 主题订阅（如 org:microsoft、topic:llm），定期展开为具体仓库
+        
+        Returns:
+            规范化后的查询
+        """
+        normalized = parse_watch_query(query)
+        if normalized is None:
+            raise ValueError(f"不支持的查询: {query}，正确格式: org:名称 或 topic:名称")
+        
+        # 展开一页验证组织存在（主题不存在时结果为空，不视为错误）
+        self.github_client.expand_query(normalized, limit=1)
+        
+        self.db.add_watch(normalized, ','.join(tags) if tags else '')
+        return normalized
+    
+    def remove_watch(self, query: str) -> bool:
+        """移除组织 / 主题订阅"""
+        normalized = parse_watch_query(query) or query
+        if self.db.remove_watch(normalized) > 0:
+            logger.info(f"移除订阅成功: {normalized}")
+            return True
+        logger.warning(f"订阅不存在: {normalized}")
+        return False
+    
+    def list_watches(self) -> List[Dict]:
+        """列出所有组织 / 主题订阅"""
+        return [{
+            'query': watch['query'],
+            'tags': watch.get('tags', ''),
+            'repo_count': len(watch.get('repos') or {}),
+            'created_at': watch['created_at'],
+            'last_expanded': watch.get('last_expanded') or 'Never'
+        } for watch in self.db.get_watches()]
+    
+    def get_watch(self, query: str) -> Optional[Dict]:
+        """获取组织 / 主题订阅，包含上次展开的仓库快照"""
+        normalized = parse_watch_query(query) or query
+        for watch in self.db.get_watches():
+            if watch['query'] == normalized:
+                return watch
+        return None
+    
+    def save_watch_snapshot(self, query: str, repos: Dict[str, Dict]):
+        """保存组织 / 主题订阅本次展开的仓库快照"""
+        self.db.update_watch_snapshot(query, repos)
+    
     def save_update_record(self, subscription_id: int, updates: Dict):
         """保存更新记录
         
@@ -103,6 +290,10 @@ class SubscriptionManager:
         
         logger.info(f"保存更新记录成功: 订阅 ID {subscription_id}")
     
+    def save_probe(self, subscription_id: int, probe: Dict):
+        """保存仓库探测结果，用于下次轮询判断仓库是否有变化"""
+        self.db.update_subscription_probe(subscription_id, probe)
+    
     def get_update_history(self, repo_name: str, limit: int = 10) -> List[Dict]:
         """获取更新历史
         
@@ -0,0 +1,74 @@
+"""
+组织 / 主题订阅
+把 org:名称、topic:名称 展开为具体仓库，与上次展开的结果比较，只处理有变化的活跃仓库
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+
+WATCH_KINDS = ('org', 'topic')
+
+
+def parse_watch_query(query: str) -> Optional[str]:
+    """识别组织 / 主题订阅，返回规范化的查询（如 "org:microsoft"），不是此类查询时返回 None"""
+    kind, sep, value = query.partition(':')
+    kind, value = kind.strip().lower(), value.strip()
+    if not sep or kind not in WATCH_KINDS or not value or '/' in value:
+        return None
+    return f"{kind}:{value.lower()}"
+
+
+def activity_time(probe: Dict) -> Optional[datetime]:
+    """仓库最近一次活动时间（代码推送或仓库更新中较晚的一个）"""
+    times = [datetime.fromisoformat(probe[key]) for key in ('pushed_at', 'updated_at') if probe.get(key)]
+    return max(times) if times else None
+
+
+def diff_snapshot(previous: Dict[str, Dict], current: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """比较两次展开的结果
+
+    Returns:
+        {'added': 新出现的仓库, 'removed': 已不在结果中的仓库, 'changed': 探测结果有变化的仓库}
+    """
+    return {
+        'added': sorted(name for name in current if name not in previous),
+        'removed': sorted(name for name in previous if name not in current),
+        'changed': sorted(name for name, probe in current.items()
+                          if name in previous and previous[name] != probe),
+    }
+
+
+def select_active(previous: Dict[str, Dict], current: Dict[str, Dict], max_repos: int = 20,
+                  active_days: float = 1, first_run: bool = False, now: datetime = None) -> List[str]:
+    """选出本次需要处理的仓库，按最近活动时间倒序
+
+    已有快照的仓库只在探测结果变化时处理；首次展开或新出现的仓库在
+    active_days 内有活动时处理。已归档的仓库不处理。
+
+    Args:
+        previous: 上次展开的快照（仓库名 -> 探测结果）
+        current: 本次展开的快照
+        max_repos: 每次最多处理的仓库数，0 表示不限制
+        active_days: 判断新仓库是否活跃的时间窗口（天）
+        first_run: 是否为首次展开
+        now: 当前时间
+    """
+    now = now or datetime.now(timezone.utc)
+    since = now - timedelta(days=active_days)
+
+    candidates = []
+    for name, probe in current.items():
+        if probe.get('archived'):
+            continue
+        last_activity = activity_time(probe)
+        if first_run or name not in previous:
+            if last_activity is None or last_activity < since:
+                continue
+        elif previous[name] == probe:
+            continue
+        candidates.append((last_activity or since, name))
+
+    candidates.sort(reverse=True)
+    names = [name for _, name in candidates]
+    return names[:max_repos] if max_repos else names
@@ -4,6 +4,10 @@
 
 import click
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List
 from datetime import datetime, timedelta
 from rich.console import Console
 from loguru import logger
@@ -12,8 +16,14 @@ from pathlib import Path
 from src.core.subscription_manager import SubscriptionManager
 from src.core.github_client import GitHubClient
 from src.core.scheduler import Scheduler
+from src.core.rate_pacer import RateLimitPacer
+from src.core.cluster import ClusterStore, ClusterWorker, daily_report_payload, default_worker_id, scope_worker_paths
+from src.core.watch import diff_snapshot, select_active
+from src.core.metrics import MetricsEngine
+from src.core.http_pool import HTTPPool
 from src.ai.report_generator import ReportGenerator
 from src.storage.database import Database
+from src.storage.search_index import DOCUMENT_KINDS, SearchIndex
 from src.config_loader import ConfigLoader
 from src.cli.interactive_shell import SentinelShell
 from src.cli.subscription_commands import SubscriptionCommands
@@ -24,13 +34,37 @@ console = Console()
 class GitHubSentinel:
     """GitHub Sentinel 主类"""
     
-    def __init__(self, config_path: str = "config/config.yaml"):
+    def __init__(self, config_path: str = "config/config.yaml", background_scheduler: bool = False,
+                 worker_id: str = None, background_delivery: bool = False):
+        """初始化
+        
+        Args:
+            config_path: 配置文件路径
+            background_scheduler: 使用后台调度器（serve 模式下与 Web 界面共用一个进程）
+            worker_id: 集群工作进程 ID，指定时活动快照等本地 JSON 文件按 ID 分开保存
+            background_delivery: 由后台线程投递发件箱中的通知（常驻进程）；
+                短时命令只在当前线程投递本次产生的通知，失败的留给常驻进程重试
+        """
         self.config = ConfigLoader(config_path)
+        if worker_id:
+            scope_worker_paths(self.config, worker_id)
         self.db = Database(self.config.get("database.path", "data/sentinel.json"))
-        self.github_client = GitHubClient(self.config.get("github.token"))
+        self.http_pool = HTTPPool.from_config(self.config)
+        self.github_client = GitHubClient.from_config(self.config, http_pool=self.http_pool)
         self.subscription_manager = SubscriptionManager(self.db, self.github_client)
-        self.report_generator = ReportGenerator(self.config)
-        self.scheduler = Scheduler(self.config, self)
+        self.metrics = self._init_metrics()
+        self.report_generator = ReportGenerator(self.config, http_pool=self.http_pool,
+                                                search_index=self.github_client.search_index,
+                                                release_cache=self.github_client.release_cache)
+        self.rate_pacer = RateLimitPacer.from_config(self.config, self.github_client)
+        self.scheduler = Scheduler(self.config, self, background=background_scheduler)
+        # 集群协调模式下由 ClusterStore 接收任务，交给工作进程执行
+        self.cluster = None
+        self._notifiers = {}
+        # 当前线程所在批次收集的摘要报告；按线程区分，并发的单仓库任务不会混入正在运行的批次
+        self._batch_state = threading.local()
+        self.background_delivery = background_delivery
+        self.outbox = self._init_outbox()
         
         # 配置日志
         self._setup_logging()
@@ -67,15 +101,45 @@ class GitHubSentinel:
             console.print("[yellow]没有订阅的仓库[/yellow]")
             return
         
-        for sub in subscriptions:
-            self.update_single_repository(sub['repo_name'], sub['id'])
+        with self._notification_batch():
+            for sub in subscriptions:
+                self.update_single_repository(sub['repo_name'], sub['id'])
+    
+    @contextmanager
+    def _notification_batch(self):
+        """批量通知：摘要模式下合并为一封邮件；直接投递时邮件共用一个 SMTP 会话"""
+        if not self.config.get("notification.email.enabled"):
+            yield
+            return
+        
+        email_notifier = self._get_notifier('email')
+        # 后台投递时由投递线程管理 SMTP 会话
+        session = nullcontext() if self.outbox and self.background_delivery else email_notifier.session()
+        with session:
+            outer = getattr(self._batch_state, 'digest', None)
+            digest = {} if email_notifier.digest_enabled and outer is None else outer
+            self._batch_state.digest = digest
+            try:
+                yield
+            finally:
+                self._batch_state.digest = outer
+                # 嵌套批次由最外层统一发送
+                if digest and outer is None:
+                    try:
+                        self._dispatch_notification('email', {'kind': 'digest', 'reports': digest})
+                    except Exception as e:
+                        logger.error(f"发送汇总邮件失败: {e}")
 
-    def update_single_repository(self, repo_name: str, sub_id: int = None):
+    def update_single_repository(self, repo_name: str, sub_id: int = None, days: float = None) -> bool:
         """更新单个仓库
         
         Args:
             repo_name: 仓库名称
             sub_id: 订阅ID（可选），如果没有提供，尝试查找
+            days: 获取最近多少天的更新（默认使用 report.max_days）
+        
+        Returns:
+            是否更新成功
         """
         try:
             logger.info(f"正在更新仓库: {repo_name}")
@@ -91,7 +155,7 @@ class GitHubSentinel:
 
             updates = self.github_client.fetch_repository_updates(
                 repo_name,
-                days=self.config.get("report.max_days", 7)
+                days=days or self.config.get("report.max_days", 7)
             )
             
             # 生成报告
@@ -112,27 +176,355 @@ class GitHubSentinel:
                 console.print(f"[green]✓[/green] 已记录并通知: {repo_name}")
             else:
                 console.print(f"[yellow]ℹ[/yellow] 这是一个未订阅的仓库，仅显示报告。")
+            return True
             
         except Exception as e:
             logger.error(f"更新仓库 {repo_name} 失败: {e}")
             console.print(f"[red]✗[/red] 更新失败: {repo_name}")
+            return False
     
-    def _send_notification(self, repo_name: str, report: str):
-        """发送通知"""
-        # 邮件通知
+    def _get_notifier(self, channel: str):
+        """获取通知器（每个渠道只创建一次，复用连接）"""
+        if channel not in self._notifiers:
+            if channel == 'email':
+                from src.notifier.email_notifier import EmailNotifier
+                self._notifiers[channel] = EmailNotifier(self.config)
+            elif channel == 'webhook':
+                from src.notifier.webhook_notifier import WebhookNotifier
+                self._notifiers[channel] = WebhookNotifier(self.config, http_pool=self.http_pool)
+            else:
+                raise ValueError(f"未知的通知渠道: {channel}")
+        return self._notifiers[channel]
+    
+    def _init_outbox(self):
+        """创建通知发件箱并注册各渠道的投递函数（未启用时返回 None）"""
+        if not self.config.get("notification.outbox.enabled", True):
+            return None
+        if not (self.config.get("notification.email.enabled") or self.config.get("notification.webhook.enabled")):
+            return None
+        
+        from src.notifier.outbox import NotificationOutbox
+        outbox = NotificationOutbox.from_config(self.config)
         if self.config.get("notification.email.enabled"):
-            from src.notifier.email_notifier import EmailNotifier
-            email_notifier = EmailNotifier(self.config)
-            email_notifier.send(
-                subject=f"GitHub Sentinel - {repo_name} 更新报告",
-                content=report
+            outbox.register(
+                'email',
+                lambda payload: self._deliver_notification('email', payload),
+                session=lambda: self._get_notifier('email').session()
             )
+        if self.config.get("notification.webhook.enabled"):
+            outbox.register('webhook', lambda payload: self._deliver_notification('webhook', payload))
+        # 常驻进程继续投递上次运行未投递完（含退避中）的通知
+        pending = outbox.stats()[outbox.STATUS_PENDING]
+        if pending and self.background_delivery:
+            logger.info(f"发件箱中有 {pending} 条未投递的通知，继续投递")
+            outbox.start()
+        return outbox
+    
+    def _deliver_notification(self, channel: str, payload: Dict):
+        """实际投递一条通知，失败时抛出异常"""
+        if channel == 'email':
+            email_notifier = self._get_notifier('email')
+            if payload.get('kind') == 'digest':
+                email_notifier.send_digest(payload['reports'])
+            else:
+                email_notifier.send(subject=payload['subject'], content=payload['content'])
+        elif channel == 'webhook':
+            self._get_notifier('webhook').send(payload['repo_name'], payload['report'])
+        else:
+            raise ValueError(f"未知的通知渠道: {channel}")
+    
+    def _dispatch_notification(self, channel: str, payload: Dict):
+        """分发通知：启用发件箱时先写入发件箱，常驻进程交给投递线程，短时命令在当前线程投递"""
+        if self.outbox:
+            message_id = self.outbox.enqueue(channel, payload)
+            if self.background_delivery:
+                self.outbox.start()
+            elif not self.outbox.deliver(message_id):
+                logger.warning(f"{channel} 通知暂未投递成功，已保留在发件箱中，由常驻进程重试")
+        else:
+            self._deliver_notification(channel, payload)
+    
+    def _send_notification(self, repo_name: str, report: str):
+        """发送通知"""
+        # 邮件通知（批量摘要模式下先收集，批次结束时合并发送）
+        digest = getattr(self._batch_state, 'digest', None)
+        if digest is not None:
+            digest[repo_name] = report
+        elif self.config.get("notification.email.enabled"):
+            self._dispatch_notification('email', {
+                'subject': f"GitHub Sentinel - {repo_name} 更新报告",
+                'content': report
+            })
         
         # Webhook 通知
         if self.config.get("notification.webhook.enabled"):
-            from src.notifier.webhook_notifier import WebhookNotifier
-            webhook_notifier = WebhookNotifier(self.config)
-            webhook_notifier.send(repo_name, report)
+            self._dispatch_notification('webhook', {'repo_name': repo_name, 'report': report})
+    
+    def shutdown(self):
+        """退出前等待发件箱投递完当前消息，并释放连接"""
+        if self.outbox and self.outbox.running:
+            timeout = self.config.get("notification.outbox.drain_timeout", 120)
+            if not self.outbox.wait_idle(timeout):
+                logger.warning("部分通知未在超时内投递，将在下次运行时继续")
+            self.outbox.stop()
+        self.http_pool.close()
+    
+    def run_update_pipeline(self):
+        """更新与报告流水线（定时任务）
+        
+        仓库依次更新；每个仓库更新成功后立即提交该仓库的每日报告任务，
+        报告生成与后续仓库的更新并行进行，无需等待固定的时间间隔。
+        """
+        logger.info("开始执行更新与报告流水线...")
+        subscriptions = self.subscription_manager.list_subscriptions()
+        
+        if not subscriptions:
+            logger.warning("没有订阅的仓库")
+            return 0, 0
+        
+        if self.cluster:
+            for sub in subscriptions:
+                self._enqueue_cluster_update(sub['repo_name'], with_report=True)
+            return len(subscriptions), 0
+        
+        workers = self.config.get("schedule.report_workers", 2)
+        report_futures = {}
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report") as executor:
+            with self._notification_batch():
+                for sub in subscriptions:
+                    repo_name = sub['repo_name']
+                    if self.update_single_repository(repo_name, sub['id']):
+                        report_futures[repo_name] = executor.submit(self.generate_repository_daily_report, repo_name)
+                    else:
+                        logger.warning(f"{repo_name} 更新失败，跳过报告生成")
+        
+        success_count = 0
+        for repo_name, future in report_futures.items():
+            try:
+                report_file = future.result()
+                logger.info(f"✓ {repo_name} 每日报告已生成: {report_file}")
+                success_count += 1
+            except Exception as e:
+                logger.error(f"✗ 生成 {repo_name} 的每日报告失败: {e}")
+        
+        fail_count = len(subscriptions) - success_count
+        logger.info(f"更新与报告流水线完成 - 成功: {success_count}, 失败: {fail_count}")
+        return success_count, fail_count
+    
+    def run_repository_pipeline(self, repo_name: str) -> bool:
+        """单个订阅的更新与报告（按订阅调度的定时任务）
+        
+        派发前按剩余 API 配额节流，更新成功后立即生成该仓库的每日报告。
+        
+        Returns:
+            是否全部成功
+        """
+        sub = self.subscription_manager.get_subscription(repo_name)
+        if not sub:
+            logger.warning(f"订阅不存在，跳过调度任务: {repo_name}")
+            return False
+        
+        if self.cluster:
+            if self.scheduler.adaptive:
+                self.cluster.enqueue('report', repo_name, daily_report_payload())
+            else:
+                self._enqueue_cluster_update(repo_name, with_report=True)
+            return True
+        
+        if self.scheduler.adaptive:
+            # 自适应轮询负责更新，定时任务只生成报告
+            logger.info(f"{repo_name} 由自适应轮询负责更新，直接生成报告")
+        else:
+            if self.rate_pacer:
+                wait = self.rate_pacer.acquire(repo_name)
+                if wait:
+                    self.scheduler.defer_subscription_job(repo_name, wait)
+                    return False
+            
+            if not self.update_single_repository(repo_name, sub['id']):
+                logger.warning(f"{repo_name} 更新失败，跳过报告生成")
+                return False
+        
+        try:
+            report_file = self.generate_repository_daily_report(repo_name)
+            logger.info(f"✓ {repo_name} 每日报告已生成: {report_file}")
+            return True
+        except Exception as e:
+            logger.error(f"✗ 生成 {repo_name} 的每日报告失败: {e}")
+            return False
+    
+    def poll_repository(self, repo_name: str) -> bool:
+        """自适应轮询：先轻量探测，仓库有变化时才完整更新
+        
+        只获取上次更新以来（不超过 report.max_days）的数据并保存更新记录，
+        不生成报告、不发送通知。
+        
+        Returns:
+            是否执行了完整更新
+        """
+        sub = self.subscription_manager.get_subscription(repo_name)
+        if not sub:
+            logger.warning(f"订阅不存在，跳过轮询: {repo_name}")
+            return False
+        
+        if self.cluster:
+            # 探测与更新都交给负责该仓库的工作进程
+            self._enqueue_cluster_update(repo_name, with_report=False, adaptive=True)
+            return True
+        
+        try:
+            probe = self.github_client.probe_repository(repo_name)
+        except Exception as e:
+            logger.warning(f"探测仓库 {repo_name} 失败: {e}，执行完整更新")
+            probe = None
+        
+        if probe and self.scheduler.adaptive.should_skip(probe, sub.get('probe'), sub['last_updated']):
+            logger.info(f"{repo_name} 自上次更新以来没有变化，跳过本次轮询")
+            return False
+        
+        max_days = self.config.get("report.max_days", 7)
+        days = max_days
+        if sub['last_updated'] != 'Never':
+            elapsed = datetime.now() - datetime.fromisoformat(sub['last_updated'])
+            # 多取 1 小时，覆盖上次拉取与本次之间的边界
+            days = min(max_days, (elapsed + timedelta(hours=1)).total_seconds() / 86400)
+        
+        if self.rate_pacer and self.rate_pacer.acquire(repo_name):
+            # 配额不足，等下一次轮询
+            return False
+        
+        # 轮询只拉取并记录更新；报告和通知由每日报告 / 汇总任务负责
+        try:
+            updates = self.github_client.fetch_repository_updates(repo_name, days=days)
+            self.subscription_manager.save_update_record(sub['id'], updates)
+        except Exception as e:
+            logger.error(f"轮询仓库 {repo_name} 失败: {e}")
+            return False
+        if probe:
+            self.subscription_manager.save_probe(sub['id'], probe)
+        logger.info(f"✓ {repo_name} 轮询完成，已记录更新")
+        return True
+    
+    def run_watch(self, query: str) -> List[str]:
+        """展开组织 / 主题订阅，只为有变化的活跃仓库生成每日报告
+        
+        一次分页 GraphQL 查询得到所有仓库的活动快照，与上次展开的结果比较后，
+        按最近活动时间选出至多 watch.max_active 个仓库处理。
+        
+        Returns:
+            本次处理的仓库列表
+        """
+        watch = self.subscription_manager.get_watch(query)
+        if not watch:
+            logger.warning(f"订阅不存在，跳过展开: {query}")
+            return []
+        
+        try:
+            current = self.github_client.expand_query(watch['query'], limit=self.config.get("watch.max_repos", 0))
+        except Exception as e:
+            logger.error(f"展开 {watch['query']} 失败: {e}")
+            return []
+        
+        previous = watch.get('repos') or {}
+        diff = diff_snapshot(previous, current)
+        logger.info(f"{watch['query']}: 共 {len(current)} 个仓库，新增 {len(diff['added'])}，"
+                    f"移除 {len(diff['removed'])}，有变化 {len(diff['changed'])}")
+        
+        # 先取出全部候选，超出 max_active 的部分同样保留旧快照，下次再处理
+        eligible = select_active(
+            previous, current,
+            max_repos=0,
+            active_days=self.config.get("watch.active_days", 1),
+            first_run=watch.get('last_expanded') is None
+        )
+        max_active = self.config.get("watch.max_active", 20)
+        active = eligible[:max_active] if max_active else eligible
+        
+        processed = []
+        for repo_name in active:
+            if self.cluster:
+                self.cluster.enqueue('report', repo_name, daily_report_payload())
+                processed.append(repo_name)
+                continue
+            if self.rate_pacer and self.rate_pacer.acquire(repo_name):
+                # 配额不足，其余仓库留到下一次展开
+                break
+            try:
+                report_file = self.generate_repository_daily_report(repo_name)
+                logger.info(f"✓ {repo_name} 每日报告已生成: {report_file}")
+                processed.append(repo_name)
+            except Exception as e:
+                logger.error(f"✗ 生成 {repo_name} 的每日报告失败: {e}")
+        
+        # 快照只为已处理的仓库前进；未处理（失败、限流或超出上限）的候选保留
+        # 上次的快照，新仓库记为空快照，下次展开时仍视为有变化
+        snapshot = dict(current)
+        for name in set(eligible) - set(processed):
+            snapshot[name] = previous.get(name, {})
+        self.subscription_manager.save_watch_snapshot(watch['query'], snapshot)
+        return processed
+    
+    def run_watches(self):
+        """展开所有组织 / 主题订阅"""
+        for watch in self.subscription_manager.list_watches():
+            self.run_watch(watch['query'])
+    
+    def _enqueue_cluster_update(self, repo_name: str, with_report: bool, adaptive: bool = False):
+        """把仓库更新（及随后的每日报告）作为任务交给集群"""
+        payload = {'adaptive': adaptive}
+        if with_report:
+            payload['report'] = daily_report_payload()
+        if self.cluster.enqueue('update', repo_name, payload):
+            logger.info(f"已提交集群任务: 更新 {repo_name}")
+        else:
+            logger.info(f"{repo_name} 已有未完成的更新任务，跳过")
+    
+    def _init_metrics(self):
+        """创建指标计算引擎（依赖本地活动仓库，未启用时返回 None）"""
+        if self.github_client.warehouse is None or not self.config.get("metrics.enabled", True):
+            return None
+        return MetricsEngine(self.github_client.warehouse)
+    
+    def _metrics_section(self, repo_name: str, start_date: datetime = None, end_date: datetime = None):
+        """计算报告的趋势指标章节，失败时返回 None（不影响报告生成）"""
+        if self.metrics is None:
+            return None
+        today = datetime.utcnow().date()
+        try:
+            return self.metrics.report_section(
+                repo_name,
+                start_date.date() if start_date else today,
+                end_date.date() if end_date else today,
+                min_days=self.config.get("metrics.min_days", 7)
+            )
+        except Exception as e:
+            logger.warning(f"计算 {repo_name} 的趋势指标失败: {e}")
+            return None
+    
+    def generate_repository_daily_report(self, repo_name: str) -> str:
+        """为单个仓库生成每日报告
+        
+        Returns:
+            生成的报告文件路径
+        """
+        logger.info(f"正在生成 {repo_name} 的每日报告...")
+        
+        # 获取今日的 Issues 和 PRs
+        issues = self.github_client.get_daily_issues(repo_name)
+        pull_requests = self.github_client.get_daily_pull_requests(repo_name)
+        
+        # 导出每日进展
+        progress_file = self.github_client.export_daily_progress(
+            repo_name, issues, pull_requests,
+            metrics_section=self._metrics_section(repo_name)
+        )
+        
+        # 生成 AI 报告
+        return self.report_generator.generate_daily_report(
+            repo_name, progress_file,
+            issues=issues, pull_requests=pull_requests
+        )
     
     def generate_daily_reports(self):
         """为所有订阅的仓库生成每日报告"""
@@ -149,22 +541,7 @@ class GitHubSentinel:
         for sub in subscriptions:
             repo_name = sub['repo_name']
             try:
-                logger.info(f"正在生成 {repo_name} 的每日报告...")
-                
-                # 获取今日的 Issues 和 PRs
-                issues = self.github_client.get_daily_issues(repo_name)
-                pull_requests = self.github_client.get_daily_pull_requests(repo_name)
-                
-                # 导出每日进展
-                progress_file = self.github_client.export_daily_progress(
-                    repo_name, issues, pull_requests
-                )
-                
-                # 生成 AI 报告
-                report_file = self.report_generator.generate_daily_report(
-                    repo_name, progress_file
-                )
-                
+                report_file = self.generate_repository_daily_report(repo_name)
                 logger.info(f"✓ {repo_name} 每日报告已生成: {report_file}")
                 success_count += 1
                 
@@ -179,6 +556,8 @@ class GitHubSentinel:
                                    end_date: datetime = None) -> str:
         """为指定仓库生成自定义日期范围的报告
         
+        启用本地活动仓库时，历史日期直接读取本地数据，只从 GitHub 补齐缺失的日期。
+        
         Args:
             repo_name: 仓库名称
             start_date: 开始日期
@@ -198,12 +577,14 @@ class GitHubSentinel:
         
         # 导出进展
         progress_file = self.github_client.export_daily_progress(
-            repo_name, issues, pull_requests, start_date=start_date, end_date=end_date
+            repo_name, issues, pull_requests, start_date=start_date, end_date=end_date,
+            metrics_section=self._metrics_section(repo_name, start_date, end_date)
         )
         
         # 生成 AI 报告
         report_file = self.report_generator.generate_daily_report(
-            repo_name, progress_file, start_date=start_date, end_date=end_date
+            repo_name, progress_file, start_date=start_date, end_date=end_date,
+            issues=issues, pull_requests=pull_requests
         )
         
         logger.info(f"✓ {repo_name} 自定义范围报告已生成: {report_file}")
@@ -259,6 +640,7 @@ def interactive():
     try:
         sentinel = GitHubSentinel()
         SentinelShell(sentinel).cmdloop()
+        sentinel.shutdown()
     except KeyboardInterrupt:
         console.print("\n[yellow]退出...[/yellow]")
 
@@ -270,12 +652,51 @@ def subscribe():
 @subscribe.command("add")
 @click.argument("repo_name")
 @click.option("--tags", "-t", help="标签（逗号分隔）", default="")
-def subscribe_add(repo_name: str, tags: str):
-    """添加仓库订阅"""
+@click.option("--frequency", "-f", type=click.Choice(["daily", "weekly"]), help="更新频率")
+@click.option("--time", "time_", help="更新时间 (HH:MM)，不指定时在全局调度时间后自动分散")
+def subscribe_add(repo_name: str, tags: str, frequency: str, time_: str):
+    """添加仓库订阅（org:名称 / topic:名称 订阅组织或主题下的所有仓库）"""
     sentinel = GitHubSentinel()
     commands = SubscriptionCommands(sentinel)
     tag_list = [t.strip() for t in tags.split(",") if t.strip()]
-    commands.add_subscription(repo_name, tag_list)
+    commands.add_subscription(repo_name, tag_list, frequency=frequency, time=time_)
+    sentinel.shutdown()
+
+@subscribe.command("schedule")
+@click.argument("repo_name")
+@click.option("--frequency", "-f", type=click.Choice(["daily", "weekly"]), help="更新频率")
+@click.option("--time", "time_", help="更新时间 (HH:MM)")
+def subscribe_schedule(repo_name: str, frequency: str, time_: str):
+    """设置订阅的更新频率和时间（都不指定时恢复使用全局配置）"""
+    sentinel = GitHubSentinel()
+    commands = SubscriptionCommands(sentinel)
+    commands.set_schedule(repo_name, frequency, time_)
+    sentinel.shutdown()
+
+@subscribe.command("import")
+@click.argument("source")
+@click.option("--tags", "-t", help="追加到每个仓库的标签（逗号分隔）", default="")
+@click.option("--frequency", "-f", type=click.Choice(["daily", "weekly"]), help="默认更新频率")
+@click.option("--time", "time_", help="默认更新时间 (HH:MM)")
+@click.option("--format", "fmt", type=click.Choice(["yaml", "csv", "txt"]), help="文件格式，默认按扩展名识别")
+@click.option("--limit", type=int, default=0, help="按 org:/topic: 查询导入时的最大仓库数")
+def subscribe_import(source: str, tags: str, frequency: str, time_: str, fmt: str, limit: int):
+    """从文件（YAML/CSV/txt）或 org:名称 / topic:名称 批量导入订阅"""
+    sentinel = GitHubSentinel()
+    commands = SubscriptionCommands(sentinel)
+    tag_list = [t.strip() for t in tags.split(",") if t.strip()]
+    commands.import_subscriptions(source, tag_list, frequency, time_, fmt, limit)
+    sentinel.shutdown()
+
+@subscribe.command("export")
+@click.argument("path", required=False)
+@click.option("--format", "fmt", type=click.Choice(["yaml", "csv", "txt"]), help="文件格式，默认按扩展名识别")
+def subscribe_export(path: str, fmt: str):
+    """导出订阅列表（不指定路径时输出 YAML 到标准输出）"""
+    sentinel = GitHubSentinel()
+    commands = SubscriptionCommands(sentinel)
+    commands.export_subscriptions(path, fmt)
+    sentinel.shutdown()
 
 @subscribe.command("remove")
 @click.argument("repo_name")
@@ -284,6 +705,7 @@ def subscribe_remove(repo_name: str):
     sentinel = GitHubSentinel()
     commands = SubscriptionCommands(sentinel)
     commands.remove_subscription(repo_name)
+    sentinel.shutdown()
 
 @subscribe.command("list")
 def subscribe_list():
@@ -291,13 +713,17 @@ def subscribe_list():
     sentinel = GitHubSentinel()
     commands = SubscriptionCommands(sentinel)
     commands.list_subscriptions()
+    sentinel.shutdown()
 
 @cli.command()
 def update():
     """手动触发更新所有订阅的仓库"""
     try:
         sentinel = GitHubSentinel()
-        sentinel.update_repositories()
+        try:
+            sentinel.update_repositories()
+        finally:
+            sentinel.shutdown()
     except Exception as e:
         console.print(f"[red]✗[/red] 更新失败: {e}")
 
@@ -308,6 +734,7 @@ def check_repo(repo_name: str):
     sentinel = GitHubSentinel()
     commands = SubscriptionCommands(sentinel)
     commands.check_repository(repo_name)
+    sentinel.shutdown()
 
 @cli.command()
 def start():
@@ -315,8 +742,9 @@ def start():
     try:
         console.print("[green]GitHub Sentinel 已启动[/green]")
         console.print(f"调度间隔: {ConfigLoader().get('schedule.interval', 'daily')}")
-        sentinel = GitHubSentinel()
+        sentinel = GitHubSentinel(background_delivery=True)
         sentinel.scheduler.start()
+        sentinel.shutdown()
     except KeyboardInterrupt:
         console.print("\n[yellow]正在停止 GitHub Sentinel...[/yellow]")
     except Exception as e:
@@ -334,6 +762,7 @@ def init():
             console.print("[yellow]⚠[/yellow] 配置文件不存在，请复制 config/config.yaml.example 并修改")
         else:
             console.print("[green]✓[/green] 配置文件已存在")
+        sentinel.shutdown()
         console.print("\n[green]GitHub Sentinel 初始化完成！[/green]")
     except Exception as e:
         console.print(f"[red]✗[/red] 初始化失败: {e}")
@@ -350,11 +779,52 @@ def generate_custom_report(repo_name: str, start_date: str, end_date: str = None
         end = datetime.strptime(end_date, "%Y-%m-%d") if end_date else start + timedelta(days=1)
         
         sentinel = GitHubSentinel()
-        report_file = sentinel.generate_custom_range_report(repo_name, start, end)
+        try:
+            report_file = sentinel.generate_custom_range_report(repo_name, start, end)
+        finally:
+            sentinel.shutdown()
         console.print(f"[green]✓[/green] 报告已生成: {report_file}")
     except Exception as e:
         console.print(f"[red]✗[/red] 生成报告失败: {e}")
 
+@cli.command("search")
+@click.argument("query", required=False, default="")
+@click.option("--repo", "-r", "repo_name", help="只搜索指定仓库 (owner/repo)")
+@click.option("--kind", "-k", type=click.Choice(list(DOCUMENT_KINDS)), help="只搜索指定类型")
+@click.option("--limit", "-n", default=20, help="最多显示的结果数")
+@click.option("--reindex", is_flag=True, help="先为 data/reports 下已有的报告补建索引")
+def search(query: str, repo_name: str, kind: str, limit: int, reindex: bool):
+    """全文搜索已拉取的 Issues、PRs 和生成的报告"""
+    from rich.table import Table
+    
+    index = SearchIndex.from_config(ConfigLoader())
+    if index is None:
+        console.print("[yellow]⚠[/yellow] 搜索索引未启用（search.enabled）")
+        return
+    if reindex:
+        console.print(f"[green]✓[/green] 已索引 {index.index_report_files()} 份报告")
+    if not query:
+        if not reindex:
+            console.print("[yellow]请提供搜索关键词[/yellow]")
+        return
+    
+    results = index.search(query, repo_name=repo_name, kind=kind, limit=limit)
+    if not results:
+        console.print(f"[yellow]没有找到与 \"{query}\" 相关的内容[/yellow]")
+        return
+    
+    table = Table(title=f"搜索结果: {query}")
+    table.add_column("仓库", style="cyan")
+    table.add_column("类型", style="magenta")
+    table.add_column("日期", style="yellow")
+    table.add_column("标题")
+    table.add_column("摘要")
+    table.add_column("链接 / 路径", style="green")
+    for r in results:
+        table.add_row(r['repo'], DOCUMENT_KINDS[r['kind']], r['date'] or "-", r['title'],
+                      r['snippet'].replace('\n', ' '), r['url'] or "-")
+    console.print(table)
+
 @cli.command("web")
 @click.option("--port", "-p", default=7860, help="Web 服务端口")
 @click.option("--host", "-h", default="0.0.0.0", help="Web 服务主机地址")
@@ -380,5 +850,105 @@ def start_web(port: int, host: str, share: bool):
         console.print(f"[red]✗[/red] Web 服务启动失败: {e}")
         console.print("[yellow]提示: 请确保已安装 gradio: pip install gradio[/yellow]")
 
+@cli.group()
+def cluster():
+    """多进程 / 多节点分片运行"""
+    pass
+
+@cluster.command("coordinator")
+def cluster_coordinator():
+    """运行协调进程：按调度把更新和报告任务提交到共享存储，由工作进程执行"""
+    sentinel = GitHubSentinel(background_delivery=True)
+    sentinel.cluster = ClusterStore.from_config(sentinel.config)
+    purged = sentinel.cluster.purge(sentinel.config.get("cluster.retention_hours", 24))
+    if purged:
+        logger.info(f"已清理 {purged} 个已结束的集群任务")
+    console.print(f"[green]集群协调进程已启动[/green] (共享存储: {sentinel.cluster.path})")
+    sentinel.scheduler.start()
+    sentinel.shutdown()
+
+@cluster.command("worker")
+@click.option("--worker-id", default=None, help="工作进程 ID（默认由主机名和随机后缀生成）")
+def cluster_worker(worker_id: str):
+    """运行工作进程：执行按一致性哈希分配给自己的仓库任务"""
+    worker_id = worker_id or default_worker_id()
+    sentinel = GitHubSentinel(worker_id=worker_id, background_delivery=True)
+    worker = ClusterWorker.from_config(sentinel.config, sentinel, worker_id=worker_id)
+    console.print(f"[green]集群工作进程已启动[/green]: {worker.worker_id}")
+    worker.run()
+    sentinel.shutdown()
+
+@cluster.command("status")
+def cluster_status():
+    """查看工作进程、任务分配和任务队列"""
+    from rich.table import Table
+    
+    config = ConfigLoader()
+    store = ClusterStore.from_config(config)
+    workers = store.live_workers()
+    ring = store.ring()
+    
+    assigned = {w['worker_id']: 0 for w in workers}
+    db = Database(config.get("database.path", "data/sentinel.json"))
+    for sub in db.get_subscriptions():
+        owner = ring.node_for(sub['repo_name'])
+        if owner:
+            assigned[owner] += 1
+    
+    table = Table(title="存活的工作进程")
+    table.add_column("ID", style="cyan")
+    table.add_column("主机", style="magenta")
+    table.add_column("PID")
+    table.add_column("最近心跳", style="yellow")
+    table.add_column("分配的仓库", style="green")
+    for w in workers:
+        table.add_row(
+            w['worker_id'], w['host'], str(w['pid']),
+            datetime.fromtimestamp(w['heartbeat_at']).strftime("%Y-%m-%d %H:%M:%S"),
+            str(assigned[w['worker_id']])
+        )
+    console.print(table)
+    
+    stats = store.stats()
+    console.print(
+        f"任务: 待执行 {stats['pending']} | 执行中 {stats['leased']} | "
+        f"已完成 {stats['done']} | 失败 {stats['failed']}"
+    )
+
+@cli.command("serve")
+@click.option("--port", "-p", default=7860, help="Web 服务端口")
+@click.option("--host", "-h", default="0.0.0.0", help="Web 服务主机地址")
+@click.option("--share", is_flag=True, help="创建公共分享链接")
+def serve(port: int, host: str, share: bool):
+    """在同一进程中运行定时任务和 Web 界面"""
+    try:
+        from src.web.gradio_ui import GitHubSentinelUI
+    except ImportError as e:
+        console.print(f"[red]✗[/red] Web 服务启动失败: {e}")
+        console.print("[yellow]提示: 请确保已安装 gradio: pip install gradio[/yellow]")
+        return
+    
+    sentinel = GitHubSentinel(background_scheduler=True, background_delivery=True)
+    try:
+        sentinel.scheduler.start()
+        console.print("[green]GitHub Sentinel 定时任务已在后台启动[/green]")
+        console.print(f"[green]📍 访问地址: http://{host}:{port}[/green]")
+        
+        # Web 界面复用同一个 GitHubSentinel 的数据存储、GitHub 客户端和连接池
+        ui = GitHubSentinelUI(sentinel=sentinel)
+        ui.launch(
+            server_name=host,
+            server_port=port,
+            share=share,
+            show_error=True
+        )
+    except KeyboardInterrupt:
+        console.print("\n[yellow]正在停止 GitHub Sentinel...[/yellow]")
+    except Exception as e:
+        console.print(f"[red]✗[/red] 启动失败: {e}")
+    finally:
+        sentinel.scheduler.stop(wait=False)
+        sentinel.shutdown()
+
 if __name__ == "__main__":
     cli()
\ No newline at end of file
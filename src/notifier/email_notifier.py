@@ -3,27 +3,100 @@
 """
 
 import smtplib
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List
+from typing import Dict, List
 from loguru import logger
 
+from src.notifier.html_renderer import HTMLRenderer, get_renderer
+
 
 class EmailNotifier:
     """邮件通知器"""
     
-    def __init__(self, config):
+    def __init__(self, config, renderer: HTMLRenderer = None):
         self.config = config
+        self.renderer = renderer or get_renderer()
         self.smtp_host = config.get("notification.email.smtp_host")
         self.smtp_port = config.get("notification.email.smtp_port", 587)
         self.username = config.get("notification.email.username")
         self.password = config.get("notification.email.password")
         self.from_addr = config.get("notification.email.from_addr")
         self.to_addrs = config.get("notification.email.to_addrs", [])
+        self.timeout = config.get("notification.email.timeout", 30)
+        # 发送模式: per_repo（每个仓库一封）或 digest（一次运行合并为一封）
+        self.mode = config.get("notification.email.mode", "per_repo")
+        
+        # 会话模式下复用的 SMTP 连接
+        self._server = None
+        self._session_depth = 0
+        self._lock = threading.RLock()
         
         if not self.smtp_host or not self.username or not self.password:
             logger.warning("邮件通知未完全配置")
     
+    @property
+    def digest_enabled(self) -> bool:
+        """是否启用摘要合并模式"""
+        return self.mode == "digest"
+    
+    @contextmanager
+    def session(self):
+        """会话模式：在同一个已认证的 SMTP 连接上发送多封邮件
+        
+        连接在首次发送时建立，退出最外层会话时关闭；支持嵌套。
+        """
+        with self._lock:
+            self._session_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._session_depth -= 1
+                if self._session_depth == 0:
+                    self._close_connection()
+    
+    def _connect(self) -> smtplib.SMTP:
+        """建立并认证 SMTP 连接"""
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.timeout)
+        server.starttls()
+        server.login(self.username, self.password)
+        return server
+    
+    def _close_connection(self):
+        """关闭会话中的 SMTP 连接"""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception as e:
+            logger.debug(f"关闭 SMTP 连接时出错: {e}")
+        finally:
+            self._server = None
+    
+    def _deliver(self, msg: MIMEMultipart):
+        """发送邮件：会话中复用连接（断线时重连一次），否则使用一次性连接"""
+        with self._lock:
+            if self._session_depth == 0:
+                with self._connect() as server:
+                    server.send_message(msg)
+                return
+            
+            for attempt in (1, 2):
+                if self._server is None:
+                    self._server = self._connect()
+                try:
+                    self._server.send_message(msg)
+                    return
+                except smtplib.SMTPServerDisconnected:
+                    logger.warning("SMTP 连接已断开，重新连接")
+                    self._server = None
+                    if attempt == 2:
+                        raise
+    
     def send(self, subject: str, content: str, to_addrs: List[str] = None):
         """发送邮件
         
@@ -57,10 +130,7 @@ class EmailNotifier:
             msg.attach(part2)
             
             # 发送邮件
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.username, self.password)
-                server.send_message(msg)
+            self._deliver(msg)
             
             logger.info(f"邮件发送成功: {subject} -> {', '.join(to_addrs)}")
             
@@ -68,69 +138,92 @@ class EmailNotifier:
             logger.error(f"邮件发送失败: {e}")
             raise
     
-    def _markdown_to_html(self, markdown_text: str) -> str:
-        """将 Markdown 转换为 HTML
+    def send_digest(self, reports: Dict[str, str], subject: str = None, to_addrs: List[str] = None):
+        """将多个仓库的报告合并为一封邮件发送
+        
+        正文包含目录和各仓库的分节，同时附带每个仓库的 Markdown 报告。
         
-        简单的转换，可以根据需要使用 markdown 库进行更复杂的转换
+        Args:
+            reports: {仓库名称: 报告内容}
+            subject: 邮件主题，默认自动生成
+            to_addrs: 收件人列表，如果为 None 则使用配置中的默认值
         """
+        if not reports:
+            logger.info("没有需要合并发送的报告")
+            return
+        
+        if not to_addrs:
+            to_addrs = self.to_addrs
+        
+        if not to_addrs:
+            logger.warning("没有配置收件人，跳过邮件发送")
+            return
+        
+        if not subject:
+            subject = f"GitHub Sentinel - {datetime.now().strftime('%Y-%m-%d')} 汇总报告（{len(reports)} 个仓库）"
+        
         try:
-            import markdown
-            html = markdown.markdown(
-                markdown_text,
-                extensions=['extra', 'codehilite', 'tables']
-            )
+            content = self._build_digest_markdown(reports)
+            
+            msg = MIMEMultipart('mixed')
+            msg['Subject'] = subject
+            msg['From'] = self.from_addr
+            msg['To'] = ', '.join(to_addrs)
+            
+            body = MIMEMultipart('alternative')
+            body.attach(MIMEText(content, 'plain', 'utf-8'))
+            body.attach(MIMEText(self._markdown_to_html(content), 'html', 'utf-8'))
+            msg.attach(body)
+            
+            # 每个仓库的报告作为独立附件
+            for repo_name, report in reports.items():
+                attachment = MIMEText(report, 'markdown', 'utf-8')
+                attachment.add_header(
+                    'Content-Disposition', 'attachment',
+                    filename=f"{repo_name.replace('/', '_')}.md"
+                )
+                msg.attach(attachment)
             
-            # 添加基本的 CSS 样式
-            styled_html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <style>
-                    body {{
-                        font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
-                        line-height: 1.6;
-                        color: #333;
-                        max-width: 800px;
-                        margin: 0 auto;
-                        padding: 20px;
-                        background-color: #f5f5f5;
-                    }}
-                    .container {{
-                        background-color: white;
-                        padding: 30px;
-                        border-radius: 8px;
-                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                    }}
-                    h1, h2, h3 {{ color: #2c3e50; }}
-                    code {{
-                        background-color: #f4f4f4;
-                        padding: 2px 6px;
-                        border-radius: 3px;
-                        font-family: 'Monaco', 'Courier New', monospace;
-                    }}
-                    pre {{
-                        background-color: #f4f4f4;
-                        padding: 15px;
-                        border-radius: 5px;
-                        overflow-x: auto;
-                    }}
-                    a {{ color: #3498db; text-decoration: none; }}
-                    a:hover {{ text-decoration: underline; }}
-                    ul, ol {{ padding-left: 20px; }}
-                    hr {{ border: none; border-top: 1px solid #ddd; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    {html}
-                </div>
-            </body>
-            </html>
-            """
-            return styled_html
+            self._deliver(msg)
             
-        except ImportError:
-            # 如果没有安装 markdown 库，返回基本的 HTML
-            html = markdown_text.replace('\n', '<br>')
-            return f"<html><body><pre>{html}</pre></body></html>"
+            logger.info(f"汇总邮件发送成功: {len(reports)} 个仓库 -> {', '.join(to_addrs)}")
+            
+        except Exception as e:
+            logger.error(f"汇总邮件发送失败: {e}")
+            raise
+    
+    @staticmethod
+    def _build_digest_markdown(reports: Dict[str, str]) -> str:
+        """生成带目录的汇总 Markdown"""
+        lines = [
+            "# GitHub Sentinel 汇总报告",
+            "",
+            f"**生成时间**: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}  ",
+            f"**仓库数量**: {len(reports)}",
+            "",
+            "## 目录",
+            ""
+        ]
+        for idx, repo_name in enumerate(reports, 1):
+            lines.append(f"{idx}. [{repo_name}](#repo-{idx})")
+        
+        for idx, (repo_name, report) in enumerate(reports.items(), 1):
+            lines.extend([
+                "",
+                "---",
+                "",
+                f'<a id="repo-{idx}"></a>',
+                "",
+                f"## {idx}. {repo_name}",
+                "",
+                report.strip()
+            ])
+        
+        return '\n'.join(lines) + '\n'
+    
+    def _markdown_to_html(self, markdown_text: str) -> str:
+        """将 Markdown 转换为 HTML
+        
+        使用共享的渲染器，同一份报告在一次运行内只渲染一次
+        """
+        return self.renderer.render(markdown_text)
@@ -0,0 +1,142 @@
+"""
+Markdown → HTML 渲染器
+复用 Markdown 转换器和预编译的 HTML 模板，并按内容哈希缓存渲染结果，
+供邮件、Web 界面和 HTML 报告归档共享
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from jinja2 import Template
+from loguru import logger
+
+
+# 报告 HTML 模板（启动时编译一次）
+REPORT_HTML_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    {% if title %}<title>{{ title }}</title>{% endif %}
+    <style>
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            max-width: 800px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f5f5f5;
+        }
+        .container {
+            background-color: white;
+            padding: 30px;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        h1, h2, h3 { color: #2c3e50; }
+        code {
+            background-color: #f4f4f4;
+            padding: 2px 6px;
+            border-radius: 3px;
+            font-family: 'Monaco', 'Courier New', monospace;
+        }
+        pre {
+            background-color: #f4f4f4;
+            padding: 15px;
+            border-radius: 5px;
+            overflow-x: auto;
+        }
+        a { color: #3498db; text-decoration: none; }
+        a:hover { text-decoration: underline; }
+        ul, ol { padding-left: 20px; }
+        hr { border: none; border-top: 1px solid #ddd; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        {{ body }}
+    </div>
+</body>
+</html>
+""")
+
+
+class HTMLRenderer:
+    """Markdown → HTML 渲染器（带内容哈希缓存）"""
+
+    def __init__(self, max_entries: int = 256):
+        """初始化渲染器
+
+        Args:
+            max_entries: 缓存的最大渲染结果数量（LRU 淘汰）
+        """
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._converter = self._create_converter()
+
+    @staticmethod
+    def _create_converter():
+        """创建可复用的 Markdown 转换器，未安装 markdown 库时返回 None"""
+        try:
+            import markdown
+            return markdown.Markdown(extensions=['extra', 'codehilite', 'tables'])
+        except ImportError:
+            logger.warning("未安装 markdown 库，HTML 渲染将使用纯文本格式")
+            return None
+
+    def render_fragment(self, markdown_text: str) -> str:
+        """将 Markdown 转换为 HTML 片段（不含页面框架）"""
+        return self._cached('fragment', markdown_text, lambda: self._convert(markdown_text))
+
+    def render(self, markdown_text: str, title: Optional[str] = None) -> str:
+        """将 Markdown 转换为带样式的完整 HTML 文档"""
+        def build():
+            if self._converter is None:
+                # 如果没有安装 markdown 库，返回基本的 HTML
+                html = markdown_text.replace('\n', '<br>')
+                return f"<html><body><pre>{html}</pre></body></html>"
+            return REPORT_HTML_TEMPLATE.render(title=title, body=self.render_fragment(markdown_text))
+
+        return self._cached(f"document:{title or ''}", markdown_text, build)
+
+    def _convert(self, markdown_text: str) -> str:
+        """执行转换；Markdown 实例不是线程安全的，需要加锁并在每次转换后重置"""
+        if self._converter is None:
+            return markdown_text.replace('\n', '<br>')
+        with self._lock:
+            try:
+                return self._converter.convert(markdown_text)
+            finally:
+                self._converter.reset()
+
+    def _cached(self, kind: str, markdown_text: str, build) -> str:
+        """按内容哈希缓存渲染结果"""
+        key = kind + ':' + hashlib.sha256(markdown_text.encode('utf-8')).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        html = build()
+
+        with self._lock:
+            self._cache[key] = html
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return html
+
+
+_default_renderer: Optional[HTMLRenderer] = None
+_default_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> HTMLRenderer:
+    """获取进程内共享的渲染器实例"""
+    global _default_renderer
+    with _default_renderer_lock:
+        if _default_renderer is None:
+            _default_renderer = HTMLRenderer()
+        return _default_renderer
@@ -0,0 +1,343 @@
+"""
+通知发件箱
+通知先持久化到 SQLite，再按渠道投递，失败时指数退避重试。
+多个进程可共用同一个发件箱：消息通过条件 UPDATE 领取并持有租约，
+只有租约过期（投递进程异常退出）的消息才会被重新领取。
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional
+from loguru import logger
+
+
+class NotificationOutbox:
+    """持久化通知发件箱（带租约、重试与死信）"""
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_DEAD = 'dead'
+
+    def __init__(self, path: str = "data/outbox.sqlite", max_attempts: int = 5,
+                 backoff_base: float = 30, backoff_max: float = 3600,
+                 concurrency: Dict[str, int] = None, poll_interval: float = 1.0,
+                 lease_ttl: float = 300):
+        """初始化发件箱
+
+        Args:
+            path: 发件箱 SQLite 文件路径（多个进程可共用）
+            max_attempts: 最大投递次数，超过后转入死信
+            backoff_base: 首次重试等待时间（秒），之后按 2 的幂增长
+            backoff_max: 最大重试等待时间（秒）
+            concurrency: 各渠道的工作线程数，如 {'email': 1, 'webhook': 4}
+            poll_interval: 空闲时轮询间隔（秒）
+            lease_ttl: 投递租约时长（秒），应明显大于单条消息的投递时间
+        """
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.concurrency = concurrency or {}
+        self.poll_interval = poll_interval
+        self.lease_ttl = lease_ttl
+        # 本实例领取消息时使用的租约持有者标识
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._senders: Dict[str, Callable[[Dict], None]] = {}
+        self._sessions: Dict[str, Callable[[], ContextManager]] = {}
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    @classmethod
+    def from_config(cls, config) -> 'NotificationOutbox':
+        """根据配置创建发件箱"""
+        return cls(
+            path=config.get("notification.outbox.path", "data/outbox.sqlite"),
+            max_attempts=config.get("notification.outbox.max_attempts", 5),
+            backoff_base=config.get("notification.outbox.backoff_base", 30),
+            backoff_max=config.get("notification.outbox.backoff_max", 3600),
+            concurrency=config.get("notification.outbox.concurrency", {'email': 1, 'webhook': 4}),
+            lease_ttl=config.get("notification.outbox.lease_ttl", 300),
+        )
+
+    @contextmanager
+    def _connect(self):
+        """打开连接并在一个事务内执行（写操作立即获取写锁）"""
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建表结构"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    payload TEXT,
+                    status TEXT NOT NULL,
+                    owner TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL,
+                    created_at REAL,
+                    last_error TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_status ON messages (channel, status, next_attempt_at)")
+
+    @staticmethod
+    def _to_message(row: sqlite3.Row) -> Dict:
+        message = dict(row)
+        message['payload'] = json.loads(message['payload'] or '{}')
+        return message
+
+    def register(self, channel: str, sender: Callable[[Dict], None],
+                 session: Callable[[], ContextManager] = None):
+        """注册渠道的投递函数
+
+        Args:
+            channel: 渠道名称
+            sender: 投递单条消息的函数，失败时抛出异常
+            session: 可选，返回上下文管理器，工作线程在其中连续投递多条消息
+        """
+        self._senders[channel] = sender
+        if session:
+            self._sessions[channel] = session
+
+    def enqueue(self, channel: str, payload: Dict) -> int:
+        """写入一条待投递通知，立即返回消息 ID"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                INSERT INTO messages (channel, payload, status, attempts, next_attempt_at, created_at)
+                VALUES (?, ?, ?, 0, ?, ?)
+            """, (channel, json.dumps(payload, ensure_ascii=False), self.STATUS_PENDING, now, now))
+            message_id = cursor.lastrowid
+        with self._lock:
+            self._wakeup.notify_all()
+
+        logger.debug(f"通知已写入发件箱: {channel} (ID: {message_id})")
+        return message_id
+
+    def start(self):
+        """启动各渠道的后台投递线程（重复调用无副作用）
+
+        只应在常驻进程中调用；短时命令用 deliver() 在当前线程投递自己写入的消息。
+        """
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            for channel in self._senders:
+                for index in range(max(1, self.concurrency.get(channel, 1))):
+                    thread = threading.Thread(
+                        target=self._worker, args=(channel,),
+                        name=f"outbox-{channel}-{index}", daemon=True
+                    )
+                    thread.start()
+                    self._threads.append(thread)
+        logger.info(f"通知发件箱已启动: {len(self._threads)} 个投递线程")
+
+    @property
+    def running(self) -> bool:
+        """后台投递线程是否在运行"""
+        return bool(self._threads)
+
+    def stop(self, timeout: float = 10):
+        """停止投递线程；未投递的消息保留在发件箱中"""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+        logger.info("通知发件箱已停止")
+
+    def wait_idle(self, timeout: float = 60) -> bool:
+        """等待本实例可投递的消息全部处理完（死信和退避中的消息不等待）"""
+        channels = list(self._senders)
+        if not channels:
+            return True
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            now = time.time()
+            with self._connect() as conn:
+                busy = conn.execute(f"""
+                    SELECT 1 FROM messages
+                    WHERE (status = ? AND owner = ?)
+                       OR (status = ? AND next_attempt_at <= ? AND channel IN ({','.join('?' * len(channels))}))
+                    LIMIT 1
+                """, (self.STATUS_SENDING, self.owner, self.STATUS_PENDING, now, *channels)).fetchone()
+            if not busy:
+                return True
+            time.sleep(min(0.1, self.poll_interval))
+        return False
+
+    def _claim(self, channel: str, message_id: int = None) -> Optional[Dict]:
+        """领取一条到期的待投递消息或租约已过期的投递中消息
+
+        Args:
+            channel: 渠道
+            message_id: 只领取指定的消息
+        """
+        now = time.time()
+        claimable = "((status = ? AND next_attempt_at <= ?) OR (status = ? AND lease_expires < ?))"
+        params = (self.STATUS_PENDING, now, self.STATUS_SENDING, now)
+        with self._connect() as conn:
+            # 投递进程异常退出且已达投递上限的消息直接转入死信，避免反复重发
+            conn.execute(
+                "UPDATE messages SET status = ?, owner = NULL WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (self.STATUS_DEAD, self.STATUS_SENDING, now, self.max_attempts)
+            )
+            if message_id is None:
+                row = conn.execute(
+                    f"SELECT id FROM messages WHERE channel = ? AND {claimable} ORDER BY id LIMIT 1",
+                    (channel, *params)
+                ).fetchone()
+                if row is None:
+                    return None
+                message_id = row['id']
+            cursor = conn.execute(f"""
+                UPDATE messages SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE id = ? AND channel = ? AND {claimable}
+            """, (self.STATUS_SENDING, self.owner, now + self.lease_ttl, message_id, channel, *params))
+            if cursor.rowcount != 1:
+                return None
+            return self._to_message(conn.execute("SELECT * FROM messages WHERE id = ?", (message_id,)).fetchone())
+
+    def deliver(self, message_id: int) -> bool:
+        """在当前线程投递指定消息（短时命令使用，不启动后台线程）
+
+        失败的消息按退避规则留在发件箱中，由常驻进程的投递线程继续重试。
+
+        Returns:
+            是否投递成功
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT channel FROM messages WHERE id = ?", (message_id,)).fetchone()
+        if row is None:
+            return False
+        message = self._claim(row['channel'], message_id)
+        if message is None:
+            return False
+        return self._deliver(message)
+
+    def _worker(self, channel: str):
+        """投递线程：有消息时在同一会话内连续投递，空闲时等待唤醒"""
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+            message = self._claim(channel)
+            if message is None:
+                with self._lock:
+                    if not self._stopping:
+                        self._wakeup.wait(self.poll_interval)
+                continue
+
+            session_factory = self._sessions.get(channel)
+            try:
+                with session_factory() if session_factory else nullcontext():
+                    while message is not None:
+                        self._deliver(message)
+                        message = None
+                        with self._lock:
+                            stopping = self._stopping
+                        if not stopping:
+                            message = self._claim(channel)
+            except Exception as e:
+                # 会话本身出错（如建立连接失败），当前领取的消息按投递失败处理
+                logger.error(f"{channel} 投递会话异常: {e}")
+                if message is not None:
+                    self._record_failure(message, e)
+
+    def _deliver(self, message: Dict) -> bool:
+        """投递单条已领取的消息并更新状态"""
+        channel = message['channel']
+        started = time.monotonic()
+        try:
+            self._senders[channel](message['payload'])
+        except Exception as e:
+            self._record_failure(message, e)
+            return False
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM messages WHERE id = ? AND owner = ? AND status = ?",
+                (message['id'], self.owner, self.STATUS_SENDING)
+            )
+        if cursor.rowcount != 1:
+            logger.warning(f"通知投递期间租约已过期，可能被其他进程重复投递: {channel} (ID: {message['id']})")
+        logger.info(f"通知投递成功: {channel} (ID: {message['id']})，耗时 {time.monotonic() - started:.2f}s")
+        return True
+
+    def _record_failure(self, message: Dict, error: Exception):
+        """记录投递失败：指数退避后重试，超过上限转入死信"""
+        channel = message['channel']
+        attempts = message['attempts']
+        if attempts >= self.max_attempts:
+            status, next_attempt_at = self.STATUS_DEAD, None
+            logger.error(f"通知投递失败已达上限，转入死信: {channel} (ID: {message['id']}) - {error}")
+        else:
+            delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+            status, next_attempt_at = self.STATUS_PENDING, time.time() + delay
+            logger.warning(
+                f"通知投递失败: {channel} (ID: {message['id']}) - {error}，{delay:.0f}s 后第 {attempts + 1} 次尝试"
+            )
+        with self._connect() as conn:
+            conn.execute("""
+                UPDATE messages SET status = ?, owner = NULL, lease_expires = NULL,
+                                    next_attempt_at = COALESCE(?, next_attempt_at), last_error = ?
+                WHERE id = ? AND owner = ? AND status = ?
+            """, (status, next_attempt_at, str(error), message['id'], self.owner, self.STATUS_SENDING))
+
+    def stats(self) -> Dict[str, int]:
+        """统计各状态的消息数量"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM messages GROUP BY status").fetchall()
+        result = {self.STATUS_PENDING: 0, self.STATUS_SENDING: 0, self.STATUS_DEAD: 0}
+        result.update({row['status']: row['n'] for row in rows})
+        return result
+
+    def dead_letters(self) -> List[Dict]:
+        """获取死信消息"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM messages WHERE status = ? ORDER BY id", (self.STATUS_DEAD,)
+            ).fetchall()
+        return [self._to_message(row) for row in rows]
+
+    def retry_dead_letters(self) -> int:
+        """将所有死信重新置为待投递，返回数量"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE messages SET status = ?, attempts = 0, next_attempt_at = ? WHERE status = ?",
+                (self.STATUS_PENDING, time.time(), self.STATUS_DEAD)
+            )
+            count = cursor.rowcount
+        if count:
+            with self._lock:
+                self._wakeup.notify_all()
+        return count
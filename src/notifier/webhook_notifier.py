@@ -2,18 +2,24 @@
 Webhook 通知器
 """
 
-import requests
 import json
 from loguru import logger
 
+from src.core.http_pool import HTTPPool
+
 
 class WebhookNotifier:
     """Webhook 通知器"""
     
-    def __init__(self, config):
+    def __init__(self, config, http_pool: HTTPPool = None):
         self.config = config
         self.url = config.get("notification.webhook.url")
         self.headers = config.get("notification.webhook.headers", {})
+        # 读取超时（秒）；未设置时使用连接池的默认超时（http.connect_timeout / http.timeout）
+        self.timeout = config.get("notification.webhook.timeout")
+        self.connect_timeout = config.get("http.connect_timeout", 10)
+        # 复用共享连接池，避免每次发送都重新建立 TLS 连接
+        self.http_pool = http_pool or HTTPPool.from_config(config)
         
         if not self.url:
             logger.warning("Webhook URL 未配置")
@@ -37,12 +43,15 @@ class WebhookNotifier:
                 "timestamp": self._get_timestamp()
             }
             
-            # 发送请求
-            response = requests.post(
+            # 发送请求（连接超时始终使用 http.connect_timeout）
+            kwargs = {}
+            if self.timeout is not None:
+                kwargs['timeout'] = (self.connect_timeout, self.timeout)
+            response = self.http_pool.post(
                 self.url,
                 json=payload,
                 headers=self.headers,
-                timeout=30
+                **kwargs
             )
             
             response.raise_for_status()
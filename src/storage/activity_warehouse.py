@@ -0,0 +1,327 @@
+"""
+本地活动仓库（SQLite）
+按仓库和日期（UTC）分区保存拉取到的 Issues、PRs、提交和 Releases，
+历史日期范围的报告直接读取本地数据，只为缺失的日期调用 GitHub API
+"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+
+def _day_range(first_day: date, last_day: date) -> List[date]:
+    """首尾两天之间（含）的所有日期"""
+    return [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+
+
+class ActivityWarehouse:
+    """按 (仓库, 类型, 日期) 分区的活动仓库
+
+    Issues/PRs 分区保存当天创建或更新的已关闭条目（与 Search API 的 created / updated 语义一致）。
+    已结束的日期拉取完成后标记为完整，之后不再改写；当天的分区每次重新拉取。
+    提交和 Releases 按发生日期追加保存。
+    另有按 (仓库, 日期) 缓存的每日指标计数器，写入条目时使受影响日期的计数器失效。
+    """
+
+    CLOSED_KINDS = ('issues', 'pull_requests')
+    # 每日指标计数器（可累加）
+    COUNTER_COLUMNS = ('prs_merged', 'merge_hours_sum', 'churn', 'issues_closed', 'close_hours_sum', 'commits')
+
+    def __init__(self, path: str = "data/warehouse.sqlite"):
+        """初始化活动仓库
+
+        Args:
+            path: SQLite 文件路径
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    @classmethod
+    def from_config(cls, config) -> Optional['ActivityWarehouse']:
+        """根据配置创建活动仓库，未启用时返回 None"""
+        if not config.get("warehouse.enabled", True):
+            return None
+        return cls(path=config.get("warehouse.path", "data/warehouse.sqlite"))
+
+    @contextmanager
+    def _connect(self):
+        """打开连接并在一个事务内执行"""
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建表结构"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS activity (
+                    repo TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    item_key TEXT NOT NULL,
+                    created_at TEXT,
+                    updated_at TEXT,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (repo, kind, day, item_key)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS partitions (
+                    repo TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    fetched_at TEXT NOT NULL,
+                    complete INTEGER NOT NULL,
+                    PRIMARY KEY (repo, kind, day)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS daily_counters (
+                    repo TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    prs_merged REAL NOT NULL,
+                    merge_hours_sum REAL NOT NULL,
+                    churn REAL NOT NULL,
+                    issues_closed REAL NOT NULL,
+                    close_hours_sum REAL NOT NULL,
+                    commits REAL NOT NULL,
+                    authors TEXT NOT NULL,
+                    PRIMARY KEY (repo, day)
+                ) WITHOUT ROWID
+            """)
+
+    @staticmethod
+    def _invalidate_counters(conn, repo: str, days):
+        """删除受影响日期的每日计数器"""
+        conn.executemany("DELETE FROM daily_counters WHERE repo = ? AND day = ?", [(repo, day) for day in days])
+
+    def missing_ranges(self, repo_name: str, kind: str, start_date: datetime, end_date: datetime,
+                       today: date = None) -> List[Tuple[date, date]]:
+        """日期范围（含首尾两天）内没有完整分区的连续日期段"""
+        today = today or datetime.now(timezone.utc).date()
+        days = _day_range(start_date.date(), end_date.date())
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT day FROM partitions WHERE repo = ? AND kind = ? AND day BETWEEN ? AND ? AND complete = 1",
+                (repo_name.lower(), kind, days[0].isoformat(), days[-1].isoformat())
+            ).fetchall()
+        complete = {row['day'] for row in rows}
+
+        ranges = []
+        for day in days:
+            if day.isoformat() in complete and day < today:
+                continue
+            if ranges and ranges[-1][1] == day - timedelta(days=1):
+                ranges[-1] = (ranges[-1][0], day)
+            else:
+                ranges.append((day, day))
+        return ranges
+
+    def covers(self, repo_name: str, kind: str, first_day: date, last_day: date, today: date = None) -> bool:
+        """日期范围（含首尾两天）是否都已拉取：已结束的日期需有完整分区，当天有分区即可，之后的日期不检查"""
+        today = today or datetime.now(timezone.utc).date()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT day, complete FROM partitions WHERE repo = ? AND kind = ? AND day BETWEEN ? AND ?",
+                (repo_name.lower(), kind, first_day.isoformat(), last_day.isoformat())
+            ).fetchall()
+        partitions = {row['day']: bool(row['complete']) for row in rows}
+        for day in _day_range(first_day, min(last_day, today)):
+            complete = partitions.get(day.isoformat())
+            if complete is None or (not complete and day < today):
+                return False
+        return True
+
+    def store_closed(self, repo_name: str, kind: str, items: List[Dict], first_day: date, last_day: date,
+                     fetched_at: datetime = None):
+        """保存一段日期的完整拉取结果
+
+        每个条目写入其创建日和更新日所在的分区；拉取时已经结束的日期标记为完整。
+
+        Args:
+            fetched_at: 数据的实际拉取时间（UTC），默认为当前时间；复用的快照按快照的拉取时间，
+                        在某天结束前拉取的数据不能把这一天标记为完整
+        """
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        repo = repo_name.lower()
+        first, last = first_day.isoformat(), last_day.isoformat()
+
+        with self._connect() as conn:
+            # 范围内未完整的分区（如当天）整体替换
+            conn.execute(
+                "DELETE FROM activity WHERE repo = ? AND kind = ? AND day BETWEEN ? AND ? AND day NOT IN "
+                "(SELECT day FROM partitions WHERE repo = ? AND kind = ? AND complete = 1)",
+                (repo, kind, first, last, repo, kind)
+            )
+            rows = []
+            # 计数器按合并 / 关闭日期统计，这些日期可能早于条目所在的分区
+            touched = {day.isoformat() for day in _day_range(first_day, last_day)}
+            for item in items:
+                for day in {item['created_at'][:10], item['updated_at'][:10]}:
+                    if first <= day <= last:
+                        rows.append((repo, kind, day, str(item['number']), item['created_at'],
+                                     item['updated_at'], json.dumps(item, ensure_ascii=False)))
+                touched.update(item[key][:10] for key in ('closed_at', 'merged_at') if item.get(key))
+            conn.executemany("INSERT OR IGNORE INTO activity VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._invalidate_counters(conn, repo, touched)
+            conn.executemany(
+                "INSERT INTO partitions VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (repo, kind, day) DO UPDATE SET fetched_at = excluded.fetched_at, "
+                "complete = excluded.complete WHERE partitions.complete = 0",
+                [(repo, kind, day.isoformat(), fetched_at.isoformat(),
+                  int(datetime.combine(day + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc) <= fetched_at))
+                 for day in _day_range(first_day, last_day)]
+            )
+
+    def query_closed(self, repo_name: str, kind: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """读取日期范围（含首尾两天）内各分区的条目，同一条目保留最新的版本"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT item_key, updated_at, data FROM activity "
+                "WHERE repo = ? AND kind = ? AND day BETWEEN ? AND ?",
+                (repo_name.lower(), kind, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+            ).fetchall()
+
+        latest = {}
+        for row in rows:
+            current = latest.get(row['item_key'])
+            if current is None or row['updated_at'] > current['updated_at']:
+                latest[row['item_key']] = row
+        return [json.loads(row['data']) for row in latest.values()]
+
+    def closed_activity(self, repo_name: str, kind: str, start_date: datetime, end_date: datetime,
+                        fetch: Callable[[datetime, datetime], Tuple[List[Dict], datetime]]) -> List[Dict]:
+        """读取日期范围内已关闭的 Issues/PRs，缺失的日期通过 fetch 补齐后保存
+
+        Args:
+            fetch: fetch(start, end) 获取一段日期（含首尾两天）的全部条目，返回 (条目, 实际拉取时间)
+        """
+        for first_day, last_day in self.missing_ranges(repo_name, kind, start_date, end_date):
+            logger.info(f"{repo_name} {kind} 本地缺少 {first_day} 到 {last_day} 的数据，从 GitHub 补齐")
+            start = datetime.combine(first_day, datetime.min.time(), tzinfo=timezone.utc)
+            end = datetime.combine(last_day, datetime.min.time(), tzinfo=timezone.utc)
+            items, fetched_at = fetch(start, end)
+            self.store_closed(repo_name, kind, items, first_day, last_day, fetched_at=fetched_at)
+        return self.query_closed(repo_name, kind, start_date, end_date)
+
+    def update_items(self, repo_name: str, kind: str, items: List[Dict]):
+        """用补充了字段的条目（如 PR 的代码变更统计）替换已保存的同一版本"""
+        repo = repo_name.lower()
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE activity SET data = ? WHERE repo = ? AND kind = ? AND item_key = ? AND updated_at = ?",
+                [(json.dumps(item, ensure_ascii=False), repo, kind, str(item['number']), item['updated_at'])
+                 for item in items]
+            )
+            self._invalidate_counters(conn, repo, {item[key][:10] for item in items
+                                                   for key in ('closed_at', 'merged_at') if item.get(key)})
+
+    def record_events(self, repo_name: str, kind: str, items: List[Dict], key_field: str, time_field: str):
+        """按发生日期追加保存提交或 Releases（已存在的条目保持不变）"""
+        repo = repo_name.lower()
+        rows = [(repo, kind, item[time_field][:10], str(item[key_field]), item[time_field], item[time_field],
+                 json.dumps(item, ensure_ascii=False))
+                for item in items if item.get(time_field) and item.get(key_field)]
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany("INSERT OR IGNORE INTO activity VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._invalidate_counters(conn, repo, {row[2] for row in rows})
+
+    def events(self, repo_name: str, kind: str, start_date: datetime, end_date: datetime) -> List[Dict]:
+        """读取日期范围（含首尾两天）内的提交或 Releases，按时间倒序"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT data FROM activity WHERE repo = ? AND kind = ? AND day BETWEEN ? AND ? "
+                "ORDER BY created_at DESC",
+                (repo_name.lower(), kind, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+            ).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def scan(self, kind: str, fields: Dict[str, str], start_date: datetime, end_date: Optional[datetime],
+             repos: List[str] = None) -> Dict[str, list]:
+        """按列批量读取日期范围内的条目（同一条目保留最新版本），供指标计算使用
+
+        Args:
+            kind: 条目类型
+            fields: 列名 -> 条目 JSON 中的路径（如 {'merged_at': '$.merged_at'}），
+                    时间字段以 _at 结尾时截取到秒（去掉时区，均为 UTC）
+            start_date: 开始日期（含）
+            end_date: 结束日期（含），None 表示不限
+            repos: 仓库列表，None 表示全部
+
+        Returns:
+            列名 -> 值列表，固定包含 repo、created_at
+        """
+        columns = ['repo', 'created_at'] + list(fields)
+        selects = ['repo', 'substr(created_at, 1, 19)']
+        for name, path in fields.items():
+            expr = f"json_extract(data, '{path}')"
+            selects.append(f"substr({expr}, 1, 19)" if name.endswith('_at') else expr)
+
+        sql = f"SELECT {', '.join(selects)}, MAX(updated_at) FROM activity WHERE kind = ? AND day >= ?"
+        params = [kind, start_date.strftime('%Y-%m-%d')]
+        if end_date is not None:
+            sql += " AND day <= ?"
+            params.append(end_date.strftime('%Y-%m-%d'))
+        if repos is not None:
+            sql += f" AND repo IN ({', '.join('?' * len(repos))})"
+            params.extend(repo.lower() for repo in repos)
+        # SQLite 中与 MAX() 同时查询的其他列取自最大值所在的行，即条目的最新版本
+        sql += " GROUP BY repo, item_key"
+
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+
+    def cached_counters(self, repos: List[str], first_day: date, last_day: date) -> Dict[str, list]:
+        """按列读取日期范围（含首尾两天）内已缓存的每日计数器
+
+        Returns:
+            列名 -> 值列表：repo（小写）、day、各计数器、authors（当天的作者列表）
+        """
+        columns = ['repo', 'day'] + list(self.COUNTER_COLUMNS) + ['authors']
+        sql = (f"SELECT {', '.join(columns)} FROM daily_counters WHERE day BETWEEN ? AND ? "
+               f"AND repo IN ({', '.join('?' * len(repos))})")
+        params = [first_day.isoformat(), last_day.isoformat()] + [repo.lower() for repo in repos]
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        result = {name: [row[i] for row in rows] for i, name in enumerate(columns)}
+        result['authors'] = [names.split('\n') if names else [] for names in result['authors']]
+        return result
+
+    def store_counters(self, rows: List[Tuple[str, str, Dict[str, float], List[str]]]):
+        """保存每日计数器
+
+        Args:
+            rows: [(仓库名, 日期, 计数器, 当天的作者列表)]
+        """
+        if not rows:
+            return
+        placeholders = ', '.join('?' * (len(self.COUNTER_COLUMNS) + 3))
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO daily_counters VALUES ({placeholders})",
+                [(repo.lower(), day, *(counters.get(name, 0) for name in self.COUNTER_COLUMNS), '\n'.join(authors))
+                 for repo, day, counters, authors in rows]
+            )
@@ -3,18 +3,43 @@
 """
 
 import json
+import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from functools import wraps
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from loguru import logger
 
+try:
+    import fcntl
+except ImportError:  # Windows 不支持文件锁，退化为仅进程内加锁
+    fcntl = None
+
+
+def _synchronized(method):
+    """在线程锁和文件锁内执行，并先加载其他进程写入的数据，保证多线程 / 多进程读写一致"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock, self._file_lock():
+            self._reload_if_changed()
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class Database:
     """JSON 文件数据存储"""
     
     def __init__(self, db_path: str = "data/sentinel.json"):
         self.db_path = Path(db_path)
+        # 调度任务与 Web 界面可能在同一进程的不同线程中共用一个实例，
+        # 集群模式下多个工作进程共用同一个文件
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._lock_file = None
         self._ensure_directory()
+        self._file_stamp = self._stat()
         self.data = self._load_data()
         logger.info(f"数据存储初始化成功: {self.db_path}")
     
@@ -22,6 +47,40 @@ class Database:
         """确保数据目录存在"""
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
     
+    def _stat(self):
+        """数据文件的修改标记（不存在时为 None）"""
+        try:
+            stat = self.db_path.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+    
+    @contextmanager
+    def _file_lock(self):
+        """跨进程文件锁（可重入，调用方需持有线程锁）"""
+        if fcntl is None:
+            yield
+            return
+        if self._lock_depth == 0:
+            self._lock_file = open(self.db_path.with_suffix(self.db_path.suffix + '.lock'), 'a')
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                self._lock_file.close()
+                self._lock_file = None
+    
+    def _reload_if_changed(self):
+        """数据文件被其他进程修改过时重新加载"""
+        stamp = self._stat()
+        if stamp is not None and stamp != self._file_stamp:
+            self.data = self._load_data()
+            self._file_stamp = stamp
+    
     def _load_data(self) -> Dict:
         """从 JSON 文件加载数据"""
         if self.db_path.exists():
@@ -38,6 +97,7 @@ class Database:
         """初始化数据结构"""
         return {
             'subscriptions': [],
+            'watches': [],
             'update_records': [],
             'settings': {},
             'next_subscription_id': 1,
@@ -45,15 +105,20 @@ class Database:
         }
     
     def _save_data(self):
-        """保存数据到 JSON 文件"""
-        try:
-            with open(self.db_path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"保存数据失败: {e}")
-            raise
+        """保存数据到 JSON 文件（先写临时文件再替换，避免其他进程读到不完整的内容）"""
+        with self._lock:
+            try:
+                tmp_path = self.db_path.with_suffix(self.db_path.suffix + '.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.db_path)
+                self._file_stamp = self._stat()
+            except Exception as e:
+                logger.error(f"保存数据失败: {e}")
+                raise
     
-    def add_subscription(self, repo_name: str, tags: str = '') -> int:
+    @_synchronized
+    def add_subscription(self, repo_name: str, tags: str = '', schedule: Dict = None) -> int:
         """添加订阅"""
         # 检查是否已存在
         for sub in self.data['subscriptions']:
@@ -67,6 +132,7 @@ class Database:
             'id': subscription_id,
             'repo_name': repo_name,
             'tags': tags,
+            'schedule': schedule,
             'created_at': datetime.now().isoformat(),
             'last_updated': None
         }
@@ -77,6 +143,43 @@ class Database:
         logger.info(f"添加订阅成功: {repo_name} (ID: {subscription_id})")
         return subscription_id
     
+    @_synchronized
+    def add_subscriptions(self, entries: List[Dict]) -> Dict[str, int]:
+        """批量添加订阅（只写入一次文件），已订阅的仓库（不区分大小写）跳过
+        
+        Args:
+            entries: 订阅列表，每条包含 repo_name、tags（逗号分隔字符串）、schedule
+        
+        Returns:
+            仓库名称 -> 订阅 ID（仅包含新添加的仓库）
+        """
+        existing = {sub['repo_name'].lower() for sub in self.data['subscriptions']}
+        added = {}
+        now = datetime.now().isoformat()
+        for entry in entries:
+            repo_name = entry['repo_name']
+            if repo_name.lower() in existing:
+                continue
+            existing.add(repo_name.lower())
+            
+            subscription_id = self.data['next_subscription_id']
+            self.data['next_subscription_id'] += 1
+            self.data['subscriptions'].append({
+                'id': subscription_id,
+                'repo_name': repo_name,
+                'tags': entry.get('tags', ''),
+                'schedule': entry.get('schedule'),
+                'created_at': now,
+                'last_updated': None
+            })
+            added[repo_name] = subscription_id
+        
+        if added:
+            self._save_data()
+        logger.info(f"批量添加订阅成功: {len(added)} 个")
+        return added
+    
+    @_synchronized
     def remove_subscription(self, repo_name: str) -> int:
         """移除订阅"""
         original_length = len(self.data['subscriptions'])
@@ -108,10 +211,12 @@ class Database:
         
         return affected
     
+    @_synchronized
     def get_subscriptions(self) -> List[Dict]:
         """获取所有订阅"""
-        return self.data['subscriptions']
+        return list(self.data['subscriptions'])
     
+    @_synchronized
     def get_subscription_by_name(self, repo_name: str) -> Optional[Dict]:
         """根据仓库名获取订阅"""
         for sub in self.data['subscriptions']:
@@ -119,6 +224,68 @@ class Database:
                 return sub
         return None
     
+    @_synchronized
+    def update_subscription_schedule(self, repo_name: str, schedule: Optional[Dict]) -> bool:
+        """更新订阅的调度设置"""
+        for sub in self.data['subscriptions']:
+            if sub['repo_name'] == repo_name:
+                sub['schedule'] = schedule
+                self._save_data()
+                return True
+        return False
+    
+    @_synchronized
+    def update_subscription_probe(self, subscription_id: int, probe: Dict):
+        """保存订阅最近一次的仓库探测结果"""
+        for sub in self.data['subscriptions']:
+            if sub['id'] == subscription_id:
+                sub['probe'] = probe
+                self._save_data()
+                break
+    
+    @_synchronized
+    def add_watch(self, query: str, tags: str = '') -> None:
+        """添加组织 / 主题订阅"""
+        watches = self.data.setdefault('watches', [])
+        if any(w['query'] == query for w in watches):
+            raise ValueError(f"已订阅: {query}")
+        watches.append({
+            'query': query,
+            'tags': tags,
+            'created_at': datetime.now().isoformat(),
+            'last_expanded': None,
+            'repos': {}
+        })
+        self._save_data()
+        logger.info(f"添加订阅成功: {query}")
+    
+    @_synchronized
+    def remove_watch(self, query: str) -> int:
+        """移除组织 / 主题订阅"""
+        watches = self.data.setdefault('watches', [])
+        remaining = [w for w in watches if w['query'] != query]
+        affected = len(watches) - len(remaining)
+        if affected:
+            self.data['watches'] = remaining
+            self._save_data()
+        return affected
+    
+    @_synchronized
+    def get_watches(self) -> List[Dict]:
+        """获取所有组织 / 主题订阅"""
+        return list(self.data.get('watches', []))
+    
+    @_synchronized
+    def update_watch_snapshot(self, query: str, repos: Dict[str, Dict]):
+        """保存组织 / 主题订阅最近一次展开得到的仓库及其活动快照"""
+        for watch in self.data.get('watches', []):
+            if watch['query'] == query:
+                watch['repos'] = repos
+                watch['last_expanded'] = datetime.now().isoformat()
+                self._save_data()
+                break
+    
+    @_synchronized
     def update_subscription_last_updated(self, subscription_id: int):
         """更新订阅的最后更新时间"""
         for sub in self.data['subscriptions']:
@@ -127,6 +294,7 @@ class Database:
                 self._save_data()
                 break
     
+    @_synchronized
     def add_update_record(self, subscription_id: int, update_data: Dict) -> int:
         """添加更新记录"""
         record_id = self.data['next_record_id']
@@ -145,6 +313,7 @@ class Database:
         logger.info(f"添加更新记录成功: 记录 ID {record_id}")
         return record_id
     
+    @_synchronized
     def get_update_records(self, subscription_id: int, limit: int = 10) -> List[Dict]:
         """获取订阅的更新记录"""
         records = [
@@ -161,6 +330,7 @@ class Database:
         """获取配置值"""
         return self.data['settings'].get(key, default)
     
+    @_synchronized
     def set_setting(self, key: str, value: str):
         """设置配置值"""
         self.data['settings'][key] = {
@@ -0,0 +1,184 @@
+"""
+Release 缓存（SQLite）
+每个 tag 的 Release 元数据和说明只保存一份，按列表 ETag 做条件请求，
+只拉取比游标更新的 tag；较长的更新日志摘要一次后在各报告间复用
+"""
+
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+
+def release_digest(release: Dict) -> str:
+    """Release 内容摘要，名称、说明或预发布标记被编辑后变化"""
+    parts = [release.get('name') or '', release.get('body') or '', str(bool(release.get('prerelease')))]
+    return hashlib.sha1('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+
+class ReleaseCache:
+    """按仓库和 tag 保存的 Release 缓存
+
+    releases 表保存 Release 字段及内容摘要，内容变化（Release 被编辑）时更新并清除已有的说明摘要；
+    cursors 表保存每个仓库已同步的最新创建时间和 Releases 列表第一页的 ETag。
+    """
+
+    def __init__(self, path: str = "data/releases.sqlite"):
+        """初始化 Release 缓存
+
+        Args:
+            path: SQLite 文件路径
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    @classmethod
+    def from_config(cls, config) -> Optional['ReleaseCache']:
+        """根据配置创建 Release 缓存，未启用时返回 None"""
+        if not config.get("releases.cache.enabled", True):
+            return None
+        return cls(path=config.get("releases.cache.path", "data/releases.sqlite"))
+
+    @contextmanager
+    def _connect(self):
+        """打开连接并在一个事务内执行"""
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建表结构"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS releases (
+                    repo TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    name TEXT,
+                    body TEXT,
+                    author TEXT,
+                    created_at TEXT NOT NULL,
+                    prerelease INTEGER NOT NULL DEFAULT 0,
+                    url TEXT,
+                    digest TEXT NOT NULL,
+                    summary TEXT,
+                    PRIMARY KEY (repo, tag)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS releases_created ON releases (repo, created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cursors (
+                    repo TEXT PRIMARY KEY,
+                    latest_created_at TEXT,
+                    etag TEXT
+                )
+            """)
+
+    def cursor(self, repo_name: str) -> Dict[str, Optional[str]]:
+        """已同步的最新 Release 创建时间和列表 ETag"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT latest_created_at, etag FROM cursors WHERE repo = ?",
+                               (repo_name.lower(),)).fetchone()
+        if row is None:
+            return {'latest_created_at': None, 'etag': None}
+        return {'latest_created_at': row['latest_created_at'], 'etag': row['etag']}
+
+    def set_cursor(self, repo_name: str, latest_created_at: Optional[str], etag: Optional[str]):
+        """更新同步游标"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO cursors (repo, latest_created_at, etag) VALUES (?, ?, ?) "
+                "ON CONFLICT (repo) DO UPDATE SET latest_created_at = excluded.latest_created_at, etag = excluded.etag",
+                (repo_name.lower(), latest_created_at, etag)
+            )
+
+    def store(self, repo_name: str, releases: List[Dict]) -> int:
+        """写入 Releases，已有且内容未变化的 tag 跳过
+
+        Returns:
+            新增或被编辑的 Release 数
+        """
+        repo = repo_name.lower()
+        written = 0
+        with self._connect() as conn:
+            for release in releases:
+                digest = release_digest(release)
+                row = conn.execute("SELECT digest FROM releases WHERE repo = ? AND tag = ?",
+                                   (repo, release['tag'])).fetchone()
+                if row is not None and row['digest'] == digest:
+                    continue
+                if row is not None:
+                    logger.info(f"{repo_name} 的 Release {release['tag']} 已被编辑，更新缓存")
+                conn.execute(
+                    "INSERT OR REPLACE INTO releases "
+                    "(repo, tag, name, body, author, created_at, prerelease, url, digest, summary) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                    (repo, release['tag'], release.get('name'), release.get('body') or '', release.get('author'),
+                     release['created_at'], int(bool(release.get('prerelease'))), release.get('url'), digest)
+                )
+                written += 1
+        return written
+
+    def releases(self, repo_name: str, since: datetime = None, limit: int = 10) -> List[Dict]:
+        """读取 Releases（按创建时间倒序），字段与 REST API 路径一致，已有说明摘要时包含 summary
+
+        Args:
+            repo_name: 仓库名称
+            since: 只返回该时间之后创建的 Releases（可选）
+            limit: 最大数量，0 表示不限制
+        """
+        sql = "SELECT * FROM releases WHERE repo = ?"
+        params: list = [repo_name.lower()]
+        if since is not None:
+            sql += " AND created_at >= ?"
+            params.append(since.isoformat())
+        sql += " ORDER BY created_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        releases = []
+        for row in rows:
+            release = {
+                'tag': row['tag'],
+                'name': row['name'],
+                'body': row['body'],
+                'author': row['author'],
+                'created_at': row['created_at'],
+                'prerelease': bool(row['prerelease']),
+                'url': row['url'],
+            }
+            if row['summary']:
+                release['summary'] = row['summary']
+            releases.append(release)
+        return releases
+
+    def summary(self, repo_name: str, tag: str, digest: str) -> Optional[str]:
+        """读取 Release 说明的摘要，内容已变化（摘要不匹配）时返回 None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT summary FROM releases WHERE repo = ? AND tag = ? AND digest = ?",
+                               (repo_name.lower(), tag, digest)).fetchone()
+        return row['summary'] if row else None
+
+    def store_summary(self, repo_name: str, tag: str, digest: str, summary: str) -> bool:
+        """保存 Release 说明的摘要，Release 已被编辑（摘要不匹配）时不保存
+
+        Returns:
+            是否保存
+        """
+        with self._connect() as conn:
+            return conn.execute("UPDATE releases SET summary = ? WHERE repo = ? AND tag = ? AND digest = ?",
+                                (summary, repo_name.lower(), tag, digest)).rowcount > 0
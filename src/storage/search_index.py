@@ -0,0 +1,238 @@
+"""
+全文搜索索引（SQLite FTS5）
+导出进展时索引 Issues/PRs 的标题、正文、标签和作者，生成报告时索引报告全文，
+供 `search` 命令和 Web UI 检索历史活动与报告
+"""
+
+import hashlib
+import re
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+
+
+# 条目类型 -> 显示名称
+DOCUMENT_KINDS = {
+    'issue': 'Issue',
+    'pull_request': 'PR',
+    'report': '报告',
+}
+
+# trigram 分词按 3 个字符切分，更短的词无法使用索引
+MIN_TERM_LENGTH = 3
+
+# 匹配数不超过该值时按相关度（BM25）排序，否则按索引时间倒序（避免为大量匹配逐个打分）
+RANK_LIMIT = 200
+
+
+def _digest(*parts: str) -> str:
+    """文档内容摘要，用于跳过未变化的文档"""
+    return hashlib.sha1('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+
+class SearchIndex:
+    """增量维护的全文搜索索引
+
+    entries 表按文档键（如 "a/b#issue#12"、"report:路径"）保存元数据和内容摘要，
+    documents 为 FTS5 表（rowid 与 entries.id 一致），使用 trigram 分词，
+    中文和英文均可按子串检索。仓库和类型也作为索引列，过滤条件直接参与全文匹配。
+    内容未变化的文档不会重复写入。
+    """
+
+    def __init__(self, path: str = "data/search.sqlite"):
+        """初始化搜索索引
+
+        Args:
+            path: SQLite 文件路径
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_schema()
+
+    @classmethod
+    def from_config(cls, config) -> Optional['SearchIndex']:
+        """根据配置创建搜索索引，未启用时返回 None"""
+        if not config.get("search.enabled", True):
+            return None
+        return cls(path=config.get("search.path", "data/search.sqlite"))
+
+    @contextmanager
+    def _connect(self):
+        """打开连接并在一个事务内执行"""
+        conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """创建表结构"""
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    doc_key TEXT NOT NULL UNIQUE,
+                    repo TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    date TEXT,
+                    url TEXT,
+                    digest TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_repo ON entries (repo, kind)")
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS documents
+                USING fts5(title, body, labels, author, repo, kind, tokenize='trigram')
+            """)
+
+    def _upsert(self, conn, doc_key: str, repo: str, kind: str, date: str, url: str,
+                title: str, body: str, labels: str, author: str) -> bool:
+        """写入一个文档，内容未变化时跳过。返回是否写入"""
+        digest = _digest(title, body, labels, author, date or '', url or '')
+        row = conn.execute("SELECT id, digest FROM entries WHERE doc_key = ?", (doc_key,)).fetchone()
+        if row is not None:
+            if row['digest'] == digest:
+                return False
+            conn.execute("DELETE FROM documents WHERE rowid = ?", (row['id'],))
+            conn.execute("UPDATE entries SET date = ?, url = ?, digest = ? WHERE id = ?",
+                         (date, url, digest, row['id']))
+            doc_id = row['id']
+        else:
+            doc_id = conn.execute(
+                "INSERT INTO entries (doc_key, repo, kind, date, url, digest) VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_key, repo, kind, date, url, digest)
+            ).lastrowid
+        conn.execute("INSERT INTO documents (rowid, title, body, labels, author, repo, kind) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?)", (doc_id, title, body, labels, author, repo, kind))
+        return True
+
+    def index_items(self, repo_name: str, kind: str, items: List[Dict]) -> int:
+        """索引 Issues 或 PRs
+
+        Args:
+            repo_name: 仓库名称
+            kind: 'issue' 或 'pull_request'
+            items: 条目列表（需包含 number、title，可选 body、labels、author、updated_at、url）
+
+        Returns:
+            新写入或更新的文档数
+        """
+        repo = repo_name.lower()
+        written = 0
+        with self._connect() as conn:
+            for item in items:
+                written += self._upsert(
+                    conn, f"{repo}#{kind}#{item['number']}", repo, kind,
+                    (item.get('updated_at') or item.get('created_at') or '')[:10], item.get('url'),
+                    f"#{item['number']} {item.get('title') or ''}", item.get('body') or '',
+                    ' '.join(item.get('labels') or []), item.get('author') or ''
+                )
+        if written:
+            logger.debug(f"搜索索引: {repo_name} 写入 {written} 个{DOCUMENT_KINDS[kind]}")
+        return written
+
+    def index_report(self, repo_name: str, path: str, content: str, date: str = None) -> bool:
+        """索引报告全文，标题取第一个 Markdown 标题行
+
+        Returns:
+            是否写入（内容未变化时为 False）
+        """
+        match = re.search(r'^#+\s*(.+)$', content, re.MULTILINE)
+        title = match.group(1).strip() if match else Path(path).stem
+        if date is None:
+            found = re.search(r'\d{4}-\d{2}-\d{2}', Path(path).stem)
+            date = found.group(0) if found else None
+        with self._connect() as conn:
+            return self._upsert(conn, f"report:{Path(path).as_posix()}", repo_name.lower(), 'report',
+                                date, str(path), title, content, '', '')
+
+    def index_report_files(self, directory: str = "data/reports") -> int:
+        """索引目录下已有的报告文件（按 仓库名_report_日期.md 命名），用于补建索引
+
+        Returns:
+            新写入或更新的报告数
+        """
+        written = 0
+        for path in sorted(Path(directory).glob("*/*_report_*.md")):
+            repo_name = path.parent.name.replace('_', '/', 1)
+            written += self.index_report(repo_name, str(path), path.read_text(encoding='utf-8'))
+        return written
+
+    @staticmethod
+    def _quote(term: str) -> str:
+        """FTS5 短语"""
+        return '"' + term.replace('"', '""') + '"'
+
+    def search(self, query: str, repo_name: str = None, kind: str = None, limit: int = 20) -> List[Dict]:
+        """搜索文档
+
+        所有词都需出现（不区分大小写的子串匹配）。匹配较少时按相关度排序，
+        否则按索引时间倒序。少于 3 个字符的词无法使用索引，此时退化为逐行扫描。
+
+        Returns:
+            [{'repo', 'kind', 'title', 'date', 'url', 'snippet'}]
+        """
+        terms = query.split()
+        if not terms:
+            return []
+        repo = repo_name.lower() if repo_name else None
+        filters, filter_params = [], []
+        if repo:
+            filters.append("entries.repo = ?")
+            filter_params.append(repo)
+        if kind:
+            filters.append("entries.kind = ?")
+            filter_params.append(kind)
+
+        columns = ("entries.repo, entries.kind, entries.date, entries.url, documents.title, "
+                   "snippet(documents, 1, '**', '**', '…', 16) AS snippet")
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            if all(len(term) >= MIN_TERM_LENGTH for term in terms):
+                # 关键词只匹配内容列
+                expression = "{title body labels author} : (" + ' AND '.join(self._quote(t) for t in terms) + ")"
+                # 过滤条件同时作为列过滤参与匹配，缩小候选集合；精确过滤仍由 entries 完成
+                if repo:
+                    expression = f"repo : {self._quote(repo)} AND {expression}"
+                if kind:
+                    expression = f"kind : {self._quote(kind)} AND {expression}"
+                matches = conn.execute(
+                    "SELECT COUNT(*) FROM (SELECT rowid FROM documents WHERE documents MATCH ? LIMIT ?)",
+                    (expression, RANK_LIMIT + 1)
+                ).fetchone()[0]
+                order = ("bm25(documents, 10.0, 1.0, 2.0, 2.0, 0.0, 0.0)" if matches <= RANK_LIMIT
+                         else "documents.rowid DESC")
+                where = ["documents MATCH ?"] + filters
+                params = [expression] + filter_params
+            else:
+                text = "(documents.title || ' ' || documents.body || ' ' || documents.labels || ' ' || documents.author)"
+                where = [f"{text} LIKE ?" for _ in terms] + filters
+                params = [f"%{term}%" for term in terms] + filter_params
+                order = "documents.rowid DESC"
+
+            rows = conn.execute(
+                f"SELECT {columns} FROM documents JOIN entries ON entries.id = documents.rowid "
+                f"WHERE {' AND '.join(where)} ORDER BY {order} LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def count(self) -> int:
+        """已索引的文档数"""
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,151 @@
+"""
+活动快照存储（JSON 文件）
+更新任务拉取的 Issues/PRs 列表按仓库保存为快照，随后的报告任务可直接复用，
+只为快照未覆盖的时间段调用 Search API
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+
+def _parse_time(value: str) -> datetime:
+    """解析 ISO 时间字符串，缺少时区时按 UTC 处理"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def select_window_items(items: List[Dict], start_date: datetime, end_date: datetime) -> List[Dict]:
+    """按 Search API 的语义从条目中筛选日期范围内已关闭的条目
+
+    与 `created:A..B` / `updated:A..B` 一致，按日期（含首尾两天）比较。
+    结果按编号去重，新创建的在前（按创建时间倒序），更新的在后（按更新时间倒序），
+    并重新计算 is_new / is_updated 标记。
+    """
+    first_day = start_date.strftime('%Y-%m-%d')
+    last_day = end_date.strftime('%Y-%m-%d')
+
+    unique = {}
+    for item in items:
+        if item.get('state') != 'closed':
+            continue
+        created_day = item['created_at'][:10]
+        updated_day = item['updated_at'][:10]
+        is_new = first_day <= created_day <= last_day
+        if not is_new and not (first_day <= updated_day <= last_day):
+            continue
+        unique[item['number']] = dict(item, is_new=is_new, is_updated=not is_new)
+
+    new_items = sorted((i for i in unique.values() if i['is_new']),
+                       key=lambda i: i['created_at'], reverse=True)
+    updated_items = sorted((i for i in unique.values() if not i['is_new']),
+                           key=lambda i: i['updated_at'], reverse=True)
+    return new_items + updated_items
+
+
+class ActivitySnapshotStore:
+    """按仓库保存的 Issues/PRs 活动快照"""
+
+    def __init__(self, path: str = "data/cache/activity_snapshots.json", max_age_minutes: int = 120):
+        """初始化快照存储
+
+        Args:
+            path: 快照 JSON 文件路径
+            max_age_minutes: 快照的最长有效时间（分钟），超时后不再复用
+        """
+        self.path = Path(path)
+        self.max_age = timedelta(minutes=max_age_minutes)
+        self._lock = threading.Lock()
+        self.data: Dict[str, Dict] = self._load()
+
+    @classmethod
+    def from_config(cls, config) -> Optional['ActivitySnapshotStore']:
+        """根据配置创建快照存储，未启用时返回 None"""
+        if not config.get("github.snapshot.enabled", True):
+            return None
+        return cls(
+            path=config.get("github.snapshot.path", "data/cache/activity_snapshots.json"),
+            max_age_minutes=config.get("github.snapshot.max_age_minutes", 120),
+        )
+
+    def _load(self) -> Dict:
+        """从文件加载快照"""
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"加载活动快照失败: {e}，使用空快照")
+            return {}
+
+    def _save(self):
+        """保存快照到文件，同时清理过期快照（调用方需持有锁）"""
+        now = datetime.now(timezone.utc)
+        for repo_name in list(self.data):
+            kinds = self.data[repo_name]
+            for kind in list(kinds):
+                if now - _parse_time(kinds[kind]['fetched_at']) > self.max_age:
+                    del kinds[kind]
+            if not kinds:
+                del self.data[repo_name]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"保存活动快照失败: {e}")
+
+    def record(self, repo_name: str, kind: str, items: List[Dict],
+               covered_from: datetime, fetched_at: datetime = None):
+        """记录快照
+
+        Args:
+            repo_name: 仓库名称
+            kind: 条目类型 (issues, pull_requests)
+            items: 所有更新时间不早于 covered_from 的条目（不限状态）
+            covered_from: 快照完整覆盖的起始时间
+            fetched_at: 拉取时间，默认为当前时间
+        """
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        with self._lock:
+            self.data.setdefault(repo_name, {})[kind] = {
+                'fetched_at': fetched_at.isoformat(),
+                'covered_from': covered_from.isoformat(),
+                'items': items
+            }
+            self._save()
+        logger.debug(f"已记录 {repo_name} {kind} 快照: {len(items)} 条，覆盖自 {covered_from.isoformat()}")
+
+    def lookup(self, repo_name: str, kind: str, start_date: datetime,
+               end_date: datetime) -> Optional[Tuple[List[Dict], Optional[Tuple[datetime, datetime]], datetime]]:
+        """查询快照
+
+        Returns:
+            None 表示没有可用快照；否则返回 (快照条目, 缺失时间段, 快照拉取时间)，
+            缺失时间段为 None 表示快照完整覆盖该日期范围
+        """
+        with self._lock:
+            snapshot = self.data.get(repo_name, {}).get(kind)
+            if not snapshot:
+                return None
+            fetched_at = _parse_time(snapshot['fetched_at'])
+            # 拉取之后的变化无从得知，由最长有效时间限制数据的陈旧程度
+            if datetime.now(timezone.utc) - fetched_at > self.max_age:
+                return None
+            items = list(snapshot['items'])
+            covered_from = _parse_time(snapshot['covered_from'])
+
+        window_start = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        if covered_from <= window_start:
+            return items, None, fetched_at
+        if covered_from.strftime('%Y-%m-%d') > end_date.strftime('%Y-%m-%d'):
+            # 快照与日期范围没有重叠
+            return None
+        # 快照只覆盖后半段，前半段（含边界当天）需要补充获取
+        return items, (window_start, covered_from), fetched_at
@@ -2,6 +2,12 @@
 Web UI 模块
 """
 
-from src.web.gradio_ui import GitHubSentinelUI
-
 __all__ = ['GitHubSentinelUI']
+
+
+def __getattr__(name):
+    # 按需导入 Gradio 界面，未安装 gradio 时仍可使用 report_jobs 等模块
+    if name == 'GitHubSentinelUI':
+        from src.web.gradio_ui import GitHubSentinelUI
+        return GitHubSentinelUI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,28 +7,123 @@ import gradio as gr
 from datetime import datetime, timedelta
 from loguru import logger
 import os
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from src.core.subscription_manager import SubscriptionManager
+from src.core.subscription_manager import SubscriptionManager, format_schedule
 from src.core.github_client import GitHubClient
+from src.core.http_pool import HTTPPool
+from src.core.metrics import WINDOW_LABELS, MetricsEngine
 from src.ai.report_generator import ReportGenerator
 from src.storage.database import Database
+from src.storage.search_index import DOCUMENT_KINDS
+from src.web.report_jobs import JOB_STATUSES, ReportJob, ReportJobManager
 from src.config_loader import ConfigLoader
 
 
+# 趋势图的统计方式 -> 滑动窗口天数
+METRIC_WINDOWS = {"按日": 1, "最近 7 天滚动": 7, "最近 30 天滚动": 30}
+
+# 等待后台报告任务时刷新进度的间隔（秒）
+JOB_POLL_INTERVAL = 1.0
+
+
 class GitHubSentinelUI:
     """GitHub Sentinel Web UI"""
     
-    def __init__(self, config_path: str = "config/config.yaml"):
-        """初始化 UI"""
-        self.config = ConfigLoader(config_path)
-        self.db = Database(self.config.get("database.path", "data/sentinel.json"))
-        self.github_client = GitHubClient(self.config.get("github.token"))
-        self.subscription_manager = SubscriptionManager(self.db, self.github_client)
-        self.report_generator = ReportGenerator(self.config)
+    def __init__(self, config_path: str = "config/config.yaml", sentinel=None):
+        """初始化 UI
+        
+        Args:
+            config_path: 配置文件路径（提供 sentinel 时忽略）
+            sentinel: GitHubSentinel 实例（可选）。serve 模式下传入，UI 与后台调度器
+                共用数据存储、GitHub 客户端和连接池，并可查看、触发定时任务
+        """
+        self.sentinel = sentinel
+        if sentinel is not None:
+            self.config = sentinel.config
+            self.db = sentinel.db
+            self.github_client = sentinel.github_client
+            self.subscription_manager = sentinel.subscription_manager
+            self.http_pool = sentinel.http_pool
+            self.report_generator = sentinel.report_generator
+            self.metrics = sentinel.metrics
+        else:
+            self.config = ConfigLoader(config_path)
+            self.db = Database(self.config.get("database.path", "data/sentinel.json"))
+            self.http_pool = HTTPPool.from_config(self.config)
+            self.github_client = GitHubClient.from_config(self.config, http_pool=self.http_pool)
+            self.subscription_manager = SubscriptionManager(self.db, self.github_client)
+            self.report_generator = ReportGenerator(self.config, http_pool=self.http_pool,
+                                                    search_index=self.github_client.search_index,
+                                                    release_cache=self.github_client.release_cache)
+            self.metrics = None
+            if self.github_client.warehouse is not None and self.config.get("metrics.enabled", True):
+                self.metrics = MetricsEngine(self.github_client.warehouse)
+        
+        # 最近一次加载的每日聚合（切换图表指标时复用）
+        self._aggregates = None
+        
+        # 后台报告任务：相同日期范围的进行中任务只执行一次
+        self.report_jobs = ReportJobManager(
+            self._generate_repo_report,
+            max_jobs=self.config.get("web.report_jobs.max_jobs", 2),
+            repo_workers=self.config.get("web.report_jobs.repo_workers", 1),
+            history=self.config.get("web.report_jobs.history", 20),
+        )
         
         logger.info("GitHub Sentinel Web UI 初始化成功")
     
+    @property
+    def scheduler(self):
+        """同进程运行的调度器（serve 模式），否则为 None"""
+        if self.sentinel is None or not self.sentinel.scheduler.running:
+            return None
+        return self.sentinel.scheduler
+    
+    def scheduler_status(self) -> Tuple[str, dict]:
+        """定时任务状态：任务列表与最近运行记录
+        
+        Returns:
+            Tuple[status_markdown, job_dropdown_update]
+        """
+        scheduler = self.scheduler
+        if scheduler is None:
+            return "ℹ️ 定时任务未在本进程中运行（使用 `python -m src.main serve` 启动）", gr.update(choices=[])
+        
+        def fmt(value):
+            return value.astimezone().strftime("%Y-%m-%d %H:%M:%S") if value else "-"
+        
+        jobs = scheduler.job_overview()
+        result = "### ⏰ 调度任务\n\n| 任务 | 下次运行 | 状态 |\n|---|---|---|\n"
+        for job in jobs:
+            state = f"运行中（{fmt(job['running_since'])} 开始）" if job['running_since'] else "等待"
+            result += f"| {job['name']} | {fmt(job['next_run_time'])} | {state} |\n"
+        
+        runs = scheduler.recent_runs()
+        result += "\n### 🕘 最近运行\n\n"
+        if not runs:
+            result += "暂无运行记录\n"
+        else:
+            status_icons = {'success': '✅', 'error': '❌', 'missed': '⏭️', 'skipped': '⏸️'}
+            result += "| 任务 | 结果 | 开始 | 结束 | 错误 |\n|---|---|---|---|---|\n"
+            for run in runs:
+                icon = status_icons.get(run['status'], run['status'])
+                result += f"| {run['job_id']} | {icon} | {fmt(run['started_at'])} | {fmt(run['finished_at'])} | {run['error'] or ''} |\n"
+        
+        choices = [(job['name'], job['id']) for job in jobs]
+        return result, gr.update(choices=choices)
+    
+    def trigger_scheduled_job(self, job_id: str) -> str:
+        """立即运行一个已有的调度任务（由后台调度器执行，不另起任务）"""
+        scheduler = self.scheduler
+        if scheduler is None:
+            return "⚠️ 定时任务未在本进程中运行"
+        if not job_id:
+            return "❌ 请选择要运行的任务"
+        if scheduler.trigger_job(job_id):
+            return f"✅ 已触发任务: {job_id}，可点击刷新查看运行状态"
+        return f"⚠️ 未找到任务: {job_id}"
+    
     def list_subscriptions(self) -> str:
         """列出所有订阅"""
         try:
@@ -46,6 +141,7 @@ class GitHubSentinelUI:
                     result += f"  - 最后更新: 从未检查\n"
                 if sub.get('tags'):
                     result += f"  - 标签: {sub['tags']}\n"
+                result += f"  - 调度: {format_schedule(sub.get('schedule'))}\n"
                 result += "\n"
             
             return result
@@ -53,7 +149,7 @@ class GitHubSentinelUI:
             logger.error(f"获取订阅列表失败: {e}")
             return f"❌ 获取订阅列表失败: {str(e)}"
     
-    def add_subscription(self, repo_name: str, frequency: str) -> str:
+    def add_subscription(self, repo_name: str, frequency: str, time: str = None) -> str:
         """添加订阅"""
         try:
             if not repo_name or not repo_name.strip():
@@ -69,10 +165,13 @@ class GitHubSentinelUI:
             if not self.github_client.validate_repository(repo_name):
                 return f"❌ 仓库 {repo_name} 不存在或无法访问"
             
-            # 添加订阅（使用 frequency 作为标签）
-            tags = [frequency] if frequency else []
-            subscription_id = self.subscription_manager.add_subscription(repo_name, tags)
-            return f"✅ 成功订阅仓库: {repo_name} ({frequency}) [ID: {subscription_id}]"
+            # 添加订阅（更新频率和时间保存在订阅的调度设置中）
+            time = time.strip() if time else None
+            subscription_id = self.subscription_manager.add_subscription(
+                repo_name, frequency=frequency, time=time or None
+            )
+            schedule_desc = f"{frequency} {time}" if time else frequency
+            return f"✅ 成功订阅仓库: {repo_name} ({schedule_desc}) [ID: {subscription_id}]"
         
         except Exception as e:
             logger.error(f"添加订阅失败: {e}")
@@ -96,89 +195,256 @@ class GitHubSentinelUI:
             logger.error(f"移除订阅失败: {e}")
             return f"❌ 移除订阅失败: {str(e)}"
     
-    def generate_all_repos_report(self, start_date: str, end_date: str) -> Tuple[str, str, List[str]]:
-        """为所有订阅仓库生成自定义日期范围报告
+    def _metrics_section(self, repo_name: str, start: datetime, end: datetime) -> Optional[str]:
+        """计算报告的趋势指标章节，失败时返回 None"""
+        if self.metrics is None:
+            return None
+        try:
+            return self.metrics.report_section(
+                repo_name, start.date(), end.date(),
+                min_days=self.config.get("metrics.min_days", 7)
+            )
+        except Exception as e:
+            logger.warning(f"计算 {repo_name} 的趋势指标失败: {e}")
+            return None
+    
+    def metrics_overview(self, days: float, metric_label: str, window_label: str):
+        """所有订阅仓库最近若干天的指标趋势
+        
+        加载每日缓存并建立前缀和索引，之后切换指标或滑动窗口只使用已加载的索引。
+        
+        Returns:
+            Tuple[summary_markdown, chart_dataframe]
+        """
+        if self.metrics is None:
+            return "⚠️ 未启用本地活动仓库（warehouse.enabled）或指标计算（metrics.enabled）", self._chart_frame([])
+        
+        repos = [sub['repo_name'] for sub in self.subscription_manager.list_subscriptions()]
+        if not repos:
+            return "⚠️ 没有订阅任何仓库，请先添加订阅", self._chart_frame([])
+        
+        days = max(int(days or 30), 1)
+        end = datetime.utcnow().date()
+        start = end - timedelta(days=days - 1)
+        
+        try:
+            self._aggregates = self.metrics.aggregates(repos, start, end)
+        except Exception as e:
+            logger.error(f"计算趋势指标失败: {e}")
+            return f"❌ 计算趋势指标失败: {str(e)}", self._chart_frame([])
+        
+        labels = list(WINDOW_LABELS.values())
+        lines = [
+            f"📅 {start} 至 {end}（基于本地活动仓库中已拉取的数据）",
+            "",
+            "| 仓库 | " + " | ".join(labels) + " |",
+            "| --- " * (len(labels) + 1) + "|",
+        ]
+        for repo_name in repos:
+            summary = self._aggregates.summary(repo_name)
+            values = ["-" if summary[name] is None else f"{summary[name]:.1f}".removesuffix(".0")
+                      for name in WINDOW_LABELS]
+            lines.append(f"| {repo_name} | " + " | ".join(values) + " |")
+        
+        return '\n'.join(lines), self.metrics_chart(metric_label, window_label)
+    
+    def metrics_chart(self, metric_label: str, window_label: str):
+        """根据已加载的每日聚合绘制所选指标（按日或滑动窗口）"""
+        if self._aggregates is None:
+            return self._chart_frame([])
+        metric = next((name for name, label in WINDOW_LABELS.items() if label == metric_label), 'prs_merged')
+        window = METRIC_WINDOWS.get(window_label, 1)
+        return self._chart_frame(self._aggregates.chart_rows(metric, window))
+    
+    @staticmethod
+    def _chart_frame(rows: List[dict]):
+        """图表数据转换为 DataFrame"""
+        import pandas as pd
+        
+        chart = pd.DataFrame(rows, columns=['date', 'repo', 'value'])
+        chart['date'] = pd.to_datetime(chart['date'])
+        return chart
+    
+    def search_activity(self, query: str, repo_name: str = "", kind_label: str = "全部") -> str:
+        """全文搜索已拉取的 Issues、PRs 和生成的报告
+        
+        Returns:
+            搜索结果 Markdown
+        """
+        index = self.github_client.search_index
+        if index is None:
+            return "⚠️ 搜索索引未启用（search.enabled）"
+        if not query or not query.strip():
+            return "⚠️ 请输入搜索关键词"
+        
+        kind = next((k for k, label in DOCUMENT_KINDS.items() if label == kind_label), None)
+        try:
+            results = index.search(query.strip(), repo_name=repo_name.strip() or None, kind=kind, limit=50)
+        except Exception as e:
+            logger.error(f"搜索失败: {e}")
+            return f"❌ 搜索失败: {str(e)}"
+        
+        if not results:
+            return f"没有找到与 “{query}” 相关的内容"
+        
+        lines = [f"### 🔎 找到 {len(results)} 条结果\n"]
+        for r in results:
+            link = f"[{r['title']}]({r['url']})" if r['url'] and r['url'].startswith('http') else f"**{r['title']}**"
+            location = f" · `{r['url']}`" if r['kind'] == 'report' else ""
+            lines.append(f"- {link} — {r['repo']} · {DOCUMENT_KINDS[r['kind']]} · {r['date'] or '-'}{location}")
+            if r['snippet']:
+                lines.append(f"  > {r['snippet'].replace(chr(10), ' ')}")
+        return '\n'.join(lines)
+    
+    def _generate_repo_report(self, repo_name: str, params: Dict) -> Dict:
+        """为一个仓库生成自定义日期范围报告（在后台报告任务中执行）
         
         直接获取 Issues 和 PRs 数据，与日期范围一致
         
         Returns:
-            Tuple[status_msg, report_content, report_files]
+            {'report_file', 'files', 'content', 'issues', 'prs'}
         """
+        start, end = params['start'], params['end']
+        # 验证仓库
+        if not self.github_client.validate_repository(repo_name):
+            raise RuntimeError("仓库不存在或无法访问")
+        
+        logger.info(f"正在处理仓库 {repo_name} ({start:%Y-%m-%d} 至 {end:%Y-%m-%d})...")
+        
+        # 直接获取指定日期范围的 Issues 和 PRs（作为 AI 报告的背景输入）
+        issues = self.github_client.get_daily_issues(repo_name, start_date=start, end_date=end)
+        prs = self.github_client.get_daily_pull_requests(repo_name, start_date=start, end_date=end)
+        
+        logger.info(f"仓库 {repo_name}: 获取到 {len(issues)} 个 Issues, {len(prs)} 个 PRs")
+        
+        # 导出进展数据
+        progress_file = self.github_client.export_daily_progress(
+            repo_name, issues, prs, 
+            start_date=start, end_date=end,
+            output_dir="data/daily_progress",
+            metrics_section=self._metrics_section(repo_name, start, end)
+        )
+        
+        # 生成 AI 报告（基于获取的 Issues 和 PRs）
+        report_file = self.report_generator.generate_daily_report(
+            repo_name, progress_file,
+            output_dir="data/reports",
+            start_date=start, end_date=end,
+            issues=issues, pull_requests=prs
+        )
+        
+        # 收集报告文件路径（包括归档的 HTML 版本）
+        files = [report_file]
+        html_file = os.path.splitext(report_file)[0] + '.html'
+        if os.path.exists(html_file):
+            files.append(html_file)
+        
+        with open(report_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return {'report_file': report_file, 'files': files, 'content': content,
+                'issues': len(issues), 'prs': len(prs)}
+    
+    def submit_report_job(self, start_date: str, end_date: str) -> Tuple[Optional[ReportJob], str]:
+        """提交批量报告任务，相同日期范围的任务正在进行时复用该任务
+        
+        Returns:
+            (任务, 提示信息)，参数无效或没有订阅时任务为 None
+        """
+        subscriptions = self.subscription_manager.list_subscriptions()
+        if not subscriptions:
+            return None, "⚠️ 没有订阅任何仓库，请先添加订阅"
+        
+        # 解析日期
         try:
-            subscriptions = self.subscription_manager.list_subscriptions()
-            
-            if not subscriptions:
-                return "⚠️ 没有订阅任何仓库，请先添加订阅", "", []
-            
-            # 解析日期
-            try:
-                start = datetime.strptime(start_date, "%Y-%m-%d")
-                end = datetime.strptime(end_date, "%Y-%m-%d")
-            except ValueError:
-                return "❌ 日期格式错误，请使用 YYYY-MM-DD 格式", "", []
-            
-            if start > end:
-                return "❌ 开始日期不能晚于结束日期", "", []
-            
-            success_msg = f"# 📝 批量报告生成\n\n"
-            success_msg += f"📅 日期范围: {start_date} 至 {end_date}\n"
-            success_msg += f"📦 处理仓库: {len(subscriptions)} 个\n\n---\n\n"
-            
-            all_reports = ""
-            report_files = []  # 收集所有生成的报告文件路径
-            
-            for idx, sub in enumerate(subscriptions, 1):
-                repo_name = sub['repo_name']
-                success_msg += f"{idx}. **{repo_name}**\n"
-                
-                try:
-                    # 验证仓库
-                    if not self.github_client.validate_repository(repo_name):
-                        success_msg += f"   - ❌ 仓库不存在或无法访问\n"
-                        continue
-                    
-                    logger.info(f"正在处理仓库 {repo_name} ({start_date} 至 {end_date})...")
-                    
-                    # 直接获取指定日期范围的 Issues 和 PRs（作为 AI 报告的背景输入）
-                    issues = self.github_client.get_daily_issues(repo_name, start_date=start, end_date=end)
-                    prs = self.github_client.get_daily_pull_requests(repo_name, start_date=start, end_date=end)
-                    
-                    logger.info(f"仓库 {repo_name}: 获取到 {len(issues)} 个 Issues, {len(prs)} 个 PRs")
-                    
-                    # 导出进展数据
-                    progress_file = self.github_client.export_daily_progress(
-                        repo_name, issues, prs, 
-                        start_date=start, end_date=end,
-                        output_dir="data/daily_progress"
-                    )
-                    
-                    # 生成 AI 报告（基于获取的 Issues 和 PRs）
-                    report_file = self.report_generator.generate_daily_report(
-                        repo_name, progress_file,
-                        output_dir="data/reports",
-                        start_date=start, end_date=end
-                    )
-                    
-                    # 收集报告文件路径
-                    report_files.append(report_file)
-                    
-                    # 读取报告内容
-                    with open(report_file, 'r', encoding='utf-8') as f:
-                        report_content = f.read()
-                    
-                    success_msg += f"   - ✅ 报告: `{report_file}`\n"
-                    success_msg += f"   - 📊 数据: {len(issues)} Issues, {len(prs)} PRs\n"
-                    all_reports += f"\n\n---\n\n# 📊 {repo_name}\n\n{report_content}\n\n"
-                    
-                except Exception as e:
-                    logger.error(f"生成 {repo_name} 报告失败: {e}")
-                    success_msg += f"   - ❌ 失败: {str(e)}\n"
-            
-            return success_msg, all_reports, report_files
+            start = datetime.strptime(start_date, "%Y-%m-%d")
+            end = datetime.strptime(end_date, "%Y-%m-%d")
+        except ValueError:
+            return None, "❌ 日期格式错误，请使用 YYYY-MM-DD 格式"
+        
+        if start > end:
+            return None, "❌ 开始日期不能晚于结束日期"
+        
+        job, created = self.report_jobs.submit(
+            f"{start_date}..{end_date}", [sub['repo_name'] for sub in subscriptions],
+            {'start': start, 'end': end}
+        )
+        if created:
+            return job, f"🆕 已提交报告任务 `{job.id}`"
+        return job, f"♻️ 相同日期范围的任务 `{job.id}` 正在进行，已复用该任务"
+    
+    @staticmethod
+    def render_report_job(job: ReportJob, note: str = "") -> Tuple[str, str, List[str]]:
+        """渲染任务进度和已完成的报告
+        
+        Returns:
+            Tuple[status_msg, report_content, report_files]
+        """
+        state = job.snapshot()
+        start_date, _, end_date = state['key'].partition('..')
+        status_msg = f"# 📝 批量报告生成\n\n"
+        if note:
+            status_msg += f"{note}\n\n"
+        status_msg += f"🆔 任务: `{state['id']}` · {JOB_STATUSES[state['status']]}\n"
+        status_msg += f"📅 日期范围: {start_date} 至 {end_date}\n"
+        status_msg += f"📦 处理仓库: {len(state['progress'])} 个\n\n---\n\n"
+        
+        all_reports = ""
+        report_files = []
+        for idx, (repo_name, progress) in enumerate(state['progress'].items(), 1):
+            status_msg += f"{idx}. **{repo_name}** · {progress}\n"
+            result = state['results'].get(repo_name)
+            if result is None:
+                continue
+            if 'error' in result:
+                status_msg += f"   - ❌ 失败: {result['error']}\n"
+                continue
+            status_msg += f"   - ✅ 报告: `{result['report_file']}`\n"
+            status_msg += f"   - 📊 数据: {result['issues']} Issues, {result['prs']} PRs\n"
+            report_files.extend(result['files'])
+            all_reports += f"\n\n---\n\n# 📊 {repo_name}\n\n{result['content']}\n\n"
+        
+        return status_msg, all_reports, report_files
+    
+    def generate_all_repos_report(self, start_date: str, end_date: str, progress=gr.Progress()):
+        """为所有订阅仓库生成自定义日期范围报告
+        
+        报告在后台任务中生成，这里按间隔刷新进度并逐步输出已完成的报告；
+        页面关闭后任务继续执行，可凭任务 ID 查看结果或取消。
         
+        Yields:
+            Tuple[job_id, status_msg, report_content, report_files]
+        """
+        try:
+            job, note = self.submit_report_job(start_date, end_date)
         except Exception as e:
-            logger.error(f"批量生成报告失败: {e}")
-            return f"❌ 批量生成报告失败: {str(e)}", "", []
+            logger.error(f"提交报告任务失败: {e}")
+            yield "", f"❌ 批量生成报告失败: {str(e)}", "", []
+            return
+        if job is None:
+            yield "", note, "", []
+            return
+        
+        while not job.wait(JOB_POLL_INTERVAL):
+            running = [repo for repo, state in job.snapshot()['progress'].items() if state == '进行中']
+            progress(job.fraction(), desc=f"正在生成: {', '.join(running)}" if running else "排队中")
+            yield (job.id, *self.render_report_job(job, note))
+        yield (job.id, *self.render_report_job(job, note))
+    
+    def report_job_status(self, job_id: str) -> Tuple[str, str, List[str]]:
+        """查看任务进度和已完成的报告"""
+        job = self.report_jobs.get(job_id)
+        if job is None:
+            return f"⚠️ 任务不存在: {job_id}", "", []
+        return self.render_report_job(job)
+    
+    def cancel_report_job(self, job_id: str) -> str:
+        """取消任务：正在生成的仓库会完成，尚未开始的仓库不再处理"""
+        if self.report_jobs.cancel(job_id):
+            return f"🛑 已请求取消任务 `{job_id.strip()}`，正在生成的仓库完成后停止"
+        job = self.report_jobs.get(job_id)
+        if job is None:
+            return f"⚠️ 任务不存在: {job_id}"
+        return f"ℹ️ 任务 `{job.id}` {JOB_STATUSES[job.status]}，无需取消"
     
     def build_interface(self):
         """构建 Gradio 界面"""
@@ -205,6 +471,11 @@ class GitHubSentinelUI:
                         value="daily",
                         label="更新频率"
                     )
+                    add_time = gr.Textbox(
+                        label="更新时间（可选）",
+                        placeholder="HH:MM",
+                        info="留空则在全局调度时间后自动分散执行"
+                    )
                     add_btn = gr.Button("➕ 添加订阅", variant="primary", size="lg")
                     add_output = gr.Markdown()
                 
@@ -247,6 +518,16 @@ class GitHubSentinelUI:
                 )
             
             generate_btn = gr.Button("🤖 生成 AI 报告", variant="primary", size="lg")
+            with gr.Row():
+                job_id_input = gr.Textbox(
+                    label="任务 ID",
+                    placeholder="提交后自动填写",
+                    info="报告在后台生成，关闭页面后可凭任务 ID 查看结果",
+                    scale=3
+                )
+                job_status_btn = gr.Button("🔄 查看任务", scale=1)
+                job_cancel_btn = gr.Button("🛑 取消任务", variant="stop", scale=1)
+            job_cancel_output = gr.Markdown()
             report_status = gr.Markdown()
             report_content = gr.Markdown()
             
@@ -260,10 +541,61 @@ class GitHubSentinelUI:
                 visible=True
             )
             
+            # 搜索区域
+            gr.Markdown("---")
+            gr.Markdown("## 🔎 搜索")
+            with gr.Row():
+                search_input = gr.Textbox(
+                    label="关键词",
+                    placeholder="例如: memory leak 或 内存泄漏",
+                    info="多个关键词需同时出现；少于 3 个字符的关键词检索较慢",
+                    scale=3
+                )
+                search_repo = gr.Textbox(label="仓库（可选）", placeholder="owner/repo", scale=2)
+                search_kind = gr.Dropdown(
+                    choices=["全部"] + list(DOCUMENT_KINDS.values()),
+                    value="全部",
+                    label="类型",
+                    scale=1
+                )
+            search_btn = gr.Button("🔎 搜索")
+            search_output = gr.Markdown()
+            
+            # 趋势指标区域
+            gr.Markdown("---")
+            gr.Markdown("## 📈 趋势指标")
+            with gr.Row():
+                metrics_days = gr.Number(label="最近天数", value=30, precision=0, scale=1)
+                metrics_select = gr.Dropdown(
+                    choices=list(WINDOW_LABELS.values()),
+                    value=WINDOW_LABELS['prs_merged'],
+                    label="图表指标",
+                    scale=2
+                )
+                window_select = gr.Dropdown(
+                    choices=list(METRIC_WINDOWS),
+                    value="按日",
+                    label="统计方式",
+                    scale=1
+                )
+                metrics_btn = gr.Button("📈 计算指标", scale=1)
+            metrics_plot = gr.LinePlot(x="date", y="value", color="repo", label="按日趋势")
+            metrics_output = gr.Markdown()
+            
+            # 定时任务区域（serve 模式下可查看和触发后台调度任务）
+            gr.Markdown("---")
+            gr.Markdown("## ⏰ 定时任务")
+            with gr.Row():
+                job_select = gr.Dropdown(choices=[], label="调度任务", scale=3)
+                trigger_btn = gr.Button("▶️ 立即运行", scale=1)
+                refresh_jobs_btn = gr.Button("🔄 刷新", size="sm", scale=1)
+            trigger_output = gr.Markdown()
+            jobs_output = gr.Markdown()
+            
             # 事件绑定
             add_btn.click(
                 fn=self.add_subscription,
-                inputs=[add_repo_input, add_frequency],
+                inputs=[add_repo_input, add_frequency, add_time],
                 outputs=add_output
             )
             remove_btn.click(
@@ -278,14 +610,59 @@ class GitHubSentinelUI:
             generate_btn.click(
                 fn=self.generate_all_repos_report,
                 inputs=[start_date_input, end_date_input],
+                outputs=[job_id_input, report_status, report_content, download_files]
+            )
+            job_status_btn.click(
+                fn=self.report_job_status,
+                inputs=job_id_input,
                 outputs=[report_status, report_content, download_files]
             )
+            job_cancel_btn.click(
+                fn=self.cancel_report_job,
+                inputs=job_id_input,
+                outputs=job_cancel_output
+            )
+            search_btn.click(
+                fn=self.search_activity,
+                inputs=[search_input, search_repo, search_kind],
+                outputs=search_output
+            )
+            search_input.submit(
+                fn=self.search_activity,
+                inputs=[search_input, search_repo, search_kind],
+                outputs=search_output
+            )
+            metrics_btn.click(
+                fn=self.metrics_overview,
+                inputs=[metrics_days, metrics_select, window_select],
+                outputs=[metrics_output, metrics_plot]
+            )
+            for selector in (metrics_select, window_select):
+                selector.change(
+                    fn=self.metrics_chart,
+                    inputs=[metrics_select, window_select],
+                    outputs=metrics_plot
+                )
+            
+            refresh_jobs_btn.click(
+                fn=self.scheduler_status,
+                outputs=[jobs_output, job_select]
+            )
+            trigger_btn.click(
+                fn=self.trigger_scheduled_job,
+                inputs=job_select,
+                outputs=trigger_output
+            )
             
             # 初始加载订阅列表
             interface.load(
                 fn=self.list_subscriptions,
                 outputs=subscriptions_output
             )
+            interface.load(
+                fn=self.scheduler_status,
+                outputs=[jobs_output, job_select]
+            )
             
             gr.Markdown("""
             ---
@@ -307,9 +684,19 @@ class GitHubSentinelUI:
         return interface
     
     def launch(self, **kwargs):
-        """启动 Web 界面"""
+        """启动 Web 界面
+        
+        启用 Gradio 队列：限制同时执行的事件数和排队长度，生成器事件（报告进度）通过队列推送更新。
+        """
         interface = self.build_interface()
-        interface.launch(**kwargs)
+        interface.queue(
+            default_concurrency_limit=self.config.get("web.queue.concurrency_limit", 4),
+            max_size=self.config.get("web.queue.max_size", 64)
+        )
+        try:
+            interface.launch(**kwargs)
+        finally:
+            self.report_jobs.shutdown(wait=False)
 
 
 def main():
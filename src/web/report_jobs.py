@@ -0,0 +1,206 @@
+"""
+后台报告任务
+Web 界面提交的批量报告在后台线程中执行，按任务 ID 查询进度、结果或取消；
+相同参数（日期范围）的进行中任务只执行一次，后来的请求直接复用
+"""
+
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+
+# 任务状态 -> 显示名称
+JOB_STATUSES = {
+    'pending': '排队中',
+    'running': '进行中',
+    'done': '已完成',
+    'cancelled': '已取消',
+}
+
+
+class ReportJob:
+    """一次批量报告任务
+
+    repos 中每个仓库的进度为 等待中 / 进行中 / 完成 / 失败 / 已取消；
+    results 按完成顺序保存每个仓库的结果（runner 的返回值，失败时为 {'error': ...}）。
+    """
+
+    def __init__(self, job_id: str, key: str, repos: List[str]):
+        self.id = job_id
+        self.key = key
+        self.repos = list(repos)
+        self.status = 'pending'
+        self.progress: Dict[str, str] = {repo: '等待中' for repo in self.repos}
+        self.results: Dict[str, Dict] = {}
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """任务是否仍在排队或执行"""
+        return self.status in ('pending', 'running')
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已请求取消"""
+        return self._cancel.is_set()
+
+    def fraction(self) -> float:
+        """已处理（完成、失败或取消）的仓库比例"""
+        if not self.repos:
+            return 1.0
+        with self._lock:
+            finished = sum(1 for state in self.progress.values() if state not in ('等待中', '进行中'))
+        return finished / len(self.repos)
+
+    def snapshot(self) -> Dict:
+        """任务状态的副本，供界面渲染"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'key': self.key,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'results': dict(self.results),
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+            }
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待任务结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def _set(self, repo_name: str, state: str, result: Dict = None):
+        with self._lock:
+            self.progress[repo_name] = state
+            if result is not None:
+                self.results[repo_name] = result
+
+    def _finish(self):
+        """结束任务：因取消而跳过了仓库时状态为已取消，否则为已完成"""
+        with self._lock:
+            skipped = [repo for repo, state in self.progress.items() if state == '等待中']
+            for repo in skipped:
+                self.progress[repo] = '已取消'
+            self.status = 'cancelled' if skipped and self._cancel.is_set() else 'done'
+            self.finished_at = datetime.now()
+        self._done.set()
+
+
+class ReportJobManager:
+    """后台报告任务管理器
+
+    任务在 max_jobs 个线程中执行，每个任务内的仓库依次处理（由 repo_workers 控制并发），
+    取消在仓库之间生效：正在生成的仓库会完成，尚未开始的仓库不再处理。
+    只保留最近 history 个已结束的任务。
+    """
+
+    def __init__(self, runner: Callable[[str, Dict], Dict], max_jobs: int = 2, repo_workers: int = 1,
+                 history: int = 20):
+        """初始化任务管理器
+
+        Args:
+            runner: 生成单个仓库报告的函数，参数为 (仓库名, 任务参数)，返回结果字典
+            max_jobs: 同时执行的任务数
+            repo_workers: 每个任务内并发处理的仓库数
+            history: 保留的已结束任务数
+        """
+        self.runner = runner
+        self.repo_workers = max(1, repo_workers)
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_jobs), thread_name_prefix="report-job")
+        self._jobs: Dict[str, ReportJob] = {}
+        self._params: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, repos: List[str], params: Dict = None) -> Tuple[ReportJob, bool]:
+        """提交任务，相同 key 的任务仍在进行时直接返回该任务
+
+        Args:
+            key: 任务参数的标识（如日期范围），用于合并重复请求
+            repos: 要处理的仓库
+            params: 传给 runner 的参数
+
+        Returns:
+            (任务, 是否新建)
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.key == key and job.active:
+                    logger.info(f"报告任务 {key} 正在进行，复用任务 {job.id}")
+                    return job, False
+            job = ReportJob(uuid.uuid4().hex[:8], key, repos)
+            self._jobs[job.id] = job
+            self._params[job.id] = params or {}
+            self._prune()
+        self._executor.submit(self._run, job)
+        logger.info(f"已提交报告任务 {job.id}（{key}，{len(repos)} 个仓库）")
+        return job, True
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        """按 ID 查询任务"""
+        with self._lock:
+            return self._jobs.get((job_id or '').strip())
+
+    def jobs(self) -> List[ReportJob]:
+        """所有保留的任务，按创建时间倒序"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """请求取消任务，返回任务是否存在且仍在进行"""
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        job._cancel.set()
+        logger.info(f"已请求取消报告任务 {job.id}")
+        return True
+
+    def _prune(self):
+        """删除超出保留数量的已结束任务（调用方需持有锁）"""
+        finished = sorted((job for job in self._jobs.values() if not job.active), key=lambda job: job.created_at)
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.id]
+            self._params.pop(job.id, None)
+
+    def _run_repo(self, job: ReportJob, repo_name: str):
+        """处理任务中的一个仓库"""
+        if job.cancelled:
+            return
+        job._set(repo_name, '进行中')
+        try:
+            result = self.runner(repo_name, self._params.get(job.id, {}))
+            job._set(repo_name, '完成', result)
+        except Exception as e:
+            logger.error(f"报告任务 {job.id} 处理 {repo_name} 失败: {e}")
+            job._set(repo_name, '失败', {'error': str(e)})
+
+    def _run(self, job: ReportJob):
+        """执行任务"""
+        if job.cancelled:
+            job._finish()
+            return
+        with job._lock:
+            job.status = 'running'
+        try:
+            if self.repo_workers == 1:
+                for repo_name in job.repos:
+                    self._run_repo(job, repo_name)
+            else:
+                with ThreadPoolExecutor(max_workers=self.repo_workers) as executor:
+                    list(executor.map(lambda repo: self._run_repo(job, repo), job.repos))
+        finally:
+            job._finish()
+            logger.info(f"报告任务 {job.id} {JOB_STATUSES[job.status]}")
+
+    def shutdown(self, wait: bool = True):
+        """取消所有任务，wait 为 True 时等待正在生成的仓库完成"""
+        for job in self.jobs():
+            job._cancel.set()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,112 @@
+"""
+本地活动仓库测试
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+from src.core.github_client import GitHubClient
+from src.storage.activity_warehouse import ActivityWarehouse
+from src.storage.snapshot_store import ActivitySnapshotStore
+
+
+def make_item(number, created, updated):
+    """创建已关闭的条目"""
+    return {'number': number, 'title': f'Item {number}', 'state': 'closed',
+            'created_at': f'{created}T10:00:00+00:00', 'updated_at': f'{updated}T12:00:00+00:00'}
+
+
+def utc(day):
+    return datetime.fromisoformat(day).replace(tzinfo=timezone.utc)
+
+
+def test_backfill_only_missing_days(tmp_path):
+    """测试只补齐缺失的日期，已完整的历史日期不再请求"""
+    warehouse = ActivityWarehouse(str(tmp_path / "warehouse.sqlite"))
+    fetched_at = utc('2026-01-20')
+    fetch = Mock(return_value=([make_item(1, '2026-01-02', '2026-01-03'), make_item(2, '2025-12-01', '2026-01-04')],
+                               fetched_at))
+
+    items = warehouse.closed_activity("A/Repo", "issues", utc('2026-01-02'), utc('2026-01-04'), fetch)
+    assert sorted(i['number'] for i in items) == [1, 2]
+    fetch.assert_called_once_with(utc('2026-01-02'), utc('2026-01-04'))
+
+    # 已完整的日期直接读取本地数据
+    fetch.reset_mock()
+    fetch.return_value = ([make_item(3, '2026-01-06', '2026-01-06')], fetched_at)
+    items = warehouse.closed_activity("a/repo", "issues", utc('2026-01-03'), utc('2026-01-06'), fetch)
+    fetch.assert_called_once_with(utc('2026-01-05'), utc('2026-01-06'))
+    assert sorted(i['number'] for i in items) == [1, 2, 3]
+
+    fetch.reset_mock()
+    warehouse.closed_activity("a/repo", "issues", utc('2026-01-02'), utc('2026-01-06'), fetch)
+    fetch.assert_not_called()
+
+
+def test_today_is_refetched_and_replaced(tmp_path):
+    """测试未结束的日期每次重新拉取并替换"""
+    warehouse = ActivityWarehouse(str(tmp_path / "warehouse.sqlite"))
+    today = date(2026, 1, 10)
+    noon = datetime(2026, 1, 10, 12, tzinfo=timezone.utc)
+    warehouse.store_closed("a/repo", "issues", [make_item(1, '2026-01-10', '2026-01-10')], today, today, fetched_at=noon)
+    assert warehouse.missing_ranges("a/repo", "issues", utc('2026-01-09'), utc('2026-01-10'), today=today) == \
+        [(date(2026, 1, 9), date(2026, 1, 10))]
+
+    warehouse.store_closed("a/repo", "issues", [make_item(2, '2026-01-10', '2026-01-10')], today, today, fetched_at=noon)
+    assert [i['number'] for i in warehouse.query_closed("a/repo", "issues", utc('2026-01-10'), utc('2026-01-10'))] == [2]
+
+
+def test_day_fetched_before_midnight_stays_incomplete(tmp_path):
+    """测试在某天结束前拉取（如复用前一晚的快照）的数据不会把这一天标记为完整"""
+    warehouse = ActivityWarehouse(str(tmp_path / "warehouse.sqlite"))
+    day = date(2026, 1, 9)
+    evening = datetime(2026, 1, 9, 23, 0, tzinfo=timezone.utc)
+    warehouse.store_closed("a/repo", "issues", [make_item(1, '2026-01-09', '2026-01-09')], day, day, fetched_at=evening)
+    assert warehouse.missing_ranges("a/repo", "issues", utc('2026-01-09'), utc('2026-01-09'),
+                                    today=date(2026, 1, 10)) == [(day, day)]
+
+    midnight = datetime(2026, 1, 10, tzinfo=timezone.utc)
+    warehouse.store_closed("a/repo", "issues", [make_item(1, '2026-01-09', '2026-01-09')], day, day, fetched_at=midnight)
+    assert warehouse.missing_ranges("a/repo", "issues", utc('2026-01-09'), utc('2026-01-09'),
+                                    today=date(2026, 1, 10)) == []
+
+
+def test_events_append_only(tmp_path):
+    """测试提交按日期追加保存"""
+    warehouse = ActivityWarehouse(str(tmp_path / "warehouse.sqlite"))
+    commits = [{'sha': 'abc', 'date': '2026-01-02T01:00:00+00:00'}, {'sha': 'def', 'date': '2026-01-05T01:00:00+00:00'}]
+    warehouse.record_events("a/repo", "commits", commits, 'sha', 'date')
+    warehouse.record_events("a/repo", "commits", commits[:1], 'sha', 'date')
+
+    assert [c['sha'] for c in warehouse.events("a/repo", "commits", utc('2026-01-01'), utc('2026-01-31'))] == ['def', 'abc']
+
+
+@patch('src.core.github_client.Github')
+def test_client_reads_history_from_warehouse(mock_github, tmp_path):
+    """测试客户端读取历史日期范围时不再调用 Search API"""
+    warehouse = ActivityWarehouse(str(tmp_path / "warehouse.sqlite"))
+    client = GitHubClient("test_token", warehouse=warehouse)
+    client._search_closed = Mock(return_value=[make_item(7, '2026-01-02', '2026-01-02')])
+
+    first = client.get_daily_issues("a/repo", start_date=utc('2026-01-01'), end_date=utc('2026-01-03'))
+    second = client.get_daily_issues("a/repo", start_date=utc('2026-01-01'), end_date=utc('2026-01-03'))
+
+    assert [i['number'] for i in first] == [i['number'] for i in second] == [7]
+    assert second[0]['is_new']
+    client._search_closed.assert_called_once()
+
+
+@patch('src.core.github_client.Github')
+def test_backfill_from_snapshot_uses_snapshot_time(mock_github, tmp_path):
+    """测试复用前一天结束前的快照补齐时，前一天不会被标记为完整"""
+    warehouse = ActivityWarehouse(str(tmp_path / "warehouse.sqlite"))
+    snapshots = ActivitySnapshotStore(str(tmp_path / "snapshots.json"), max_age_minutes=3 * 24 * 60)
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    day = yesterday.strftime('%Y-%m-%d')
+    snapshots.record("a/repo", "issues", [make_item(1, day, day)], covered_from=yesterday - timedelta(days=1),
+                     fetched_at=yesterday + timedelta(hours=23))
+    client = GitHubClient("test_token", warehouse=warehouse, snapshot_store=snapshots)
+
+    assert [i['number'] for i in client.get_daily_issues("a/repo", start_date=yesterday, end_date=yesterday)] == [1]
+    assert warehouse.missing_ranges("a/repo", "issues", yesterday, yesterday) == [(yesterday.date(), yesterday.date())]
@@ -0,0 +1,107 @@
+"""
+AI 客户端测试
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+
+from src.ai.ai_client import AIClient
+
+
+class FakeAPIError(Exception):
+    """模拟 SDK 的 API 状态错误"""
+
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def make_client(provider="openai", **kwargs):
+    """创建一个不依赖真实 SDK 的客户端"""
+    client = AIClient(provider, None, "test-model", backoff_base=0, **kwargs)
+    client.client = object()
+    return client
+
+
+def test_retry_on_rate_limit_then_success():
+    """测试 429 后重试成功"""
+    client = make_client(max_retries=2)
+    client._openai_completion = Mock(side_effect=[FakeAPIError(429), "ok"])
+
+    assert client.generate_completion("sys", "user") == "ok"
+    assert client._openai_completion.call_count == 2
+
+
+def test_no_retry_on_client_error():
+    """测试 4xx（非 429）不重试"""
+    client = make_client(max_retries=3)
+    client._openai_completion = Mock(side_effect=FakeAPIError(400))
+
+    assert client.generate_completion("sys", "user") is None
+    assert client._openai_completion.call_count == 1
+
+
+def test_failover_to_next_provider():
+    """测试主提供商失败后切换到备用提供商"""
+    fallback = make_client(provider="anthropic")
+    fallback._anthropic_completion = Mock(return_value="from anthropic")
+    client = make_client(max_retries=1, fallbacks=[fallback])
+    client._openai_completion = Mock(side_effect=FakeAPIError(503))
+
+    assert client.generate_completion("sys", "user") == "from anthropic"
+    assert client._openai_completion.call_count == 2
+    # 报告元信息记录实际返回结果的提供商
+    assert client.answered_by() is fallback
+
+
+def test_hedged_request_returns_first_success():
+    """测试超过对冲阈值后发起对冲请求"""
+    calls = []
+
+    def completion(*args):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return "slow"
+        return "fast"
+
+    client = make_client(hedge_enabled=True, hedge_after=0.05)
+    client._openai_completion = Mock(side_effect=completion)
+
+    assert client.generate_completion("sys", "user") == "fast"
+    assert len(calls) == 2
+    client._hedge_executor.shutdown(wait=True)
+
+
+def test_hedge_executor_created_once_across_threads():
+    """测试多个线程同时发起对冲调用时只创建一个线程池"""
+    client = make_client(hedge_enabled=True, hedge_after=5)
+    client._openai_completion = Mock(return_value="ok")
+    barrier = threading.Barrier(8)
+    executors = []
+
+    def call():
+        barrier.wait()
+        client.generate_completion("sys", "user")
+        executors.append(client._hedge_executor)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(executors) == 8 and len(set(map(id, executors))) == 1
+    assert client.answered_by() is client
+    client._hedge_executor.shutdown(wait=True)
+
+
+@pytest.mark.parametrize("samples, expected", [([1.0] * 5, None), ([float(i) for i in range(1, 21)], 20.0)])
+def test_hedge_threshold_from_percentile(samples, expected):
+    """测试基于历史延迟百分位的对冲阈值"""
+    client = make_client(hedge_enabled=True, hedge_min_samples=20)
+    client._latencies.extend(samples)
+
+    assert client._hedge_threshold() == expected
@@ -0,0 +1,156 @@
+"""
+集群分片测试
+"""
+
+import time
+from unittest.mock import Mock
+
+from src.core.cluster import ClusterStore, ClusterWorker, HashRing, daily_report_payload, scope_worker_paths
+from src.notifier.outbox import NotificationOutbox
+from src.storage.database import Database
+
+
+def test_hash_ring_moves_only_removed_node_keys():
+    """测试移除节点时只有该节点的键重新分配"""
+    repos = [f"org/repo-{i}" for i in range(500)]
+    ring = HashRing(["w1", "w2", "w3"])
+    before = {repo: ring.node_for(repo) for repo in repos}
+    assert set(before.values()) == {"w1", "w2", "w3"}
+
+    ring.remove("w2")
+    after = {repo: ring.node_for(repo) for repo in repos}
+
+    for repo in repos:
+        if before[repo] != "w2":
+            assert after[repo] == before[repo]
+        else:
+            assert after[repo] in ("w1", "w3")
+
+
+def test_claim_respects_ring_and_dedupes(tmp_path):
+    """测试工作进程只领取分配给自己的任务，未完成的同类任务不重复添加"""
+    store = ClusterStore(str(tmp_path / "cluster.sqlite"))
+    store.heartbeat("w1")
+    store.heartbeat("w2")
+    ring = store.ring()
+
+    repos = [f"org/repo-{i}" for i in range(20)]
+    for repo in repos:
+        assert store.enqueue('update', repo) is not None
+    assert store.enqueue('update', repos[0]) is None
+
+    claimed = {}
+    for worker in ("w1", "w2"):
+        while True:
+            task = store.claim(worker, ring)
+            if task is None:
+                break
+            assert ring.node_for(task['repo_name']) == worker
+            claimed[task['repo_name']] = worker
+            store.complete(task['id'])
+
+    assert set(claimed) == set(repos)
+    assert store.stats()['done'] == 20
+
+
+def test_claim_pages_past_other_workers_backlog(tmp_path):
+    """测试队列前部积压的其他进程的任务超过一批时，仍能领取到后面分配给自己的任务"""
+    store = ClusterStore(str(tmp_path / "cluster.sqlite"))
+    ring = HashRing(["w1", "w2"])
+    repos = [f"org/repo-{i}" for i in range(200)]
+    backlog = [repo for repo in repos if ring.node_for(repo) == "w2"][:12]
+    mine = next(repo for repo in repos if ring.node_for(repo) == "w1")
+    for repo in backlog + [mine]:
+        store.enqueue('update', repo)
+
+    task = store.claim("w1", ring, batch=5)
+    assert task is not None and task['repo_name'] == mine
+    assert store.claim("w1", ring, batch=5) is None
+
+
+def test_dead_worker_tasks_are_rebalanced(tmp_path):
+    """测试失联工作进程的任务转移到存活的进程"""
+    store = ClusterStore(str(tmp_path / "cluster.sqlite"), heartbeat_ttl=1)
+    store.heartbeat("w1")
+    store.enqueue('update', 'org/a')
+    task = store.claim("w1", HashRing(["w1"]))
+    assert task is not None
+
+    time.sleep(1.1)
+    store.heartbeat("w2")
+    assert store.reap_dead_workers() == ["w1"]
+    assert [w['worker_id'] for w in store.live_workers()] == ["w2"]
+
+    retaken = store.claim("w2")
+    assert retaken['id'] == task['id'] and retaken['attempts'] == 2
+
+
+def test_worker_runs_update_then_report(tmp_path):
+    """测试更新任务完成后提交同一仓库的报告任务"""
+    store = ClusterStore(str(tmp_path / "cluster.sqlite"))
+    sentinel = Mock()
+    sentinel.update_single_repository.return_value = True
+    worker = ClusterWorker(sentinel, store, worker_id="w1")
+    store.heartbeat("w1")
+
+    store.enqueue('update', 'org/a', {'report': daily_report_payload()})
+    assert worker.run_once()
+    assert worker.run_once()
+    assert not worker.run_once()
+
+    sentinel.update_single_repository.assert_called_once_with('org/a')
+    sentinel.generate_custom_range_report.assert_called_once()
+    assert store.stats()['done'] == 2
+
+
+def test_failed_task_retries_then_fails(tmp_path):
+    """测试任务失败后重试，超过上限标记为失败"""
+    store = ClusterStore(str(tmp_path / "cluster.sqlite"), max_attempts=2)
+    sentinel = Mock()
+    sentinel.update_single_repository.return_value = False
+    worker = ClusterWorker(sentinel, store, worker_id="w1")
+    store.heartbeat("w1")
+
+    store.enqueue('update', 'org/a')
+    worker.run_once()
+    assert store.stats()['pending'] == 1
+    worker.run_once()
+    assert store.stats()['failed'] == 1
+
+
+def test_database_sees_writes_from_other_instances(tmp_path):
+    """测试多个进程（实例）共用数据文件时能读到彼此的写入"""
+    path = str(tmp_path / "sentinel.json")
+    first = Database(path)
+    second = Database(path)
+
+    first.add_subscription("org/a")
+    second.add_subscription("org/b")
+
+    assert [s['repo_name'] for s in first.get_subscriptions()] == ["org/a", "org/b"]
+    assert {s['id'] for s in second.get_subscriptions()} == {1, 2}
+
+
+
+def scoped_config(tmp_path, worker_id):
+    """按工作进程 ID 调整路径后的模拟配置"""
+    values = {"github.snapshot.path": str(tmp_path / "snapshots.json"),
+              "notification.outbox.path": str(tmp_path / "outbox.sqlite")}
+    config = Mock()
+    config.get = Mock(side_effect=lambda key, default=None: values.get(key, default))
+    config.set = Mock(side_effect=lambda key, value: values.__setitem__(key, value))
+    scope_worker_paths(config, worker_id)
+    return values
+
+
+def test_worker_local_paths_are_scoped(tmp_path):
+    """测试工作进程的本地 JSON 文件按工作进程 ID 分开，共享的 SQLite 发件箱不分开"""
+    first = scoped_config(tmp_path, "host-1/a")
+    second = scoped_config(tmp_path, "host-2")
+    assert first["github.snapshot.path"] == str(tmp_path / "snapshots.host-1_a.json")
+    assert second["report.map_reduce.cache_path"] == "data/cache/chunk_summaries.host-2.json"
+    assert first["notification.outbox.path"] == second["notification.outbox.path"] == str(tmp_path / "outbox.sqlite")
+
+    NotificationOutbox(first["notification.outbox.path"]).enqueue('email', {'subject': "一"})
+    NotificationOutbox(second["notification.outbox.path"]).enqueue('email', {'subject': "二"})
+    assert NotificationOutbox(first["notification.outbox.path"]).stats()['pending'] == 2
@@ -0,0 +1,79 @@
+"""
+相似条目聚类测试
+"""
+
+import os
+from unittest.mock import Mock
+
+from src.ai.dedup import cluster_items, collapse_duplicates, normalize_title, title_shingles
+from src.ai.prompts import PromptTemplates
+from src.ai.report_generator import ReportGenerator
+
+
+def _item(number, title):
+    return {'number': number, 'title': title, 'state': 'closed', 'author': 'bot', 'labels': [], 'body': ''}
+
+
+def test_normalize_title():
+    """测试版本号、编号和提交哈希被替换，中文按字切分"""
+    assert normalize_title("Bump lodash from 4.17.20 to v4.17.21") == \
+        ['bump', 'lodash', 'from', '<n>', 'to', '<n>']
+    assert normalize_title("Revert 3f2a9bc1 (#123)") == ['revert', '<h>', '<n>']
+    assert normalize_title("修复崩溃") == ['修', '复', '崩', '溃']
+    assert title_shingles("Bump lodash from 4.17.20 to 4.17.21") == \
+        title_shingles("bump Lodash from 4.17.19 to 4.17.21")
+
+
+def test_cluster_near_duplicates():
+    """测试标题近似的条目聚为一组，不同的条目保持独立"""
+    items = [
+        _item(5, "Crash when opening large file"),
+        _item(1, "Add dark mode"),
+        _item(3, "App crash when opening large file on Windows"),
+        _item(7, "Bump axios from 0.21.1 to 0.22.0"),
+        _item(8, "Bump axios from 0.22.0 to 0.23.0"),
+        _item(9, "Bump lodash from 4.17.20 to 4.17.21"),
+        _item(10, "编辑器打开大文件时崩溃"),
+        _item(11, "编辑器打开大文件崩溃"),
+    ]
+    groups = [[item['number'] for item in group] for group in cluster_items(items)]
+    assert groups == [[3, 5], [1], [7, 8], [9], [10, 11]]
+
+    collapsed = collapse_duplicates(items)
+    assert [item['number'] for item in collapsed] == [3, 1, 7, 9, 10]
+    assert collapsed[0]['duplicates'] == [5]
+    assert 'duplicates' not in collapsed[1]
+    assert 'duplicates' not in items[2]
+
+    assert "（另有 1 个相似条目: #8）" in PromptTemplates.format_activity_items(collapsed, [])
+
+
+def test_report_prompt_uses_collapsed_items(tmp_path):
+    """测试生成报告时提示词只包含代表条目，进展文件保持完整"""
+    config = Mock()
+    config.get = Mock(side_effect=lambda key, default=None: {
+        "ai.language": "zh-CN",
+        "report.map_reduce.cache_path": str(tmp_path / "chunks.json"),
+    }.get(key, default))
+    generator = ReportGenerator(config)
+    generator.ai_client = Mock(provider="openai", model="gpt-4")
+    generator.ai_client.is_available.return_value = True
+    generator.ai_client.generate_completion.return_value = "报告"
+
+    issues = [_item(n, f"Crash in renderer on startup (build {n})") for n in range(1, 6)]
+    progress = "# a/b 每日进展\n\n## 📊 概览\n\n- 概览内容\n\n---\n\n## 🐛 Issues\n\n" + \
+        "".join(f"#### #{i['number']} {i['title']}\n\n" for i in issues)
+    progress_file = tmp_path / "progress.md"
+    progress_file.write_text(progress, encoding='utf-8')
+
+    report_file = generator.generate_daily_report("a/b", str(progress_file), output_dir=str(tmp_path / "reports"),
+                                                  issues=issues, pull_requests=[])
+
+    prompt = generator.ai_client.generate_completion.call_args.kwargs['user_prompt']
+    assert "- 概览内容" in prompt
+    assert "标题近似的条目已合并为 1 条" in prompt
+    assert "Issue #1: Crash in renderer on startup (build 1)" in prompt
+    assert "（另有 4 个相似条目: #2, #3, #4, #5）" in prompt
+    assert "#### #2" not in prompt
+    assert os.path.exists(report_file)
+    assert progress_file.read_text(encoding='utf-8') == progress
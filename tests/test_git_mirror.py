@@ -0,0 +1,74 @@
+"""
+本地 Git 镜像测试
+"""
+
+import os
+import subprocess
+from datetime import datetime, timezone
+
+from src.ai.prompts import PromptTemplates
+from src.core.git_mirror import GitMirror
+
+
+def git(cwd, *args, date=None):
+    """在测试仓库中执行 git 命令"""
+    env = dict(os.environ, GIT_AUTHOR_NAME="Alice", GIT_AUTHOR_EMAIL="alice@example.com",
+               GIT_COMMITTER_NAME="Alice", GIT_COMMITTER_EMAIL="alice@example.com")
+    if date:
+        env.update(GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+    subprocess.run(['git', *args], cwd=str(cwd), env=env, check=True, capture_output=True)
+
+
+def commit(source, filename, content, message, date):
+    """在源仓库中提交一个文件"""
+    (source / filename).write_text(content, encoding='utf-8')
+    git(source, 'add', filename)
+    git(source, 'commit', '-q', '-m', message, date=date)
+
+
+def make_source(tmp_path):
+    """创建作为远程仓库的本地仓库 a/b"""
+    source = tmp_path / "remote" / "a" / "b"
+    source.mkdir(parents=True)
+    git(source, 'init', '-q', '-b', 'main')
+    git(source, 'config', 'uploadpack.allowFilter', 'true')
+    git(source, 'config', 'uploadpack.allowAnySHA1InWant', 'true')
+    commit(source, 'a.txt', 'one\n', 'Initial commit', '2026-01-01T10:00:00+00:00')
+    commit(source, 'b.txt', 'two\nthree\n', 'Add b', '2026-01-05T10:00:00+08:00')
+    return source
+
+
+def test_mirror_reads_commits_and_fetches_incrementally(tmp_path):
+    """测试首次部分克隆、按时间范围读取提交，以及增量 fetch"""
+    source = make_source(tmp_path)
+    mirror = GitMirror(root=str(tmp_path / "mirrors"), remote_url=f"file://{tmp_path}/remote/{{repo}}",
+                       fetch_interval=3600)
+
+    commits = mirror.commits("a/b", datetime(2026, 1, 2, tzinfo=timezone.utc))
+    assert [c['message'] for c in commits] == ['Add b']
+    assert commits[0]['author'] == 'Alice'
+    assert commits[0]['date'] == '2026-01-05T02:00:00+00:00'
+    assert commits[0]['changed_files'] == 1
+    assert commits[0]['url'].startswith("https://github.com/a/b/commit/")
+    assert len(commits[0]['sha']) == 7
+    assert mirror.mirror_path("a/b").exists()
+    assert "Add b by Alice" in PromptTemplates.format_commits(commits)
+
+    commit(source, 'c.txt', 'four\n', 'Add c', '2026-01-06T10:00:00+00:00')
+    # fetch 间隔内不重新获取
+    assert len(mirror.commits("a/b", datetime(2026, 1, 1, tzinfo=timezone.utc))) == 2
+    mirror.sync("a/b", force=True)
+    commits = mirror.commits("a/b", datetime(2026, 1, 1, tzinfo=timezone.utc),
+                             until=datetime(2026, 1, 5, 12, tzinfo=timezone.utc))
+    assert [c['message'] for c in commits] == ['Add b', 'Initial commit']
+    assert mirror.commits("a/b", datetime(2026, 1, 1, tzinfo=timezone.utc), max_count=1)[0]['message'] == 'Add c'
+
+
+def test_mirror_diffstat(tmp_path):
+    """测试启用 diffstat 时统计增删行数"""
+    make_source(tmp_path)
+    mirror = GitMirror(root=str(tmp_path / "mirrors"), remote_url=f"file://{tmp_path}/remote/{{repo}}",
+                       diffstat=True)
+
+    commits = mirror.commits("a/b", datetime(2026, 1, 1, tzinfo=timezone.utc))
+    assert [(c['additions'], c['deletions'], c['changed_files']) for c in commits] == [(2, 0, 1), (1, 0, 1)]
@@ -0,0 +1,134 @@
+"""
+GitHub 客户端测试
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+from github import GithubException, UnknownObjectException
+
+from src.core.github_client import SEARCH_RESULT_CAP, GitHubClient
+
+
+@patch('src.core.github_client.Github')
+def test_validate_repository_reuses_cached_repo(mock_github):
+    """测试验证结果被缓存，拉取更新时复用验证得到的仓库对象"""
+    repo = Mock()
+    get_repo = mock_github.return_value.get_repo = Mock(return_value=repo)
+    client = GitHubClient("test_token")
+
+    assert client.validate_repository("Owner/Repo")
+    assert client.validate_repository("owner/repo")
+    assert client.get_repository("owner/repo") is repo
+    get_repo.assert_called_once_with("Owner/Repo")
+
+    # 探测总是重新请求
+    client.probe_repository("owner/repo")
+    assert get_repo.call_count == 2
+
+
+@patch('src.core.github_client.Github')
+def test_validate_repository_negative_cache(mock_github):
+    """测试 404 结果被缓存，其他错误不缓存"""
+    get_repo = mock_github.return_value.get_repo = Mock(
+        side_effect=UnknownObjectException(404, {'message': 'Not Found'}, None)
+    )
+    client = GitHubClient("test_token")
+
+    assert not client.validate_repository("a/missing")
+    assert not client.validate_repository("a/missing")
+    assert get_repo.call_count == 1
+
+    get_repo.side_effect = GithubException(403, {'message': 'rate limited'}, None)
+    assert not client.validate_repository("a/limited")
+    assert not client.validate_repository("a/limited")
+    assert get_repo.call_count == 3
+
+
+@patch('src.core.github_client.Github')
+def test_repo_cache_disabled(mock_github):
+    """测试 ttl 为 0 时不缓存"""
+    get_repo = mock_github.return_value.get_repo = Mock(return_value=Mock())
+    client = GitHubClient("test_token", repo_cache_ttl=0)
+
+    client.validate_repository("a/one")
+    client.validate_repository("a/one")
+    assert get_repo.call_count == 2
+
+
+@patch('src.core.github_client.Github')
+def test_validate_repositories_graphql_batches(mock_github):
+    """测试批量验证按批发送带别名的 GraphQL 查询，并缓存结果"""
+    pool = Mock()
+
+    def post(url, json, headers):
+        query = json['query']
+        data, errors = {}, []
+        for i in range(query.count('repository(')):
+            if f'r{i}: repository(owner: "a", name: "missing")' in query:
+                data[f'r{i}'] = None
+                errors.append({'type': 'NOT_FOUND', 'path': [f'r{i}']})
+            else:
+                data[f'r{i}'] = {'nameWithOwner': 'A/Repo' if '"repo"' in query else 'b/x'}
+        return Mock(status_code=200, json=Mock(return_value={'data': data, 'errors': errors}))
+
+    pool.post = Mock(side_effect=post)
+    client = GitHubClient("test_token", http_pool=pool, graphql_batch_size=2)
+
+    result = client.validate_repositories(["a/repo", "a/missing", "b/x", "bad name"])
+
+    assert result == {"a/repo": "A/Repo", "a/missing": None, "b/x": "b/x", "bad name": None}
+    assert pool.post.call_count == 2
+    assert not client.validate_repository("a/missing")
+    mock_github.return_value.get_repo.assert_called_with("b/x", lazy=True)
+
+    # 再次验证直接使用缓存的规范名称
+    assert client.validate_repositories(["a/repo"]) == {"a/repo": "A/Repo"}
+    assert pool.post.call_count == 2
+
+
+class FakeSearch:
+    """模拟 Search API：按 created 时间范围过滤，最多返回 1000 个结果，每页 100 个"""
+
+    def __init__(self, items, query):
+        start, end = re.search(r'created:(\S+)\.\.(\S+)', query).groups()
+        start = datetime.fromisoformat(start.replace('Z', '+00:00'))
+        end = datetime.fromisoformat(end.replace('Z', '+00:00'))
+        if end.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+            end = end.replace(tzinfo=timezone.utc) + timedelta(days=1, seconds=-1)
+        self.matches = [item for item in items if start <= item.created_at <= end]
+        self.totalCount = len(self.matches)
+
+    def get_page(self, page):
+        return self.matches[:SEARCH_RESULT_CAP][page * 100:(page + 1) * 100]
+
+
+@patch('src.core.github_client.Github')
+def test_search_splits_windows_beyond_result_cap(mock_github):
+    """测试结果超过 1000 条时二分时间窗口，合并并按编号去重"""
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    items = []
+    for number in range(2500):
+        item = Mock(number=number, created_at=base + timedelta(minutes=17 * number), labels=[])
+        item.updated_at = item.closed_at = item.created_at
+        items.append(item)
+    queries = []
+
+    def search_issues(query, **kwargs):
+        queries.append(query)
+        if '-created:' in query:
+            return FakeSearch([], query)
+        return FakeSearch(items, query)
+
+    mock_github.return_value.search_issues.side_effect = search_issues
+    client = GitHubClient("test_token", max_items=0, search_per_minute=0)
+    issues = client.get_daily_issues("a/b", start_date=base, end_date=datetime(2026, 2, 28, tzinfo=timezone.utc))
+
+    assert len(issues) == 2500
+    assert len({issue['number'] for issue in issues}) == 2500
+    assert issues[0]['number'] == 2499
+    # 第一层是整天的日期范围，拆分后使用精确到秒的时间
+    assert "created:2026-01-01..2026-02-28" in queries[0]
+    assert any(re.search(r'created:2026-01-\d\dT\d\d:\d\d:\d\dZ\.\.', query) for query in queries)
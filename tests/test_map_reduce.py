@@ -0,0 +1,101 @@
+"""
+分层摘要测试
+"""
+
+import unittest
+from unittest.mock import Mock
+import os
+import tempfile
+
+from src.ai.map_reduce import ChunkSummaryCache, chunk_activity, chunk_fingerprint
+from src.ai.report_generator import ReportGenerator
+
+
+def _issue(number, day, labels=None):
+    return {
+        'number': number,
+        'title': f"Issue {number}",
+        'state': 'closed',
+        'author': 'testuser',
+        'created_at': f"{day}T10:00:00+00:00",
+        'updated_at': f"{day}T12:00:00+00:00",
+        'labels': labels or [],
+        'body': '',
+    }
+
+
+class TestChunkActivity(unittest.TestCase):
+    """测试活动分块"""
+
+    def test_chunk_by_day(self):
+        issues = [_issue(1, '2026-01-14'), _issue(2, '2026-01-15'), _issue(3, '2026-01-14')]
+        chunks = chunk_activity(issues, [], strategy='day')
+        self.assertEqual(list(chunks.keys()), ['2026-01-14', '2026-01-15'])
+        self.assertEqual([i['number'] for i in chunks['2026-01-14']['issues']], [1, 3])
+
+    def test_chunk_by_area_and_split(self):
+        issues = [_issue(n, '2026-01-14', ['area/editor']) for n in range(5)]
+        issues.append(_issue(9, '2026-01-14', ['bug']))
+        chunks = chunk_activity(issues, [], strategy='area', max_chunk_items=2)
+        self.assertEqual(list(chunks.keys()), ['editor', 'editor#2', 'editor#3', 'other'])
+
+    def test_fingerprint_stable(self):
+        chunk = {'issues': [_issue(1, '2026-01-14')], 'pull_requests': []}
+        self.assertEqual(chunk_fingerprint('a/b', 'k', chunk), chunk_fingerprint('a/b', 'k', chunk))
+        changed = {'issues': [dict(_issue(1, '2026-01-14'), state='open')], 'pull_requests': []}
+        self.assertNotEqual(chunk_fingerprint('a/b', 'k', chunk), chunk_fingerprint('a/b', 'k', changed))
+
+
+class TestMapReduceReport(unittest.TestCase):
+    """测试分层摘要报告生成"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        cache_path = os.path.join(self.tmpdir.name, 'chunks.json')
+        self.mock_config = Mock()
+        self.mock_config.get = Mock(side_effect=lambda key, default=None: {
+            "ai.provider": "openai",
+            "ai.api_key": None,
+            "ai.model": "gpt-4",
+            "ai.language": "zh-CN",
+            "report.map_reduce.enabled": True,
+            "report.map_reduce.threshold": 1,
+            "report.map_reduce.cache_path": cache_path,
+        }.get(key, default))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _generator(self):
+        generator = ReportGenerator(self.mock_config)
+        generator.ai_client = Mock()
+        generator.ai_client.provider = "openai"
+        generator.ai_client.model = "gpt-4"
+        generator.ai_client.is_available.return_value = True
+        generator.ai_client.generate_completion.return_value = "摘要"
+        return generator
+
+    def test_widening_range_only_summarizes_new_chunks(self):
+        first = [_issue(1, '2026-01-14'), _issue(2, '2026-01-15')]
+        generator = self._generator()
+        generator._generate_map_reduce_report("test/repo", first, [], "raw")
+        # 2 个分块 + 1 次合并
+        self.assertEqual(generator.ai_client.generate_completion.call_count, 3)
+
+        widened = first + [_issue(3, '2026-01-16')]
+        generator = self._generator()
+        report = generator._generate_map_reduce_report("test/repo", widened, [], "raw")
+        # 仅新增的 1 个分块 + 1 次合并
+        self.assertEqual(generator.ai_client.generate_completion.call_count, 2)
+        self.assertIn("摘要", report)
+
+    def test_merge_failure_falls_back_to_progress(self):
+        generator = self._generator()
+        generator.ai_client.generate_completion.return_value = None
+        report = generator._generate_map_reduce_report("test/repo", [_issue(1, '2026-01-14')], [], "raw")
+        self.assertEqual(report, "raw")
+        self.assertEqual(ChunkSummaryCache(generator.chunk_cache.cache_path).entries, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
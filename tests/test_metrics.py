@@ -0,0 +1,171 @@
+"""
+趋势指标测试
+"""
+
+import time
+from datetime import date, datetime, timezone
+from unittest.mock import Mock
+
+import numpy as np
+
+from src.core.metrics import MetricsEngine, grouped_distinct, grouped_median
+from src.storage.activity_warehouse import ActivityWarehouse
+
+
+def make_pr(number, created, merged, author, additions=10, deletions=5):
+    """创建已合并的 PR"""
+    return {'number': number, 'title': f'PR {number}', 'state': 'closed', 'author': author,
+            'created_at': created, 'updated_at': merged, 'closed_at': merged, 'merged_at': merged,
+            'additions': additions, 'deletions': deletions}
+
+
+def make_warehouse(tmp_path):
+    """包含两个仓库数据的活动仓库"""
+    warehouse = ActivityWarehouse(str(tmp_path / "warehouse.sqlite"))
+    first, last = date(2026, 1, 1), date(2026, 1, 10)
+    warehouse.store_closed("a/one", "pull_requests", [
+        make_pr(1, '2026-01-01T00:00:00+00:00', '2026-01-02T10:00:00+00:00', 'alice'),
+        make_pr(2, '2026-01-02T00:00:00+00:00', '2026-01-02T04:00:00+00:00', 'bob', 1, 1),
+        make_pr(3, '2026-01-03T00:00:00+00:00', '2026-01-03T02:00:00+00:00', 'alice'),
+    ], first, last, fetched_at=datetime(2026, 2, 1, tzinfo=timezone.utc))
+    warehouse.store_closed("a/one", "issues", [
+        {'number': 4, 'state': 'closed', 'author': 'carol', 'created_at': '2026-01-01T00:00:00+00:00',
+         'updated_at': '2026-01-04T00:00:00+00:00', 'closed_at': '2026-01-03T00:00:00+00:00'},
+    ], first, last, fetched_at=datetime(2026, 2, 1, tzinfo=timezone.utc))
+    warehouse.record_events("B/Two", "commits", [
+        {'sha': 'abc', 'author': 'dave', 'date': '2026-01-05T01:00:00+00:00'},
+        {'sha': 'def', 'author': 'dave', 'date': '2026-01-05T03:00:00+00:00'},
+    ], 'sha', 'date')
+    return warehouse
+
+
+def test_grouped_median_and_distinct():
+    """测试按组计算中位数和去重计数"""
+    groups = np.array([2, 0, 2, 2, 0])
+    values = np.array([5.0, 1.0, 1.0, 3.0, 4.0])
+    result = grouped_median(groups, values, 4)
+    assert result[0] == 2.5 and result[2] == 3.0
+    assert np.isnan(result[1]) and np.isnan(result[3])
+
+    labels = np.array(['x', 'y', 'x', 'x', 'y'])
+    assert grouped_distinct(groups, labels, 4).tolist() == [1, 0, 1, 0]
+
+
+def test_compute_series_and_summary(tmp_path):
+    """测试多个仓库的按日序列与汇总"""
+    engine = MetricsEngine(make_warehouse(tmp_path))
+    result = engine.compute(["a/one", "b/two"], date(2026, 1, 1), date(2026, 1, 7))
+
+    one = result.repo_series("a/one")
+    assert one['prs_merged'].tolist() == [0, 2, 1, 0, 0, 0, 0]
+    assert one['merge_hours'][1] == 19.0
+    assert one['churn'][1] == 17
+    assert one['issues_closed'][2] == 1
+
+    summary = result.repo_summary("a/one")
+    assert summary['prs_merged'] == 3
+    assert summary['merge_hours'] == 4.0
+    assert summary['close_hours'] == 48.0
+    assert summary['contributors'] == 3
+    assert summary['commits'] == 0
+
+    two = result.repo_summary("b/two")
+    assert two['commits'] == 2 and two['contributors'] == 1
+    assert two['merge_hours'] is None
+
+    rows = result.chart_rows("b/two", ['commits'])
+    assert len(rows) == 7
+    assert rows[4] == {'date': '2026-01-05', 'metric': '提交数', 'value': 2.0}
+    # 没有数据的中位数不输出
+    assert result.chart_rows("b/two", ['merge_hours']) == []
+
+
+def test_report_section_compares_previous_period(tmp_path):
+    """测试报告章节按最短天数统计并与上期对比，未完整拉取的时间段显示为 -"""
+    warehouse = make_warehouse(tmp_path)
+    engine = MetricsEngine(warehouse)
+    section = engine.report_section("a/one", date(2026, 1, 10), date(2026, 1, 10), min_days=7)
+
+    assert "2026-01-04 到 2026-01-10" in section
+    assert "2025-12-28 到 2026-01-03" in section
+    # 上期的 2025-12-28 ~ 2025-12-31 没有拉取过
+    assert "| PR 合并数 | 0 | - |" in section
+    assert "数据缺失" in section
+
+    for kind in ("issues", "pull_requests"):
+        warehouse.store_closed("a/one", kind, [], date(2025, 12, 28), date(2025, 12, 31),
+                               fetched_at=datetime(2026, 2, 1, tzinfo=timezone.utc))
+    section = engine.report_section("a/one", date(2026, 1, 10), date(2026, 1, 10), min_days=7)
+    assert "| PR 合并数 | 0 | 3 |" in section
+    assert "数据缺失" not in section
+    assert "| PR 平均合并耗时（小时） | - | 13.3 |" in section
+    assert "| 贡献者数 | 0 | 3 |" in section
+
+
+def test_aggregates_cached_per_day(tmp_path):
+    """测试每日部分聚合被缓存，只有当天重新统计；写入新条目后受影响的日期失效"""
+    warehouse = make_warehouse(tmp_path)
+    engine = MetricsEngine(warehouse)
+    today = date(2026, 1, 7)
+
+    first = engine.aggregates(["a/one", "b/two"], date(2026, 1, 1), today, today=today)
+    totals = first.totals(date(2026, 1, 1), date(2026, 1, 3))
+    assert totals['prs_merged'].tolist() == [3, 0]
+    assert totals['merge_hours'][0] == 40 / 3
+    assert first.summary("a/one")['contributors'] == 3
+
+    engine._daily_partials = Mock(wraps=engine._daily_partials)
+    engine.aggregates(["a/one", "b/two"], date(2026, 1, 1), today, today=today)
+    # 只重新统计当天
+    args = engine._daily_partials.call_args[0]
+    assert args[1] == args[2] == today
+
+    warehouse.record_events("b/two", "commits", [
+        {'sha': 'ghi', 'author': 'erin', 'date': '2026-01-03T01:00:00+00:00'}], 'sha', 'date')
+    engine._daily_partials.reset_mock()
+    result = engine.aggregates(["a/one", "b/two"], date(2026, 1, 1), today, today=today)
+    args = engine._daily_partials.call_args[0]
+    assert args[1] == date(2026, 1, 3) and args[2] == today
+    assert result.summary("b/two")['contributors'] == 2
+
+
+def test_rolling_windows_from_prefix_sums(tmp_path):
+    """测试滑动窗口与逐日求和一致"""
+    engine = MetricsEngine(make_warehouse(tmp_path))
+    result = engine.aggregates(["a/one", "b/two"], date(2026, 1, 1), date(2026, 1, 7), today=date(2026, 2, 1))
+
+    assert result.rolling('prs_merged', 2)[0].tolist() == [0, 2, 3, 1, 0, 0, 0]
+    assert result.rolling('commits', 7)[1].tolist() == [0, 0, 0, 0, 2, 2, 2]
+    assert result.rolling('contributors', 2)[0].tolist() == [0, 2, 3, 2, 0, 0, 0]
+    rows = result.chart_rows('merge_hours', 1)
+    assert [(row['date'], row['repo']) for row in rows] == [('2026-01-02', 'a/one'), ('2026-01-03', 'a/one')]
+
+
+def test_compute_scales_to_many_repos():
+    """测试 500 个仓库 × 365 天的计算在秒级完成"""
+    rng = np.random.default_rng(0)
+    repos = [f"org/repo{i}" for i in range(500)]
+    n = 200_000
+    base = np.datetime64('2025-01-01T00:00:00')
+    created = base + rng.integers(0, 365 * 86400, n).astype('timedelta64[s]')
+    closed = created + rng.integers(0, 30 * 86400, n).astype('timedelta64[s]')
+    columns = {
+        'repo': [repos[i] for i in rng.integers(0, 500, n)],
+        'created_at': created.astype(str).tolist(),
+        'merged_at': closed.astype(str).tolist(),
+        'closed_at': closed.astype(str).tolist(),
+        'updated_at': closed.astype(str).tolist(),
+        'additions': rng.integers(0, 100, n).tolist(),
+        'deletions': rng.integers(0, 100, n).tolist(),
+        'author': [f"user{i}" for i in rng.integers(0, 5000, n)],
+    }
+    warehouse = Mock()
+    warehouse.scan = Mock(return_value=columns)
+
+    started = time.monotonic()
+    result = MetricsEngine(warehouse).compute(repos, date(2025, 1, 1), date(2025, 12, 31))
+    elapsed = time.monotonic() - started
+
+    assert result.series['prs_merged'].shape == (500, 365)
+    assert result.summary['prs_merged'].sum() == np.count_nonzero(closed < np.datetime64('2026-01-01'))
+    assert elapsed < 10
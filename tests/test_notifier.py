@@ -0,0 +1,254 @@
+"""
+通知模块测试
+"""
+
+import smtplib
+import pytest
+from unittest.mock import Mock, patch
+
+from src.core.http_pool import HTTPPool
+from src.main import GitHubSentinel
+from src.notifier.email_notifier import EmailNotifier
+from src.notifier.html_renderer import HTMLRenderer
+from src.notifier.outbox import NotificationOutbox
+from src.notifier.webhook_notifier import WebhookNotifier
+
+
+def make_config(values):
+    """创建模拟配置"""
+    config = Mock()
+    config.get = Mock(side_effect=lambda key, default=None: values.get(key, default))
+    return config
+
+
+def test_http_pool_reuses_session_per_host():
+    """测试同一主机复用会话，不同主机使用独立会话"""
+    pool = HTTPPool()
+
+    first = pool.session_for("https://hooks.example.com/a")
+    second = pool.session_for("https://hooks.example.com/b?x=1")
+    other = pool.session_for("https://api.example.org/")
+
+    assert first is second
+    assert first is not other
+    pool.close()
+
+
+def test_webhook_uses_shared_pool():
+    """测试 Webhook 通过共享连接池发送"""
+    pool = Mock(spec=HTTPPool)
+    config = make_config({
+        "notification.webhook.url": "https://hooks.example.com/endpoint",
+        "notification.webhook.timeout": 5,
+    })
+
+    notifier = WebhookNotifier(config, http_pool=pool)
+    notifier.send("test/repo", "report")
+
+    pool.post.assert_called_once()
+    args, kwargs = pool.post.call_args
+    assert args[0] == "https://hooks.example.com/endpoint"
+    assert kwargs['json']['repo_name'] == "test/repo"
+    assert kwargs['timeout'] == (10, 5)
+
+    # 未设置 Webhook 超时时使用连接池的默认超时
+    pool.post.reset_mock()
+    WebhookNotifier(make_config({"notification.webhook.url": "https://hooks.example.com/endpoint"}),
+                    http_pool=pool).send("test/repo", "report")
+    assert 'timeout' not in pool.post.call_args.kwargs
+
+
+def test_webhook_failure_is_raised():
+    """测试 Webhook 失败时抛出异常"""
+    pool = Mock(spec=HTTPPool)
+    pool.post.return_value.raise_for_status.side_effect = RuntimeError("500")
+    config = make_config({"notification.webhook.url": "https://hooks.example.com/endpoint"})
+
+    with pytest.raises(RuntimeError):
+        WebhookNotifier(config, http_pool=pool).send("test/repo", "report")
+
+
+EMAIL_CONFIG = {
+    "notification.email.smtp_host": "smtp.example.com",
+    "notification.email.username": "user",
+    "notification.email.password": "secret",
+    "notification.email.from_addr": "sentinel@example.com",
+    "notification.email.to_addrs": ["dev@example.com"],
+}
+
+
+@patch('src.notifier.email_notifier.smtplib.SMTP')
+def test_email_session_reuses_connection(mock_smtp):
+    """测试会话模式下多封邮件共用一个 SMTP 连接"""
+    notifier = EmailNotifier(make_config(EMAIL_CONFIG))
+
+    with notifier.session():
+        for repo in ("a/one", "b/two", "c/three"):
+            notifier.send(subject=f"{repo} 更新报告", content="# report")
+
+    assert mock_smtp.call_count == 1
+    server = mock_smtp.return_value
+    assert server.login.call_count == 1
+    assert server.send_message.call_count == 3
+    server.quit.assert_called_once()
+
+
+@patch('src.notifier.email_notifier.smtplib.SMTP')
+def test_email_session_reconnects_after_disconnect(mock_smtp):
+    """测试会话中连接断开后自动重连"""
+    server = mock_smtp.return_value
+    server.send_message.side_effect = [smtplib.SMTPServerDisconnected(), None]
+    notifier = EmailNotifier(make_config(EMAIL_CONFIG))
+
+    with notifier.session():
+        notifier.send(subject="s", content="c")
+
+    assert mock_smtp.call_count == 2
+    assert server.send_message.call_count == 2
+
+
+@patch('src.notifier.email_notifier.smtplib.SMTP')
+def test_email_digest_merges_reports(mock_smtp):
+    """测试汇总模式合并为一封带目录的邮件"""
+    notifier = EmailNotifier(make_config(dict(EMAIL_CONFIG, **{"notification.email.mode": "digest"})))
+
+    notifier.send_digest({"a/one": "# one", "b/two": "# two"})
+
+    server = mock_smtp.return_value.__enter__.return_value
+    server.send_message.assert_called_once()
+    msg = server.send_message.call_args[0][0]
+    parts = msg.get_payload()
+    # 正文 + 2 个附件
+    assert len(parts) == 3
+    text = parts[0].get_payload()[0].get_payload(decode=True).decode('utf-8')
+    assert "## 目录" in text
+    assert "[a/one](#repo-1)" in text and "[b/two](#repo-2)" in text
+
+
+def test_outbox_delivers_in_background(tmp_path):
+    """测试发件箱后台投递并移除已投递消息"""
+    delivered = []
+    outbox = NotificationOutbox(str(tmp_path / "outbox.sqlite"), poll_interval=0.05)
+    outbox.register('webhook', delivered.append)
+
+    outbox.enqueue('webhook', {'repo_name': 'a/one'})
+    outbox.enqueue('webhook', {'repo_name': 'b/two'})
+    outbox.start()
+
+    assert outbox.wait_idle(timeout=5)
+    outbox.stop()
+    assert [p['repo_name'] for p in delivered] == ['a/one', 'b/two']
+    assert outbox.stats()['pending'] == 0
+
+
+def test_outbox_retries_then_dead_letters(tmp_path):
+    """测试投递失败后退避重试，超过上限转入死信"""
+    sender = Mock(side_effect=RuntimeError("smtp down"))
+    outbox = NotificationOutbox(str(tmp_path / "outbox.sqlite"), max_attempts=2,
+                                backoff_base=0, poll_interval=0.05)
+    outbox.register('email', sender)
+
+    outbox.enqueue('email', {'subject': 's', 'content': 'c'})
+    outbox.start()
+    assert outbox.wait_idle(timeout=5)
+    outbox.stop()
+
+    assert sender.call_count == 2
+    dead = outbox.dead_letters()
+    assert len(dead) == 1 and dead[0]['last_error'] == "smtp down"
+
+
+def test_outbox_survives_restart(tmp_path):
+    """测试未投递的消息在重启后仍然保留"""
+    path = str(tmp_path / "outbox.sqlite")
+    NotificationOutbox(path).enqueue('webhook', {'repo_name': 'a/one'})
+
+    delivered = []
+    outbox = NotificationOutbox(path, poll_interval=0.05)
+    outbox.register('webhook', delivered.append)
+    outbox.start()
+    assert outbox.wait_idle(timeout=5)
+    outbox.stop()
+
+    assert delivered == [{'repo_name': 'a/one'}]
+
+
+def test_pending_messages_resume_on_startup(tmp_path):
+    """测试启动时发件箱中有未投递的消息即开始投递，无需等待新的通知"""
+    path = str(tmp_path / "outbox.sqlite")
+    NotificationOutbox(path).enqueue('webhook', {'repo_name': 'a/one', 'report': '报告'})
+
+    sentinel = GitHubSentinel.__new__(GitHubSentinel)
+    sentinel.config = make_config({"notification.webhook.enabled": True, "notification.outbox.path": path})
+    sentinel.background_delivery = True
+    sentinel._deliver_notification = Mock()
+    outbox = sentinel._init_outbox()
+
+    assert outbox.wait_idle(timeout=5)
+    outbox.stop()
+    sentinel._deliver_notification.assert_called_once_with('webhook', {'repo_name': 'a/one', 'report': '报告'})
+    assert outbox.stats()['pending'] == 0
+
+
+def test_outbox_only_reclaims_expired_leases(tmp_path):
+    """测试其他进程投递中的消息在租约过期前不会被重新领取"""
+    path = str(tmp_path / "outbox.sqlite")
+    first = NotificationOutbox(path, lease_ttl=60)
+    second = NotificationOutbox(path, lease_ttl=60)
+    message_id = first.enqueue('webhook', {'repo_name': 'a/one'})
+
+    claimed = first._claim('webhook')
+    assert claimed['id'] == message_id and claimed['owner'] == first.owner
+    assert second._claim('webhook') is None
+    assert second.deliver(message_id) is False
+
+    # 持有者异常退出，租约过期后由其他进程接手
+    with first._connect() as conn:
+        conn.execute("UPDATE messages SET lease_expires = ?", (0,))
+    delivered = []
+    second.register('webhook', delivered.append)
+    assert second.deliver(message_id) is True
+    assert delivered == [{'repo_name': 'a/one'}]
+    assert first.stats() == {'pending': 0, 'sending': 0, 'dead': 0}
+
+
+def test_short_lived_command_delivers_without_threads(tmp_path):
+    """测试短时命令在当前线程投递本次的通知，不启动投递线程，也不接手其他未投递的消息"""
+    path = str(tmp_path / "outbox.sqlite")
+    NotificationOutbox(path).enqueue('webhook', {'repo_name': 'old/one', 'report': '旧报告'})
+
+    sentinel = GitHubSentinel.__new__(GitHubSentinel)
+    sentinel.config = make_config({"notification.webhook.enabled": True, "notification.outbox.path": path})
+    sentinel.background_delivery = False
+    sentinel._deliver_notification = Mock()
+    sentinel.outbox = sentinel._init_outbox()
+
+    sentinel._dispatch_notification('webhook', {'repo_name': 'a/one', 'report': '报告'})
+
+    assert not sentinel.outbox.running
+    sentinel._deliver_notification.assert_called_once_with('webhook', {'repo_name': 'a/one', 'report': '报告'})
+    assert sentinel.outbox.stats()['pending'] == 1
+
+
+def test_html_renderer_memoizes_by_content():
+    """测试相同内容只渲染一次"""
+    renderer = HTMLRenderer()
+    renderer._convert = Mock(wraps=renderer._convert)
+
+    first = renderer.render("# Title\n\n- item")
+    second = renderer.render("# Title\n\n- item")
+
+    assert first is second
+    assert renderer._convert.call_count == 1
+    assert "<h1>Title</h1>" in first
+    assert "<!DOCTYPE html>" in first
+
+
+def test_email_notifier_uses_shared_renderer():
+    """测试邮件通知器使用共享渲染器"""
+    renderer = Mock(spec=HTMLRenderer)
+    renderer.render.return_value = "<html></html>"
+    notifier = EmailNotifier(make_config(EMAIL_CONFIG), renderer=renderer)
+
+    assert notifier._markdown_to_html("# report") == "<html></html>"
+    renderer.render.assert_called_once_with("# report")
@@ -0,0 +1,95 @@
+"""
+Release 缓存测试
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+from src.ai.report_generator import ReportGenerator
+from src.core.github_client import GitHubClient
+from src.storage.release_cache import ReleaseCache, release_digest
+
+
+def release_json(tag, created, body="Notes"):
+    """REST API 返回的 Release"""
+    return {'tag_name': tag, 'name': f"Release {tag}", 'body': body, 'author': {'login': 'alice'},
+            'created_at': created, 'prerelease': False, 'draft': False,
+            'html_url': f"https://github.com/a/b/releases/tag/{tag}"}
+
+
+def response(status, data=None, etag=None):
+    """模拟 HTTP 响应"""
+    return Mock(status_code=status, json=Mock(return_value=data), headers={'ETag': etag} if etag else {})
+
+
+def test_store_detects_edits_and_invalidates_summary(tmp_path):
+    """测试内容未变化的 tag 跳过，被编辑的 tag 更新并清除摘要"""
+    cache = ReleaseCache(str(tmp_path / "releases.sqlite"))
+    release = {'tag': 'v1', 'name': 'v1', 'body': 'a' * 10, 'author': 'alice',
+               'created_at': '2026-01-02T00:00:00+00:00', 'prerelease': False, 'url': None}
+    assert cache.store("A/B", [release]) == 1
+    assert cache.store("a/b", [release]) == 0
+
+    digest = release_digest(release)
+    assert cache.store_summary("a/b", "v1", digest, "- 要点")
+    assert cache.releases("a/b")[0]['summary'] == "- 要点"
+
+    edited = dict(release, body='b' * 10)
+    assert cache.store("a/b", [edited]) == 1
+    assert 'summary' not in cache.releases("a/b")[0]
+    assert cache.summary("a/b", "v1", digest) is None
+    assert not cache.store_summary("a/b", "v1", digest, "过期摘要")
+    assert cache.releases("a/b", since=datetime(2026, 1, 3, tzinfo=timezone.utc)) == []
+
+
+@patch('src.core.github_client.Github')
+def test_sync_uses_etag_and_cursor(mock_github, tmp_path):
+    """测试按 ETag 条件请求，只翻页到游标为止"""
+    pool = Mock()
+    client = GitHubClient("test_token", http_pool=pool, release_cache=ReleaseCache(str(tmp_path / "r.sqlite")))
+
+    pool.get.return_value = response(200, [release_json('v2', '2026-01-05T00:00:00Z'),
+                                           release_json('v1', '2026-01-01T00:00:00Z')], etag='"e1"')
+    assert client.sync_releases("a/b") == 2
+    assert client.release_cache.cursor("a/b") == {'latest_created_at': '2026-01-05T00:00:00+00:00', 'etag': '"e1"'}
+
+    pool.get.reset_mock()
+    pool.get.return_value = response(304)
+    assert client.sync_releases("a/b") == 0
+    assert pool.get.call_args.kwargs['headers']['If-None-Match'] == '"e1"'
+
+    # 新版本发布：第一页已包含游标之前的 tag，不再翻页
+    pool.get.reset_mock()
+    pool.get.return_value = response(200, [release_json('v3', '2026-01-09T00:00:00Z')] +
+                                     [release_json(f'v0.{i}', '2025-12-01T00:00:00Z') for i in range(29)] +
+                                     [release_json('v2', '2026-01-05T00:00:00Z')], etag='"e2"')
+    assert client.sync_releases("a/b") == 30
+    assert pool.get.call_count == 1
+    releases = client._fetch_releases(Mock(), datetime(2026, 1, 4, tzinfo=timezone.utc), "a/b")
+    assert [r['tag'] for r in releases] == ['v3', 'v2']
+
+
+def test_long_changelog_summarized_once(tmp_path):
+    """测试较长的更新日志只摘要一次，在之后的报告中复用"""
+    config = Mock()
+    config.get = Mock(side_effect=lambda key, default=None: {
+        "ai.language": "zh-CN",
+        "report.map_reduce.cache_path": str(tmp_path / "chunks.json"),
+        "releases.summary_min_length": 100,
+    }.get(key, default))
+    cache = ReleaseCache(str(tmp_path / "releases.sqlite"))
+    generator = ReportGenerator(config, release_cache=cache)
+    generator.ai_client = Mock(provider="openai", model="gpt-4")
+    generator.ai_client.generate_completion.return_value = "- 新增插件系统 (#12)"
+
+    body = "\n".join(f"- Change {i}" for i in range(50))
+    release = {'tag': 'v2', 'name': 'v2.0', 'body': body, 'author': 'alice',
+               'created_at': '2026-01-05T00:00:00+00:00', 'prerelease': False, 'url': None}
+    cache.store("a/b", [release])
+
+    first = generator._build_update_report_prompt("a/b", {'releases': cache.releases("a/b")})
+    second = generator._build_update_report_prompt("a/b", {'releases': cache.releases("a/b")})
+
+    assert generator.ai_client.generate_completion.call_count == 1
+    assert "新增插件系统 (#12)" in first and "新增插件系统 (#12)" in second
+    assert "Change 49" not in second
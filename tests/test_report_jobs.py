@@ -0,0 +1,67 @@
+"""
+后台报告任务测试
+"""
+
+import threading
+
+from src.web.report_jobs import ReportJobManager
+
+
+def test_duplicate_requests_share_running_job():
+    """测试相同日期范围的进行中任务被复用，进度与结果按仓库记录"""
+    release = threading.Event()
+    calls = []
+
+    def runner(repo_name, params):
+        calls.append(repo_name)
+        release.wait(5)
+        if repo_name == "a/broken":
+            raise RuntimeError("仓库不存在或无法访问")
+        return {'report_file': f"{repo_name}.md", 'days': params['days']}
+
+    manager = ReportJobManager(runner)
+    job, created = manager.submit("2026-01-01..2026-01-07", ["a/one", "a/broken"], {'days': 7})
+    again, created_again = manager.submit("2026-01-01..2026-01-07", ["a/one", "a/broken"], {'days': 7})
+    other, created_other = manager.submit("2026-01-02..2026-01-07", ["a/one"], {'days': 6})
+    assert created and not created_again and created_other
+    assert again is job and other is not job
+    assert job.fraction() == 0
+
+    release.set()
+    assert job.wait(5) and other.wait(5)
+    state = job.snapshot()
+    assert state['status'] == 'done'
+    assert state['progress'] == {"a/one": '完成', "a/broken": '失败'}
+    assert state['results']["a/one"] == {'report_file': "a/one.md", 'days': 7}
+    assert "不存在" in state['results']["a/broken"]['error']
+    assert job.fraction() == 1
+    assert calls.count("a/one") == 2
+
+    # 任务结束后相同参数的请求新建任务
+    assert manager.submit("2026-01-01..2026-01-07", ["a/one"])[1]
+    manager.shutdown()
+
+
+def test_cancel_skips_remaining_repos():
+    """测试取消后正在生成的仓库完成，其余仓库不再处理"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def runner(repo_name, params):
+        started.set()
+        release.wait(5)
+        return {'repo': repo_name}
+
+    manager = ReportJobManager(runner)
+    job, _ = manager.submit("range", ["a/one", "a/two", "a/three"])
+    assert started.wait(5)
+    assert manager.cancel(job.id)
+    release.set()
+    assert job.wait(5)
+
+    state = job.snapshot()
+    assert state['status'] == 'cancelled'
+    assert state['progress'] == {"a/one": '完成', "a/two": '已取消', "a/three": '已取消'}
+    assert not manager.cancel(job.id)
+    assert manager.get(f" {job.id} ") is job
+    manager.shutdown()
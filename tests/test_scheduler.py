@@ -0,0 +1,372 @@
+"""
+调度器测试
+"""
+
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import pytest
+from apscheduler.jobstores.memory import MemoryJobStore
+
+from src.core import scheduler as scheduler_module
+from src.core.adaptive_polling import AdaptivePolicy
+from src.core.rate_pacer import RateLimitPacer
+from src.core.scheduler import (
+    PIPELINE_JOB_ID, POLL_JOB_PREFIX, SUBSCRIPTION_JOB_PREFIX, WATCH_JOB_PREFIX, Scheduler, jitter_seconds,
+    subscription_trigger
+)
+from src.core.subscription_manager import SubscriptionManager
+from src.main import GitHubSentinel
+
+
+def make_config(values):
+    """创建模拟配置"""
+    config = Mock()
+    config.get = Mock(side_effect=lambda key, default=None: values.get(key, default))
+    return config
+
+
+def test_pipeline_job_prevents_overlap():
+    """测试流水线任务禁止重叠并合并错过的运行"""
+    config = make_config({"schedule.jobstore": "memory", "schedule.mode": "batch", "schedule.daily_time": "08:15"})
+    sentinel = Mock()
+    sentinel.subscription_manager.list_watches.return_value = []
+    scheduler = Scheduler(config, sentinel)
+    scheduler._setup_jobs()
+
+    job = scheduler.scheduler.get_job(PIPELINE_JOB_ID)
+    assert job.func is scheduler_module.run_update_pipeline
+    defaults = scheduler.scheduler._job_defaults
+    assert defaults['max_instances'] == 1
+    assert defaults['coalesce'] is True
+    assert "hour='8'" in str(job.trigger) and "minute='15'" in str(job.trigger)
+
+
+def test_job_entry_uses_active_sentinel():
+    """测试模块级任务入口调用当前绑定的实例"""
+    sentinel = Mock()
+    scheduler_module._active_sentinel = sentinel
+    try:
+        scheduler_module.run_update_pipeline()
+    finally:
+        scheduler_module._active_sentinel = None
+
+    sentinel.run_update_pipeline.assert_called_once()
+
+
+def test_report_starts_after_each_repository_update():
+    """测试每个仓库更新成功后生成报告，更新失败的仓库跳过报告"""
+    sentinel = GitHubSentinel.__new__(GitHubSentinel)
+    sentinel.config = make_config({"schedule.report_workers": 1})
+    sentinel.cluster = None
+    sentinel.subscription_manager = Mock()
+    sentinel.subscription_manager.list_subscriptions.return_value = [
+        {'id': 1, 'repo_name': 'a/one'},
+        {'id': 2, 'repo_name': 'b/two'},
+        {'id': 3, 'repo_name': 'c/three'},
+    ]
+    sentinel.update_single_repository = Mock(side_effect=lambda repo, sub_id: repo != 'b/two')
+    sentinel.generate_repository_daily_report = Mock(side_effect=lambda repo: f"reports/{repo}.md")
+    sentinel._notification_batch = Mock(return_value=Mock(__enter__=Mock(), __exit__=Mock(return_value=False)))
+
+    success, failed = sentinel.run_update_pipeline()
+
+    assert (success, failed) == (2, 1)
+    reported = [call.args[0] for call in sentinel.generate_repository_daily_report.call_args_list]
+    assert reported == ['a/one', 'c/three']
+
+
+def test_subscription_trigger_is_deterministic_and_spread():
+    """测试未指定时间的订阅在窗口内确定性分散"""
+    config = make_config({"schedule.daily_time": "09:00", "schedule.spread_minutes": 60})
+
+    first, _ = subscription_trigger("a/one", None, config)
+    again, _ = subscription_trigger("a/one", None, config)
+    assert str(first) == str(again)
+
+    offsets = {jitter_seconds(f"org/repo-{i}", 3600) for i in range(50)}
+    assert len(offsets) > 40
+    assert all(0 <= offset < 3600 for offset in offsets)
+
+
+def test_subscription_trigger_uses_own_schedule():
+    """测试订阅的频率和时间优先于全局配置，跨越午夜时顺延到下一天"""
+    config = make_config({"schedule.jitter_minutes": 0, "schedule.weekly_day": 6})
+
+    trigger, description = subscription_trigger("a/one", {'frequency': 'weekly', 'time': '18:30'}, config)
+    assert "day_of_week='6'" in str(trigger) and "hour='18'" in str(trigger)
+
+    config = make_config({"schedule.daily_time": "23:50", "schedule.spread_minutes": 60, "schedule.weekly_day": 6,
+                          "schedule.interval": "weekly", "schedule.weekly_time": "23:50"})
+    trigger, _ = subscription_trigger("a/one", None, config)
+    offset = 23 * 3600 + 50 * 60 + jitter_seconds("a/one", 3600)
+    expected_day = 0 if offset >= 24 * 3600 else 6
+    assert f"day_of_week='{expected_day}'" in str(trigger)
+
+
+def test_sync_subscription_jobs_adds_and_removes():
+    """测试按订阅列表同步调度任务"""
+    sentinel = Mock()
+    sentinel.subscription_manager.list_subscriptions.return_value = [
+        {'repo_name': 'a/one', 'schedule': None},
+        {'repo_name': 'b/two', 'schedule': {'frequency': 'weekly', 'time': '10:00'}},
+    ]
+    sentinel.subscription_manager.list_watches.return_value = [{'query': 'org:acme'}]
+    scheduler = Scheduler(make_config({"schedule.jobstore": "memory"}), sentinel)
+    scheduler._setup_jobs()
+
+    job_ids = {job.id for job in scheduler.scheduler.get_jobs()}
+    assert {SUBSCRIPTION_JOB_PREFIX + 'a/one', SUBSCRIPTION_JOB_PREFIX + 'b/two'} <= job_ids
+    assert WATCH_JOB_PREFIX + 'org:acme' in job_ids
+    assert PIPELINE_JOB_ID not in job_ids
+
+
+def test_build_schedule_validation():
+    """测试订阅调度设置的校验与旧版标签兼容"""
+    assert SubscriptionManager.build_schedule() is None
+    assert SubscriptionManager.build_schedule('weekly', '7:05') == {'frequency': 'weekly', 'time': '07:05'}
+    with pytest.raises(ValueError):
+        SubscriptionManager.build_schedule('hourly')
+    with pytest.raises(ValueError):
+        SubscriptionManager.build_schedule(time='25:00')
+
+    assert SubscriptionManager._schedule_of({'tags': 'weekly'}) == {'frequency': 'weekly', 'time': None}
+
+
+def test_rate_pacer_spreads_remaining_budget():
+    """测试节流器按剩余配额计算派发间隔"""
+    github_client = Mock()
+    reset = datetime.now(timezone.utc) + timedelta(seconds=1000)
+    github_client.get_rate_limit.return_value = {
+        'core': {'limit': 5000, 'remaining': 1200, 'reset': reset.isoformat()}
+    }
+    pacer = RateLimitPacer(github_client, cost_per_repo=100, reserve=200)
+
+    # 首次派发无需等待
+    assert pacer.wait_time() == 0
+    pacer._last_dispatch = time.time()
+    # 1000 个可用请求，每个仓库 100 个，重置前 1000 秒 -> 约每 100 秒派发一次
+    assert 90 < pacer.wait_time() <= 100
+
+    # 配额不足时等到重置之后，超过 max_wait 的任务不放行
+    github_client.get_rate_limit.return_value['core']['remaining'] = 250
+    pacer._remaining = None
+    assert 1000 < pacer.wait_time() <= 1001
+    assert pacer.acquire("a/b") > pacer.max_wait
+    assert pacer._remaining == 250
+
+
+def test_rate_pacer_waits_outside_lock(monkeypatch):
+    """测试节流器在锁外等待，同时到期的任务按预约时间依次放行"""
+    github_client = Mock()
+    reset = datetime.now(timezone.utc) + timedelta(seconds=1000)
+    github_client.get_rate_limit.return_value = {
+        'core': {'limit': 5000, 'remaining': 1200, 'reset': reset.isoformat()}
+    }
+    pacer = RateLimitPacer(github_client, cost_per_repo=100, reserve=200)
+    sleeps = []
+
+    def fake_sleep(seconds):
+        # 等待期间锁未被占用
+        assert pacer._lock.acquire(blocking=False)
+        pacer._lock.release()
+        sleeps.append(seconds)
+
+    monkeypatch.setattr('src.core.rate_pacer.time.sleep', fake_sleep)
+    for _ in range(3):
+        pacer.acquire("a/b")
+
+    assert len(sleeps) == 2
+    # 第二个任务在第一个之后约一个派发间隔，第三个排在第二个预约的时间之后
+    assert 100 < sleeps[0] <= 112 and sleeps[1] - sleeps[0] > 100
+    assert pacer._remaining == 900
+
+
+def test_rate_pacer_defers_instead_of_bunching(monkeypatch):
+    """测试预约时间超过 max_wait 后不再放行，而不是都按 max_wait 一起派发"""
+    github_client = Mock()
+    reset = datetime.now(timezone.utc) + timedelta(seconds=1000)
+    github_client.get_rate_limit.return_value = {
+        'core': {'limit': 5000, 'remaining': 1200, 'reset': reset.isoformat()}
+    }
+    pacer = RateLimitPacer(github_client, cost_per_repo=100, reserve=200, max_wait=300)
+    sleeps = []
+    monkeypatch.setattr('src.core.rate_pacer.time.sleep', sleeps.append)
+
+    results = [pacer.acquire("a/b") for _ in range(5)]
+    # 前 3 个依次相隔一个派发间隔，之后的需要等待超过 300s，交由调用方推迟
+    assert results[:3] == [0, 0, 0] and all(wait > 300 for wait in results[3:])
+    assert len(sleeps) == 2 and sleeps[0] < sleeps[1] <= 300
+    assert pacer._remaining == 900
+
+
+def test_paced_subscription_job_is_deferred():
+    """测试配额不足时按订阅调度的任务推迟执行"""
+    sentinel = Mock()
+    sentinel.subscription_manager.list_watches.return_value = []
+    scheduler = Scheduler(make_config({"schedule.jobstore": "memory"}), sentinel)
+    scheduler.defer_subscription_job("a/b", 1200)
+
+    job = scheduler.scheduler.get_job(scheduler_module.DEFERRED_JOB_PREFIX + "a/b")
+    assert job.func is scheduler_module.run_subscription_job and job.args == ("a/b",)
+
+
+def test_adaptive_interval_follows_activity():
+    """测试活跃仓库的轮询间隔更短，冷门仓库更长且受上下限约束"""
+    policy = AdaptivePolicy(min_hours=1, max_hours=72, target_events=10)
+    now = datetime.now(timezone.utc)
+
+    def record(hours_ago, commits):
+        created = now - timedelta(hours=hours_ago)
+        return {
+            'created_at': created.isoformat(),
+            'update_data': {'commits': [
+                {'sha': f"{hours_ago}-{i}", 'date': (created - timedelta(minutes=i)).isoformat()}
+                for i in range(commits)
+            ]}
+        }
+
+    hot = policy.change_rate([record(0, 40), record(24, 40), record(48, 40)], now=now)
+    cold = policy.change_rate([record(0, 0), record(48, 0)], now=now)
+
+    assert policy.interval_hours(hot) < policy.interval_hours(policy.change_rate([record(48, 5)], now=now))
+    assert policy.interval_hours(cold) == 72
+    assert policy.interval_hours(10000) == 1
+    assert policy.interval_hours(None) == 24
+
+
+def test_adaptive_probe_skip():
+    """测试探测结果未变化时跳过，超过最长间隔后强制更新"""
+    policy = AdaptivePolicy(max_hours=24)
+    probe = {'pushed_at': '2026-01-01T00:00:00+00:00', 'updated_at': None, 'open_issues': 3}
+    recent = datetime.now().isoformat()
+    stale = (datetime.now() - timedelta(hours=30)).isoformat()
+
+    assert policy.should_skip(probe, dict(probe), recent)
+    assert not policy.should_skip(probe, dict(probe, open_issues=4), recent)
+    assert not policy.should_skip(probe, dict(probe), stale)
+    assert not policy.should_skip(probe, None, recent)
+
+
+def test_poll_only_fetches_and_records():
+    """测试轮询只拉取并记录更新，不生成报告、不发送通知"""
+    sentinel = GitHubSentinel.__new__(GitHubSentinel)
+    sentinel.config = make_config({})
+    sentinel.cluster = None
+    sentinel.rate_pacer = None
+    sentinel.scheduler = Mock()
+    sentinel.scheduler.adaptive.should_skip.return_value = False
+    sentinel.subscription_manager = Mock()
+    sentinel.subscription_manager.get_subscription.return_value = {'id': 7, 'last_updated': 'Never', 'probe': None}
+    sentinel.github_client = Mock()
+    sentinel.github_client.probe_repository.return_value = {'pushed_at': '2026-01-01T00:00:00+00:00'}
+    sentinel.github_client.fetch_repository_updates.return_value = {'issues': []}
+    sentinel.report_generator = Mock()
+    sentinel._send_notification = Mock()
+
+    assert sentinel.poll_repository("a/one") is True
+
+    sentinel.github_client.fetch_repository_updates.assert_called_once_with("a/one", days=7)
+    sentinel.subscription_manager.save_update_record.assert_called_once_with(7, {'issues': []})
+    sentinel.subscription_manager.save_probe.assert_called_once_with(7, {'pushed_at': '2026-01-01T00:00:00+00:00'})
+    sentinel.report_generator.generate_report.assert_not_called()
+    sentinel._send_notification.assert_not_called()
+
+
+def test_adaptive_mode_adds_poll_jobs():
+    """测试启用自适应轮询时为每个订阅添加轮询任务"""
+    sentinel = Mock()
+    sentinel.subscription_manager.list_subscriptions.return_value = [{'repo_name': 'a/one', 'schedule': None}]
+    sentinel.subscription_manager.get_update_history.return_value = []
+    sentinel.subscription_manager.list_watches.return_value = []
+    config = make_config({"schedule.jobstore": "memory", "schedule.adaptive.enabled": True})
+    scheduler = Scheduler(config, sentinel)
+    scheduler._setup_jobs()
+
+    job_ids = {job.id for job in scheduler.scheduler.get_jobs()}
+    assert POLL_JOB_PREFIX + 'a/one' in job_ids
+    assert SUBSCRIPTION_JOB_PREFIX + 'a/one' in job_ids
+
+
+def test_digest_email_falls_back_to_batch_mode():
+    """测试邮件 digest 模式下 spread 调度改用 batch 模式，使报告能合并为一封邮件"""
+    sentinel = Mock()
+    sentinel.subscription_manager.list_watches.return_value = []
+    config = make_config({"schedule.jobstore": "memory", "schedule.adaptive.enabled": True,
+                          "notification.email.enabled": True, "notification.email.mode": "digest"})
+    scheduler = Scheduler(config, sentinel)
+    scheduler._setup_jobs()
+
+    assert scheduler.mode == "batch" and scheduler.adaptive is None
+    assert [job.id for job in scheduler.scheduler.get_jobs()] == [PIPELINE_JOB_ID]
+
+
+def test_digest_collection_is_per_batch():
+    """测试其他线程的单仓库通知不会混入正在运行的批次摘要"""
+    sentinel = GitHubSentinel.__new__(GitHubSentinel)
+    sentinel.config = make_config({"notification.email.enabled": True})
+    sentinel.outbox = None
+    sentinel._batch_state = threading.local()
+    sentinel._notifiers = {'email': Mock(digest_enabled=True)}
+    sentinel._notifiers['email'].session.return_value = nullcontext()
+    sentinel._dispatch_notification = Mock()
+
+    with sentinel._notification_batch():
+        sentinel._send_notification("a/one", "报告一")
+        other = threading.Thread(target=sentinel._send_notification, args=("b/two", "报告二"))
+        other.start()
+        other.join()
+
+    calls = [call.args for call in sentinel._dispatch_notification.call_args_list]
+    assert calls[0] == ('email', {'subject': "GitHub Sentinel - b/two 更新报告", 'content': "报告二"})
+    assert calls[1] == ('email', {'kind': 'digest', 'reports': {"a/one": "报告一"}})
+
+
+def test_background_scheduler_triggers_existing_job():
+    """测试后台调度器可手动触发已有任务并记录运行结果"""
+    sentinel = Mock()
+    sentinel.subscription_manager.list_watches.return_value = []
+    config = make_config({"schedule.jobstore": "memory", "schedule.mode": "batch"})
+    scheduler = Scheduler(config, sentinel, background=True)
+    scheduler.start()
+    try:
+        assert scheduler.running
+        assert scheduler.trigger_job(PIPELINE_JOB_ID)
+        assert not scheduler.trigger_job("missing")
+
+        deadline = time.time() + 5
+        while not scheduler.recent_runs() and time.time() < deadline:
+            time.sleep(0.05)
+    finally:
+        scheduler.stop()
+        scheduler_module._active_sentinel = None
+
+    sentinel.run_update_pipeline.assert_called_once()
+    run = scheduler.recent_runs()[0]
+    assert run['job_id'] == PIPELINE_JOB_ID and run['status'] == 'success'
+
+
+def test_jobstore_created_on_start(monkeypatch):
+    """测试任务存储在启动时才创建，启动时读取已保存的任务并同步"""
+    store = MemoryJobStore()
+    created = []
+    monkeypatch.setattr(Scheduler, '_create_jobstore', lambda self: created.append(self) or store)
+    sentinel = Mock()
+    sentinel.subscription_manager.list_watches.return_value = []
+    config = make_config({"schedule.mode": "batch"})
+
+    scheduler = Scheduler(config, sentinel, background=True)
+    assert not created
+    scheduler.start()
+    try:
+        assert created == [scheduler]
+        saved = store.lookup_job(PIPELINE_JOB_ID)
+        assert saved is not None
+    finally:
+        scheduler.stop()
+        scheduler_module._active_sentinel = None
+    assert not scheduler.running
+
@@ -0,0 +1,167 @@
+"""
+重要性评分测试
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, Mock, patch
+
+from github.Issue import Issue
+
+from src.ai.report_generator import ReportGenerator
+from src.core.github_client import GitHubClient
+from src.core.scoring import ImportanceScorer, release_references
+from src.storage.activity_warehouse import ActivityWarehouse
+
+
+def _item(number, labels=(), reactions=0, comments=0, author='alice', association='NONE', **extra):
+    """创建条目"""
+    return dict({'number': number, 'title': f'Item {number}', 'state': 'closed', 'labels': list(labels), 'reactions': reactions,
+                 'comments': comments, 'author': author, 'author_association': association}, **extra)
+
+
+def test_rank_orders_by_features_and_applies_repo_rules():
+    """测试按特征排序，订阅规则覆盖全局规则"""
+    scorer = ImportanceScorer(
+        rules={'exclude_authors': ['dependabot[bot]']},
+        repo_rules={'A/B': {'exclude_labels': ['wontfix'], 'boost_labels': {'ui': 90}}},
+    )
+    items = [
+        _item(1),
+        _item(2, labels=['security'], reactions=12, association='MEMBER'),
+        _item(3, labels=['dependencies'], author='dependabot[bot]'),
+        _item(4, comments=20),
+        _item(5, labels=['wontfix'], reactions=100),
+        _item(6, labels=['area/ui']),
+        _item(7, merged=True, additions=400, deletions=100),
+    ]
+    referenced = release_references([{'body': '- Fix leak (#1)\n- https://github.com/a/b/pull/7'}])
+    assert referenced == {1, 7}
+
+    ranked = scorer.rank("a/b", items, referenced)
+    numbers = [item['number'] for item in ranked]
+    assert numbers[:2] == [6, 2]
+    assert 3 not in numbers and 5 not in numbers
+    # 被 Release 引用的条目高于同等条件的普通条目
+    assert numbers.index(7) < numbers.index(4)
+    assert 'score' not in items[0]
+
+    # 其他仓库只使用全局规则
+    other = [item['number'] for item in scorer.rank("c/d", items, limit=3)]
+    assert 5 in other and 3 not in other and len(other) == 3
+    assert scorer.top_k("a/b") == 50
+
+
+def _search_pr(number, labels=(), reactions=0):
+    """创建 Search API 返回的 PR"""
+    pr = MagicMock()
+    pr.number = number
+    pr.title = f"PR {number}"
+    pr.state = "closed"
+    pr.user.login = "bob"
+    pr.created_at = pr.updated_at = pr.closed_at = datetime(2026, 1, 18, 10, 0, tzinfo=timezone.utc)
+    pr.comments = 0
+    pr.labels = [Mock() for _ in labels]
+    for label, name in zip(pr.labels, labels):
+        label.name = name
+    pr.body = ""
+    pr.html_url = f"https://github.com/a/b/pull/{number}"
+    pr.raw_data = {'author_association': "CONTRIBUTOR", 'reactions': {'total_count': reactions},
+                   'pull_request': {'merged_at': "2026-01-18T12:00:00Z"}}
+    full = MagicMock(merged=True, merged_at=datetime(2026, 1, 18, 12, 0, tzinfo=timezone.utc),
+                     additions=10, deletions=2, changed_files=1)
+    pr.as_pull_request.return_value = full
+    return pr
+
+
+@patch('src.core.github_client.Github')
+def test_search_requests_details_only_for_top_items(mock_github):
+    """测试 Search API 路径先预评分，只为入选的 PR 请求完整信息"""
+    prs = [_search_pr(n) for n in range(1, 6)] + [_search_pr(6, ['bug'], reactions=30), _search_pr(7, ['security'])]
+    mock_github.return_value.search_issues.side_effect = \
+        lambda query, **kwargs: prs if "-created:" not in query else []
+
+    client = GitHubClient("test_token", max_items=2, scorer=ImportanceScorer())
+    result = client.get_daily_pull_requests("a/b", datetime(2026, 1, 18))
+
+    assert [pr['number'] for pr in result] == [6, 7]
+    assert result[0]['merged'] and result[0]['additions'] == 10
+    assert sum(pr.as_pull_request.call_count for pr in prs) == 2
+
+
+@patch('src.core.github_client.Github')
+def test_warehouse_backfill_requests_details_only_for_top_items(mock_github, tmp_path):
+    """测试启用本地活动仓库时补齐只保存搜索结果字段，读取后只为入选的 PR 请求完整信息"""
+    prs = [_search_pr(n) for n in range(1, 6)] + [_search_pr(6, ['bug'], reactions=30), _search_pr(7, ['security'])]
+
+    def search(query, **kwargs):
+        items = prs if "-created:" not in query else []
+        results = Mock(totalCount=len(items))
+        results.get_page.side_effect = lambda page: items if page == 0 else []
+        return results
+
+    github = mock_github.return_value
+    github.search_issues.side_effect = search
+    full = MagicMock(merged=True, merged_at=datetime(2026, 1, 18, 12, 0, tzinfo=timezone.utc),
+                     additions=10, deletions=2, changed_files=1)
+    github.get_repo.return_value.get_pull.return_value = full
+
+    warehouse = ActivityWarehouse(str(tmp_path / "warehouse.sqlite"))
+    client = GitHubClient("test_token", max_items=2, scorer=ImportanceScorer(), warehouse=warehouse)
+    day = datetime(2026, 1, 18, tzinfo=timezone.utc)
+    first = client.get_daily_pull_requests("a/b", day)
+    second = client.get_daily_pull_requests("a/b", day)
+
+    assert [pr['number'] for pr in first] == [pr['number'] for pr in second] == [6, 7]
+    assert first[0]['merged'] and first[0]['additions'] == 10 and second[1]['changed_files'] == 1
+    assert sum(pr.as_pull_request.call_count for pr in prs) == 0
+    # 详情写回本地，再次读取不重复请求
+    assert github.get_repo.return_value.get_pull.call_count == 2
+
+
+def test_report_prompt_keeps_top_k_items(tmp_path):
+    """测试提示词只保留每类前 top_k 条，并注明省略数量"""
+    config = Mock()
+    config.get = Mock(side_effect=lambda key, default=None: {
+        "ai.language": "zh-CN",
+        "report.map_reduce.cache_path": str(tmp_path / "chunks.json"),
+        "scoring.repos": {"a/b": {"top_k": 2}},
+    }.get(key, default))
+    generator = ReportGenerator(config)
+    generator.ai_client = Mock(provider="openai", model="gpt-4")
+    generator.ai_client.is_available.return_value = True
+    generator.ai_client.generate_completion.return_value = "报告"
+
+    titles = ["Typo in README", "Memory leak when loading plugins", "Add dark theme", "Segfault on exit"]
+    issues = [dict(_item(n + 1, reactions=n * 5), title=title) for n, title in enumerate(titles)]
+    progress_file = tmp_path / "progress.md"
+    progress_file.write_text("# a/b 每日进展\n\n## 🐛 Issues\n\n#### #1 Typo in README\n", encoding='utf-8')
+
+    generator.generate_daily_report("a/b", str(progress_file), output_dir=str(tmp_path / "reports"),
+                                    issues=issues, pull_requests=[])
+
+    prompt = generator.ai_client.generate_completion.call_args.kwargs['user_prompt']
+    assert "列出其中 2 条，其余 2 条重要性较低" in prompt
+    assert "Segfault on exit" in prompt and "Add dark theme" in prompt
+    assert "Typo in README" not in prompt
+
+
+def test_search_result_fields_from_real_issue():
+    """测试从 PyGithub 的真实 Issue 对象（搜索结果 JSON）读取反应数、作者关系和合并时间，不额外请求"""
+    requester = Mock()
+    raw = {
+        'number': 8, 'title': "Fix crash", 'state': "closed", 'user': {'login': "bob"},
+        'author_association': "MEMBER", 'comments': 3, 'reactions': {'total_count': 7},
+        'created_at': "2026-01-18T10:00:00Z", 'updated_at': "2026-01-18T12:00:00Z",
+        'closed_at': "2026-01-18T12:00:00Z", 'labels': [{'name': "bug"}], 'body': None,
+        'html_url': "https://github.com/a/b/pull/8",
+        'url': "https://api.github.com/repos/a/b/issues/8",
+        'pull_request': {'url': "https://api.github.com/repos/a/b/pulls/8", 'merged_at': "2026-01-18T12:00:00Z"},
+    }
+    item = Issue(requester, {}, raw, completed=False)
+
+    issue = GitHubClient._issue_to_dict(item, is_new=True)
+    assert issue['reactions'] == 7 and issue['author_association'] == "MEMBER"
+    pr = GitHubClient._pull_request_to_dict(item, is_new=False, details=False)
+    assert pr['merged'] and pr['merged_at'] == "2026-01-18T12:00:00+00:00"
+    assert pr['labels'] == ["bug"] and pr['comments'] == 3
+    assert not requester.requestJsonAndCheck.called
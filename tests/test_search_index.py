@@ -0,0 +1,65 @@
+"""
+全文搜索索引测试
+"""
+
+from src.storage.search_index import SearchIndex
+
+
+def make_issue(number, title, body='', labels=None, author='alice'):
+    """创建条目"""
+    return {'number': number, 'title': title, 'body': body, 'labels': labels or [], 'author': author,
+            'updated_at': '2026-01-02T10:00:00+00:00', 'url': f'https://github.com/a/b/issues/{number}'}
+
+
+def test_index_and_search_items(tmp_path):
+    """测试索引条目后按标题、正文、标签检索，内容未变化时不重复写入"""
+    index = SearchIndex(str(tmp_path / "search.sqlite"))
+    issues = [make_issue(1, 'Fix memory leak in parser', '修复解析器内存泄漏问题', ['bug']),
+              make_issue(2, 'Add dark mode', 'UI 改进', ['feature'], author='bob')]
+
+    assert index.index_items("A/B", "issue", issues) == 2
+    assert index.index_items("a/b", "issue", issues) == 0
+    assert index.count() == 2
+
+    assert [r['title'] for r in index.search("memory leak")] == ['#1 Fix memory leak in parser']
+    assert [r['title'] for r in index.search("内存泄漏")] == ['#1 Fix memory leak in parser']
+    assert [r['title'] for r in index.search("feature")] == ['#2 Add dark mode']
+    assert index.search("memory dark") == []
+    # 少于 3 个字符的关键词按子串扫描
+    assert [r['title'] for r in index.search("UI")] == ['#2 Add dark mode']
+
+    # 内容变化时替换旧文档
+    issues[1]['title'] = 'Add light theme'
+    assert index.index_items("a/b", "issue", issues) == 1
+    assert index.search("dark mode") == []
+    assert index.count() == 2
+
+
+def test_search_filters_and_reports(tmp_path):
+    """测试按仓库和类型过滤，并为已有报告补建索引"""
+    index = SearchIndex(str(tmp_path / "search.sqlite"))
+    index.index_items("a/b", "pull_request", [make_issue(3, 'Refactor scheduler')])
+    index.index_items("c/d", "issue", [make_issue(4, 'Scheduler crash')])
+
+    report_dir = tmp_path / "reports" / "a_b"
+    report_dir.mkdir(parents=True)
+    (report_dir / "a_b_report_2026-01-05.md").write_text("# a/b 每日报告\n\n调度器重构完成", encoding='utf-8')
+    assert index.index_report_files(str(tmp_path / "reports")) == 1
+    assert index.index_report_files(str(tmp_path / "reports")) == 0
+
+    assert {r['repo'] for r in index.search("scheduler")} == {"a/b", "c/d"}
+    assert [r['kind'] for r in index.search("scheduler", repo_name="C/D")] == ["issue"]
+    reports = index.search("调度器重构", kind="report")
+    assert len(reports) == 1
+    assert reports[0]['repo'] == "a/b" and reports[0]['date'] == "2026-01-05"
+    assert reports[0]['title'] == "a/b 每日报告"
+
+
+def test_keywords_do_not_match_filter_columns(tmp_path):
+    """测试关键词不匹配仓库名和类型列"""
+    index = SearchIndex(str(tmp_path / "search.sqlite"))
+    index.index_items("issue/tracker", "issue", [make_issue(5, 'Improve docs')])
+
+    assert index.search("issue") == []
+    assert index.search("tracker") == []
+    assert len(index.search("docs", repo_name="issue/tracker", kind="issue")) == 1
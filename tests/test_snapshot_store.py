@@ -0,0 +1,93 @@
+"""
+活动快照测试
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+from src.core.github_client import GitHubClient
+from src.storage.snapshot_store import ActivitySnapshotStore, select_window_items
+
+
+def make_item(number, created, updated, state='closed'):
+    """创建快照条目"""
+    return {
+        'number': number,
+        'title': f'Item {number}',
+        'state': state,
+        'created_at': created.isoformat(),
+        'updated_at': updated.isoformat(),
+    }
+
+
+NOW = datetime.now(timezone.utc)
+TODAY = NOW.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def test_select_window_items_matches_search_semantics():
+    """测试按日期筛选已关闭条目，新创建的排在前面"""
+    yesterday = TODAY - timedelta(days=1)
+    items = [
+        make_item(1, TODAY, TODAY),
+        make_item(2, yesterday - timedelta(days=5), TODAY),
+        make_item(3, TODAY, TODAY, state='open'),
+        make_item(4, yesterday - timedelta(days=5), yesterday - timedelta(days=3)),
+    ]
+
+    result = select_window_items(items, TODAY, TODAY + timedelta(days=1))
+
+    assert [i['number'] for i in result] == [1, 2]
+    assert result[0]['is_new'] and result[1]['is_updated']
+
+
+def test_lookup_full_and_partial_coverage(tmp_path):
+    """测试快照完整覆盖与部分覆盖"""
+    store = ActivitySnapshotStore(str(tmp_path / "snapshots.json"))
+    store.record("a/one", "issues", [make_item(1, TODAY, TODAY)], covered_from=NOW - timedelta(days=3))
+
+    items, missing, fetched_at = store.lookup("a/one", "issues", TODAY, TODAY + timedelta(days=1))
+    assert missing is None and len(items) == 1 and fetched_at <= datetime.now(timezone.utc)
+
+    start = TODAY - timedelta(days=7)
+    items, missing, _ = store.lookup("a/one", "issues", start, TODAY + timedelta(days=1))
+    assert missing == (start, NOW - timedelta(days=3))
+
+    assert store.lookup("b/two", "issues", TODAY, TODAY) is None
+
+
+def test_lookup_ignores_stale_snapshot(tmp_path):
+    """测试过期快照不再复用"""
+    store = ActivitySnapshotStore(str(tmp_path / "snapshots.json"), max_age_minutes=10)
+    store.record("a/one", "issues", [], covered_from=NOW - timedelta(days=1),
+                 fetched_at=NOW - timedelta(minutes=30))
+
+    assert store.lookup("a/one", "issues", TODAY, TODAY) is None
+
+
+@patch('src.core.github_client.Github')
+def test_daily_issues_skip_search_when_snapshot_covers(mock_github, tmp_path):
+    """测试快照完整覆盖时不调用 Search API"""
+    store = ActivitySnapshotStore(str(tmp_path / "snapshots.json"))
+    store.record("a/one", "issues", [make_item(7, TODAY, TODAY)], covered_from=NOW - timedelta(days=1))
+    search = mock_github.return_value.search_issues = Mock()
+
+    client = GitHubClient("test_token", snapshot_store=store)
+    issues = client.get_daily_issues("a/one", start_date=TODAY, end_date=TODAY)
+
+    assert [i['number'] for i in issues] == [7]
+    search.assert_not_called()
+
+
+@patch('src.core.github_client.Github')
+def test_partial_snapshot_top_up_respects_limit(mock_github, tmp_path):
+    """测试快照部分覆盖时，补充搜索按数量上限获取，而不是完整拉取"""
+    store = ActivitySnapshotStore(str(tmp_path / "snapshots.json"))
+    store.record("a/one", "issues", [make_item(7, TODAY, TODAY)], covered_from=NOW - timedelta(hours=1))
+
+    client = GitHubClient("test_token", max_items=5, snapshot_store=store)
+    client._search_closed = Mock(return_value=[make_item(3, TODAY - timedelta(days=2), TODAY - timedelta(days=2))])
+    start = TODAY - timedelta(days=3)
+    issues = client.get_daily_issues("a/one", start_date=start, end_date=TODAY)
+
+    assert sorted(i['number'] for i in issues) == [3, 7]
+    assert client._search_closed.call_args.args[4] == 5
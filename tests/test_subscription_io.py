@@ -0,0 +1,59 @@
+"""
+订阅批量导入 / 导出测试
+"""
+
+from unittest.mock import Mock
+
+from src.core.subscription_io import parse_subscriptions, dump_subscriptions
+from src.core.subscription_manager import SubscriptionManager
+from src.storage.database import Database
+
+
+def test_parse_formats():
+    """测试解析 YAML / CSV / txt"""
+    yaml_text = "- a/one\n- repo: b/two\n  tags: [x, y]\n  frequency: weekly\n  time: '9:30'\n"
+    entries = parse_subscriptions(yaml_text, 'yaml')
+    assert entries[0] == {'repo_name': 'a/one', 'tags': [], 'frequency': None, 'time': None}
+    assert entries[1] == {'repo_name': 'b/two', 'tags': ['x', 'y'], 'frequency': 'weekly', 'time': '9:30'}
+
+    csv_text = "repo_name,tags,frequency,time\na/one,\"x,y\",daily,\n"
+    assert parse_subscriptions(csv_text, 'csv')[0]['tags'] == ['x', 'y']
+    assert parse_subscriptions("a/one,x\n", 'csv')[0]['tags'] == ['x']
+
+    assert [e['repo_name'] for e in parse_subscriptions("# list\na/one\n\nb/two  # note\n", 'txt')] == ['a/one', 'b/two']
+
+
+def test_dump_roundtrip():
+    """测试导出结果可以重新导入"""
+    subs = [{'repo_name': 'a/one', 'tags': ['x', 'y'], 'frequency': 'weekly', 'time': '09:30'},
+            {'repo_name': 'b/two', 'tags': [], 'frequency': None, 'time': None}]
+    for fmt in ('yaml', 'csv'):
+        parsed = parse_subscriptions(dump_subscriptions(subs, fmt), fmt)
+        assert [(e['repo_name'], e['tags'], e['frequency'] or None, e['time'] or None) for e in parsed] == \
+            [(s['repo_name'], s['tags'], s['frequency'], s['time']) for s in subs]
+
+
+def test_import_subscriptions_single_write(tmp_path):
+    """测试批量导入：过滤已订阅 / 重复 / 无效仓库，新订阅一次写入"""
+    db = Database(str(tmp_path / "sentinel.json"))
+    db.add_subscription("a/existing")
+    client = Mock()
+    client.validate_repositories = Mock(return_value={"a/new": "A/New", "a/missing": None})
+    manager = SubscriptionManager(db, client)
+    db._save_data = Mock(wraps=db._save_data)
+
+    result = manager.import_subscriptions([
+        {'repo_name': 'A/Existing', 'tags': []},
+        {'repo_name': 'a/new', 'tags': ['x']},
+        {'repo_name': 'a/NEW', 'tags': []},
+        {'repo_name': 'a/missing', 'tags': []},
+        {'repo_name': 'a/badtime', 'tags': [], 'time': '25:00'},
+    ])
+
+    assert result['added'] == ['A/New']
+    assert [r for r, _ in result['skipped']] == ['A/Existing', 'a/NEW']
+    assert [r for r, _ in result['invalid']] == ['a/badtime', 'a/missing']
+    assert db._save_data.call_count == 1
+    client.validate_repositories.assert_called_once_with(['a/new', 'a/missing'])
+    assert db.get_subscription_by_name("A/New")['tags'] == 'x'
+    assert [e['repo_name'] for e in manager.export_subscriptions()] == ['a/existing', 'A/New']
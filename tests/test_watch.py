@@ -0,0 +1,144 @@
+"""
+组织 / 主题订阅测试
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+from src.core.github_client import GitHubClient
+from src.core.watch import diff_snapshot, parse_watch_query, select_active
+from src.main import GitHubSentinel
+from src.storage.database import Database
+from src.core.subscription_manager import SubscriptionManager
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def probe(hours_ago, open_issues=0, archived=False):
+    """构造活动快照"""
+    when = (NOW - timedelta(hours=hours_ago)).isoformat()
+    return {'pushed_at': when, 'updated_at': when, 'open_issues': open_issues, 'archived': archived}
+
+
+def test_parse_watch_query():
+    """测试识别组织 / 主题订阅"""
+    assert parse_watch_query("org:Microsoft") == "org:microsoft"
+    assert parse_watch_query(" topic:LLM ") == "topic:llm"
+    assert parse_watch_query("owner/repo") is None
+    assert parse_watch_query("org:a/b") is None
+
+
+def test_select_active_only_changed_repos_ranked_by_activity():
+    """测试只选出有变化的仓库，按活动时间排序并限制数量"""
+    previous = {'a/quiet': probe(48), 'a/busy': probe(5), 'a/issues': probe(30)}
+    current = {
+        'a/quiet': probe(48),
+        'a/busy': probe(1),
+        'a/issues': probe(30, open_issues=2),
+        'a/new': probe(2),
+        'a/new-stale': probe(200),
+        'a/archived': probe(1, archived=True),
+    }
+
+    assert diff_snapshot(previous, current) == {
+        'added': ['a/archived', 'a/new', 'a/new-stale'],
+        'removed': [],
+        'changed': ['a/busy', 'a/issues'],
+    }
+    assert select_active(previous, current, max_repos=0, now=NOW) == ['a/busy', 'a/new', 'a/issues']
+    assert select_active(previous, current, max_repos=2, now=NOW) == ['a/busy', 'a/new']
+    assert select_active({}, current, first_run=True, now=NOW) == ['a/busy', 'a/new']
+
+
+@patch('src.core.github_client.Github')
+def test_expand_query_paginates(mock_github):
+    """测试分页展开组织下的仓库"""
+    def page(names, has_next, cursor=None):
+        nodes = [{'nameWithOwner': n, 'pushedAt': '2026-03-01T10:00:00Z', 'updatedAt': None,
+                  'isArchived': False, 'issues': {'totalCount': 1}, 'pullRequests': {'totalCount': 2}}
+                 for n in names]
+        return {'repositoryOwner': {'repositories': {
+            'pageInfo': {'hasNextPage': has_next, 'endCursor': cursor}, 'nodes': nodes}}}, []
+
+    client = GitHubClient("test_token")
+    client.graphql = Mock(side_effect=[page(['acme/a', 'acme/b'], True, 'c1'), page(['acme/c'], False)])
+
+    repos = client.expand_query("org:acme")
+
+    assert list(repos) == ['acme/a', 'acme/b', 'acme/c']
+    assert repos['acme/a'] == {'pushed_at': '2026-03-01T10:00:00+00:00', 'updated_at': None,
+                               'open_issues': 3, 'archived': False}
+    assert client.graphql.call_args_list[1][0][1]['cursor'] == 'c1'
+
+
+def test_run_watch_processes_changed_repos_and_saves_snapshot(tmp_path):
+    """测试展开后只为有变化的仓库生成报告，失败的仓库下次仍会处理"""
+    db = Database(str(tmp_path / "sentinel.json"))
+    github_client = Mock()
+    manager = SubscriptionManager(db, github_client)
+    manager.add_watch("org:acme")
+    db.update_watch_snapshot("org:acme", {'acme/a': probe(30), 'acme/b': probe(30)})
+
+    sentinel = GitHubSentinel.__new__(GitHubSentinel)
+    sentinel.config = Mock(get=lambda key, default=None: default)
+    sentinel.github_client = github_client
+    sentinel.subscription_manager = manager
+    sentinel.cluster = None
+    sentinel.rate_pacer = None
+    sentinel.generate_repository_daily_report = Mock(side_effect=lambda repo: repo if repo == 'acme/a' else 1 / 0)
+    github_client.expand_query.return_value = {'acme/a': probe(1), 'acme/b': probe(2), 'acme/c': probe(40)}
+
+    assert sentinel.run_watch("org:acme") == ['acme/a']
+
+    watch = manager.get_watch("org:acme")
+    assert watch['repos']['acme/a'] == probe(1)
+    # 处理失败的仓库保留旧快照
+    assert watch['repos']['acme/b'] == probe(30)
+    assert 'acme/c' in watch['repos']
+
+
+def test_run_watch_keeps_snapshot_for_repos_over_cap(tmp_path):
+    """测试超出 max_active 的仓库保留旧快照，下一次展开时处理"""
+    db = Database(str(tmp_path / "sentinel.json"))
+    github_client = Mock()
+    manager = SubscriptionManager(db, github_client)
+    manager.add_watch("org:acme")
+    db.update_watch_snapshot("org:acme", {'acme/a': probe(30), 'acme/b': probe(30)})
+
+    config = {'watch.max_active': 1}
+    sentinel = GitHubSentinel.__new__(GitHubSentinel)
+    sentinel.config = Mock(get=lambda key, default=None: config.get(key, default))
+    sentinel.github_client = github_client
+    sentinel.subscription_manager = manager
+    sentinel.cluster = None
+    sentinel.rate_pacer = None
+    sentinel.generate_repository_daily_report = Mock(side_effect=lambda repo: repo)
+    github_client.expand_query.return_value = {'acme/a': probe(1), 'acme/b': probe(2)}
+
+    assert sentinel.run_watch("org:acme") == ['acme/a']
+    assert manager.get_watch("org:acme")['repos']['acme/b'] == probe(30)
+    assert sentinel.run_watch("org:acme") == ['acme/b']
+    assert sentinel.run_watch("org:acme") == []
+
+
+def test_run_watch_first_run_over_cap_is_processed_later(tmp_path):
+    """测试首次展开时超出上限的新仓库不会因为快照前进而被跳过"""
+    db = Database(str(tmp_path / "sentinel.json"))
+    github_client = Mock()
+    manager = SubscriptionManager(db, github_client)
+    manager.add_watch("org:acme")
+
+    now = datetime.now(timezone.utc)
+    fresh = lambda hours: {'pushed_at': (now - timedelta(hours=hours)).isoformat(), 'archived': False}
+    config = {'watch.max_active': 1}
+    sentinel = GitHubSentinel.__new__(GitHubSentinel)
+    sentinel.config = Mock(get=lambda key, default=None: config.get(key, default))
+    sentinel.github_client = github_client
+    sentinel.subscription_manager = manager
+    sentinel.cluster = None
+    sentinel.rate_pacer = None
+    sentinel.generate_repository_daily_report = Mock(side_effect=lambda repo: repo)
+    github_client.expand_query.return_value = {'acme/a': fresh(1), 'acme/b': fresh(2)}
+
+    assert sentinel.run_watch("org:acme") == ['acme/a']
+    assert sentinel.run_watch("org:acme") == ['acme/b']